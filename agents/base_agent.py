@@ -10,6 +10,9 @@ import asyncio
 import logging
 from enum import Enum
 
+from utils.metrics import AGENT_TASK_DURATION
+from utils.tracing import bind_trace, current_trace_id, reset_trace, span
+
 
 class AgentStatus(Enum):
     """Agent状态枚举"""
@@ -47,6 +50,7 @@ class BaseAgent(ABC):
         self._running = False
         self._task_queue = asyncio.Queue()
         self._worker_tasks: List[asyncio.Task] = []
+        self._processing_count = 0
     
     @abstractmethod
     async def initialize(self) -> bool:
@@ -140,7 +144,9 @@ class BaseAgent(ABC):
                 "started_at": None,
                 "completed_at": None,
                 "result": None,
-                "error": None
+                "error": None,
+                # 工作线程不继承提交方的上下文，记录调用链以便在处理任务时恢复
+                "trace_id": current_trace_id()
             }
             
             self.tasks[task_id] = task_info
@@ -153,6 +159,10 @@ class BaseAgent(ABC):
             self.logger.error(f"提交任务失败: {e}")
             return False
     
+    def get_queue_depth(self) -> int:
+        """获取积压任务数（排队中 + 处理中），供任务管理器做容量感知调度"""
+        return self._task_queue.qsize() + self._processing_count
+    
     async def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
         """获取任务状态"""
         task = self.tasks.get(task_id)
@@ -210,6 +220,8 @@ class BaseAgent(ABC):
         if not task:
             return
         
+        self._processing_count += 1
+        trace_token = bind_trace(task.get("trace_id"))
         try:
             # 更新任务状态
             task["status"] = TaskStatus.PROCESSING
@@ -218,7 +230,8 @@ class BaseAgent(ABC):
             
             # 处理任务
             start_time = datetime.now()
-            result = await self.process_task(task_id, task["data"])
+            with span("agent.process_task", agent_id=self.agent_id, task_id=task_id):
+                result = await self.process_task(task_id, task["data"])
             end_time = datetime.now()
             
             # 立即更新任务结果和状态（在返回结果后立即更新，确保Coordinator能快速检测到）
@@ -231,6 +244,7 @@ class BaseAgent(ABC):
             self.metrics["tasks_completed"] += 1
             self.metrics["total_processing_time"] += processing_time
             self.metrics["last_activity"] = end_time
+            AGENT_TASK_DURATION.observe(processing_time, agent=self.agent_id, status="completed")
             
             self.logger.info(f"✅ 任务完成: {task_id}, 耗时: {processing_time:.2f}秒")
             self.logger.info(f"📤 任务状态已更新为COMPLETED，等待Coordinator轮询...")
@@ -244,8 +258,13 @@ class BaseAgent(ABC):
             # 更新指标
             self.metrics["tasks_failed"] += 1
             self.metrics["last_activity"] = datetime.now()
+            AGENT_TASK_DURATION.observe((task["completed_at"] - task["started_at"]).total_seconds(),
+                                        agent=self.agent_id, status="failed")
             
             self.logger.error(f"❌ 任务失败: {task_id}, 错误: {e}")
+        finally:
+            self._processing_count -= 1
+            reset_trace(trace_token)
     
     def get_status(self) -> Dict[str, Any]:
         """获取Agent状态"""
@@ -14,6 +14,8 @@ import tarfile
 import shutil
 import tempfile
 import subprocess
+import uuid
+import time
 from typing import Dict, Any, List, Optional, Tuple, Set
 from datetime import datetime
 from pathlib import Path
@@ -28,6 +30,15 @@ from tools.static_analysis.bandit_tool import BanditTool
 from tools.static_analysis.mypy_tool import MypyTool
 from tools.static_analysis.semgrep_tool import SemgrepTool
 from tools.static_analysis.ruff_tool import RuffTool
+from utils.artifact_store import get_artifact_store
+from utils.metrics import AGENT_TASK_DURATION, observe_llm
+from utils.progress import progress_enabled, report_issue, report_stage, report_tool_completed
+from utils.pytest_sharding import ShardedPytestRunner
+from utils.storage_manager import TRASH_DIR_NAME, get_storage_manager
+from utils.tracing import span
+from .correlation_index import ApiUsageTable, LibraryIssueIndex
+from .issue_fingerprint import deduplicate_issues
+from .library_cache import LibraryAnalysisCache, build_probe_command, make_cache_key, parse_probe_output
 
 # 简化的设置类
 class Settings:
@@ -92,6 +103,9 @@ class BugDetectionAgent(BaseAgent):
                 self.use_docker = False
                 self.docker_runner = None
         
+        # 项目测试执行器（分片并行 pytest，结果来自 JUnit XML 报告）
+        self.pytest_runner = ShardedPytestRunner(config)
+        
         # 缺陷严重性级别
         self.severity_levels = {
             "error": {"level": 1, "name": "错误", "color": "#ff4444"},
@@ -144,8 +158,18 @@ class BugDetectionAgent(BaseAgent):
             "skip_dirs": [".git", "__pycache__", "node_modules", ".venv", "venv", "doc", "docs", "tests", ".github", "ci", "asv_bench", "conda.recipe", "web", "LICENSES"],
             "skip_files": ["*.pyc", "*.pyo", "*.pyd", "*.so", "*.dll", "*.rst", "*.md", "*.txt", "*.yml", "*.yaml", "*.json", "*.xml", "*.bat", "*.sh"],
             "timeout": 120,  # 2分钟超时
-            "sample_ratio": 0.2  # 只分析20%的文件
+            "sample_ratio": 0.2,  # 只分析20%的文件
+            "correlation_top_k": None,  # 每个测试问题最多关联的源码问题数（None 表示不限制）
+            "library_analysis_workers": 4,  # 依赖库定位/分析的并发数
+            "library_analysis_timeout": 600  # 单个依赖库分析的超时时间（秒）
+        }
+        
+        # 依赖库源码分析的工具参数（同时作为分析结果缓存键的一部分）
+        self.library_analyzer_args = {
+            "mypy": ["--no-error-summary", "--show-error-codes"],
+            "pylint": ["--disable=all", "--enable=E,F"]
         }
+        self._library_analysis_cache = None
     
     async def initialize(self) -> bool:
         """初始化缺陷检测AGENT"""
@@ -187,6 +211,8 @@ class BugDetectionAgent(BaseAgent):
     
     async def process_task(self, task_id: str, task_data: Dict[str, Any]) -> Dict[str, Any]:
         """处理缺陷检测任务"""
+        # 任务运行期间pin住所用的工作区，避免其他上传触发的预算检查把它回收
+        pinned_workspace = None
         try:
             self.logger.info(f"开始处理缺陷检测任务: {task_id}")
             
@@ -206,7 +232,9 @@ class BugDetectionAgent(BaseAgent):
                 if file_path and os.path.isfile(file_path) and any(file_path.endswith(ext) for ext in ['.zip', '.tar', '.tar.gz']):
                     # file_path 是压缩文件，需要解压
                     self.logger.info(f"检测到压缩文件，开始解压: {file_path}")
-                    project_path = await self.extract_project(file_path)
+                    report_stage("extracting")
+                    project_path = await self.extract_project(file_path, pin=True)
+                    pinned_workspace = Path(project_path)
                 elif not project_path:
                     # 只有 file_path 但不是压缩文件，当作项目路径使用
                     project_path = file_path
@@ -214,8 +242,11 @@ class BugDetectionAgent(BaseAgent):
                 # 现在 project_path 应该是已解压的目录
                 if not project_path or not os.path.exists(project_path):
                     raise ValueError(f"项目路径无效: {project_path}")
+                if pinned_workspace is None:
+                    pinned_workspace = self._pin_workspace(project_path)
                 
                 self.logger.info(f"开始分析项目: {project_path}")
+                report_stage("analyzing", project_path=project_path)
                 project_result = await self.analyze_project(project_path, options)
                 if project_result.get("success"):
                     detection_results = project_result.get("detection_results", {})
@@ -229,11 +260,21 @@ class BugDetectionAgent(BaseAgent):
                     }
             elif file_path:
                 # 单文件分析
+                pinned_workspace = self._pin_workspace(file_path)
+                report_stage("analyzing", file_path=file_path)
                 detection_results = await self._detect_file_bugs(file_path, options)
             else:
+                pinned_workspace = self._pin_workspace(project_path)
+                report_stage("analyzing", project_path=project_path)
                 detection_results = await self._detect_project_bugs(project_path, options)
             
+            # 增强静态分析在误报过滤时已逐个上报缺陷，其他分析方式在这里统一上报
+            if detection_results.get("analysis_type") != "enhanced_static_analysis" and progress_enabled():
+                for issue in detection_results.get("issues", []):
+                    report_issue(issue)
+            
             # 生成检测报告
+            report_stage("reporting")
             report = await self._generate_report(detection_results)
             
             self.logger.info(f"缺陷检测任务完成: {task_id}")
@@ -274,6 +315,18 @@ class BugDetectionAgent(BaseAgent):
                 "error": str(e),
                 "timestamp": datetime.now().isoformat()
             }
+        finally:
+            if pinned_workspace is not None:
+                get_storage_manager().unpin(pinned_workspace)
+    
+    def _pin_workspace(self, path: str) -> Optional[Path]:
+        """pin住包含该路径的已登记工作区，返回工作区路径（未登记时返回 None）"""
+        storage = get_storage_manager()
+        workspace = storage.find_workspace(path)
+        if workspace is None:
+            return None
+        storage.pin(workspace.path)
+        return workspace.path
     
     async def submit_task(self, task_id: str, task_data: Dict[str, Any]) -> str:
         """提交任务"""
@@ -301,9 +354,13 @@ class BugDetectionAgent(BaseAgent):
             raise
     
     async def _process_task_async(self, task_id: str, task_data: Dict[str, Any]):
-        """异步处理任务"""
+        """异步处理任务（在 submit_task 调用方的调用链中执行）"""
+        started = time.perf_counter()
         try:
-            result = await self.process_task(task_id, task_data)
+            with span("agent.process_task", agent_id=self.agent_id, task_id=task_id):
+                result = await self.process_task(task_id, task_data)
+            AGENT_TASK_DURATION.observe(time.perf_counter() - started, agent=self.agent_id,
+                                        status="completed" if result.get("success", True) else "failed")
             
             # 更新任务状态
             self.tasks[task_id].update({
@@ -316,6 +373,7 @@ class BugDetectionAgent(BaseAgent):
             self._save_tasks_state()
             
         except Exception as e:
+            AGENT_TASK_DURATION.observe(time.perf_counter() - started, agent=self.agent_id, status="failed")
             # 更新任务状态为失败
             self.tasks[task_id].update({
                 "status": "failed",
@@ -1312,35 +1370,38 @@ class BugDetectionAgent(BaseAgent):
                 "temperature": 0.3
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{deepseek_config.base_url}/chat/completions",
-                    headers=deepseek_config.get_headers(),
-                    json=request_data,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        ai_response = result["choices"][0]["message"]["content"]
-                        
-                        # 解析AI返回的JSON
-                        try:
-                            import json
-                            ai_result = json.loads(ai_response)
-                            issues = ai_result.get("issues", [])
+            with observe_llm("bug_detection_ai", request_data["model"]) as call:
+                async with aiohttp.ClientSession() as session:
+                    async with session.post(
+                        f"{deepseek_config.base_url}/chat/completions",
+                        headers=deepseek_config.get_headers(),
+                        json=request_data,
+                        timeout=aiohttp.ClientTimeout(total=30)
+                    ) as response:
+                        if response.status == 200:
+                            result = await response.json()
+                            call.record_usage(result)
+                            ai_response = result["choices"][0]["message"]["content"]
                             
-                            # 添加文件信息
-                            for issue in issues:
-                                issue["file"] = Path(file_path).name
-                                issue["language"] = language
-                            
-                            return issues
-                        except json.JSONDecodeError:
-                            self.logger.warning(f"AI返回格式错误: {ai_response}")
+                            # 解析AI返回的JSON
+                            try:
+                                import json
+                                ai_result = json.loads(ai_response)
+                                issues = ai_result.get("issues", [])
+                                
+                                # 添加文件信息
+                                for issue in issues:
+                                    issue["file"] = Path(file_path).name
+                                    issue["language"] = language
+                                
+                                return issues
+                            except json.JSONDecodeError:
+                                self.logger.warning(f"AI返回格式错误: {ai_response}")
+                                return []
+                        else:
+                            call.fail()
+                            self.logger.warning(f"AI分析失败: {response.status}")
                             return []
-                    else:
-                        self.logger.warning(f"AI分析失败: {response.status}")
-                        return []
         
         except Exception as e:
             self.logger.error(f"AI分析文件失败 {file_path}: {e}")
@@ -1662,13 +1723,17 @@ class BugDetectionAgent(BaseAgent):
             self.logger.error(f"项目检测失败: {e}")
             return False
     
-    async def extract_project(self, file_path: str) -> str:
+    async def extract_project(self, file_path: str, pin: bool = False) -> str:
         """解压项目文件并创建虚拟环境
 
         对已知的演示/测试项目（如 flask_simple_test）跳过解压后立即创建项目内虚拟环境，
         避免被热重载器监控而导致 Windows 下文件占用或卡死。此类项目的运行时会由动态检测模块
         使用预置缓存虚拟环境运行。
+
+        pin=True 时工作区从登记起即被pin住（覆盖安装依赖阶段），由调用方在使用结束后 unpin；
+        解压失败时在这里解除。
         """
+        pinned_dir = None
         try:
             file_path = Path(file_path)
             # 使用更精确的时间戳（包含微秒）和UUID，避免目录冲突
@@ -1735,6 +1800,10 @@ class BugDetectionAgent(BaseAgent):
                 shutil.copytree(file_path, extract_dir)
             
             self.logger.info(f"项目解压到: {extract_dir}")
+            # 登记工作区（解压后即计算大小，虚拟环境安装完成后再刷新）
+            await asyncio.to_thread(get_storage_manager().register, extract_dir, "temp_extract", pin)
+            if pin:
+                pinned_dir = extract_dir
 
             # 常规项目：创建虚拟环境并安装依赖
             # 如果启用了Docker，优先使用Docker
@@ -1814,6 +1883,8 @@ class BugDetectionAgent(BaseAgent):
             
         except Exception as e:
             self.logger.error(f"项目解压失败: {e}")
+            if pinned_dir is not None:
+                get_storage_manager().unpin(pinned_dir)
             raise
     
     async def _create_virtual_environment(self, project_path: Path) -> Path:
@@ -2177,6 +2248,9 @@ class BugDetectionAgent(BaseAgent):
             with open(venv_info_file, 'w') as f:
                 f.write(str(python_path))
             
+            # 虚拟环境与依赖计入工作区大小（遍历整个虚拟环境，放到线程中执行）
+            await asyncio.to_thread(get_storage_manager().refresh, project_path)
+            
             self.logger.info("依赖安装完成")
             return True
             
@@ -2276,11 +2350,12 @@ class BugDetectionAgent(BaseAgent):
                 self.logger.warning(f"cleanup_project_environment: 路径不存在，跳过清理: {project_path}")
                 return False
             
-            # 删除虚拟环境
+            # 删除虚拟环境（重命名到回收站后在后台删除，不阻塞）
+            storage = get_storage_manager()
             venv_path = project_path / "venv"
             if venv_path.exists():
                 self.logger.info(f"清理虚拟环境: {venv_path}")
-                shutil.rmtree(venv_path, ignore_errors=True)
+                storage.reclaim(venv_path)
             
             # 删除.venv_info文件
             venv_info_file = project_path / ".venv_info"
@@ -2297,6 +2372,7 @@ class BugDetectionAgent(BaseAgent):
                 if pyc_file.is_file():
                     pyc_file.unlink()
             
+            await asyncio.to_thread(storage.refresh, project_path)
             self.logger.info("项目环境清理完成")
             return True
             
@@ -2310,7 +2386,10 @@ class BugDetectionAgent(BaseAgent):
             temp_extract_dir = Path("temp_extract")
             if temp_extract_dir.exists():
                 self.logger.info(f"清理临时解压目录: {temp_extract_dir}")
-                shutil.rmtree(temp_extract_dir, ignore_errors=True)
+                storage = get_storage_manager()
+                for item in temp_extract_dir.iterdir():
+                    if item.name != TRASH_DIR_NAME:
+                        storage.reclaim(item)
                 return True
             return True
             
@@ -2593,6 +2672,7 @@ class BugDetectionAgent(BaseAgent):
             # ========== 步骤1: 文件过滤（排除第三方库等）==========
             self.logger.info("开始过滤项目文件，排除第三方库...")
             print(f"📁 [BugDetectionAgent] 开始过滤项目文件...")
+            report_stage("filtering_files")
             filtered_files_info = await self._filter_project_files(project_path)
             print(f"✅ [BugDetectionAgent] 文件过滤完成")
             
@@ -2650,11 +2730,13 @@ class BugDetectionAgent(BaseAgent):
                 analysis_files = python_files  # 分析所有过滤后的核心文件
             
             self.logger.info(f"实际分析文件数: {len(analysis_files)}")
+            report_stage("static_analysis", files=len(analysis_files), core_files=len(core_files))
             
             # Pylint：优先使用目录模式（更高效）
             if options.get("enable_pylint", True) and self.pylint_tool:
                 if use_pylint_directory_mode and hasattr(self.pylint_tool, 'analyze_directory'):
                     self.logger.info(f"使用Pylint目录模式分析（更高效，文件数: {len(analysis_files)}）...")
+                    tool_started = time.monotonic()
                     try:
                         # 只分析包含核心文件的目录
                         # 获取所有需要分析的文件的共同父目录
@@ -2702,6 +2784,7 @@ class BugDetectionAgent(BaseAgent):
                                         pylint_issues.append(issue)
                                 
                                 self.logger.info(f"Pylint目录模式检测到 {len(pylint_issues)} 个问题（已过滤为核心文件，原始问题数: {len(pylint_result['issues'])})")
+                        report_tool_completed("pylint", len(pylint_issues), time.monotonic() - tool_started)
                     except Exception as e:
                         self.logger.warning(f"Pylint目录模式分析失败，回退到单文件模式: {e}")
                         use_pylint_directory_mode = False  # 回退到单文件模式
@@ -2749,6 +2832,7 @@ class BugDetectionAgent(BaseAgent):
                 
                 # 批量并行处理文件（限制并发数以避免资源耗尽）
                 if analysis_files:
+                    tool_started = time.monotonic()
                     max_workers = options.get("max_parallel_files", 10)  # 默认最多10个文件并行
                     
                     # 分批处理
@@ -2772,6 +2856,13 @@ class BugDetectionAgent(BaseAgent):
                             mypy_issues.extend(mypy_batch)
                         
                         self.logger.info(f"批次 {i//max_workers + 1} 完成: Pylint={batch_pylint_count}个问题, Mypy={batch_mypy_count}个问题")
+                    
+                    # Pylint 和 Mypy 按文件并行执行，两者同时完成
+                    tool_duration = time.monotonic() - tool_started
+                    if options.get("enable_pylint", True) and self.pylint_tool:
+                        report_tool_completed("pylint", len(pylint_issues), tool_duration)
+                    if options.get("enable_mypy", True) and self.mypy_tool:
+                        report_tool_completed("mypy", len(mypy_issues), tool_duration)
             
             # Mypy仍然使用单文件模式（因为Mypy需要类型检查，目录模式可能不够精确）
             # 注意：如果使用了Pylint目录模式，Mypy需要单独执行
@@ -2796,6 +2887,7 @@ class BugDetectionAgent(BaseAgent):
                             return []
                     
                     # 批量并行处理Mypy
+                    tool_started = time.monotonic()
                     max_workers = options.get("max_parallel_files", 10)
                     for i in range(0, len(analysis_files), max_workers):
                         batch = analysis_files[i:i + max_workers]
@@ -2804,11 +2896,13 @@ class BugDetectionAgent(BaseAgent):
                             if isinstance(result, Exception):
                                 continue
                             mypy_issues.extend(result)
+                    report_tool_completed("mypy", len(mypy_issues), time.monotonic() - tool_started)
                 # else: Mypy的分析已经在单文件模式中处理了（在analyze_file_tools中）
             
             # Bandit：对整个目录进行安全检测（优先使用目录模式，更高效）
             if options.get("enable_bandit", True) and self.bandit_tool:
                 self.logger.info("开始Bandit安全检测...")
+                tool_started = time.monotonic()
                 try:
                     # Bandit优先使用目录模式，更高效
                     # 添加超时保护（最多5分钟）
@@ -2931,6 +3025,7 @@ class BugDetectionAgent(BaseAgent):
                         self.logger.info(f"Bandit检测到 {len(bandit_issues)} 个安全问题")
                     else:
                         self.logger.info("Bandit未检测到安全问题")
+                    report_tool_completed("bandit", len(bandit_issues), time.monotonic() - tool_started)
                 except Exception as e:
                     self.logger.warning(f"Bandit分析失败: {e}")
                     import traceback
@@ -2940,6 +3035,7 @@ class BugDetectionAgent(BaseAgent):
             if options.get("enable_semgrep", True):
                 if self.semgrep_tool:
                     self.logger.info("开始Semgrep目录分析（规则引擎检测Flask特定问题）...")
+                    tool_started = time.monotonic()
                     try:
                         semgrep_result = await self.semgrep_tool.analyze_directory(project_path)
                         if semgrep_result.get('success'):
@@ -2962,6 +3058,8 @@ class BugDetectionAgent(BaseAgent):
                                 self.logger.debug(f"Semgrep stdout: {semgrep_result.get('stdout', '')[:500]}")
                             if 'stderr' in semgrep_result:
                                 self.logger.debug(f"Semgrep stderr: {semgrep_result.get('stderr', '')[:500]}")
+                        report_tool_completed("semgrep", len(semgrep_issues), time.monotonic() - tool_started,
+                                              success=bool(semgrep_result.get('success')))
                     except Exception as e:
                         self.logger.warning(f"Semgrep分析失败: {e}")
                         import traceback
@@ -2973,6 +3071,7 @@ class BugDetectionAgent(BaseAgent):
             if options.get("enable_ruff", True):
                 if self.ruff_tool:
                     self.logger.info("开始Ruff目录分析（快速代码质量检查）...")
+                    tool_started = time.monotonic()
                     try:
                         # 添加超时保护（最多5分钟）
                         try:
@@ -3022,6 +3121,8 @@ class BugDetectionAgent(BaseAgent):
                         elif not ruff_result.get('success'):
                             error_msg = ruff_result.get('error', '未知错误') if isinstance(ruff_result, dict) else str(ruff_result)
                             self.logger.warning(f"Ruff分析失败: {error_msg}")
+                        report_tool_completed("ruff", len(ruff_issues), time.monotonic() - tool_started,
+                                              success=bool(ruff_result.get('success')))
                     except Exception as e:
                         self.logger.warning(f"Ruff分析失败: {e}")
                         import traceback
@@ -3036,6 +3137,7 @@ class BugDetectionAgent(BaseAgent):
                 max_ai_files = options.get("max_files_for_ai_analysis", 20)
                 ai_files_to_analyze = other_language_files[:max_ai_files] if len(other_language_files) > max_ai_files else other_language_files
                 self.logger.info(f"开始AI分析 {len(ai_files_to_analyze)} 个其他语言文件（共 {len(other_language_files)} 个，已过滤核心文件）...")
+                tool_started = time.monotonic()
                 for other_file in ai_files_to_analyze:
                     try:
                         # other_file 已经是绝对路径
@@ -3060,16 +3162,19 @@ class BugDetectionAgent(BaseAgent):
                     except Exception as e:
                         self.logger.warning(f"AI分析文件失败 {other_file}: {e}")
                         continue
+                report_tool_completed("ai_analyzer", len(ai_issues), time.monotonic() - tool_started)
             
             # 合并所有问题（方案B标准工具集，Ruff替代Flake8）
             all_issues = pylint_issues + mypy_issues + semgrep_issues + ruff_issues + bandit_issues + ai_issues
             
             # 可选：如果项目包含 tests/test 目录，则运行项目测试并将失败作为缺陷输出
             try:
+                tool_started = time.monotonic()
                 test_issues = await self._maybe_run_project_tests(project_path)
                 if test_issues:
                     self.logger.info(f"项目测试发现 {len(test_issues)} 个失败用例，纳入缺陷列表")
                     all_issues.extend(test_issues)
+                    report_tool_completed("pytest", len(test_issues), time.monotonic() - tool_started)
             except Exception as e:
                 self.logger.warning(f"运行项目测试时发生异常，跳过测试集成: {e}")
             
@@ -3082,10 +3187,29 @@ class BugDetectionAgent(BaseAgent):
             self.logger.info(f"AI分析: {len(ai_issues)} 个问题")
             self.logger.info(f"总计: {len(all_issues)} 个问题")
             
+            # ========== 跨工具去重（在任何LLM步骤之前）==========
+            # 同一缺陷常被多个工具同时报告（如 pylint W0611 / ruff F401），合并后保留所有来源
+            issues_before_dedup = len(all_issues)
+            if options.get("enable_issue_dedup", True) and all_issues:
+                all_issues = await asyncio.to_thread(deduplicate_issues, all_issues, project_path)
+                self.logger.info(f"跨工具去重: {issues_before_dedup} 个问题合并为 {len(all_issues)} 个唯一问题")
+            deduplication_stats = {
+                "original_count": issues_before_dedup,
+                "unique_count": len(all_issues),
+                "merged_count": issues_before_dedup - len(all_issues)
+            }
+            
             # ========== 步骤3: LLM智能误报过滤 ==========
             # 记录过滤前的原始问题数量（包括所有工具检测到的问题）
             original_issue_count_before_filter = len(all_issues)
             
+            # 通过过滤的缺陷立即上报进度（每个缺陷只上报一次）
+            streamed_issue_ids: Set[int] = set()
+            def stream_issue(issue: Dict[str, Any]):
+                if id(issue) not in streamed_issue_ids:
+                    streamed_issue_ids.add(id(issue))
+                    report_issue(issue)
+            
             if options.get("enable_llm_filter", True):
                 try:
                     from tools.llm_filter import get_false_positive_filter
@@ -3109,6 +3233,7 @@ class BugDetectionAgent(BaseAgent):
                     # 检查是否启用LLM过滤
                     if filter_config.get("enabled", True):
                         self.logger.info(f"开始LLM智能误报过滤（原始问题数: {original_issue_count_before_filter}）...")
+                        report_stage("llm_filtering", issues=original_issue_count_before_filter)
                         
                         # 初始化过滤器
                         llm_filter = get_false_positive_filter(filter_config)
@@ -3154,7 +3279,8 @@ class BugDetectionAgent(BaseAgent):
                             # 执行批量过滤
                             filtered_issues = await llm_filter.filter_issues_batch(
                                 issues_to_filter,
-                                get_source_code
+                                get_source_code,
+                                on_issue_kept=stream_issue if progress_enabled() else None
                             )
                             
                             # 合并过滤后的问题和未过滤的问题
@@ -3178,6 +3304,11 @@ class BugDetectionAgent(BaseAgent):
             else:
                 self.logger.info("LLM误报过滤已禁用（options中enable_llm_filter=False）")
             
+            # 未经过LLM过滤的缺陷（过滤禁用、失败或超出过滤上限）在这里上报
+            if progress_enabled():
+                for issue in all_issues:
+                    stream_issue(issue)
+            
             # 代码质量分析功能已移除，不再添加代码质量分析中的问题
             code_quality_issues = []
             
@@ -3286,7 +3417,8 @@ class BugDetectionAgent(BaseAgent):
                     "warning_count": issues_by_severity.get('warning', 0),
                     "info_count": issues_by_severity.get('info', 0)
                 },
-                "llm_filter": llm_filter_stats
+                "llm_filter": llm_filter_stats,
+                "deduplication": deduplication_stats
             }
             
         except Exception as e:
@@ -3441,18 +3573,18 @@ class BugDetectionAgent(BaseAgent):
                 except Exception as e:
                     self.logger.warning(f"Docker测试运行失败，回退到本地运行: {e}")
             
+            failures: List[Dict[str, Any]] = []
             if not success and (not getattr(self, "use_docker", False) or not getattr(self, "docker_runner", None)):
                 try:
-                    proc = await asyncio.create_subprocess_shell(
-                        "python -m pytest -v",
-                        cwd=project_path,
-                        stdout=asyncio.subprocess.PIPE,
-                        stderr=asyncio.subprocess.PIPE
+                    result = await self.pytest_runner.run(project_path)
+                    stdout = result.get("stdout", "") or ""
+                    stderr = result.get("stderr", "") or ""
+                    success = bool(result.get("passed"))
+                    failures = result.get("failures", [])
+                    self.logger.info(
+                        f"项目测试完成（{result.get('backend')}，{len(result.get('shards', []))} 个分片，"
+                        f"{result.get('duration', 0):.1f}秒）: {result.get('summary')}"
                     )
-                    out, err = await proc.communicate()
-                    stdout = out.decode(errors="ignore") if out else ""
-                    stderr = err.decode(errors="ignore") if err else ""
-                    success = (proc.returncode == 0)
                 except Exception as e:
                     stderr = f"本地运行pytest失败: {e}"
                     success = False
@@ -3460,6 +3592,19 @@ class BugDetectionAgent(BaseAgent):
             if success:
                 return []
             
+            # 有逐个测试的结构化结果时，每个失败的测试作为一个缺陷
+            if failures:
+                return [{
+                    "file": failure.get("file") or "tests/",
+                    "line": failure.get("line") or 1,
+                    "column": 0,
+                    "type": "test_failure",
+                    "severity": "error",
+                    "message": f"单元测试失败: {failure['nodeid']}",
+                    "details": (failure.get("message") or "") + ("\n" + failure["details"] if failure.get("details") else ""),
+                    "tool": "pytest"
+                } for failure in failures[:50]]
+            
             # 解析失败摘要（尽量抓取关键信息）
             lines = (stdout or "").splitlines() + (stderr or "").splitlines()
             summaries: List[str] = []
@@ -3694,38 +3839,34 @@ class BugDetectionAgent(BaseAgent):
         
         return suggestions.get(issue_type, ["建议根据具体情况进行修复"])
     
+    def build_downloadable_report(self, detection_results: Dict[str, Any], file_path: str) -> Dict[str, Any]:
+        """构造可下载的检测报告内容（由调用方决定写入位置）"""
+        return {
+            "report_info": {
+                "generated_at": datetime.now().isoformat(),
+                "file_path": file_path,
+                "total_issues": detection_results.get("total_issues", 0),
+                "summary": detection_results.get("summary", {}),
+                "detection_tools": detection_results.get("detection_tools", [])
+            },
+            "issues": detection_results.get("issues", []),
+            "statistics": {
+                "by_severity": self._get_issues_by_severity(detection_results.get("issues", [])),
+                "by_type": self._get_issues_by_type(detection_results.get("issues", [])),
+                "by_category": self._get_issues_by_category(detection_results.get("issues", []))
+            }
+        }
+    
     async def generate_downloadable_report(self, detection_results: Dict[str, Any], file_path: str) -> str:
         """生成可下载的检测报告"""
         try:
-            # 创建报告目录
-            report_dir = Path("reports")
-            report_dir.mkdir(exist_ok=True)
-            
-            # 生成报告文件名
+            # 生成报告文件名（同一秒内生成的报告不会互相覆盖）
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"bug_detection_report_{timestamp}.json"
-            report_path = report_dir / filename
-            
-            # 生成报告内容
-            report_data = {
-                "report_info": {
-                    "generated_at": datetime.now().isoformat(),
-                    "file_path": file_path,
-                    "total_issues": detection_results.get("total_issues", 0),
-                    "summary": detection_results.get("summary", {}),
-                    "detection_tools": detection_results.get("detection_tools", [])
-                },
-                "issues": detection_results.get("issues", []),
-                "statistics": {
-                    "by_severity": self._get_issues_by_severity(detection_results.get("issues", [])),
-                    "by_type": self._get_issues_by_type(detection_results.get("issues", [])),
-                    "by_category": self._get_issues_by_category(detection_results.get("issues", []))
-                }
-            }
+            report_path = Path("reports") / f"bug_detection_report_{timestamp}_{uuid.uuid4().hex[:8]}.json"
             
             # 保存报告
-            with open(report_path, 'w', encoding='utf-8') as f:
-                json.dump(report_data, f, ensure_ascii=False, indent=2)
+            report_data = self.build_downloadable_report(detection_results, file_path)
+            await get_artifact_store().write(report_path, json.dumps(report_data, ensure_ascii=False, indent=2))
             
             self.logger.info(f"检测报告已生成: {report_path}")
             return str(report_path)
@@ -3820,28 +3961,31 @@ class BugDetectionAgent(BaseAgent):
             prompt = self._build_static_analysis_prompt(detection_results, filename)
             
             self.logger.info("🤖 正在生成AI静态检测报告...")
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=180.0)) as client:
-                response = await client.post(
-                    f"{deepseek_config.base_url}/chat/completions",
-                    headers=deepseek_config.get_headers(),
-                    json={
-                        "model": deepseek_config.model,
-                        "messages": [
-                            {"role": "user", "content": prompt}
-                        ],
-                        "max_tokens": deepseek_config.max_tokens,
-                        "temperature": deepseek_config.temperature
-                    }
-                )
-                
-                if response.status == 200:
-                    result = await response.json()
-                    ai_content = result["choices"][0]["message"]["content"]
-                    self.logger.info("✅ AI静态检测报告生成成功")
-                    return ai_content
-                else:
-                    self.logger.warning(f"❌ AI API调用失败: {response.status}")
-                    return self._generate_fallback_report(detection_results, filename)
+            with observe_llm("ai_report", deepseek_config.model) as call:
+                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=180.0)) as client:
+                    response = await client.post(
+                        f"{deepseek_config.base_url}/chat/completions",
+                        headers=deepseek_config.get_headers(),
+                        json={
+                            "model": deepseek_config.model,
+                            "messages": [
+                                {"role": "user", "content": prompt}
+                            ],
+                            "max_tokens": deepseek_config.max_tokens,
+                            "temperature": deepseek_config.temperature
+                        }
+                    )
+                    
+                    if response.status == 200:
+                        result = await response.json()
+                        call.record_usage(result)
+                        ai_content = result["choices"][0]["message"]["content"]
+                        self.logger.info("✅ AI静态检测报告生成成功")
+                        return ai_content
+                    else:
+                        call.fail()
+                        self.logger.warning(f"❌ AI API调用失败: {response.status}")
+                        return self._generate_fallback_report(detection_results, filename)
                     
         except Exception as e:
             self.logger.error(f"❌ AI报告生成异常: {e}")
@@ -4216,9 +4360,15 @@ class BugDetectionAgent(BaseAgent):
             
             # 阶段3：定位阶段 - 在Docker容器中定位依赖库源码位置
             self.logger.info("阶段3: 定位依赖库源码位置...")
+            # 在目标环境中一次性查询所有库的位置、版本和 RECORD 摘要（定位和缓存校验共用）
+            library_probe = await self._probe_library_distributions(
+                sorted({issue["library"] for issue in library_related_issues if issue.get("library")}),
+                project_path_obj
+            )
             library_locations = await self._locate_library_sources(
                 library_related_issues,
-                project_path_obj
+                project_path_obj,
+                probe=library_probe
             )
             
             if not library_locations:
@@ -4240,9 +4390,12 @@ class BugDetectionAgent(BaseAgent):
             
             # 阶段4：分析阶段 - 对依赖库源码进行静态分析
             self.logger.info("阶段4: 分析依赖库源码...")
+            library_analysis_status = {}
             library_source_issues = await self._analyze_library_sources(
                 library_locations,
-                options
+                options,
+                probe=library_probe,
+                analysis_status=library_analysis_status
             )
             
             # 阶段5：关联阶段 - 将测试代码中的问题与依赖库源码中的bug关联起来
@@ -4261,6 +4414,7 @@ class BugDetectionAgent(BaseAgent):
                     "library_related_issues": library_related_issues,
                     "library_source_issues": library_source_issues,
                     "library_locations": library_locations,
+                    "library_analysis_status": library_analysis_status,
                     "correlations": correlations
                 },
                 "summary": {
@@ -4480,12 +4634,14 @@ class BugDetectionAgent(BaseAgent):
     async def _locate_library_sources(
         self,
         library_related_issues: List[Dict[str, Any]],
-        project_path: Path
+        project_path: Path,
+        probe: Optional[Dict[str, Any]] = None
     ) -> Dict[str, str]:
         """
         阶段3：定位阶段 - 在Docker容器中定位依赖库源码位置
         
-        在 Docker 容器的 site-packages 中查找依赖库的源码位置
+        在 Docker 容器中运行一次 importlib.metadata 查询，得到所有库的源码位置；
+        查询未能解析的库再并发地逐个回退查找。
         """
         library_locations = {}
         
@@ -4499,22 +4655,38 @@ class BugDetectionAgent(BaseAgent):
             
             self.logger.info(f"需要定位 {len(libraries)} 个依赖库的源码位置")
             
-            # 在 Docker 容器中定位每个库的源码位置
-            for library in libraries:
-                try:
-                    location = await self._find_library_source_in_docker(
-                        project_path,
-                        library
-                    )
-                    if location:
+            if probe is None:
+                probe = await self._probe_library_distributions(sorted(libraries), project_path)
+            
+            unresolved = []
+            for library in sorted(libraries):
+                info = probe.get("libraries", {}).get(library) or {}
+                # 只接受属于已安装发行包的模块（排除标准库等）
+                location = info.get("path") if info.get("distribution") else None
+                if location:
+                    library_locations[library] = location
+                    self.logger.info(f"定位到 {library} 源码位置: {location}")
+                else:
+                    unresolved.append(library)
+            
+            # 回退：逐个查找（有并发上限）
+            if unresolved:
+                semaphore = asyncio.Semaphore(self.project_config["library_analysis_workers"])
+                
+                async def find(library: str) -> Optional[str]:
+                    async with semaphore:
+                        return await self._find_library_source_in_docker(project_path, library)
+                
+                results = await asyncio.gather(*(find(library) for library in unresolved), return_exceptions=True)
+                for library, location in zip(unresolved, results):
+                    if isinstance(location, Exception):
+                        self.logger.warning(f"定位 {library} 源码位置失败: {location}")
+                    elif location:
                         library_locations[library] = location
                         self.logger.info(f"定位到 {library} 源码位置: {location}")
                     else:
                         self.logger.warning(f"无法定位 {library} 源码位置")
-                
-                except Exception as e:
-                    self.logger.warning(f"定位 {library} 源码位置失败: {e}")
-            
+        
         except Exception as e:
             self.logger.error(f"定位依赖库源码位置失败: {e}")
         
@@ -4587,25 +4759,83 @@ class BugDetectionAgent(BaseAgent):
     async def _analyze_library_sources(
         self,
         library_locations: Dict[str, str],
-        options: Dict[str, Any]
+        options: Dict[str, Any],
+        probe: Optional[Dict[str, Any]] = None,
+        analysis_status: Optional[Dict[str, str]] = None
     ) -> List[Dict[str, Any]]:
         """
         阶段4：分析阶段 - 对依赖库源码进行静态分析
         
-        使用 mypy、pylint 等工具对依赖库源码进行静态分析
+        使用 mypy、pylint 等工具对依赖库源码进行静态分析。
+        分析结果按 (发行包, 版本, 分析器版本及参数) 跨扫描缓存，并用 RECORD 摘要校验，
+        只有版本或安装内容变化的库才会被重新分析。
+        各库的分析在有并发上限的工作池中进行，每个库有独立的超时时间；
+        超时的库返回已完成工具的部分结果，不会拖慢其它库。
+        
+        Args:
+            analysis_status: 可选，用于接收每个库的分析状态（cached/analyzed/partial/timeout/error）
         """
         all_issues = []
+        if analysis_status is None:
+            analysis_status = {}
         
         try:
-            for library_name, library_path in library_locations.items():
-                self.logger.info(f"分析 {library_name} 源码: {library_path}")
+            cache = self._get_library_analysis_cache() if options.get("use_library_cache", True) else None
+            if cache is not None and probe is None:
+                probe = await self._probe_library_distributions(list(library_locations))
+            
+            semaphore = asyncio.Semaphore(self.project_config["library_analysis_workers"])
+            timeout = options.get("library_analysis_timeout", self.project_config["library_analysis_timeout"])
+            
+            async def analyze(library_name: str, library_path: str) -> List[Dict[str, Any]]:
+                cache_entry = self._library_cache_entry(probe or {}, library_name, options) if cache is not None else None
+                if cache_entry:
+                    cached_issues = await asyncio.to_thread(cache.get, cache_entry["key"], cache_entry["record_digest"])
+                    if cached_issues is not None:
+                        self.logger.info(
+                            f"命中依赖库分析缓存: {cache_entry['distribution']}=={cache_entry['version']} "
+                            f"({len(cached_issues)} 个问题)"
+                        )
+                        analysis_status[library_name] = "cached"
+                        return cached_issues
                 
-                # 注意：library_path 是容器内的路径，我们需要在容器中运行分析
-                library_issues = await self._analyze_library_source_in_docker(
-                    library_name,
-                    library_path,
-                    options
-                )
+                async with semaphore:
+                    self.logger.info(f"分析 {library_name} 源码: {library_path}")
+                    # 注意：library_path 是容器内的路径，我们需要在容器中运行分析
+                    library_issues, complete = await self._analyze_library_source_in_docker(
+                        library_name,
+                        library_path,
+                        options,
+                        timeout=timeout
+                    )
+                
+                analysis_status[library_name] = "analyzed" if complete else ("partial" if library_issues else "timeout")
+                # 只缓存完整的分析结果
+                if cache_entry and complete:
+                    await asyncio.to_thread(
+                        cache.put,
+                        cache_entry["key"],
+                        cache_entry["distribution"],
+                        cache_entry["version"],
+                        cache_entry["record_digest"],
+                        library_issues
+                    )
+                return library_issues
+            
+            names = list(library_locations)
+            results = await asyncio.gather(
+                *(analyze(name, library_locations[name]) for name in names),
+                return_exceptions=True
+            )
+            
+            for library_name, library_issues in zip(names, results):
+                library_path = library_locations[library_name]
+                if isinstance(library_issues, Exception):
+                    self.logger.error(f"分析 {library_name} 源码失败: {library_issues}")
+                    analysis_status[library_name] = "error"
+                    continue
+                if analysis_status.get(library_name) in ("partial", "timeout"):
+                    self.logger.warning(f"分析 {library_name} 源码超时（{timeout}秒），使用部分结果")
                 
                 for issue in library_issues:
                     issue["library"] = library_name
@@ -4613,86 +4843,183 @@ class BugDetectionAgent(BaseAgent):
                     all_issues.append(issue)
             
             self.logger.info(f"在依赖库源码中发现 {len(all_issues)} 个问题")
-            
+        
         except Exception as e:
             self.logger.error(f"分析依赖库源码失败: {e}")
         
         return all_issues
     
+    def _get_library_analysis_cache(self) -> Optional[LibraryAnalysisCache]:
+        """获取依赖库分析缓存（首次使用时创建，创建失败则不使用缓存）"""
+        if self._library_analysis_cache is None:
+            try:
+                self._library_analysis_cache = LibraryAnalysisCache()
+            except Exception as e:
+                self.logger.warning(f"依赖库分析缓存不可用: {e}")
+                return None
+        return self._library_analysis_cache
+    
+    async def _probe_library_distributions(
+        self,
+        libraries: List[str],
+        project_path: Optional[Path] = None
+    ) -> Dict[str, Any]:
+        """
+        在 Docker 容器中一次性查询所有库的信息（importlib.metadata）
+        
+        返回每个库的源码路径、发行包名称、版本和 RECORD 摘要，以及分析器版本
+        """
+        if not libraries:
+            return {}
+        
+        mount_dir = project_path if project_path is not None else Path(tempfile.mkdtemp(prefix="library_probe_"))
+        try:
+            result = await self.docker_runner.run_command(
+                project_path=mount_dir,
+                command=build_probe_command(libraries),
+                timeout=120
+            )
+            return parse_probe_output(result.get("stdout", ""))
+        except Exception as e:
+            self.logger.warning(f"查询依赖库发行包信息失败: {e}")
+            return {}
+        finally:
+            if project_path is None:
+                shutil.rmtree(mount_dir, ignore_errors=True)
+    
+    def _library_cache_entry(
+        self,
+        probe: Dict[str, Any],
+        library_name: str,
+        options: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """根据探测结果生成缓存键；发行包信息不完整或已安装文件与 RECORD 不符时不使用缓存"""
+        info = probe.get("libraries", {}).get(library_name) or {}
+        if not info.get("distribution") or not info.get("version") or not info.get("record_digest"):
+            return None
+        if info.get("files_ok") is False:
+            self.logger.info(f"{library_name} 的已安装文件与 RECORD 不一致，跳过缓存")
+            return None
+        
+        analyzers = {}
+        for tool, args in self.library_analyzer_args.items():
+            if options.get(f"use_{tool}", True):
+                analyzers[tool] = {"version": probe.get("analyzers", {}).get(tool), "args": args}
+        
+        return {
+            "key": make_cache_key(info["distribution"], info["version"], analyzers),
+            "distribution": info["distribution"],
+            "version": info["version"],
+            "record_digest": info["record_digest"]
+        }
+    
+    @staticmethod
+    def _library_tool_run_complete(result: Dict[str, Any], parsed_issues: List[Dict[str, Any]]) -> bool:
+        """
+        单个分析工具的运行结果是否完整（可以缓存）
+        
+        超时（returncode 为 -1）即使已输出部分结果也不完整；命令中的 `|| true` 只屏蔽工具自身的退出码，
+        Docker 本身失败（守护进程不可达、镜像缺失等）时运行不成功且解析不到任何问题，同样不完整。
+        """
+        if result.get("returncode") == -1:
+            return False
+        return bool(result.get("success") or parsed_issues)
+    
     async def _analyze_library_source_in_docker(
         self,
         library_name: str,
         library_path: str,
-        options: Dict[str, Any]
-    ) -> List[Dict[str, Any]]:
-        """在 Docker 容器中分析依赖库源码"""
+        options: Dict[str, Any],
+        timeout: Optional[float] = None
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        在 Docker 容器中分析依赖库源码
+        
+        Args:
+            timeout: 该库所有分析工具的总超时时间（秒），None 表示每个工具最多300秒
+        
+        Returns:
+            (问题列表, 是否所有工具都在超时前完成)
+        """
         issues = []
+        complete = True
+        deadline = time.monotonic() + timeout if timeout else None
+        
+        def tool_timeout() -> float:
+            if deadline is None:
+                return 300
+            return min(300, deadline - time.monotonic())
         
         try:
-            # 创建一个临时的项目目录来挂载（实际上我们只需要在容器中运行命令）
-            # 使用一个空的项目路径作为挂载点
-            temp_project = Path("temp_docker_analysis")
-            temp_project.mkdir(exist_ok=True)
+            # 每次分析使用独立的空挂载目录（多个库并发分析时互不影响）
+            temp_project = Path(tempfile.mkdtemp(prefix="library_analysis_"))
             
             try:
                 # 方法1: 使用 mypy 分析库源码
                 if options.get("use_mypy", True):
-                    mypy_cmd = [
-                        "sh", "-c",
-                        f"cd /usr/local/lib/python*/site-packages && "
-                        f"python -m mypy {library_name} --no-error-summary --show-error-codes 2>&1 || true"
-                    ]
-                    
-                    result = await self.docker_runner.run_command(
-                        project_path=temp_project,
-                        command=mypy_cmd,
-                        timeout=300
-                    )
-                    
-                    if result.get("success") or result.get("stdout"):
-                        # 解析 mypy 输出
-                        mypy_issues = self._parse_mypy_output(
-                            result.get("stdout", ""),
-                            library_name,
-                            library_path
+                    if tool_timeout() <= 0:
+                        complete = False
+                    else:
+                        mypy_cmd = [
+                            "sh", "-c",
+                            f"cd /usr/local/lib/python*/site-packages && "
+                            f"python -m mypy {library_name} {' '.join(self.library_analyzer_args['mypy'])} 2>&1 || true"
+                        ]
+                        
+                        result = await self.docker_runner.run_command(
+                            project_path=temp_project,
+                            command=mypy_cmd,
+                            timeout=tool_timeout()
                         )
-                        issues.extend(mypy_issues)
+                        mypy_issues = []
+                        if result.get("success") or result.get("stdout"):
+                            # 解析 mypy 输出
+                            mypy_issues = self._parse_mypy_output(
+                                result.get("stdout", ""),
+                                library_name,
+                                library_path
+                            )
+                            issues.extend(mypy_issues)
+                        if not self._library_tool_run_complete(result, mypy_issues):
+                            complete = False
                 
                 # 方法2: 使用 pylint 分析库源码
                 if options.get("use_pylint", True):
-                    pylint_cmd = [
-                        "sh", "-c",
-                        f"cd /usr/local/lib/python*/site-packages && "
-                        f"python -m pylint {library_name} --disable=all --enable=E,F 2>&1 || true"
-                    ]
-                    
-                    result = await self.docker_runner.run_command(
-                        project_path=temp_project,
-                        command=pylint_cmd,
-                        timeout=300
-                    )
-                    
-                    if result.get("success") or result.get("stdout"):
-                        # 解析 pylint 输出
-                        pylint_issues = self._parse_pylint_output(
-                            result.get("stdout", ""),
-                            library_name,
-                            library_path
+                    if tool_timeout() <= 0:
+                        complete = False
+                    else:
+                        pylint_cmd = [
+                            "sh", "-c",
+                            f"cd /usr/local/lib/python*/site-packages && "
+                            f"python -m pylint {library_name} {' '.join(self.library_analyzer_args['pylint'])} 2>&1 || true"
+                        ]
+                        
+                        result = await self.docker_runner.run_command(
+                            project_path=temp_project,
+                            command=pylint_cmd,
+                            timeout=tool_timeout()
                         )
-                        issues.extend(pylint_issues)
+                        pylint_issues = []
+                        if result.get("success") or result.get("stdout"):
+                            # 解析 pylint 输出
+                            pylint_issues = self._parse_pylint_output(
+                                result.get("stdout", ""),
+                                library_name,
+                                library_path
+                            )
+                            issues.extend(pylint_issues)
+                        if not self._library_tool_run_complete(result, pylint_issues):
+                            complete = False
             
             finally:
                 # 清理临时目录
-                if temp_project.exists():
-                    try:
-                        shutil.rmtree(temp_project)
-                    except Exception:
-                        pass
+                shutil.rmtree(temp_project, ignore_errors=True)
         
         except Exception as e:
             self.logger.error(f"在 Docker 中分析 {library_name} 源码失败: {e}")
+            complete = False
         
-        return issues
+        return issues, complete
     
     def _parse_mypy_output(
         self,
@@ -4806,7 +5133,9 @@ class BugDetectionAgent(BaseAgent):
         """
         阶段5：关联阶段 - 将测试代码中的问题与依赖库源码中的bug关联起来
         
-        通过分析错误类型、API 使用、文件路径等，建立测试代码问题与依赖库源码bug的关联
+        通过分析错误类型、API 使用、文件路径等，建立测试代码问题与依赖库源码bug的关联。
+        每个库的源码问题只建立一次倒排索引（关键词 -> 源码问题），测试文件的 API 使用只解析一次，
+        测试问题通过倒排表求并集得到相关源码问题，不再逐对比较。
         """
         correlations = []
         
@@ -4816,50 +5145,30 @@ class BugDetectionAgent(BaseAgent):
             for issue in library_related_issues:
                 library = issue.get("library")
                 if library:
-                    if library not in library_issues_map:
-                        library_issues_map[library] = []
-                    library_issues_map[library].append(issue)
+                    library_issues_map.setdefault(library, []).append(issue)
             
             library_source_issues_map = {}
             for issue in library_source_issues:
                 library = issue.get("library")
                 if library:
-                    if library not in library_source_issues_map:
-                        library_source_issues_map[library] = []
-                    library_source_issues_map[library].append(issue)
+                    library_source_issues_map.setdefault(library, []).append(issue)
+            
+            api_usage_table = ApiUsageTable()
+            top_k = self.project_config.get("correlation_top_k")
             
             # 为每个库建立关联
-            for library in library_issues_map.keys():
-                test_issues = library_issues_map.get(library, [])
+            for library, test_issues in library_issues_map.items():
                 source_issues = library_source_issues_map.get(library, [])
-                
                 if not test_issues or not source_issues:
                     continue
                 
-                # 尝试关联每个测试代码问题
+                index = LibraryIssueIndex(source_issues)
                 for test_issue in test_issues:
-                    # 查找相关的源码问题
-                    related_source_issues = []
-                    
-                    # 方法1: 通过错误类型匹配
-                    test_message = test_issue.get("message", "").lower()
-                    for source_issue in source_issues:
-                        source_message = source_issue.get("message", "").lower()
-                        # 检查是否有共同的关键词
-                        common_keywords = self._extract_keywords(test_message) & self._extract_keywords(source_message)
-                        if common_keywords:
-                            related_source_issues.append(source_issue)
-                    
-                    # 方法2: 通过 API 使用匹配
-                    # 如果测试代码使用了特定的 API，查找该 API 相关的源码问题
-                    test_file = test_issue.get("file", "")
-                    api_usage = await self._extract_api_usage(test_file, library)
-                    if api_usage:
-                        for source_issue in source_issues:
-                            source_file = source_issue.get("file", "")
-                            if any(api in source_file for api in api_usage):
-                                if source_issue not in related_source_issues:
-                                    related_source_issues.append(source_issue)
+                    # 方法1: 通过错误类型（共同关键词）匹配；方法2: 通过测试文件的 API 使用匹配
+                    api_usage = api_usage_table.get(test_issue.get("file", ""), library)
+                    related_source_issues = index.correlate(
+                        test_issue.get("message", ""), api_usage, top_k=top_k
+                    )
                     
                     # 如果找到相关源码问题，建立关联
                     if related_source_issues:
@@ -4872,49 +5181,12 @@ class BugDetectionAgent(BaseAgent):
                         })
             
             self.logger.info(f"建立了 {len(correlations)} 个关联关系")
-            
+        
         except Exception as e:
             self.logger.error(f"关联问题失败: {e}")
         
         return correlations
     
-    def _extract_keywords(self, text: str) -> Set[str]:
-        """从文本中提取关键词"""
-        import re
-        # 提取单词（排除常见停用词）
-        words = re.findall(r'\b[a-z]{3,}\b', text.lower())
-        stop_words = {'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'her', 'was', 'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his', 'how', 'its', 'may', 'new', 'now', 'old', 'see', 'two', 'way', 'who', 'boy', 'did', 'its', 'let', 'put', 'say', 'she', 'too', 'use'}
-        keywords = {w for w in words if w not in stop_words and len(w) > 3}
-        return keywords
-    
-    async def _extract_api_usage(self, file_path: str, library: str) -> List[str]:
-        """从文件中提取对指定库的 API 使用"""
-        apis = []
-        
-        try:
-            if not Path(file_path).exists():
-                return apis
-            
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            # 提取 library.xxx 或 from library import xxx 中的 xxx
-            import re
-            patterns = [
-                rf'{library}\.(\w+)',  # library.xxx
-                rf'from {library} import (\w+)',  # from library import xxx
-                rf'from {library}\.(\w+) import'  # from library.xxx import
-            ]
-            
-            for pattern in patterns:
-                matches = re.findall(pattern, content)
-                apis.extend(matches)
-            
-            return list(set(apis))
-            
-        except Exception:
-            return apis
-    
     async def _ai_analyze_file(self, file_path: str) -> List[Dict[str, Any]]:
         """使用 AI 分析文件（如果启用）"""
         # 这里可以集成 AI 分析功能
@@ -0,0 +1,140 @@
+"""
+依赖库问题关联索引
+每次扫描只构建一次：关键词 -> 源码问题 的倒排表，以及按文件缓存的 API 使用表。
+测试代码问题通过倒排表求交集得到候选，避免对每一对问题重复提取关键词、重复读取测试文件。
+"""
+
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+_WORD_PATTERN = re.compile(r'\b[a-z]{3,}\b')
+_STOP_WORDS = frozenset({
+    'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'her', 'was', 'one', 'our', 'out',
+    'day', 'get', 'has', 'him', 'his', 'how', 'its', 'may', 'new', 'now', 'old', 'see', 'two', 'way',
+    'who', 'boy', 'did', 'let', 'put', 'say', 'she', 'too', 'use'
+})
+
+
+@lru_cache(maxsize=4096)
+def extract_keywords(text: str) -> FrozenSet[str]:
+    """从文本中提取关键词（排除常见停用词和长度不超过3的单词）"""
+    words = _WORD_PATTERN.findall(text.lower())
+    return frozenset(w for w in words if w not in _STOP_WORDS and len(w) > 3)
+
+
+def extract_api_usage(content: str, library: str) -> List[str]:
+    """提取源码中对指定库的 API 使用：library.xxx、from library import xxx、from library.xxx import"""
+    patterns = [
+        rf'{library}\.(\w+)',
+        rf'from {library} import (\w+)',
+        rf'from {library}\.(\w+) import'
+    ]
+    apis = []
+    for pattern in patterns:
+        apis.extend(re.findall(pattern, content))
+    return list(set(apis))
+
+
+class ApiUsageTable:
+    """按文件缓存的 API 使用表：每个测试文件只读取一次，每个 (文件, 库) 只解析一次"""
+
+    def __init__(self):
+        self._contents: Dict[str, Optional[str]] = {}
+        self._usage: Dict[Tuple[str, str], FrozenSet[str]] = {}
+
+    def _read(self, file_path: str) -> Optional[str]:
+        if file_path not in self._contents:
+            try:
+                path = Path(file_path)
+                self._contents[file_path] = (
+                    path.read_text(encoding='utf-8', errors='ignore') if path.exists() else None
+                )
+            except Exception:
+                self._contents[file_path] = None
+        return self._contents[file_path]
+
+    def get(self, file_path: str, library: str) -> FrozenSet[str]:
+        key = (file_path, library)
+        if key not in self._usage:
+            content = self._read(file_path) if file_path else None
+            self._usage[key] = frozenset(extract_api_usage(content, library)) if content else frozenset()
+        return self._usage[key]
+
+
+class LibraryIssueIndex:
+    """
+    单个依赖库的源码问题索引
+
+    关联规则与原有启发式一致：
+    - 关键词匹配：测试问题消息与源码问题消息至少有一个共同关键词
+    - API 匹配：测试文件使用的某个 API 名称出现在源码问题的文件路径中
+    结果顺序也保持一致：先是关键词匹配（按源码问题原顺序），再追加仅由 API 匹配到的问题。
+    """
+
+    def __init__(self, source_issues: List[Dict[str, Any]]):
+        self.source_issues = source_issues
+        self._postings: Dict[str, List[int]] = {}
+        self._files: Dict[str, List[int]] = {}
+        self._api_matches: Dict[FrozenSet[str], List[int]] = {}
+
+        for position, issue in enumerate(source_issues):
+            for keyword in extract_keywords(issue.get("message", "").lower()):
+                self._postings.setdefault(keyword, []).append(position)
+            self._files.setdefault(issue.get("file", ""), []).append(position)
+
+    def keyword_matches(self, message: str) -> Dict[int, int]:
+        """返回 源码问题位置 -> 共同关键词数量"""
+        counts: Dict[int, int] = {}
+        for keyword in extract_keywords(message.lower()):
+            for position in self._postings.get(keyword, ()):
+                counts[position] = counts.get(position, 0) + 1
+        return counts
+
+    def api_matches(self, apis: FrozenSet[str]) -> List[int]:
+        """返回文件路径包含任一 API 名称的源码问题位置（按不同文件去重后匹配，结果缓存）"""
+        if not apis:
+            return []
+        if apis not in self._api_matches:
+            positions: List[int] = []
+            for source_file, file_positions in self._files.items():
+                if any(api in source_file for api in apis):
+                    positions.extend(file_positions)
+            self._api_matches[apis] = sorted(positions)
+        return self._api_matches[apis]
+
+    def correlate(
+        self,
+        message: str,
+        apis: FrozenSet[str],
+        top_k: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        查找与测试问题相关的源码问题
+
+        Args:
+            message: 测试问题消息
+            apis: 测试文件中使用的 API 名称
+            top_k: 最多返回的数量；为 None 时返回全部（顺序与原启发式一致），
+                否则按 (共同关键词数, 是否API匹配) 排序后截取，分数相同时保持原顺序
+        """
+        keyword_counts = self.keyword_matches(message)
+        api_positions = self.api_matches(apis)
+
+        ordered = sorted(keyword_counts)
+        seen: Set[int] = set(ordered)
+        for position in api_positions:
+            if position not in seen:
+                seen.add(position)
+                ordered.append(position)
+
+        if top_k is not None and len(ordered) > top_k:
+            api_set = set(api_positions)
+            rank = {position: index for index, position in enumerate(ordered)}
+            ordered = sorted(
+                ordered,
+                key=lambda p: (-keyword_counts.get(p, 0), p not in api_set, rank[p])
+            )[:top_k]
+
+        return [self.source_issues[position] for position in ordered]
@@ -0,0 +1,291 @@
+"""
+跨工具问题指纹与去重
+pylint、mypy、ruff、flake8、bandit、semgrep 经常报告同一个缺陷（例如未使用的导入同时出现为
+pylint W0611、ruff F401、flake8 F401）。这里为每个问题计算指纹：
+(文件, 规范规则类别, 所在AST语句, 涉及的标识符)，规则类别通过规则等价表跨工具归一，
+指纹相同的问题合并为一个问题并保留全部来源，使后续的 LLM 过滤、决策和修复只处理唯一缺陷。
+"""
+
+import ast
+import hashlib
+import keyword
+import os
+import re
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# 规则等价表：规范类别 -> 各工具的规则（pylint 同时列出 symbol 和 message-id）
+RULE_EQUIVALENCE: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "unused-import": {
+        "pylint": ("unused-import", "W0611"), "ruff": ("F401",), "flake8": ("F401",),
+    },
+    "unused-variable": {
+        "pylint": ("unused-variable", "W0612"), "ruff": ("F841",), "flake8": ("F841",),
+    },
+    "unused-argument": {
+        "pylint": ("unused-argument", "W0613"), "ruff": ("ARG001", "ARG002"),
+    },
+    "undefined-name": {
+        "pylint": ("undefined-variable", "E0602"), "ruff": ("F821",), "flake8": ("F821",),
+        "mypy": ("name-defined",),
+    },
+    "redefined-unused-name": {
+        "pylint": ("reimported", "W0404", "function-redefined", "E0102"), "ruff": ("F811",), "flake8": ("F811",),
+        "mypy": ("no-redef",),
+    },
+    "wildcard-import": {
+        "pylint": ("wildcard-import", "W0401"), "ruff": ("F403",), "flake8": ("F403",),
+    },
+    "import-error": {
+        "pylint": ("import-error", "E0401"), "mypy": ("import", "import-not-found", "import-untyped"),
+    },
+    "no-member": {
+        "pylint": ("no-member", "E1101"), "mypy": ("attr-defined",),
+    },
+    "bare-except": {
+        "pylint": ("bare-except", "W0702"), "ruff": ("E722",), "flake8": ("E722",),
+    },
+    "try-except-pass": {
+        "bandit": ("B110",), "ruff": ("S110",),
+    },
+    "line-too-long": {
+        "pylint": ("line-too-long", "C0301"), "ruff": ("E501",), "flake8": ("E501",),
+    },
+    "trailing-whitespace": {
+        "pylint": ("trailing-whitespace", "C0303"), "ruff": ("W291", "W293"), "flake8": ("W291", "W293"),
+    },
+    "missing-final-newline": {
+        "pylint": ("missing-final-newline", "C0304"), "ruff": ("W292",), "flake8": ("W292",),
+    },
+    "f-string-without-placeholders": {
+        "pylint": ("f-string-without-interpolation", "W1309"), "ruff": ("F541",), "flake8": ("F541",),
+    },
+    "comparison-to-none": {
+        "pylint": ("singleton-comparison", "C0121"), "ruff": ("E711", "E712"), "flake8": ("E711", "E712"),
+    },
+    "redefined-builtin": {
+        "pylint": ("redefined-builtin", "W0622"), "ruff": ("A001", "A002"),
+    },
+    "dangerous-default-value": {
+        "pylint": ("dangerous-default-value", "W0102"), "ruff": ("B006",),
+    },
+    "eval-used": {
+        "pylint": ("eval-used", "W0123"), "bandit": ("B307",), "ruff": ("S307",),
+    },
+    "exec-used": {
+        "pylint": ("exec-used", "W0122"), "bandit": ("B102",), "ruff": ("S102",),
+    },
+    "assert-used": {
+        "bandit": ("B101",), "ruff": ("S101",),
+    },
+    "hardcoded-password": {
+        "bandit": ("B105", "B106", "B107"), "ruff": ("S105", "S106", "S107"),
+    },
+    "subprocess-shell": {
+        "bandit": ("B602", "B604", "B605"), "ruff": ("S602", "S604", "S605"),
+    },
+    "insecure-deserialization": {
+        "bandit": ("B301", "B506"), "ruff": ("S301", "S506"),
+    },
+    "weak-hash": {
+        "bandit": ("B303", "B324"), "ruff": ("S324",),
+    },
+    "request-without-timeout": {
+        "bandit": ("B113",), "ruff": ("S113",),
+    },
+    "debug-enabled": {
+        "bandit": ("B201",), "ruff": ("S201",),
+    },
+}
+
+_RULE_TO_CATEGORY: Dict[Tuple[str, str], str] = {
+    (tool, rule.lower()): category
+    for category, tools in RULE_EQUIVALENCE.items()
+    for tool, rules in tools.items()
+    for rule in rules
+}
+
+# 与具体行（而不是语句）相关的类别：同一条多行语句中的不同行是不同的问题
+LINE_SCOPED_CATEGORIES = frozenset({"line-too-long", "trailing-whitespace", "missing-final-newline"})
+
+# 针对具体名字的类别：同一语句中的不同名字是不同的问题（如 from x import a, b）；
+# 其余已归一的类别各工具的措辞不同，只按语句合并。未归一的工具规则同样按名字区分
+NAME_SCOPED_CATEGORIES = frozenset({
+    "unused-import", "unused-variable", "unused-argument", "undefined-name", "redefined-unused-name",
+    "import-error", "no-member", "redefined-builtin",
+})
+
+# mypy 未开启 --show-error-codes 时按消息识别错误码
+_MYPY_MESSAGE_CODES = (
+    (re.compile(r"Name .* is not defined"), "name-defined"),
+    (re.compile(r"has no attribute"), "attr-defined"),
+    (re.compile(r"Cannot find implementation or library stub|Library stubs not installed|"
+                r"Skipping analyzing"), "import"),
+    (re.compile(r"already defined"), "no-redef"),
+)
+_MYPY_CODE = re.compile(r"\[([a-z][a-z0-9-]*)\]\s*$")
+_LEADING_CODE = re.compile(r"^([A-Z]{1,3}\d{3,4})\b")
+_QUOTED = re.compile(r"'([^']+)'|\"([^\"]+)\"|`([^`]+)`")
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*")
+
+
+def issue_tool(issue: Dict[str, Any]) -> str:
+    return (issue.get("tool") or issue.get("type") or "unknown").lower()
+
+
+def issue_rule(issue: Dict[str, Any]) -> str:
+    """提取问题在其工具中的规则标识"""
+    tool = issue_tool(issue)
+    message = issue.get("message", "") or ""
+    if tool == "pylint":
+        return issue.get("symbol") or issue.get("message_id") or issue.get("rule") or ""
+    if tool == "ruff":
+        return issue.get("rule_code") or issue.get("rule") or ""
+    if tool == "semgrep":
+        return issue.get("rule_id") or issue.get("rule") or ""
+    if tool == "mypy":
+        match = _MYPY_CODE.search(message)
+        if match:
+            return match.group(1)
+        for pattern, code in _MYPY_MESSAGE_CODES:
+            if pattern.search(message):
+                return code
+        return "mypy"
+    if tool == "flake8":
+        match = _LEADING_CODE.match(message.strip())
+        return issue.get("rule") or (match.group(1) if match else "")
+    return issue.get("rule") or issue.get("rule_code") or issue.get("rule_id") or issue.get("symbol") or ""
+
+
+def canonical_category(issue: Dict[str, Any]) -> str:
+    """规范规则类别：在等价表中的规则映射到统一类别，其余规则保持 工具:规则"""
+    tool, rule = issue_tool(issue), issue_rule(issue)
+    category = _RULE_TO_CATEGORY.get((tool, rule.lower()))
+    if category:
+        return category
+    if not rule or rule == tool:
+        # 没有具体规则标识（如未开启错误码的 mypy）时，以去掉数字的消息区分不同问题
+        rule = re.sub(r"\d+", "#", (issue.get("message", "") or "").strip().lower())
+    return f"{tool}:{rule}"
+
+
+class SourceIndex:
+    """按文件缓存源码和“行号 -> 覆盖该行的最内层语句”的映射"""
+
+    def __init__(self, project_path: Optional[str] = None):
+        self.project_path = project_path
+        self._files: Dict[str, Tuple[List[str], Dict[int, Tuple[str, int, int]]]] = {}
+
+    def _load(self, file_path: str) -> Tuple[List[str], Dict[int, Tuple[str, int, int]]]:
+        if file_path in self._files:
+            return self._files[file_path]
+        path = file_path
+        if self.project_path and not os.path.isabs(path):
+            path = os.path.join(self.project_path, path)
+        lines: List[str] = []
+        statements: Dict[int, Tuple[str, int, int]] = {}
+        try:
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                source = f.read()
+            lines = source.splitlines()
+            if path.endswith((".py", ".pyw")):
+                for node in ast.walk(ast.parse(source)):
+                    if not isinstance(node, ast.stmt):
+                        continue
+                    start, end = node.lineno, getattr(node, "end_lineno", None) or node.lineno
+                    # 复合语句（def/class/if...）只覆盖其头部（可能跨多行的签名），内部行由内层语句覆盖
+                    body = getattr(node, "body", None)
+                    if isinstance(body, list) and body and isinstance(body[0], ast.stmt):
+                        end = max(start, body[0].lineno - 1)
+                    for line in range(start, end + 1):
+                        current = statements.get(line)
+                        if current is None or end - start < current[2] - current[1]:
+                            statements[line] = (type(node).__name__, start, end)
+        except (OSError, SyntaxError, ValueError):
+            pass
+        self._files[file_path] = (lines, statements)
+        return self._files[file_path]
+
+    def anchor(self, file_path: str, line: int) -> Tuple[str, int, int]:
+        """返回覆盖该行的最内层语句 (节点类型, 起始行, 结束行)，无法解析时退化为该行本身"""
+        _, statements = self._load(file_path)
+        return statements.get(line) or ("line", line, line)
+
+    def segment(self, file_path: str, start: int, end: int) -> str:
+        lines, _ = self._load(file_path)
+        return "\n".join(lines[max(0, start - 1):end])
+
+
+def _subject(message: str, segment: str) -> FrozenSet[str]:
+    """
+    问题涉及的标识符：消息中（优先取加引号的部分）出现、且在对应源码中存在的名字
+
+    带点的名字拆成各部分比较，因此 pylint 的 "Unused List imported from typing"
+    与 ruff 的 "`typing.List` imported but unused" 得到相同的结果。
+    """
+    source_names = set(_IDENTIFIER.findall(segment))
+    source_names.update(part for name in list(source_names) for part in name.split("."))
+    quoted = [next(group for group in match if group) for match in _QUOTED.findall(message)]
+    candidates = quoted or _IDENTIFIER.findall(message)
+    return frozenset(
+        part
+        for name in candidates
+        for part in name.split(".")
+        if part in source_names and not keyword.iskeyword(part)
+    )
+
+
+def issue_fingerprint(issue: Dict[str, Any], index: SourceIndex) -> str:
+    """计算问题指纹：(文件, 规范类别, AST语句或行, 涉及的标识符)"""
+    file_path = os.path.normpath(issue.get("file") or issue.get("file_path") or "")
+    category = canonical_category(issue)
+    line = issue.get("line") or 0
+    if not isinstance(line, int):
+        try:
+            line = int(line)
+        except (TypeError, ValueError):
+            line = 0
+    if category in LINE_SCOPED_CATEGORIES or line <= 0:
+        anchor = ("line", line, line)
+    else:
+        anchor = index.anchor(file_path, line)
+    subject: FrozenSet[str] = frozenset()
+    if category in NAME_SCOPED_CATEGORIES or category not in RULE_EQUIVALENCE:
+        subject = _subject(issue.get("message", "") or "", index.segment(file_path, anchor[1], anchor[2]))
+    payload = "\x1f".join([file_path, category, f"{anchor[0]}:{anchor[1]}:{anchor[2]}", ",".join(sorted(subject))])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def deduplicate_issues(
+    issues: Iterable[Dict[str, Any]],
+    project_path: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    合并跨工具重复的问题
+
+    每组重复问题保留第一个出现的问题作为代表（保持原有顺序），并添加：
+    fingerprint、category、sources（每个来源的工具/规则/行号/消息/严重性）和 tools。
+    """
+    index = SourceIndex(project_path)
+    merged: Dict[str, Dict[str, Any]] = {}
+    for issue in issues:
+        fingerprint = issue_fingerprint(issue, index)
+        source = {
+            "tool": issue_tool(issue),
+            "rule": issue_rule(issue),
+            "line": issue.get("line"),
+            "message": issue.get("message", ""),
+            "severity": issue.get("severity"),
+        }
+        representative = merged.get(fingerprint)
+        if representative is None:
+            representative = dict(issue)
+            representative["fingerprint"] = fingerprint
+            representative["category"] = canonical_category(issue)
+            representative["sources"] = [source]
+            representative["tools"] = [source["tool"]]
+            merged[fingerprint] = representative
+        else:
+            representative["sources"].append(source)
+            if source["tool"] not in representative["tools"]:
+                representative["tools"].append(source["tool"])
+    return list(merged.values())
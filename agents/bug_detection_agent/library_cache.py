@@ -0,0 +1,199 @@
+"""
+依赖库分析结果缓存
+site-packages 中同一版本的第三方库每次都是字节相同的，没有必要在每次上传时重新运行 mypy/pylint。
+
+缓存键：(发行包名称, 版本, 分析器版本及参数)；
+缓存校验：已安装发行包 RECORD 文件的摘要（RECORD 中记录了每个文件的 sha256），
+可选地在目标环境中按 RECORD 逐个校验已安装文件，发现被修改的安装会视为未命中。
+存储为单个 SQLite 文件（utils.sqlite_lru），超出容量上限时按最近最少使用淘汰。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from utils.metrics import record_cache
+from utils.sqlite_lru import DEFAULT_CACHE_ROOT, SqliteLRUStore
+
+logger = logging.getLogger(__name__)
+
+# 在目标解释器（Docker 容器或虚拟环境）中运行的探测脚本：
+# argv[1] 为 JSON 格式的导入名列表，argv[2] 为 "1" 时按 RECORD 校验已安装文件。
+# 输出 JSON：{"analyzers": {工具: 版本}, "libraries": {导入名: {distribution, version, path, record_digest, files_ok}}}
+LIBRARY_PROBE_SCRIPT = r'''
+import base64, hashlib, importlib.util, json, os, sys
+try:
+    import importlib.metadata as md
+except ImportError:
+    import importlib_metadata as md
+
+names = json.loads(sys.argv[1])
+verify = len(sys.argv) > 2 and sys.argv[2] == "1"
+packages = md.packages_distributions() if hasattr(md, "packages_distributions") else {}
+result = {"analyzers": {}, "libraries": {}}
+for tool in ("mypy", "pylint"):
+    try:
+        result["analyzers"][tool] = md.version(tool)
+    except Exception:
+        pass
+
+
+def files_match(dist):
+    for f in dist.files or []:
+        if not f.hash or f.hash.mode != "sha256":
+            continue
+        try:
+            with open(f.locate(), "rb") as fh:
+                digest = base64.urlsafe_b64encode(hashlib.sha256(fh.read()).digest()).rstrip(b"=").decode()
+        except OSError:
+            return False
+        if digest != f.hash.value:
+            return False
+    return True
+
+
+for name in names:
+    entry = {}
+    try:
+        spec = importlib.util.find_spec(name)
+        if spec is not None and spec.origin:
+            entry["path"] = os.path.dirname(spec.origin) if spec.submodule_search_locations else spec.origin
+        elif spec is not None and spec.submodule_search_locations:
+            entry["path"] = list(spec.submodule_search_locations)[0]
+    except Exception as e:
+        entry["error"] = str(e)
+    try:
+        dist = md.distribution((packages.get(name) or [name])[0])
+        entry["distribution"] = dist.metadata["Name"]
+        entry["version"] = dist.version
+        record = dist.read_text("RECORD")
+        if record:
+            entry["record_digest"] = hashlib.sha256(record.encode("utf-8")).hexdigest()
+            if verify:
+                entry["files_ok"] = files_match(dist)
+    except Exception as e:
+        entry.setdefault("error", str(e))
+    result["libraries"][name] = entry
+print(json.dumps(result))
+'''
+
+
+def build_probe_command(
+    libraries: List[str],
+    python: str = "python",
+    verify_files: bool = True
+) -> List[str]:
+    """构造在目标环境中运行探测脚本的命令"""
+    return [python, "-c", LIBRARY_PROBE_SCRIPT, json.dumps(sorted(libraries)), "1" if verify_files else "0"]
+
+
+def parse_probe_output(stdout: str) -> Dict[str, Any]:
+    """解析探测脚本输出（容忍输出前的其它日志行），失败时返回空结果"""
+    for line in reversed((stdout or "").strip().splitlines()):
+        line = line.strip()
+        if line.startswith("{"):
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            data.setdefault("analyzers", {})
+            data.setdefault("libraries", {})
+            return data
+    return {"analyzers": {}, "libraries": {}}
+
+
+def make_cache_key(distribution: str, version: str, analyzers: Dict[str, Any]) -> str:
+    """
+    生成缓存键
+
+    Args:
+        distribution: 发行包名称（不区分大小写，- 与 _ 等价）
+        version: 发行包版本
+        analyzers: 工具名 -> {"version": 工具版本, "args": 参数列表}
+    """
+    payload = {
+        "distribution": distribution.lower().replace("_", "-"),
+        "version": version,
+        "analyzers": analyzers,
+    }
+    serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+# 依赖库问题中与具体扫描相关的字段，缓存时去除、命中时由调用方重新填充
+_SCAN_SPECIFIC_KEYS = ("library", "library_source_path")
+
+
+class LibraryAnalysisCache:
+    """跨扫描持久化的依赖库分析结果缓存（线程安全，按大小做LRU淘汰；同步阻塞，异步代码中在线程中调用）"""
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, max_size_bytes: Optional[int] = None):
+        if path is None:
+            cache_dir = Path(os.getenv("LIBRARY_ANALYSIS_CACHE_DIR") or DEFAULT_CACHE_ROOT / "library_analysis")
+            path = cache_dir / "library_analysis.sqlite"
+        if max_size_bytes is None:
+            max_size_bytes = int(float(os.getenv("LIBRARY_ANALYSIS_CACHE_MAX_MB", "256")) * 1024 * 1024)
+        self._store = SqliteLRUStore(
+            path, "library_analysis", value_column="issues",
+            columns=("distribution TEXT", "version TEXT", "record_digest TEXT"),
+            max_size_bytes=max_size_bytes
+        )
+        self.path = self._store.path
+        self.max_size_bytes = max_size_bytes
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    def get(self, key: str, record_digest: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        """
+        查找缓存结果
+
+        record_digest 与缓存时不一致（同版本号但安装内容不同）时删除旧条目并视为未命中；
+        没有 RECORD 的发行包无法校验，一律不命中。
+        """
+        row = self._store.get(key, ("record_digest",)) if record_digest else None
+        invalidated = row is not None and row[1] != record_digest
+        if invalidated:
+            self._store.delete(key)
+        hit = row is not None and not invalidated
+        with self._lock:
+            self.stats["hits" if hit else "misses"] += 1
+            self.stats["invalidations"] += invalidated
+        record_cache("library_analysis", hit)
+        return json.loads(row[0]) if hit else None
+
+    def put(
+        self,
+        key: str,
+        distribution: str,
+        version: str,
+        record_digest: Optional[str],
+        issues: List[Dict[str, Any]]
+    ) -> None:
+        """保存归一化后的分析结果（去除与本次扫描相关的字段）"""
+        if not record_digest:
+            return
+        normalized = [
+            {k: v for k, v in issue.items() if k not in _SCAN_SPECIFIC_KEYS}
+            for issue in issues
+        ]
+        evicted = self._store.put(
+            key, json.dumps(normalized, ensure_ascii=False, default=str),
+            distribution=distribution, version=version, record_digest=record_digest
+        )
+        if evicted:
+            with self._lock:
+                self.stats["evictions"] += len(evicted)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._store.size_bytes
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def close(self) -> None:
+        self._store.close()
@@ -0,0 +1,4 @@
+"""
+BugDetectionAgent测试模块
+"""
+
@@ -0,0 +1,137 @@
+"""
+依赖库问题关联索引测试（与原有逐对比较的启发式结果一致）
+"""
+
+import random
+import re
+
+from agents.bug_detection_agent.correlation_index import (
+    ApiUsageTable,
+    LibraryIssueIndex,
+    extract_api_usage,
+    extract_keywords,
+)
+
+LIBRARY = "requests"
+WORDS = [
+    "timeout", "connection", "session", "adapter", "redirect", "cookie", "header", "encoding",
+    "deprecated", "argument", "missing", "the", "and", "use", "get", "not", "retry", "proxy",
+]
+API_NAMES = ["get", "post", "Session", "adapters", "cookies", "exceptions"]
+
+
+def baseline_keywords(text):
+    """原有实现：逐次正则提取关键词"""
+    words = re.findall(r'\b[a-z]{3,}\b', text.lower())
+    stop_words = {'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'her', 'was', 'one', 'our', 'out',
+                  'day', 'get', 'has', 'him', 'his', 'how', 'its', 'may', 'new', 'now', 'old', 'see', 'two', 'way',
+                  'who', 'boy', 'did', 'its', 'let', 'put', 'say', 'she', 'too', 'use'}
+    return {w for w in words if w not in stop_words and len(w) > 3}
+
+
+def baseline_api_usage(file_path, library):
+    """原有实现：每次调用都重新读取测试文件"""
+    apis = []
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+    except OSError:
+        return apis
+    patterns = [
+        rf'{library}\.(\w+)',
+        rf'from {library} import (\w+)',
+        rf'from {library}\.(\w+) import'
+    ]
+    for pattern in patterns:
+        apis.extend(re.findall(pattern, content))
+    return list(set(apis))
+
+
+def baseline_correlate(test_issue, source_issues, library):
+    """原有实现：测试问题与每个源码问题逐对比较"""
+    related = []
+    test_message = test_issue.get("message", "").lower()
+    for source_issue in source_issues:
+        source_message = source_issue.get("message", "").lower()
+        if baseline_keywords(test_message) & baseline_keywords(source_message):
+            related.append(source_issue)
+    api_usage = baseline_api_usage(test_issue.get("file", ""), library)
+    if api_usage:
+        for source_issue in source_issues:
+            if any(api in source_issue.get("file", "") for api in api_usage):
+                if source_issue not in related:
+                    related.append(source_issue)
+    return related
+
+
+def random_message(rng):
+    return " ".join(rng.choice(WORDS).capitalize() if rng.random() < 0.2 else rng.choice(WORDS)
+                    for _ in range(rng.randint(0, 6)))
+
+
+def make_issues(tmp_path, seed=7):
+    rng = random.Random(seed)
+    test_files = []
+    for i in range(6):
+        path = tmp_path / f"test_client_{i}.py"
+        lines = [f"import {LIBRARY}"]
+        for api in rng.sample(API_NAMES, rng.randint(0, 3)):
+            lines.append(rng.choice([f"{LIBRARY}.{api}(url)", f"from {LIBRARY} import {api}",
+                                     f"from {LIBRARY}.{api} import thing"]))
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        test_files.append(str(path))
+    test_files.append(str(tmp_path / "missing.py"))
+
+    source_files = ["requests/sessions.py", "requests/adapters.py", "requests/cookies.py",
+                    "requests/models.py", "requests/exceptions.py", "requests/api.py"]
+    source_issues = [
+        {"library": LIBRARY, "file": rng.choice(source_files), "message": random_message(rng), "line": i}
+        for i in range(120)
+    ]
+    test_issues = [
+        {"library": LIBRARY, "file": rng.choice(test_files), "message": random_message(rng), "line": i}
+        for i in range(60)
+    ]
+    return test_issues, source_issues
+
+
+def test_keywords_and_api_usage_match_baseline(tmp_path):
+    test_issues, source_issues = make_issues(tmp_path)
+    for issue in test_issues + source_issues:
+        assert set(extract_keywords(issue["message"].lower())) == baseline_keywords(issue["message"])
+
+    table = ApiUsageTable()
+    for issue in test_issues:
+        expected = set(baseline_api_usage(issue["file"], LIBRARY))
+        assert table.get(issue["file"], LIBRARY) == expected
+        if expected:
+            content = open(issue["file"], encoding="utf-8").read()
+            assert set(extract_api_usage(content, LIBRARY)) == expected
+
+
+def test_index_returns_same_related_issues_in_same_order(tmp_path):
+    test_issues, source_issues = make_issues(tmp_path)
+    index = LibraryIssueIndex(source_issues)
+    table = ApiUsageTable()
+
+    matched = 0
+    for test_issue in test_issues:
+        expected = baseline_correlate(test_issue, source_issues, LIBRARY)
+        actual = index.correlate(test_issue["message"], table.get(test_issue["file"], LIBRARY))
+        assert actual == expected
+        matched += bool(expected)
+    # 输入中既有能关联上的问题，也有关联不上的问题
+    assert 0 < matched < len(test_issues)
+
+
+def test_top_k_keeps_best_ranked_subset(tmp_path):
+    test_issues, source_issues = make_issues(tmp_path)
+    index = LibraryIssueIndex(source_issues)
+    table = ApiUsageTable()
+
+    for test_issue in test_issues:
+        apis = table.get(test_issue["file"], LIBRARY)
+        full = index.correlate(test_issue["message"], apis)
+        limited = index.correlate(test_issue["message"], apis, top_k=3)
+        assert len(limited) == min(3, len(full))
+        assert all(issue in full for issue in limited)
@@ -0,0 +1,120 @@
+"""
+跨工具问题指纹与去重测试
+"""
+
+from pathlib import Path
+
+import pytest
+
+from agents.bug_detection_agent.issue_fingerprint import (
+    canonical_category,
+    deduplicate_issues,
+    issue_rule,
+)
+
+SOURCE = '''import os
+from typing import (
+    List,
+    Dict,
+)
+
+
+def handler(data=[]):
+    unused = 1
+    try:
+        return eval(data)
+    except:
+        pass
+'''
+
+
+@pytest.fixture
+def project(tmp_path: Path) -> Path:
+    (tmp_path / "m.py").write_text(SOURCE, encoding="utf-8")
+    return tmp_path
+
+
+def _issue(tool, line, message, **extra):
+    return {"tool": tool, "file": "m.py", "line": line, "message": message, "severity": "warning", **extra}
+
+
+def test_rule_extraction_per_tool():
+    assert issue_rule(_issue("pylint", 1, "Unused import os", symbol="unused-import")) == "unused-import"
+    assert issue_rule(_issue("ruff", 1, "`os` imported but unused", rule_code="F401")) == "F401"
+    assert issue_rule(_issue("flake8", 1, "F401 'os' imported but unused")) == "F401"
+    assert issue_rule(_issue("mypy", 1, 'Name "x" is not defined  [name-defined]')) == "name-defined"
+    assert canonical_category(_issue("bandit", 11, "Use of eval", rule="B307")) == "eval-used"
+    assert canonical_category(_issue("pylint", 1, "Something", symbol="too-many-locals")) == "pylint:too-many-locals"
+
+
+def test_unused_import_merges_across_tools(project):
+    issues = [
+        _issue("pylint", 1, "Unused import os", symbol="unused-import"),
+        _issue("ruff", 1, "`os` imported but unused", rule_code="F401"),
+        _issue("flake8", 1, "F401 'os' imported but unused"),
+    ]
+    result = deduplicate_issues(issues, str(project))
+
+    assert len(result) == 1
+    assert result[0]["category"] == "unused-import"
+    assert result[0]["tools"] == ["pylint", "ruff", "flake8"]
+    assert [s["rule"] for s in result[0]["sources"]] == ["unused-import", "F401", "F401"]
+
+
+def test_multiline_import_anchors_to_statement(project):
+    # pylint 报告在语句首行，ruff 报告在名字所在行
+    issues = [
+        _issue("pylint", 2, "Unused List imported from typing", symbol="unused-import"),
+        _issue("pylint", 2, "Unused Dict imported from typing", symbol="unused-import"),
+        _issue("ruff", 3, "`typing.List` imported but unused", rule_code="F401"),
+        _issue("ruff", 4, "`typing.Dict` imported but unused", rule_code="F401"),
+    ]
+    result = deduplicate_issues(issues, str(project))
+
+    assert len(result) == 2
+    assert [issue["line"] for issue in result] == [2, 2]
+    assert all(issue["tools"] == ["pylint", "ruff"] for issue in result)
+    assert "List" in result[0]["message"] and "Dict" in result[1]["message"]
+
+
+def test_security_and_except_rules_merge(project):
+    issues = [
+        _issue("pylint", 11, "Use of eval", symbol="eval-used"),
+        _issue("bandit", 11, "Use of possibly insecure function - consider using safer ast.literal_eval.", rule="B307"),
+        _issue("ruff", 11, "Use of possibly insecure function; consider using `ast.literal_eval`", rule_code="S307"),
+        _issue("pylint", 12, "No exception type(s) specified", symbol="bare-except"),
+        _issue("ruff", 12, "Do not use bare `except`", rule_code="E722"),
+    ]
+    result = deduplicate_issues(issues, str(project))
+
+    assert [issue["category"] for issue in result] == ["eval-used", "bare-except"]
+    assert result[0]["tools"] == ["pylint", "bandit", "ruff"]
+    assert result[1]["tools"] == ["pylint", "ruff"]
+
+
+def test_different_rules_and_lines_stay_separate(project):
+    issues = [
+        _issue("pylint", 8, "Dangerous default value [] as argument", symbol="dangerous-default-value"),
+        _issue("pylint", 9, "Unused variable 'unused'", symbol="unused-variable"),
+        _issue("ruff", 9, "Local variable `unused` is assigned to but never used", rule_code="F841"),
+        _issue("pylint", 9, "Line too long (120/100)", symbol="line-too-long"),
+        _issue("ruff", 10, "Line too long (120 > 100)", rule_code="E501"),
+    ]
+    result = deduplicate_issues(issues, str(project))
+
+    assert [issue["category"] for issue in result] == [
+        "dangerous-default-value", "unused-variable", "line-too-long", "line-too-long",
+    ]
+    assert result[1]["tools"] == ["pylint", "ruff"]
+
+
+def test_missing_file_falls_back_to_line(tmp_path):
+    issues = [
+        _issue("pylint", 3, "Unused import os", symbol="unused-import"),
+        _issue("ruff", 3, "`os` imported but unused", rule_code="F401"),
+        _issue("ruff", 4, "`os` imported but unused", rule_code="F401"),
+    ]
+    result = deduplicate_issues(issues, str(tmp_path))
+
+    assert len(result) == 2
+    assert result[0]["tools"] == ["pylint", "ruff"]
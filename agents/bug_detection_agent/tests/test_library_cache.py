@@ -0,0 +1,193 @@
+"""
+依赖库分析缓存测试（使用本地构建的dummy wheel）
+"""
+
+import asyncio
+import base64
+import hashlib
+import subprocess
+import sys
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from agents.bug_detection_agent.agent import BugDetectionAgent
+from agents.bug_detection_agent.library_cache import (
+    LibraryAnalysisCache,
+    build_probe_command,
+    make_cache_key,
+    parse_probe_output,
+)
+
+ANALYZERS = {"mypy": {"version": "1.0", "args": ["--show-error-codes"]}}
+
+
+def _record_hash(data: bytes) -> str:
+    digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b"=").decode()
+    return f"sha256={digest}"
+
+
+def build_dummy_wheel(target_dir: Path, version: str) -> Path:
+    """手工构建一个最小的纯Python wheel"""
+    dist_info = f"dummylib-{version}.dist-info"
+    files = {
+        "dummylib/__init__.py": f"VERSION = {version!r}\n".encode(),
+        "dummylib/core.py": b"def add(a, b):\n    return a + b\n",
+        f"{dist_info}/METADATA": f"Metadata-Version: 2.1\nName: dummylib\nVersion: {version}\n".encode(),
+        f"{dist_info}/WHEEL": b"Wheel-Version: 1.0\nGenerator: test\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+    }
+    record_lines = [f"{name},{_record_hash(data)},{len(data)}" for name, data in files.items()]
+    record_lines.append(f"{dist_info}/RECORD,,")
+    files[f"{dist_info}/RECORD"] = ("\n".join(record_lines) + "\n").encode()
+
+    wheel_path = target_dir / f"dummylib-{version}-py3-none-any.whl"
+    with zipfile.ZipFile(wheel_path, "w") as wheel:
+        for name, data in files.items():
+            wheel.writestr(name, data)
+    return wheel_path
+
+
+def install_wheel(wheel_path: Path, site_dir: Path) -> None:
+    subprocess.run(
+        [sys.executable, "-m", "pip", "install", "--quiet", "--no-deps", "--no-index",
+         "--upgrade", "--target", str(site_dir), str(wheel_path)],
+        check=True,
+        capture_output=True,
+    )
+
+
+def probe(site_dir: Path) -> dict:
+    command = build_probe_command(["dummylib"], python=sys.executable)
+    result = subprocess.run(
+        command, capture_output=True, text=True, check=True, env={"PYTHONPATH": str(site_dir)}
+    )
+    return parse_probe_output(result.stdout)["libraries"]["dummylib"]
+
+
+@pytest.fixture
+def site_dir(tmp_path):
+    site = tmp_path / "site-packages"
+    site.mkdir()
+    install_wheel(build_dummy_wheel(tmp_path, "0.1.0"), site)
+    return site
+
+
+def test_probe_reports_distribution_and_record_digest(site_dir):
+    info = probe(site_dir)
+    assert info["distribution"] == "dummylib"
+    assert info["version"] == "0.1.0"
+    assert info["files_ok"] is True
+    assert len(info["record_digest"]) == 64
+    assert Path(info["path"]) == site_dir / "dummylib"
+
+
+def test_probe_detects_modified_installation(site_dir):
+    (site_dir / "dummylib" / "core.py").write_text("def add(a, b):\n    return a - b\n")
+    assert probe(site_dir)["files_ok"] is False
+
+
+def test_repeat_scan_hits_and_version_change_misses(tmp_path, site_dir):
+    cache = LibraryAnalysisCache(tmp_path / "cache.sqlite")
+    info = probe(site_dir)
+    key = make_cache_key(info["distribution"], info["version"], ANALYZERS)
+    issues = [{"type": "mypy", "message": "bad", "library": "dummylib", "library_source_path": "/x"}]
+
+    assert cache.get(key, info["record_digest"]) is None
+    cache.put(key, info["distribution"], info["version"], info["record_digest"], issues)
+
+    # 再次扫描同一版本：命中，且不包含与扫描相关的字段
+    again = probe(site_dir)
+    assert cache.get(make_cache_key(again["distribution"], again["version"], ANALYZERS),
+                     again["record_digest"]) == [{"type": "mypy", "message": "bad"}]
+
+    # 升级到新版本（新环境中安装）：缓存键变化，需要重新分析
+    upgraded_site = tmp_path / "upgraded-site-packages"
+    install_wheel(build_dummy_wheel(tmp_path, "0.2.0"), upgraded_site)
+    upgraded = probe(upgraded_site)
+    assert upgraded["version"] == "0.2.0"
+    assert upgraded["record_digest"] != info["record_digest"]
+    assert cache.get(make_cache_key(upgraded["distribution"], upgraded["version"], ANALYZERS),
+                     upgraded["record_digest"]) is None
+
+    # 分析器参数变化同样不会命中
+    other_analyzers = {"mypy": {"version": "1.0", "args": ["--strict"]}}
+    assert cache.get(make_cache_key("dummylib", "0.1.0", other_analyzers), info["record_digest"]) is None
+    assert cache.stats["hits"] == 1
+
+
+def test_record_digest_mismatch_invalidates_entry(tmp_path):
+    cache = LibraryAnalysisCache(tmp_path / "cache.sqlite")
+    key = make_cache_key("dummylib", "0.1.0", ANALYZERS)
+    cache.put(key, "dummylib", "0.1.0", "digest-a", [{"message": "bad"}])
+
+    assert cache.get(key, "digest-b") is None
+    assert cache.stats["invalidations"] == 1
+    assert len(cache) == 0
+
+
+def test_eviction_keeps_cache_within_size_bound(tmp_path):
+    cache = LibraryAnalysisCache(tmp_path / "cache.sqlite", max_size_bytes=2000)
+    issues = [{"message": "x" * 100}] * 5
+    keys = [make_cache_key(f"lib{i}", "1.0", ANALYZERS) for i in range(10)]
+    for i, key in enumerate(keys):
+        cache.put(key, f"lib{i}", "1.0", "digest", issues)
+        cache.get(keys[0], "digest")  # 保持第一个条目为最近使用
+
+    assert cache.size_bytes <= 2000
+    assert cache.stats["evictions"] > 0
+    assert cache.get(keys[0], "digest") is not None
+    assert cache.get(keys[1], "digest") is None
+
+
+class FakeDockerRunner:
+    """按工具名返回预设结果的 Docker 执行器"""
+
+    def __init__(self, results):
+        self.results = results
+
+    async def run_command(self, project_path, command, timeout=300, **kwargs):
+        tool = "mypy" if "mypy" in command[-1] else "pylint"
+        return self.results[tool]
+
+
+def analyze_dummylib(tmp_path, results):
+    agent = BugDetectionAgent({})
+    agent.docker_runner = FakeDockerRunner(results)
+    cache = agent._library_analysis_cache = LibraryAnalysisCache(tmp_path / "cache.sqlite")
+    probe_result = {
+        "libraries": {"dummylib": {"distribution": "dummylib", "version": "0.1.0",
+                                   "record_digest": "digest", "files_ok": True}},
+        "analyzers": {"mypy": "1.0", "pylint": "3.0"},
+    }
+    status = {}
+    issues = asyncio.run(agent._analyze_library_sources(
+        {"dummylib": "/site-packages/dummylib"}, {}, probe=probe_result, analysis_status=status
+    ))
+    return issues, status["dummylib"], cache
+
+
+PYLINT_CLEAN = {"success": True, "stdout": "", "stderr": "", "returncode": 0}
+
+
+def test_timed_out_run_with_partial_output_is_not_cached(tmp_path):
+    partial = {"success": False, "stdout": "dummylib/core.py:1: error: bad [misc]\n",
+               "stderr": "", "returncode": -1, "error": "命令执行超时"}
+    issues, status, cache = analyze_dummylib(tmp_path, {"mypy": partial, "pylint": PYLINT_CLEAN})
+
+    assert [issue["message"] for issue in issues] == ["bad"]
+    assert status == "partial"
+    assert len(cache) == 0
+
+
+def test_docker_failure_without_output_is_not_cached(tmp_path):
+    unreachable = {"success": False, "stdout": "", "stderr": "Cannot connect to the Docker daemon",
+                   "returncode": 125}
+    issues, status, cache = analyze_dummylib(tmp_path, {"mypy": PYLINT_CLEAN, "pylint": unreachable})
+
+    assert issues == [] and status == "timeout"
+    assert len(cache) == 0
+
+    # 两个工具都正常完成时才写入缓存
+    _, status, cache = analyze_dummylib(tmp_path, {"mypy": PYLINT_CLEAN, "pylint": PYLINT_CLEAN})
+    assert status == "analyzed" and len(cache) == 1
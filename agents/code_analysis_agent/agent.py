@@ -19,9 +19,9 @@ class CodeAnalysisAgent(BaseAgent):
     
     def __init__(self, config: Dict[str, Any]):
         super().__init__("code_analysis_agent", config)
-        self.ai_service = AIAnalysisService()
+        self.ai_service = AIAnalysisService(config)
         self.project_analyzer = ProjectAnalyzer()
-        self.code_analyzer = CodeAnalyzer(self.ai_service)
+        self.code_analyzer = CodeAnalyzer(self.ai_service, config)
         self.dependency_analyzer = DependencyAnalyzer()
     
     async def start(self):
@@ -2,12 +2,24 @@ import os
 import json
 import ast
 import re
+import sys
 import asyncio
+import time
+import signal
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 from collections import defaultdict
+import sqlite3
+import aiohttp
 import networkx as nx
 from api.deepseek_config import DeepSeekConfig
+from utils.metrics import observe_llm
+from .intent_cache import CodeIntentCache, make_intent_cache_key
 
 @dataclass
 class CodeComplexityMetrics:
@@ -35,17 +47,126 @@ class ProjectIntent:
 class AIAnalysisService:
     """AI分析服务"""
     
-    def __init__(self):
+    # 代码意图分析提示词模板版本，修改模板时递增以使缓存结果失效
+    INTENT_PROMPT_VERSION = "1"
+    
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
         self.config = DeepSeekConfig()
+        config = config or {}
+        # 批量分析时同时进行的模型请求数上限
+        self.max_concurrency = max(1, int(config.get('ai_max_concurrency', 8)))
+        # 每个项目批量分析的Token预算（提示词估算 + 回复上限），0 表示只使用缓存
+        self.token_budget = int(config.get('ai_token_budget', 200000))
+        self.intent_max_tokens = int(config.get('ai_intent_max_tokens', self.config.max_tokens))
+        self.request_timeout = float(config.get('ai_request_timeout', 60.0))
+        self.cache = None
+        if config.get('ai_cache_enabled', True):
+            try:
+                self.cache = CodeIntentCache(config.get('ai_cache_path'))
+            except (OSError, sqlite3.Error) as e:
+                print(f"AI分析缓存不可用: {e}")
     
     async def analyze_code_intent(self, code_content: str, file_path: str, 
                                  complexity_metrics: Dict = None, issues: List = None) -> Dict[str, Any]:
         """使用AI分析代码意图"""
-        try:
-            # 构建代码分析上下文
-            context_info = self._build_code_context(file_path, code_content, complexity_metrics, issues)
+        results, _ = await self.analyze_code_intents([{
+            'file_path': file_path,
+            'content': code_content,
+            'complexity_metrics': complexity_metrics,
+            'issues': issues
+        }], token_budget=sys.maxsize)  # 单文件分析不受项目预算限制
+        return results[file_path]
+    
+    async def analyze_code_intents(self, files: List[Dict[str, Any]],
+                                   token_budget: Optional[int] = None) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, int]]:
+        """批量分析代码意图
+        
+        files 中每项包含 file_path、content、complexity_metrics、issues。
+        先按内容哈希查缓存；未命中的文件按复杂度和问题数排序，在项目Token预算内
+        预留额度（提示词估算 + 回复上限），再以有限并发同时请求模型，
+        总耗时接近最慢的单次请求而不是各次请求之和。超出预算的文件返回 skipped 结果。
+        
+        Returns:
+            (文件路径 -> 分析结果, 本批统计)；统计随结果返回，并发的多次分析互不影响
+        """
+        budget = self.token_budget if token_budget is None else token_budget
+        stats = {'files': len(files), 'cached': 0, 'requested': 0, 'skipped': 0, 'failed': 0,
+                 'token_budget': budget, 'tokens_reserved': 0, 'tokens_used': 0}
+        results: Dict[str, Dict[str, Any]] = {}
+        # 缓存键 -> 同内容的文件列表，相同内容只请求一次
+        misses: Dict[str, List[Dict[str, Any]]] = {}
+        
+        keys = [
+            make_intent_cache_key(
+                item['content'], self.config.model, self.INTENT_PROMPT_VERSION,
+                item.get('complexity_metrics'), item.get('issues')
+            )
+            for item in files
+        ]
+        # 缓存读写是阻塞的SQLite操作，放到线程中执行
+        cached_results = await asyncio.to_thread(lambda: [self._cache_get(key) for key in keys])
+        for item, key, cached in zip(files, keys, cached_results):
+            if cached is not None:
+                results[item['file_path']] = {**cached, 'file_path': item['file_path'], 'cached': True}
+                stats['cached'] += 1
+            else:
+                misses.setdefault(key, []).append(item)
+        
+        # 按优先级在预算内预留Token
+        selected = []
+        remaining = budget
+        for key, items in sorted(misses.items(), key=lambda entry: -self._intent_priority(entry[1][0])):
+            item = items[0]
+            context_info = self._build_code_context(
+                item['file_path'], item['content'], item.get('complexity_metrics'), item.get('issues')
+            )
+            prompt = self._build_intent_prompt(context_info)
+            estimate = self._estimate_tokens(prompt) + self.intent_max_tokens
+            if estimate > remaining:
+                for skipped in items:
+                    results[skipped['file_path']] = {
+                        'success': False,
+                        'skipped': True,
+                        'error': '超出项目Token预算，跳过AI分析',
+                        'file_path': skipped['file_path']
+                    }
+                stats['skipped'] += len(items)
+                continue
+            remaining -= estimate
+            stats['tokens_reserved'] += estimate
+            selected.append((key, items, prompt, context_info))
+        
+        if selected:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
             
-            prompt = f"""
+            async with aiohttp.ClientSession() as session:
+                async def request(key, items, prompt, context_info):
+                    async with semaphore:
+                        try:
+                            response, tokens = await self._chat_completion(prompt, self.intent_max_tokens, session)
+                        except Exception as e:
+                            stats['failed'] += len(items)
+                            for failed in items:
+                                results[failed['file_path']] = {
+                                    'success': False,
+                                    'error': str(e) or type(e).__name__,
+                                    'file_path': failed['file_path']
+                                }
+                            return
+                    stats['requested'] += 1
+                    stats['tokens_used'] += tokens
+                    result = {'success': True, 'analysis': response, 'context': context_info}
+                    await asyncio.to_thread(self._cache_put, key, result, tokens)
+                    for done in items:
+                        results[done['file_path']] = {**result, 'file_path': done['file_path'], 'cached': False}
+                
+                await asyncio.gather(*(request(*entry) for entry in selected))
+        
+        return results, stats
+    
+    def _build_intent_prompt(self, context_info: Dict[str, str]) -> str:
+        """构建代码意图分析提示词"""
+        return f"""
             作为资深代码审查专家,请对以下代码进行深度分析:
 
             ## 文件信息
@@ -70,22 +191,70 @@ class AIAnalysisService:
 
             请以Markdown格式输出详细的分析报告,每个部分都要有具体的分析和建议。
             """
-            
-            response = await self.config.generate_response(prompt)
-            
-            return {
-                'success': True,
-                'analysis': response,
-                'file_path': file_path,
-                'context': context_info
-            }
-            
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e),
-                'file_path': file_path
-            }
+    
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """粗略估算Token数（中文约每字1个Token，英文约每3~4个字符1个Token）"""
+        return len(text.encode('utf-8')) // 3 + 1
+    
+    @staticmethod
+    def _intent_priority(item: Dict[str, Any]) -> float:
+        """分析优先级：复杂度越高、静态问题越多越优先"""
+        metrics = item.get('complexity_metrics') or {}
+        return metrics.get('cyclomatic_complexity', 0) + 2 * len(item.get('issues') or [])
+    
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.cache is None:
+            return None
+        try:
+            return self.cache.get(key)
+        except sqlite3.Error:
+            return None
+    
+    def _cache_put(self, key: str, result: Dict[str, Any], tokens: int):
+        if self.cache is None:
+            return
+        try:
+            self.cache.put(key, result, tokens)
+        except sqlite3.Error as e:
+            print(f"AI分析结果缓存写入失败: {e}")
+    
+    async def _chat_completion(self, prompt: str, max_tokens: int,
+                               session: Optional[aiohttp.ClientSession] = None) -> Tuple[str, int]:
+        """请求DeepSeek模型，返回 (回复内容, 实际Token用量)"""
+        if not self.config.is_configured():
+            raise RuntimeError("未配置DeepSeek API密钥")
+        
+        request_data = {
+            "model": self.config.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": self.config.temperature
+        }
+        
+        with observe_llm("code_analysis", self.config.model) as call:
+            own_session = session is None
+            if own_session:
+                session = aiohttp.ClientSession()
+            try:
+                async with session.post(
+                    f"{self.config.base_url}/chat/completions",
+                    headers=self.config.get_headers(),
+                    json=request_data,
+                    timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+                ) as response:
+                    if response.status != 200:
+                        raise RuntimeError(f"AI请求失败: HTTP {response.status}")
+                    result = await response.json()
+                    call.record_usage(result)
+            finally:
+                if own_session:
+                    await session.close()
+        
+        content = result["choices"][0]["message"]["content"]
+        usage = result.get("usage") or {}
+        tokens = usage.get("total_tokens") or self._estimate_tokens(prompt) + self._estimate_tokens(content)
+        return content, tokens
     
     def _build_code_context(self, file_path: str, code_content: str, 
                            complexity_metrics: Dict = None, issues: List = None) -> Dict[str, str]:
@@ -138,7 +307,7 @@ class AIAnalysisService:
             请以Markdown格式输出详细的分析报告,每个部分都要有具体的分析和建议。
             """
             
-            response = await self.config.generate_response(prompt)
+            response, _ = await self._chat_completion(prompt, self.config.max_tokens)
             
             return {
                 'success': True,
@@ -197,9 +366,17 @@ class AIAnalysisService:
 class ProjectAnalyzer:
     """项目结构分析器"""
     
+    # 统计行数时每次读取的块大小；首块包含 NUL 字节的文件视为二进制文件
+    READ_BLOCK_SIZE = 64 * 1024
+    # 行数缓存最多保留的文件数
+    MAX_CACHED_FILES = 200000
+    
     def __init__(self):
         self.ignored_dirs = {'.git', '__pycache__', 'node_modules', '.venv', 'venv', 'env', '.env'}
         self.ignored_extensions = {'.pyc', '.pyo', '.pyd', '.so', '.dll', '.exe'}
+        # (设备, inode, mtime, 大小) -> 行数（二进制文件为None），同一上传重复分析时只需遍历目录
+        self._line_cache: "OrderedDict[Tuple[int, int, int, int], Optional[int]]" = OrderedDict()
+        self._line_cache_lock = threading.Lock()
     
     async def analyze_project_structure(self, project_path: str) -> Dict[str, Any]:
         """分析项目结构"""
@@ -228,55 +405,108 @@ class ProjectAnalyzer:
             # 分析单个文件
             structure = await self._analyze_single_file(project_path, structure)
         else:
-            # 遍历项目目录
-            for root, dirs, files in os.walk(project_path):
-                # 过滤忽略的目录
-                dirs[:] = [d for d in dirs if d not in self.ignored_dirs]
-            
-            # 分析目录
-            rel_root = os.path.relpath(root, project_path)
-            if rel_root != '.':
-                structure['directories'].append(rel_root)
+            # 在线程中遍历项目目录，避免大项目阻塞事件循环
+            await asyncio.to_thread(self._scan_directory, project_path, structure)
+        
+        # 推断项目类型
+        structure['project_type'] = self._infer_project_type(structure)
+        structure['framework'] = self._infer_framework(structure)
+        structure['primary_language'] = self._infer_primary_language(structure)
+        structure['has_tests'] = self._has_tests(structure)
+        structure['has_docs'] = self._has_docs(structure)
+        structure['has_config'] = self._has_config(structure)
+        
+        return structure
+
+    def _scan_directory(self, project_path: str, structure: Dict[str, Any]):
+        """单次遍历项目目录：os.scandir 的 stat 结果同时提供大小和缓存键，行数只在文件变化时重新统计"""
+        scan_stats = {'cached_files': 0, 'counted_files': 0, 'binary_files': 0}
+        stack = [project_path]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError:
+                continue
             
-            # 分析文件
-            for file in files:
-                if any(file.endswith(ext) for ext in self.ignored_extensions):
+            subdirs = []
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        # 过滤忽略的目录
+                        if entry.name not in self.ignored_dirs:
+                            subdirs.append(entry.path)
+                        continue
+                    if not entry.is_file() or any(entry.name.endswith(ext) for ext in self.ignored_extensions):
+                        continue
+                    stat = entry.stat()
+                except OSError:
                     continue
                 
-                file_path = os.path.join(root, file)
-                rel_path = os.path.relpath(file_path, project_path)
-                
-                # 获取文件信息
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        lines = len(content.splitlines())
-                except:
+                lines, cached = self._count_lines_cached(entry.path, stat)
+                scan_stats['cached_files' if cached else 'counted_files'] += 1
+                if lines is None:
+                    scan_stats['binary_files'] += 1
                     lines = 0
                 
                 # 文件类型统计
-                ext = os.path.splitext(file)[1].lower()
+                ext = os.path.splitext(entry.name)[1].lower()
                 structure['file_types'][ext] += 1
                 
                 structure['files'].append({
-                    'path': rel_path,
+                    'path': os.path.relpath(entry.path, project_path),
                     'lines': lines,
-                    'size': os.path.getsize(file_path)
+                    'size': stat.st_size
                 })
                 
                 structure['total_files'] += 1
                 structure['total_lines'] += lines
+            
+            # 分析目录（保持与 os.walk 相同的先序顺序）
+            for subdir in subdirs:
+                structure['directories'].append(os.path.relpath(subdir, project_path))
+            stack.extend(reversed(subdirs))
         
-        # 推断项目类型
-        structure['project_type'] = self._infer_project_type(structure)
-        structure['framework'] = self._infer_framework(structure)
-        structure['primary_language'] = self._infer_primary_language(structure)
-        structure['has_tests'] = self._has_tests(structure)
-        structure['has_docs'] = self._has_docs(structure)
-        structure['has_config'] = self._has_config(structure)
+        structure['scan_stats'] = scan_stats
+    
+    def _count_lines_cached(self, file_path: str, stat: os.stat_result) -> Tuple[Optional[int], bool]:
+        """按 (设备, inode, mtime, 大小) 缓存行数，返回 (行数, 是否命中缓存)"""
+        key = (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._line_cache_lock:
+            if key in self._line_cache:
+                self._line_cache.move_to_end(key)
+                return self._line_cache[key], True
         
-        return structure
-
+        try:
+            lines = self._count_lines(file_path)
+        except OSError:
+            # 无法读取的文件不缓存，下次重试
+            return 0, False
+        
+        with self._line_cache_lock:
+            self._line_cache[key] = lines
+            while len(self._line_cache) > self.MAX_CACHED_FILES:
+                self._line_cache.popitem(last=False)
+        return lines, False
+    
+    def _count_lines(self, file_path: str) -> Optional[int]:
+        """分块统计换行符数量，不解码内容；二进制文件返回None"""
+        lines = 0
+        last_byte = b'\n'
+        with open(file_path, 'rb') as f:
+            block = f.read(self.READ_BLOCK_SIZE)
+            if b'\0' in block:
+                return None
+            while block:
+                lines += block.count(b'\n')
+                last_byte = block[-1:]
+                block = f.read(self.READ_BLOCK_SIZE)
+        # 最后一行没有换行符时也计为一行（与 str.splitlines 一致）
+        if last_byte != b'\n':
+            lines += 1
+        return lines
+    
     def _infer_project_type(self, structure: Dict[str, Any]) -> str:
         """推断项目类型"""
         files = [f['path'] for f in structure['files']]
@@ -347,9 +577,16 @@ class ProjectAnalyzer:
 class CodeAnalyzer:
     """代码质量分析器"""
     
-    def __init__(self, ai_service: AIAnalysisService):
+    def __init__(self, ai_service: AIAnalysisService, config: Optional[Dict[str, Any]] = None):
         self.ai_service = ai_service
         self.supported_extensions = {'.py', '.js', '.ts', '.java', '.c', '.cpp', '.h', '.hpp'}
+        config = config or {}
+        # 静态分析在进程池中并行执行：按分块提交，单个文件超时后结束卡住的工作进程
+        self.max_workers = max(1, int(config.get('quality_workers') or os.cpu_count() or 1))
+        self.chunk_size = max(1, int(config.get('quality_chunk_size', 16)))
+        self.file_timeout = float(config.get('quality_file_timeout', 5.0))
+        # 新建进程池时工作进程的启动时间不计入文件超时
+        self.pool_startup_grace = float(config.get('quality_pool_startup_grace', 10.0))
     
     async def analyze_code_quality(self, project_path: str) -> Dict[str, Any]:
         """分析代码质量"""
@@ -369,80 +606,229 @@ class CodeAnalyzer:
             'ai_analysis': []
         }
         
-        # 分析所有代码文件
+        # 在线程中遍历目录，避免大项目阻塞事件循环
+        files = await asyncio.to_thread(self._collect_code_files, project_path)
+        file_order = {rel_path: index for index, (_, rel_path) in enumerate(files)}
+        
+        file_count = 0
+        complexity_sum = 0
+        ai_candidates = []
+        async for rel_path, file_analysis, error in self._analyze_files_parallel(files):
+            file_count += 1
+            # 每处理100个文件输出一次进度
+            if file_count % 100 == 0:
+                print(f"     已分析 {file_count}/{len(files)} 个文件...")
+            
+            if error:
+                # 文件分析超时或失败，跳过该文件
+                print(f"     ⚠️ {error}，跳过: {rel_path}")
+                continue
+            
+            if rel_path.endswith('.py') and 'error' not in file_analysis:
+                ai_candidates.append(file_analysis)
+            
+            # 结果到达即合并到统计信息
+            quality_metrics['file_analysis'].append(file_analysis)
+            quality_metrics['total_files'] += 1
+            quality_metrics['analyzed_files'] += 1
+            quality_metrics['total_lines'] += file_analysis['lines_of_code']
+            quality_metrics['total_functions'] += file_analysis['function_count']
+            quality_metrics['total_classes'] += file_analysis['class_count']
+            quality_metrics['total_issues'] += len(file_analysis['issues'])
+            
+            # 复杂度统计
+            complexity = file_analysis['complexity_metrics']['cyclomatic_complexity']
+            complexity_sum += complexity
+            quality_metrics['max_complexity'] = max(quality_metrics['max_complexity'], complexity)
+            quality_metrics['complexity_distribution'][complexity] += 1
+            
+            # 问题类型统计
+            for issue in file_analysis['issues']:
+                issue_type = issue.get('type', 'unknown')
+                quality_metrics['issues_by_type'][issue_type] += 1
+        
+        # 静态分析成功的Python文件批量进行AI分析（缓存 + 有限并发 + 项目Token预算）
+        if ai_candidates and self.ai_service is not None:
+            ai_results, ai_stats = await self._analyze_code_intents(project_path, ai_candidates)
+            for file_analysis in ai_candidates:
+                file_analysis['ai_analysis'] = ai_results.get(file_analysis['file_path'])
+            quality_metrics['ai_analysis_stats'] = ai_stats
+        
+        # 结果按完成顺序到达，恢复为目录遍历顺序
+        quality_metrics['file_analysis'].sort(key=lambda f: file_order.get(f['file_path'], 0))
+        
+        # 计算平均复杂度
+        if quality_metrics['analyzed_files'] > 0:
+            quality_metrics['average_complexity'] = complexity_sum / quality_metrics['analyzed_files']
+        
+        # 计算可维护性评分
+        quality_metrics['maintainability_score'] = self._calculate_maintainability_score(quality_metrics)
+        
+        return quality_metrics
+    
+    def _collect_code_files(self, project_path: str) -> List[Tuple[str, str]]:
+        """收集需要分析的代码文件，返回 (绝对路径, 相对路径) 列表"""
         # 跳过虚拟环境和缓存目录
         ignored_dirs = {'venv', '__pycache__', '.git', 'node_modules', '.pytest_cache', '.mypy_cache', 'site-packages', 'dist', 'build', '.eggs'}
         
-        file_count = 0
-        for root, dirs, files in os.walk(project_path):
+        files = []
+        for root, dirs, filenames in os.walk(project_path):
             # 过滤忽略的目录
             dirs[:] = [d for d in dirs if d not in ignored_dirs]
             
             # 跳过虚拟环境目录
             if any(ignored in root for ignored in ignored_dirs):
                 continue
-                
-            for file in files:
+            
+            for file in filenames:
                 if any(file.endswith(ext) for ext in self.supported_extensions):
                     file_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(file_path, project_path)
-                    
-                    file_count += 1
-                    # 每处理10个文件输出一次进度
-                    if file_count % 10 == 0:
-                        print(f"     已分析 {file_count} 个文件...")
-                    
+                    files.append((file_path, os.path.relpath(file_path, project_path)))
+        return files
+    
+    async def _analyze_files_parallel(self, files: List[Tuple[str, str]]):
+        """在进程池中分块并行分析文件，按完成顺序逐个产出 (相对路径, 分析结果, 错误信息)
+        
+        同时执行的分块数不超过工作进程数，因此分块提交后立即开始执行，
+        其截止时间为 文件数 × 单文件超时。超时的分块所在进程池被整体结束
+        （ProcessPoolExecutor 无法取消正在执行的任务），其他未完成的分块原样重新提交，
+        超时的分块拆成单文件重试，单个文件再次超时即判定为超时文件。
+        """
+        loop = asyncio.get_running_loop()
+        # 待提交队列元素为 (分块, 进程池异常退出次数)
+        pending = deque(
+            (files[i:i + self.chunk_size], 0) for i in range(0, len(files), self.chunk_size)
+        )
+        executor = self._create_pool()
+        if executor is None:
+            # 无法创建进程池（如受限环境）时退回到线程中顺序分析，仍不阻塞事件循环
+            while pending:
+                chunk, _ = pending.popleft()
+                for item in await asyncio.to_thread(_analyze_file_chunk, chunk):
+                    yield item
+            return
+        
+        pool_started = time.monotonic()
+        running = {}
+        try:
+            while pending or running:
+                while pending and len(running) < self.max_workers:
+                    chunk, crashes = pending.popleft()
+                    now = time.monotonic()
+                    grace = max(0.0, pool_started + self.pool_startup_grace - now)
                     try:
-                        # 分析单个文件（添加超时保护，每个文件最多5秒）
-                        file_analysis = await asyncio.wait_for(
-                            self._analyze_code_file(file_path, rel_path),
-                            timeout=5.0
-                        )
-                        quality_metrics['file_analysis'].append(file_analysis)
-                    except asyncio.TimeoutError:
-                        # 文件分析超时，跳过该文件
-                        print(f"     ⚠️ 文件分析超时，跳过: {rel_path}")
+                        future = loop.run_in_executor(executor, _analyze_file_chunk, chunk)
+                    except BrokenProcessPool:
+                        pending.appendleft((chunk, crashes))
+                        executor, pool_started = self._replace_pool(executor), time.monotonic()
                         continue
+                    running[future] = (chunk, crashes, now + grace + self.file_timeout * len(chunk), executor)
+                
+                nearest_deadline = min(deadline for _, _, deadline, _ in running.values())
+                done, _ = await asyncio.wait(
+                    running, timeout=max(0.0, nearest_deadline - time.monotonic()),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                
+                for future in done:
+                    chunk, crashes, _, pool = running.pop(future)
+                    try:
+                        results = future.result()
+                    except BrokenProcessPool:
+                        # 工作进程异常退出（如解析时崩溃）：拆分重试，单个文件两次导致崩溃则放弃
+                        if pool is executor:
+                            executor, pool_started = self._replace_pool(executor), time.monotonic()
+                        if len(chunk) == 1 and crashes >= 1:
+                            results = [(chunk[0][1], None, '文件分析失败（工作进程异常退出）')]
+                        else:
+                            pending.extendleft(([item], crashes + 1) for item in reversed(chunk))
+                            continue
                     except Exception as e:
-                        # 文件分析失败，跳过该文件
-                        print(f"     ⚠️ 文件分析失败，跳过: {rel_path} ({e})")
+                        results = [(rel_path, None, f'文件分析失败 ({e})') for _, rel_path in chunk]
+                    for item in results:
+                        yield item
+                
+                now = time.monotonic()
+                # 产出结果期间已完成的分块不算超时，下一轮直接取结果
+                expired = [
+                    future for future, (_, _, deadline, _) in running.items()
+                    if deadline <= now and not future.done()
+                ]
+                if not expired:
+                    continue
+                
+                # 结束卡住的工作进程：整个进程池重建，已完成的分块保留结果，其他未超时的分块原样重新提交
+                self._kill_pool(executor)
+                executor, pool_started = self._create_pool(), time.monotonic()
+                for future, (chunk, crashes, _, _) in list(running.items()):
+                    if future.done():
                         continue
-                    
-                    # 更新统计信息
-                    quality_metrics['total_files'] += 1
-                    quality_metrics['analyzed_files'] += 1
-                    quality_metrics['total_lines'] += file_analysis['lines_of_code']
-                    quality_metrics['total_functions'] += file_analysis['function_count']
-                    quality_metrics['total_classes'] += file_analysis['class_count']
-                    quality_metrics['total_issues'] += len(file_analysis['issues'])
-                    
-                    # 复杂度统计
-                    complexity = file_analysis['complexity_metrics']['cyclomatic_complexity']
-                    quality_metrics['max_complexity'] = max(quality_metrics['max_complexity'], complexity)
-                    quality_metrics['complexity_distribution'][complexity] += 1
-                    
-                    # 问题类型统计
-                    for issue in file_analysis['issues']:
-                        issue_type = issue.get('type', 'unknown')
-                        quality_metrics['issues_by_type'][issue_type] += 1
-        
-        # 计算平均复杂度
-        if quality_metrics['analyzed_files'] > 0:
-            quality_metrics['average_complexity'] = sum(
-                f['complexity_metrics']['cyclomatic_complexity'] 
-                for f in quality_metrics['file_analysis']
-            ) / quality_metrics['analyzed_files']
-        
-        # 计算可维护性评分
-        quality_metrics['maintainability_score'] = self._calculate_maintainability_score(quality_metrics)
+                    del running[future]
+                    # 被放弃的任务随后会以 BrokenProcessPool 结束，取走异常避免告警
+                    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+                    if future not in expired:
+                        pending.appendleft((chunk, crashes))
+                    elif len(chunk) == 1:
+                        yield chunk[0][1], None, f'文件分析超时（>{self.file_timeout:g}秒）'
+                    else:
+                        pending.extendleft(([item], crashes) for item in reversed(chunk))
+                if executor is None:
+                    # 进程池无法重建时，剩余文件在线程中顺序分析
+                    while pending:
+                        chunk, _ = pending.popleft()
+                        for item in await asyncio.to_thread(_analyze_file_chunk, chunk):
+                            yield item
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _create_pool(self) -> Optional[ProcessPoolExecutor]:
+        """创建静态分析进程池，当前环境不支持多进程时返回None"""
+        try:
+            return _WorkerTrackingPool(self.max_workers)
+        except (ImportError, NotImplementedError, OSError) as e:
+            print(f"     ⚠️ 无法创建进程池，改为顺序分析: {e}")
+            return None
+    
+    def _replace_pool(self, executor: ProcessPoolExecutor) -> Optional[ProcessPoolExecutor]:
+        """替换已损坏的进程池"""
+        executor.shutdown(wait=False, cancel_futures=True)
+        return self._create_pool()
+    
+    @staticmethod
+    def _kill_pool(executor: '_WorkerTrackingPool'):
+        """强制结束进程池的所有工作进程"""
+        executor.kill_workers()
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    async def _analyze_code_intents(self, project_path: str,
+                                    analyses: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, int]]:
+        """读取文件内容并批量进行AI分析，返回 (分析结果, 本批统计)，失败时不影响静态结果"""
+        def read_all():
+            files = []
+            for file_analysis in analyses:
+                try:
+                    content = _read_source(os.path.join(project_path, file_analysis['file_path']))
+                except OSError:
+                    continue
+                files.append({
+                    'file_path': file_analysis['file_path'],
+                    'content': content,
+                    'complexity_metrics': file_analysis['complexity_metrics'],
+                    'issues': file_analysis['issues']
+                })
+            return files
         
-        return quality_metrics
+        try:
+            return await self.ai_service.analyze_code_intents(await asyncio.to_thread(read_all))
+        except Exception as e:
+            print(f"     ⚠️ AI分析失败: {e}")
+            return {}, {}
     
-    async def _analyze_code_file(self, file_path: str, rel_path: str) -> Dict[str, Any]:
-        """分析单个代码文件"""
+    def _analyze_file_static(self, file_path: str, rel_path: str) -> Dict[str, Any]:
+        """静态分析单个代码文件（在工作进程中执行，不包含AI分析）"""
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            content = _read_source(file_path)
         except:
             return {
                 'file_path': rel_path,
@@ -458,15 +844,15 @@ class CodeAnalyzer:
         ext = os.path.splitext(file_path)[1].lower()
         
         if ext == '.py':
-            return await self._analyze_python_file(file_path, rel_path, content)
+            return self._analyze_python_file(file_path, rel_path, content)
         elif ext in {'.js', '.ts'}:
-            return await self._analyze_javascript_file(file_path, rel_path, content)
+            return self._analyze_javascript_file(file_path, rel_path, content)
         elif ext == '.java':
-            return await self._analyze_java_file(file_path, rel_path, content)
+            return self._analyze_java_file(file_path, rel_path, content)
         else:
-            return await self._analyze_generic_file(file_path, rel_path, content)
+            return self._analyze_generic_file(file_path, rel_path, content)
     
-    async def _analyze_python_file(self, file_path: str, rel_path: str, content: str) -> Dict[str, Any]:
+    def _analyze_python_file(self, file_path: str, rel_path: str, content: str) -> Dict[str, Any]:
         """分析Python文件"""
         try:
             tree = ast.parse(content)
@@ -487,19 +873,13 @@ class CodeAnalyzer:
         # 检测问题
         issues = self._detect_python_issues(tree, content)
         
-        # AI分析
-        ai_analysis = await self.ai_service.analyze_code_intent(
-            content, rel_path, complexity_metrics.__dict__, issues
-        )
-        
         return {
             'file_path': rel_path,
             'lines_of_code': len(content.splitlines()),
             'function_count': len([node for node in ast.walk(tree) if isinstance(node, ast.FunctionDef)]),
             'class_count': len([node for node in ast.walk(tree) if isinstance(node, ast.ClassDef)]),
             'complexity_metrics': complexity_metrics.__dict__,
-            'issues': issues,
-            'ai_analysis': ai_analysis
+            'issues': issues
         }
     
     def _calculate_python_complexity(self, tree: ast.AST) -> CodeComplexityMetrics:
@@ -576,7 +956,7 @@ class CodeAnalyzer:
         
         return issues
     
-    async def _analyze_javascript_file(self, file_path: str, rel_path: str, content: str) -> Dict[str, Any]:
+    def _analyze_javascript_file(self, file_path: str, rel_path: str, content: str) -> Dict[str, Any]:
         """分析JavaScript文件"""
         lines = content.splitlines()
         function_count = len(re.findall(r'function\s+\w+', content))
@@ -601,7 +981,7 @@ class CodeAnalyzer:
             'issues': []
         }
     
-    async def _analyze_java_file(self, file_path: str, rel_path: str, content: str) -> Dict[str, Any]:
+    def _analyze_java_file(self, file_path: str, rel_path: str, content: str) -> Dict[str, Any]:
         """分析Java文件"""
         lines = content.splitlines()
         function_count = len(re.findall(r'public\s+\w+\s+\w+\s*\(', content))
@@ -626,7 +1006,7 @@ class CodeAnalyzer:
             'issues': []
         }
     
-    async def _analyze_generic_file(self, file_path: str, rel_path: str, content: str) -> Dict[str, Any]:
+    def _analyze_generic_file(self, file_path: str, rel_path: str, content: str) -> Dict[str, Any]:
         """分析通用代码文件"""
         lines = content.splitlines()
         
@@ -663,11 +1043,56 @@ class CodeAnalyzer:
         
         return max(0, min(100, score))
 
+def _read_source(file_path: str) -> str:
+    """读取源文件内容"""
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+def _analyze_file_chunk(files: List[Tuple[str, str]]) -> List[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+    """进程池工作函数：静态分析一批文件，返回 (相对路径, 分析结果, 错误信息) 列表"""
+    analyzer = CodeAnalyzer(None)
+    results = []
+    for file_path, rel_path in files:
+        try:
+            results.append((rel_path, analyzer._analyze_file_static(file_path, rel_path), None))
+        except Exception as e:
+            results.append((rel_path, None, f'文件分析失败 ({e})'))
+    return results
+
+def _report_worker_pid(pid_queue):
+    """进程池工作进程初始化函数：上报自身PID"""
+    pid_queue.put(os.getpid())
+
+class _WorkerTrackingPool(ProcessPoolExecutor):
+    """记录工作进程PID的进程池（工作进程启动时通过初始化函数上报），用于强制结束卡住的工作进程"""
+    
+    def __init__(self, max_workers: int):
+        self._worker_pid_queue = multiprocessing.SimpleQueue()
+        self._worker_pids = set()
+        super().__init__(max_workers=max_workers, initializer=_report_worker_pid,
+                         initargs=(self._worker_pid_queue,))
+    
+    def kill_workers(self):
+        """强制结束已启动的全部工作进程（执行任务前都已上报PID）"""
+        while not self._worker_pid_queue.empty():
+            self._worker_pids.add(self._worker_pid_queue.get())
+        for pid in self._worker_pids:
+            try:
+                os.kill(pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+            except OSError:
+                pass
+
 class DependencyAnalyzer:
     """依赖关系分析器"""
     
-    def __init__(self):
-        self.dependency_graph = nx.DiGraph()
+    # 跳过虚拟环境和缓存目录
+    IGNORED_DIRS = {'venv', '.venv', '__pycache__', '.git', 'node_modules', '.pytest_cache', '.mypy_cache', 'site-packages', 'dist', 'build', '.eggs'}
+    
+    def __init__(self, max_reported_cycles: int = 100, max_witness_sources: int = 64):
+        # 依赖图在每次分析时新建，不在实例上累积
+        self.max_reported_cycles = max_reported_cycles
+        # 为每个强连通分量寻找最短环时最多尝试的起点模块数
+        self.max_witness_sources = max_witness_sources
     
     async def analyze_dependencies(self, project_path: str) -> Dict[str, Any]:
         """分析项目依赖"""
@@ -685,14 +1110,15 @@ class DependencyAnalyzer:
         # 分析包管理器依赖
         await self._analyze_package_dependencies(project_path, dependencies)
         
-        # 分析代码导入依赖
-        await self._analyze_code_imports(project_path, dependencies)
+        # 分析代码导入依赖（在线程中解析，避免大项目阻塞事件循环）
+        graph = await asyncio.to_thread(self._analyze_code_imports, project_path, dependencies)
         
-        # 检测循环依赖
-        dependencies['circular_dependencies'] = self._detect_circular_dependencies()
+        # 检测循环依赖：每个强连通分量报告一个最短环作为示例
+        dependencies['dependency_cycles'] = self._detect_circular_dependencies(graph)
+        dependencies['circular_dependencies'] = [c['cycle'] for c in dependencies['dependency_cycles']]
         
         # 计算依赖指标
-        dependencies['dependency_metrics'] = self._calculate_dependency_metrics(dependencies)
+        dependencies['dependency_metrics'] = self._calculate_dependency_metrics(dependencies, graph)
         
         return dependencies
     
@@ -805,55 +1231,181 @@ class DependencyAnalyzer:
         except Exception:
             return []
     
-    async def _analyze_code_imports(self, project_path: str, dependencies: Dict[str, Any]):
-        """分析代码导入依赖"""
-        imports = defaultdict(set)
-        internal_modules = set()
+    def _analyze_code_imports(self, project_path: str, dependencies: Dict[str, Any]) -> nx.DiGraph:
+        """分析代码导入依赖，返回以项目内文件为节点的模块依赖图"""
+        imports = {}
+        parsed = {}
         
         # 遍历Python文件
         for root, dirs, files in os.walk(project_path):
-            for file in files:
+            dirs[:] = sorted(d for d in dirs if d not in self.IGNORED_DIRS)
+            for file in sorted(files):
                 if file.endswith('.py'):
                     file_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(file_path, project_path)
+                    rel_path = os.path.relpath(file_path, project_path).replace(os.sep, '/')
                     
                     try:
                         with open(file_path, 'r', encoding='utf-8') as f:
                             content = f.read()
-                        
-                        # 解析导入语句
                         tree = ast.parse(content)
-                        for node in ast.walk(tree):
-                            if isinstance(node, ast.Import):
-                                for alias in node.names:
-                                    imports[rel_path].add(alias.name)
-                            elif isinstance(node, ast.ImportFrom):
-                                if node.module:
-                                    imports[rel_path].add(node.module)
                     except:
                         continue
+                    
+                    # 解析导入语句：(导入层级, 模块名, 导入的名称)
+                    statements = []
+                    for node in ast.walk(tree):
+                        if isinstance(node, ast.Import):
+                            for alias in node.names:
+                                statements.append((0, alias.name, []))
+                        elif isinstance(node, ast.ImportFrom):
+                            statements.append((node.level, node.module or '', [alias.name for alias in node.names]))
+                    parsed[rel_path] = statements
+                    imports[rel_path] = sorted({'.' * level + module for level, module, _ in statements if level or module})
         
-        # 构建依赖图
-        for file_path, imported_modules in imports.items():
-            self.dependency_graph.add_node(file_path)
-            for module in imported_modules:
-                # 检查是否为内部模块
-                if any(module.startswith(prefix) for prefix in ['agents', 'api', 'config', 'coordinator', 'tools']):
-                    internal_modules.add(module)
-                    self.dependency_graph.add_edge(file_path, module)
+        module_index, module_names = self._build_module_index(parsed)
         
-        dependencies['import_dependencies'] = dict(imports)
-        dependencies['internal_modules'] = list(internal_modules)
+        # 构建依赖图：边指向解析到的项目内文件，第三方和标准库导入不进入图
+        graph = nx.DiGraph()
+        internal_modules = set()
+        for rel_path, statements in parsed.items():
+            graph.add_node(rel_path)
+            package = self._module_package(rel_path, module_names)
+            for level, module, names in statements:
+                for target in self._resolve_import(package, level, module, names, module_index):
+                    internal_modules.add(module_names[target])
+                    if target != rel_path:
+                        graph.add_edge(rel_path, target)
+        
+        dependencies['import_dependencies'] = imports
+        dependencies['internal_modules'] = sorted(internal_modules)
+        return graph
     
-    def _detect_circular_dependencies(self) -> List[List[str]]:
-        """检测循环依赖"""
-        try:
-            cycles = list(nx.simple_cycles(self.dependency_graph))
-            return cycles
-        except:
-            return []
+    @staticmethod
+    def _build_module_index(parsed: Dict[str, Any]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """建立 模块名 -> 文件 的索引，以及 文件 -> 模块名 的映射
+        
+        同时使用相对项目根目录的模块名，以及从文件向上沿 __init__.py 链得到的包内模块名
+        （适配 src 布局等包根不在项目根目录的情况）。
+        """
+        index = {}
+        names = {}
+        package_dirs = set()
+        for rel_path in parsed:
+            if rel_path.endswith('/__init__.py') or rel_path == '__init__.py':
+                package_dirs.add(os.path.dirname(rel_path))
+        
+        for rel_path in parsed:
+            parts = rel_path[:-3].split('/')
+            if parts[-1] == '__init__':
+                parts = parts[:-1]
+            if not parts:
+                continue
+            
+            # 包内模块名：向上查找最外层仍包含 __init__.py 的目录
+            root_depth = len(rel_path.split('/')) - 1
+            while root_depth > 0 and '/'.join(rel_path.split('/')[:root_depth]) in package_dirs:
+                root_depth -= 1
+            candidates = ['.'.join(parts), '.'.join(parts[root_depth:])]
+            
+            for name in candidates:
+                if name and name not in index:
+                    index[name] = rel_path
+            names[rel_path] = candidates[-1] or candidates[0]
+        
+        return index, names
+    
+    @staticmethod
+    def _module_package(rel_path: str, module_names: Dict[str, str]) -> List[str]:
+        """返回文件所在包的模块名组成部分（用于解析相对导入）"""
+        parts = module_names.get(rel_path, '').split('.')
+        if not rel_path.endswith('__init__.py'):
+            parts = parts[:-1]
+        return [p for p in parts if p]
+    
+    @staticmethod
+    def _resolve_import(package: List[str], level: int, module: str, names: List[str],
+                        module_index: Dict[str, str]) -> List[str]:
+        """把导入语句解析为项目内的文件，无法解析（外部依赖）时返回空列表"""
+        if level:
+            if level - 1 > len(package):
+                return []
+            base = package[:len(package) - (level - 1)]
+            parts = base + (module.split('.') if module else [])
+        else:
+            parts = module.split('.')
+        
+        targets = []
+        # from x import y：y 可能是子模块
+        for name in names:
+            if name != '*':
+                target = module_index.get('.'.join(parts + [name]))
+                if target:
+                    targets.append(target)
+        
+        # 最长前缀匹配：import a.b.c 至少依赖 a.b.c，其次 a.b、a
+        for length in range(len(parts), 0, -1):
+            target = module_index.get('.'.join(parts[:length]))
+            if target:
+                targets.append(target)
+                break
+        return targets
+    
+    def _detect_circular_dependencies(self, graph: nx.DiGraph) -> List[Dict[str, Any]]:
+        """检测循环依赖
+        
+        按强连通分量（Tarjan）报告循环依赖，线性时间；不再枚举全部简单环，
+        其数量在高度耦合的包中会指数级增长。每个分量附带一个最短环作为示例。
+        """
+        components = [c for c in nx.strongly_connected_components(graph) if len(c) > 1]
+        components.sort(key=lambda c: (-len(c), min(c)))
+        
+        cycles = []
+        for component in components[:self.max_reported_cycles]:
+            cycles.append({
+                'modules': sorted(component),
+                'size': len(component),
+                'cycle': self._shortest_cycle(graph, component)
+            })
+        return cycles
+    
+    def _shortest_cycle(self, graph: nx.DiGraph, component: set) -> List[str]:
+        """在强连通分量内寻找最短环（最多从 max_witness_sources 个模块出发做BFS）"""
+        best: List[str] = []
+        for source in sorted(component)[:self.max_witness_sources]:
+            # BFS 寻找从 source 出发回到 source 的最短路径，长度不短于已知最短环时提前结束
+            parents = {source: None}
+            frontier = [source]
+            depth = 0
+            found = None
+            while frontier and found is None and (not best or depth + 1 < len(best)):
+                depth += 1
+                next_frontier = []
+                for node in frontier:
+                    for succ in graph.successors(node):
+                        if succ not in component:
+                            continue
+                        if succ == source:
+                            found = node
+                            break
+                        if succ not in parents:
+                            parents[succ] = node
+                            next_frontier.append(succ)
+                    if found is not None:
+                        break
+                frontier = next_frontier
+            if found is None:
+                continue
+            path = []
+            node = found
+            while node is not None:
+                path.append(node)
+                node = parents[node]
+            best = path[::-1]
+            if len(best) == 2:
+                break
+        return best
     
-    def _calculate_dependency_metrics(self, dependencies: Dict[str, Any]) -> Dict[str, Any]:
+    def _calculate_dependency_metrics(self, dependencies: Dict[str, Any], graph: nx.DiGraph) -> Dict[str, Any]:
         """计算依赖指标"""
         metrics = {
             'total_packages': 0,
@@ -870,12 +1422,15 @@ class DependencyAnalyzer:
         # 统计导入数量
         metrics['total_imports'] = sum(len(imports) for imports in dependencies.get('import_dependencies', {}).values())
         
-        # 循环依赖数量
+        # 循环依赖数量（强连通分量数）
         metrics['circular_dependency_count'] = len(dependencies.get('circular_dependencies', []))
+        metrics['modules_in_cycles'] = sum(c['size'] for c in dependencies.get('dependency_cycles', []))
         
-        # 计算耦合度
-        if self.dependency_graph.number_of_nodes() > 0:
-            metrics['coupling_score'] = self.dependency_graph.number_of_edges() / self.dependency_graph.number_of_nodes()
+        if graph.number_of_nodes() > 0:
+            # 计算耦合度
+            metrics['coupling_score'] = graph.number_of_edges() / graph.number_of_nodes()
+            # 依赖深度：强连通分量缩点后的最长依赖链
+            metrics['dependency_depth'] = nx.dag_longest_path_length(nx.condensation(graph))
         
         return metrics
 
@@ -0,0 +1,88 @@
+"""
+AI代码意图分析结果缓存
+未修改的文件每次重新分析都会以相同的提示词再请求一次模型，结果按内容哈希跨分析持久化复用。
+
+缓存键：(文件内容 sha256, 模型, 提示词版本, 静态分析上下文)；
+只缓存成功的分析结果。存储为单个 SQLite 文件（utils.sqlite_lru），超出容量上限时按最近最少使用淘汰。
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from utils.metrics import record_cache
+from utils.sqlite_lru import DEFAULT_CACHE_ROOT, SqliteLRUStore
+
+
+def make_intent_cache_key(
+    content: str,
+    model: str,
+    prompt_version: str,
+    complexity_metrics: Optional[Dict[str, Any]] = None,
+    issues: Optional[List[Any]] = None
+) -> str:
+    """
+    生成缓存键
+
+    Args:
+        content: 文件内容（只参与哈希，不保存）
+        model: 模型名称
+        prompt_version: 提示词模板版本，模板修改后旧结果自动失效
+        complexity_metrics: 提示词中包含的复杂度指标
+        issues: 提示词中包含的静态分析问题
+    """
+    payload = {
+        "content": hashlib.sha256(content.encode("utf-8", errors="replace")).hexdigest(),
+        "model": model,
+        "prompt_version": prompt_version,
+        "complexity_metrics": complexity_metrics or {},
+        "issues": issues or [],
+    }
+    serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class CodeIntentCache:
+    """跨分析持久化的AI代码意图分析结果缓存（线程安全，按大小做LRU淘汰；同步阻塞，异步代码中在线程中调用）"""
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, max_size_bytes: Optional[int] = None):
+        if path is None:
+            cache_dir = Path(os.getenv("AI_INTENT_CACHE_DIR") or DEFAULT_CACHE_ROOT / "ai_intent")
+            path = cache_dir / "ai_intent.sqlite"
+        if max_size_bytes is None:
+            max_size_bytes = int(float(os.getenv("AI_INTENT_CACHE_MAX_MB", "128")) * 1024 * 1024)
+        self._store = SqliteLRUStore(
+            path, "ai_intent", value_column="result", columns=("tokens INTEGER",), max_size_bytes=max_size_bytes
+        )
+        self.path = self._store.path
+        self.max_size_bytes = max_size_bytes
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """查找缓存结果，未命中返回None"""
+        row = self._store.get(key)
+        with self._lock:
+            self.stats["hits" if row is not None else "misses"] += 1
+        record_cache("code_intent", row is not None)
+        return json.loads(row[0]) if row is not None else None
+
+    def put(self, key: str, result: Dict[str, Any], tokens: int = 0) -> None:
+        """保存分析结果（与文件路径无关，同内容的文件共享结果）"""
+        evicted = self._store.put(key, json.dumps(result, ensure_ascii=False, default=str), tokens=tokens)
+        if evicted:
+            with self._lock:
+                self.stats["evictions"] += len(evicted)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._store.size_bytes
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def close(self) -> None:
+        self._store.close()
@@ -0,0 +1,3 @@
+"""
+CodeAnalysisAgent测试模块
+"""
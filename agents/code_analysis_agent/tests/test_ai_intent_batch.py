@@ -0,0 +1,107 @@
+"""
+AI代码意图批量分析测试（缓存、并发、Token预算）
+"""
+
+import asyncio
+import time
+
+from agents.code_analysis_agent.analyzer import AIAnalysisService
+
+REQUEST_SECONDS = 0.2
+
+
+def make_service(tmp_path, **config):
+    service = AIAnalysisService({'ai_cache_path': str(tmp_path / "ai_intent.sqlite"), **config})
+    service.prompts = []
+
+    async def chat_completion(prompt, max_tokens, session=None):
+        service.prompts.append(prompt)
+        await asyncio.sleep(REQUEST_SECONDS)
+        return f"report #{len(service.prompts)}", 100
+
+    service._chat_completion = chat_completion
+    return service
+
+
+def make_files(count, complexity=lambda i: i, issues=lambda i: 0):
+    return [
+        {
+            'file_path': f"pkg/mod{i}.py",
+            'content': f"def f{i}():\n    return {i}\n",
+            'complexity_metrics': {'cyclomatic_complexity': complexity(i)},
+            'issues': [{'type': 'long_function', 'message': f'issue {n}'} for n in range(issues(i))],
+        }
+        for i in range(count)
+    ]
+
+
+def test_batch_runs_concurrently(tmp_path):
+    service = make_service(tmp_path, ai_max_concurrency=10)
+    files = make_files(10)
+
+    start = time.monotonic()
+    results, stats = asyncio.run(service.analyze_code_intents(files))
+    elapsed = time.monotonic() - start
+
+    assert len(service.prompts) == 10
+    assert all(results[f['file_path']]['success'] for f in files)
+    assert elapsed < 10 * REQUEST_SECONDS / 3, elapsed
+    assert stats['requested'] == 10
+    assert stats['tokens_used'] == 1000
+
+
+def test_unchanged_files_are_served_from_cache(tmp_path):
+    files = make_files(3)
+    asyncio.run(make_service(tmp_path).analyze_code_intents(files))
+
+    # 新实例模拟下一次分析：只有内容变化的文件重新请求
+    service = make_service(tmp_path)
+    files[1] = {**files[1], 'content': "def changed():\n    pass\n"}
+    results, stats = asyncio.run(service.analyze_code_intents(files))
+
+    assert len(service.prompts) == 1
+    assert "changed" in service.prompts[0]
+    assert [results[f['file_path']]['cached'] for f in files] == [True, False, True]
+    assert results["pkg/mod0.py"]['file_path'] == "pkg/mod0.py"
+    assert stats['cached'] == 2
+
+
+def test_identical_content_is_requested_once(tmp_path):
+    service = make_service(tmp_path)
+    files = make_files(1) + [{**make_files(1)[0], 'file_path': "copy/mod0.py"}]
+
+    results, _ = asyncio.run(service.analyze_code_intents(files))
+
+    assert len(service.prompts) == 1
+    assert results["pkg/mod0.py"]['analysis'] == results["copy/mod0.py"]['analysis']
+
+
+def test_token_budget_keeps_highest_priority_files(tmp_path):
+    service = make_service(tmp_path, ai_intent_max_tokens=500)
+    # mod3 复杂度最高，mod0 问题最多（每个问题计2分）
+    files = make_files(5, complexity=lambda i: [1, 2, 3, 9, 0][i], issues=lambda i: 5 if i == 0 else 0)
+    per_request = service._estimate_tokens(service._build_intent_prompt(
+        service._build_code_context(files[3]['file_path'], files[3]['content'],
+                                    files[3]['complexity_metrics'], files[3]['issues'])
+    )) + 500
+
+    results, stats = asyncio.run(service.analyze_code_intents(files, token_budget=int(per_request * 2.5)))
+
+    requested = sorted(path for path, r in results.items() if r['success'])
+    assert requested == ["pkg/mod0.py", "pkg/mod3.py"]
+    assert all(r.get('skipped') for path, r in results.items() if path not in requested)
+    assert stats['skipped'] == 3
+    assert stats['tokens_reserved'] <= per_request * 2.5
+
+
+def test_failed_requests_are_not_cached(tmp_path):
+    service = make_service(tmp_path)
+
+    async def failing(prompt, max_tokens, session=None):
+        raise RuntimeError("AI请求失败: HTTP 503")
+
+    service._chat_completion = failing
+    result = asyncio.run(service.analyze_code_intent("x = 1\n", "a.py"))
+
+    assert result == {'success': False, 'error': "AI请求失败: HTTP 503", 'file_path': "a.py"}
+    assert len(service.cache) == 0
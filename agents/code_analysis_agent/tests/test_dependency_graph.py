@@ -0,0 +1,93 @@
+"""
+依赖图构建与循环依赖（强连通分量）检测测试
+"""
+
+import asyncio
+import random
+import time
+from pathlib import Path
+
+import networkx as nx
+
+from agents.code_analysis_agent.analyzer import DependencyAnalyzer
+
+
+def write(root: Path, rel_path: str, content: str = ""):
+    path = root / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+
+
+def analyze(project: Path, analyzer: DependencyAnalyzer = None):
+    return asyncio.run((analyzer or DependencyAnalyzer()).analyze_dependencies(str(project)))
+
+
+def build_cyclic_project(root: Path) -> Path:
+    write(root, "src/shop/__init__.py", "from .models import Order\n")
+    write(root, "src/shop/models.py", "import os\nfrom .services import pricing\n")
+    write(root, "src/shop/services/__init__.py")
+    write(root, "src/shop/services/pricing.py", "from ..models import Order\nfrom ..utils import helpers\n")
+    write(root, "src/shop/utils/__init__.py")
+    write(root, "src/shop/utils/helpers.py", "from shop.services import pricing\nimport requests\n")
+    write(root, "src/shop/cli.py", "from . import models\n")
+    write(root, "venv/lib/ignored.py", "import shop.models\n")
+    return root
+
+
+def test_relative_imports_resolve_to_files(tmp_path):
+    result = analyze(build_cyclic_project(tmp_path / "project"))
+
+    assert "venv/lib/ignored.py" not in result["import_dependencies"]
+    assert result["import_dependencies"]["src/shop/services/pricing.py"] == ["..models", "..utils"]
+    assert "shop.services.pricing" in result["internal_modules"]
+    assert "requests" not in result["internal_modules"]
+    assert result["dependency_metrics"]["dependency_depth"] >= 1
+
+
+def test_cycles_reported_per_component_with_shortest_witness(tmp_path):
+    result = analyze(build_cyclic_project(tmp_path / "project"))
+
+    assert len(result["dependency_cycles"]) == 1
+    component = result["dependency_cycles"][0]
+    assert component["modules"] == [
+        "src/shop/models.py", "src/shop/services/pricing.py", "src/shop/utils/helpers.py",
+    ]
+    # models <-> pricing 是最短环，pricing -> helpers -> pricing 同样为2
+    assert len(component["cycle"]) == 2
+    assert result["circular_dependencies"] == [component["cycle"]]
+    assert result["dependency_metrics"]["circular_dependency_count"] == 1
+    assert result["dependency_metrics"]["modules_in_cycles"] == 3
+
+
+def test_graph_is_not_shared_between_analyses(tmp_path):
+    analyzer = DependencyAnalyzer()
+    analyze(build_cyclic_project(tmp_path / "cyclic"), analyzer)
+    write(tmp_path / "clean", "app/__init__.py")
+    write(tmp_path / "clean", "app/main.py", "from app import helpers\n")
+    write(tmp_path / "clean", "app/helpers.py")
+
+    result = analyze(tmp_path / "clean", analyzer)
+
+    assert result["circular_dependencies"] == []
+    # main.py -> helpers.py 以及包 app/__init__.py，只统计本次分析的3个文件
+    assert result["dependency_metrics"]["coupling_score"] == 2 / 3
+
+
+def test_dense_graph_finishes_quickly():
+    rng = random.Random(7)
+    graph = nx.DiGraph()
+    modules = [f"pkg/mod{i}.py" for i in range(400)]
+    for i, module in enumerate(modules):
+        graph.add_edge(module, modules[(i + 1) % len(modules)])
+        for target in rng.sample(modules, 6):
+            if target != module:
+                graph.add_edge(module, target)
+
+    start = time.monotonic()
+    cycles = DependencyAnalyzer()._detect_circular_dependencies(graph)
+    elapsed = time.monotonic() - start
+
+    assert len(cycles) == 1 and cycles[0]["size"] == 400
+    witness = cycles[0]["cycle"]
+    assert all(graph.has_edge(a, b) for a, b in zip(witness, witness[1:] + witness[:1]))
+    assert elapsed < 5, elapsed
@@ -0,0 +1,154 @@
+"""
+代码质量分析进程池并行执行测试
+"""
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import pytest
+
+from agents.code_analysis_agent.analyzer import CodeAnalyzer, _WorkerTrackingPool
+
+PY_TEMPLATE = '''
+import os.path
+
+
+class Model{i}:
+    def run(self, items):
+        for item in items:
+            if item and {i}:
+                return item
+        return None
+
+
+def helper_{i}(a, b):
+    while a or b:
+        a -= 1
+    return a
+'''
+
+
+class FakeAIService:
+    """记录调用的AI服务替身"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def analyze_code_intents(self, files, token_budget=None):
+        self.calls.extend(item['file_path'] for item in files)
+        results = {
+            item['file_path']: {'success': True, 'analysis': f"{item['file_path']}: {len(item['content'])}"}
+            for item in files
+        }
+        return results, {'files': len(files)}
+
+
+def build_project(root: Path, modules: int) -> Path:
+    for i in range(modules):
+        package = root / f"pkg{i % 5}"
+        package.mkdir(parents=True, exist_ok=True)
+        (package / f"mod{i}.py").write_text(PY_TEMPLATE.format(i=i), encoding="utf-8")
+    (root / "web").mkdir()
+    (root / "web" / "app.js").write_text("function a() { if (x) { for (;;) {} } }\nclass B {}\n", encoding="utf-8")
+    (root / "Main.java").write_text("public class Main { public void run() { if (a) {} } }\n", encoding="utf-8")
+    (root / "broken.py").write_text("def broken(:\n", encoding="utf-8")
+    (root / "node_modules").mkdir()
+    (root / "node_modules" / "lib.js").write_text("function skipped() {}\n", encoding="utf-8")
+    return root
+
+
+def sequential_reference(analyzer: CodeAnalyzer, project: Path):
+    files = analyzer._collect_code_files(str(project))
+    return [analyzer._analyze_file_static(path, rel) for path, rel in files]
+
+
+def test_parallel_results_match_sequential_analysis(tmp_path):
+    project = build_project(tmp_path / "project", modules=40)
+    ai_service = FakeAIService()
+    analyzer = CodeAnalyzer(ai_service, {'quality_workers': 2, 'quality_chunk_size': 7})
+
+    result = asyncio.run(analyzer.analyze_code_quality(str(project)))
+    reference = sequential_reference(analyzer, project)
+
+    assert result['analyzed_files'] == len(reference) == 43
+    assert [f['file_path'] for f in result['file_analysis']] == [f['file_path'] for f in reference]
+    assert result['total_lines'] == sum(f['lines_of_code'] for f in reference)
+    assert result['total_functions'] == sum(f['function_count'] for f in reference)
+    assert result['total_issues'] == sum(len(f['issues']) for f in reference)
+    assert result['max_complexity'] == max(f['complexity_metrics']['cyclomatic_complexity'] for f in reference)
+    assert result['issues_by_type']['syntax_error'] == 1
+    # 只有解析成功的Python文件进行AI分析
+    assert sorted(ai_service.calls) == sorted(f['file_path'] for f in reference
+                                              if f['file_path'].endswith('.py') and 'error' not in f)
+    assert all(f['ai_analysis']['success'] for f in result['file_analysis'] if f['file_path'] in ai_service.calls)
+    assert result['ai_analysis_stats'] == {'files': len(ai_service.calls)}
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="需要fork启动方式继承补丁")
+def test_stuck_file_is_killed_and_others_are_kept(tmp_path, monkeypatch):
+    project = build_project(tmp_path / "project", modules=12)
+    (project / "stuck.py").write_text("x = 1\n", encoding="utf-8")
+    original = CodeAnalyzer._analyze_file_static
+
+    def analyze(self, file_path, rel_path):
+        if rel_path == "stuck.py":
+            time.sleep(3600)
+        return original(self, file_path, rel_path)
+
+    monkeypatch.setattr(CodeAnalyzer, "_analyze_file_static", analyze)
+    analyzer = CodeAnalyzer(FakeAIService(), {
+        'quality_workers': 2, 'quality_chunk_size': 4,
+        'quality_file_timeout': 0.5, 'quality_pool_startup_grace': 2.0,
+    })
+
+    start = time.monotonic()
+    result = asyncio.run(analyzer.analyze_code_quality(str(project)))
+    elapsed = time.monotonic() - start
+
+    analyzed = {f['file_path'] for f in result['file_analysis']}
+    assert "stuck.py" not in analyzed
+    assert result['analyzed_files'] == 15
+    assert elapsed < 30
+
+
+def test_tracking_pool_kills_workers_by_reported_pid():
+    pool = _WorkerTrackingPool(2)
+    try:
+        futures = [pool.submit(time.sleep, 3600) for _ in range(2)]
+        time.sleep(0.5)
+        start = time.monotonic()
+        pool.kill_workers()
+        for future in futures:
+            with pytest.raises(BrokenProcessPool):
+                future.result(timeout=10)
+        assert time.monotonic() - start < 10
+        assert len(pool._worker_pids) == 2
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def test_event_loop_stays_responsive(tmp_path):
+    project = build_project(tmp_path / "project", modules=300)
+    analyzer = CodeAnalyzer(FakeAIService(), {'quality_workers': 2})
+    lags = []
+
+    async def ticker(stop: asyncio.Event):
+        while not stop.is_set():
+            before = time.monotonic()
+            await asyncio.sleep(0.01)
+            lags.append(time.monotonic() - before - 0.01)
+
+    async def main():
+        stop = asyncio.Event()
+        tick = asyncio.create_task(ticker(stop))
+        result = await analyzer.analyze_code_quality(str(project))
+        stop.set()
+        await tick
+        return result
+
+    result = asyncio.run(main())
+    assert result['analyzed_files'] == 303
+    assert max(lags) < 0.25, max(lags)
@@ -0,0 +1,71 @@
+"""
+项目结构单次遍历与行数缓存测试
+"""
+
+import asyncio
+import os
+
+from agents.code_analysis_agent.analyzer import ProjectAnalyzer
+
+
+def build_project(root):
+    files = {
+        "requirements.txt": "fastapi\n",
+        "app/main.py": "import os\n\n\ndef main():\n    return 1\n",
+        "app/no_newline.py": "x = 1\ny = 2",
+        "app/static/bundle.min.js": "var a=1;" * 5000,
+        "app/empty.py": "",
+        "tests/test_main.py": "def test_main():\n    assert True\n",
+        "node_modules/lib/index.js": "module.exports = {}\n",
+    }
+    for rel_path, content in files.items():
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+    (root / "app" / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR" + b"\n" * 100)
+    return root
+
+
+def analyze(analyzer, project):
+    return asyncio.run(analyzer.analyze_project_structure(str(project)))
+
+
+def test_counts_every_directory_without_decoding(tmp_path):
+    project = build_project(tmp_path / "project")
+    structure = analyze(ProjectAnalyzer(), project)
+
+    files = {f['path'].replace(os.sep, '/'): f for f in structure['files']}
+    assert sorted(files) == [
+        "app/empty.py", "app/logo.png", "app/main.py", "app/no_newline.py",
+        "app/static/bundle.min.js", "requirements.txt", "tests/test_main.py",
+    ]
+    for rel_path in ("app/main.py", "app/no_newline.py", "app/empty.py", "tests/test_main.py"):
+        content = (project / rel_path).read_text(encoding="utf-8")
+        assert files[rel_path]['lines'] == len(content.splitlines())
+        assert files[rel_path]['size'] == len(content.encode("utf-8"))
+    assert files["app/static/bundle.min.js"]['lines'] == 1
+    assert files["app/logo.png"]['lines'] == 0
+    assert sorted(d.replace(os.sep, '/') for d in structure['directories']) == ["app", "app/static", "tests"]
+    assert structure['total_lines'] == sum(f['lines'] for f in files.values())
+    assert structure['scan_stats'] == {'cached_files': 0, 'counted_files': 7, 'binary_files': 1}
+    assert structure['has_tests'] and structure['project_type'] == 'python'
+
+
+def test_repeated_scan_only_recounts_changed_files(tmp_path, monkeypatch):
+    project = build_project(tmp_path / "project")
+    analyzer = ProjectAnalyzer()
+    analyze(analyzer, project)
+
+    counted = []
+    original = analyzer._count_lines
+    monkeypatch.setattr(analyzer, "_count_lines", lambda path: counted.append(path) or original(path))
+    changed = project / "app" / "main.py"
+    changed.write_text("import os\n\ndef main():\n    return 2\n\n\n# more\n", encoding="utf-8")
+    os.utime(changed, ns=(changed.stat().st_atime_ns, changed.stat().st_mtime_ns + 10**9))
+
+    structure = analyze(analyzer, project)
+
+    assert counted == [str(changed)]
+    assert structure['scan_stats']['cached_files'] == 6
+    main = next(f for f in structure['files'] if f['path'].endswith("main.py"))
+    assert main['lines'] == 7
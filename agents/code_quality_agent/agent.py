@@ -5,10 +5,12 @@
 
 import asyncio
 import os
+import sqlite3
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 from ..base_agent import BaseAgent, TaskStatus
 from .quality_checker import analyze_file_quality, StyleChecker, QualityMetricsCalculator, AICodeQualityAnalyzer
+from .result_cache import QualityResultCache
 
 
 class CodeQualityAgent(BaseAgent):
@@ -19,8 +21,28 @@ class CodeQualityAgent(BaseAgent):
         self.style_checker = StyleChecker(config)
         self.metrics_calculator = QualityMetricsCalculator(config)
         self.ai_analyzer = AICodeQualityAnalyzer(config)
+        self.result_cache = self._create_result_cache(config)
         self.is_running = False
     
+    def _create_result_cache(self, config: Dict[str, Any]) -> Optional[QualityResultCache]:
+        """创建分析结果缓存，禁用或磁盘不可用时返回None"""
+        if not config.get('result_cache_enabled', True):
+            return None
+        ttl = {
+            kind: config[key]
+            for kind, key in (('static', 'result_cache_static_ttl'), ('ai', 'result_cache_ai_ttl'))
+            if config.get(key) is not None
+        }
+        try:
+            return QualityResultCache(
+                path=config.get('result_cache_path'),
+                max_memory_entries=config.get('result_cache_memory_entries', 256),
+                ttl=ttl
+            )
+        except (OSError, sqlite3.Error) as e:
+            print(f"代码质量结果缓存不可用: {e}")
+            return None
+    
     async def initialize(self) -> bool:
         """初始化Agent"""
         try:
@@ -46,7 +68,7 @@ class CodeQualityAgent(BaseAgent):
                 return {'error': '缺少文件路径或文件内容'}
             
             # 调用单文件质量分析
-            result = await analyze_file_quality(file_path, file_content, self.config)
+            result = await analyze_file_quality(file_path, file_content, self.config, self.result_cache)
             
             return result
             
@@ -54,6 +76,19 @@ class CodeQualityAgent(BaseAgent):
             print(f"处理质量分析任务失败: {e}")
             return {'error': str(e)}
     
+    async def get_metrics(self) -> Dict[str, Any]:
+        """获取Agent指标（包含结果缓存的命中率和淘汰统计）"""
+        metrics = await super().get_metrics()
+        # 统计磁盘条目数需要查询 SQLite，放到线程中执行
+        metrics['result_cache'] = await asyncio.to_thread(self.result_cache.get_stats) if self.result_cache else None
+        return metrics
+    
+    def clear_result_cache(self) -> int:
+        """清空分析结果缓存，返回删除的条目数（同步删除磁盘条目，在异步代码中应通过 asyncio.to_thread 调用）"""
+        if self.result_cache is None:
+            return 0
+        return self.result_cache.clear()
+    
     def get_capabilities(self) -> List[str]:
         """获取Agent能力列表"""
         return [
@@ -67,7 +102,7 @@ class CodeQualityAgent(BaseAgent):
     async def analyze_single_file(self, file_path: str, file_content: str) -> Dict[str, Any]:
         """分析单个文件的质量 - 直接接口"""
         try:
-            result = await analyze_file_quality(file_path, file_content, self.config)
+            result = await analyze_file_quality(file_path, file_content, self.config, self.result_cache)
             return result
         except Exception as e:
             return {
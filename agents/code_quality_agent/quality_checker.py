@@ -4,15 +4,46 @@
 """
 
 import os
+import asyncio
 import ast
+import io
 import re
 import subprocess
 import json
-import asttokens
-from typing import Dict, List, Any, Optional
+import tokenize
+import importlib.util
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Set, Tuple
 from datetime import datetime
 import requests
 
+from .result_cache import QualityResultCache, checker_config_hash, make_quality_cache_key
+
+
+# 命名规范（预编译）
+SNAKE_CASE_PATTERN = re.compile(r'^[a-z_][a-z0-9_]*$')
+PASCAL_CASE_PATTERN = re.compile(r'^[A-Z][a-zA-Z0-9]*$')
+
+# 不对应源码内容的词法单元，不参与行分类
+_LAYOUT_TOKENS = {tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER}
+
+
+def parse_python_source(file_content: str) -> Optional[ast.AST]:
+    """解析Python源码，非Python内容或语法错误时返回None"""
+    try:
+        return ast.parse(file_content)
+    except (SyntaxError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=1024)
+def _is_importable(module: str) -> bool:
+    """判断模块的顶层包在当前环境中是否可导入（只查找不执行模块代码）"""
+    try:
+        return importlib.util.find_spec(module.split('.')[0]) is not None
+    except (ImportError, ValueError):
+        return False
+
 
 class StyleChecker:
     """代码风格检查器 - 专注单文件分析"""
@@ -20,181 +51,173 @@ class StyleChecker:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
     
-    async def analyze_single_file(self, file_path: str, file_content: str) -> List[Dict[str, Any]]:
-        """分析单个文件的代码风格"""
-        issues = []
+    async def analyze_single_file(self, file_path: str, file_content: str,
+                                  tree: Optional[ast.AST] = None) -> List[Dict[str, Any]]:
+        """分析单个文件的代码风格
         
-        # 基础代码风格检查
-        issues.extend(self._check_line_length(file_content))
-        issues.extend(self._check_naming_conventions(file_content))
-        issues.extend(self._check_indentation(file_content))
-        issues.extend(self._check_comments(file_content))
-        issues.extend(self._check_imports(file_content))
+        词法单元只遍历一次（区分注释行），物理行只遍历一次（行长度、缩进、注释覆盖率），
+        语法树只遍历一次（命名规范、导入顺序）。tree 可由调用方传入以复用同一次解析。
+        """
+        if tree is None:
+            tree = parse_python_source(file_content)
+        
+        line_issues, indentation_issues, comment_issues = self._scan_lines(file_content)
+        naming_issues, import_issues = self._scan_tree(tree)
         
-        return issues
+        return line_issues + naming_issues + indentation_issues + comment_issues + import_issues
     
-    def _check_line_length(self, file_content: str) -> List[Dict[str, Any]]:
-        """检查行长度"""
-        issues = []
+    def _scan_lines(self, file_content: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """单次遍历物理行：行长度、缩进一致性、注释覆盖率"""
         max_line_length = self.config.get('max_line_length', 120)
+        comment_rows = self._comment_rows(file_content)
+        
+        line_issues = []
+        tabs_count = 0
+        spaces_2_count = 0
+        spaces_4_count = 0
+        code_lines = 0
+        comment_lines = 0
         
-        lines = file_content.split('\n')
-        for i, line in enumerate(lines, 1):
+        for i, line in enumerate(file_content.split('\n'), 1):
+            # 检查行长度
             if len(line) > max_line_length:
-                issues.append({
+                line_issues.append({
                     'type': 'line_length',
                     'severity': 'warning',
                     'line': i,
                     'message': f'行长度超过{max_line_length}字符限制',
                     'content': line[:50] + '...' if len(line) > 50 else line
                 })
-        
-        return issues
-    
-    def _check_naming_conventions(self, file_content: str) -> List[Dict[str, Any]]:
-        """检查命名规范"""
-        issues = []
-        
-        try:
-            tree = ast.parse(file_content)
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    if not re.match(r'^[a-z_][a-z0-9_]*$', node.name):
-                        issues.append({
-                            'type': 'naming',
-                            'severity': 'warning',
-                            'line': node.lineno,
-                            'message': f'函数名"{node.name}"不符合小写下划线命名规范',
-                            'suggestion': '建议使用小写字母和下划线，如：function_name'
-                        })
-                
-                elif isinstance(node, ast.ClassDef):
-                    if not re.match(r'^[A-Z][a-zA-Z0-9]*$', node.name):
-                        issues.append({
-                            'type': 'naming',
-                            'severity': 'warning',
-                            'line': node.lineno,
-                            'message': f'类名"{node.name}"不符合大驼峰命名规范',
-                            'suggestion': '建议使用大驼峰命名，如：ClassName'
-                        })
-                
-                elif isinstance(node, ast.Name):
-                    if isinstance(node.ctx, ast.Store):
-                        if not re.match(r'^[a-z_][a-z0-9_]*$', node.id):
-                            issues.append({
-                                'type': 'naming',
-                                'severity': 'warning',
-                                'line': node.lineno,
-                                'message': f'变量名"{node.id}"不符合小写下划线命名规范',
-                                'suggestion': '建议使用小写字母和下划线，如：variable_name'
-                            })
-        
-        except SyntaxError:
-            # 如果不是Python文件，跳过语法检查
-            pass
-        
-        return issues
-    
-    def _check_indentation(self, file_content: str) -> List[Dict[str, Any]]:
-        """检查缩进一致性"""
-        issues = []
-        lines = file_content.split('\n')
-        
-        # 检测使用的缩进方式
-        tabs_count = 0
-        spaces_2_count = 0
-        spaces_4_count = 0
-        
-        for line in lines:
-            if line.startswith(' '):
-                if line.startswith('  ') and not line.startswith('    '):
-                    spaces_2_count += 1
-                elif line.startswith('    '):
-                    spaces_4_count += 1
+            
+            # 检测使用的缩进方式
+            if line.startswith('    '):
+                spaces_4_count += 1
+            elif line.startswith('  '):
+                spaces_2_count += 1
             elif line.startswith('\t'):
                 tabs_count += 1
+            
+            # 注释行与代码行（无法词法分析的内容按行首 # 判断）
+            if line.strip():
+                if comment_rows is not None:
+                    is_comment = i in comment_rows
+                else:
+                    is_comment = line.lstrip().startswith('#')
+                if is_comment:
+                    comment_lines += 1
+                else:
+                    code_lines += 1
         
         # 检查是否混合使用不同的缩进
+        indentation_issues = []
         total_indented = tabs_count + spaces_2_count + spaces_4_count
         if total_indented > 0:
             dominant = max([(tabs_count, 'tab'), (spaces_2_count, 'space2'), (spaces_4_count, 'space4')])
             if tabs_count > 0 and spaces_2_count + spaces_4_count > 0:
-                issues.append({
+                indentation_issues.append({
                     'type': 'indentation',
                     'severity': 'error',
                     'message': '混合使用制表符和空格进行缩进',
                     'suggestion': f'建议统一只使用{dominant[1]}缩进'
                 })
         
-        return issues
-    
-    def _check_comments(self, file_content: str) -> List[Dict[str, Any]]:
-        """检查注释覆盖率"""
-        issues = []
-        
-        lines = file_content.split('\n')
-        code_lines = [line for line in lines if line.strip() and not line.strip().startswith('#')]
-        comment_lines = [line for line in lines if line.strip().startswith('#')]
-        
-        if len(code_lines) > 10:  # 只有足够长的文件才检查注释
-            comment_ratio = len(comment_lines) / len(code_lines)
+        # 检查注释覆盖率（只有足够长的文件才检查注释）
+        comment_issues = []
+        if code_lines > 10:
+            comment_ratio = comment_lines / code_lines
             if comment_ratio < 0.1:  # 注释覆盖率低于10%
-                issues.append({
+                comment_issues.append({
                     'type': 'documentation',
                     'severity': 'info',
                     'message': f'注释覆盖率较低({comment_ratio:.1%})，建议增加注释',
                     'suggestion': '建议为复杂函数和类添加文档字符串'
                 })
         
-        return issues
+        return line_issues, indentation_issues, comment_issues
     
-    def _check_imports(self, file_content: str) -> List[Dict[str, Any]]:
-        """检查导入语句"""
-        issues = []
-        
+    @staticmethod
+    def _comment_rows(file_content: str) -> Optional[Set[int]]:
+        """用 tokenize 找出以注释开头的行（多行字符串中以 # 开头的行不算注释），无法词法分析时返回None"""
+        comment_rows = set()
+        seen_rows = set()
         try:
-            atok = asttokens.ASTTokens(file_content, parse=True)
-            tree = atok.tree
-            
-            import_lines = []
-            for node in ast.walk(tree):
-                if isinstance(node, (ast.Import, ast.ImportFrom)):
-                    import_lines.append(node)
+            for token in tokenize.generate_tokens(io.StringIO(file_content).readline):
+                if token.type in _LAYOUT_TOKENS:
+                    continue
+                row = token.start[0]
+                if row not in seen_rows:
+                    seen_rows.add(row)
+                    if token.type == tokenize.COMMENT:
+                        comment_rows.add(row)
+        except (tokenize.TokenError, SyntaxError):
+            return None
+        return comment_rows
+    
+    def _scan_tree(self, tree: Optional[ast.AST]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """单次遍历语法树：命名规范和导入语句（非Python文件跳过）"""
+        if tree is None:
+            return [], []
+        
+        naming_issues = []
+        import_nodes = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.FunctionDef):
+                if not SNAKE_CASE_PATTERN.match(node.name):
+                    naming_issues.append({
+                        'type': 'naming',
+                        'severity': 'warning',
+                        'line': node.lineno,
+                        'message': f'函数名"{node.name}"不符合小写下划线命名规范',
+                        'suggestion': '建议使用小写字母和下划线，如：function_name'
+                    })
             
-            # 检查导入语句是否按照标准库、第三方库、本地库的顺序
-            stdlib_after_other = False
-            third_party_after_local = False
+            elif isinstance(node, ast.ClassDef):
+                if not PASCAL_CASE_PATTERN.match(node.name):
+                    naming_issues.append({
+                        'type': 'naming',
+                        'severity': 'warning',
+                        'line': node.lineno,
+                        'message': f'类名"{node.name}"不符合大驼峰命名规范',
+                        'suggestion': '建议使用大驼峰命名，如：ClassName'
+                    })
             
-            for i, node in enumerate(import_lines):
-                if isinstance(node, ast.ImportFrom):
-                    module = node.module
-                    if module and not module.startswith('.'):
-                        # 检查是否是标准库
-                        try:
-                            __import__(module)
-                            if i > 0 and not stdlib_after_other:
-                                prev_node = import_lines[i-1]
-                                if isinstance(prev_node, ast.ImportFrom) and prev_node.module:
-                                    try:
-                                        __import__(prev_node.module)
-                                    except ModuleNotFoundError:
-                                        stdlib_after_other = True
-                        except ModuleNotFoundError:
-                            # 第三方库
-                            pass
+            elif isinstance(node, ast.Name):
+                if isinstance(node.ctx, ast.Store) and not SNAKE_CASE_PATTERN.match(node.id):
+                    naming_issues.append({
+                        'type': 'naming',
+                        'severity': 'warning',
+                        'line': node.lineno,
+                        'message': f'变量名"{node.id}"不符合小写下划线命名规范',
+                        'suggestion': '建议使用小写字母和下划线，如：variable_name'
+                    })
             
-            if stdlib_after_other:
-                issues.append({
-                    'type': 'import_order',
-                    'severity': 'warning',
-                    'message': '导入语句顺序不规范',
-                    'suggestion': '建议按照标准库、第三方库、本地库的顺序排列导入语句'
-                })
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                import_nodes.append(node)
         
-        except Exception:
-            pass
-        
-        return issues
+        return naming_issues, self._check_import_order(import_nodes)
+    
+    def _check_import_order(self, import_nodes: List[ast.AST]) -> List[Dict[str, Any]]:
+        """检查导入语句是否按照标准库、第三方库、本地库的顺序"""
+        stdlib_after_other = False
+        
+        for i, node in enumerate(import_nodes):
+            if isinstance(node, ast.ImportFrom):
+                module = node.module
+                if module and not module.startswith('.') and _is_importable(module):
+                    if i > 0 and not stdlib_after_other:
+                        prev_node = import_nodes[i-1]
+                        if isinstance(prev_node, ast.ImportFrom) and prev_node.module:
+                            if not _is_importable(prev_node.module):
+                                stdlib_after_other = True
+        
+        if stdlib_after_other:
+            return [{
+                'type': 'import_order',
+                'severity': 'warning',
+                'message': '导入语句顺序不规范',
+                'suggestion': '建议按照标准库、第三方库、本地库的顺序排列导入语句'
+            }]
+        return []
 
 
 class QualityMetricsCalculator:
@@ -203,8 +226,9 @@ class QualityMetricsCalculator:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
     
-    async def calculate_metrics(self, file_path: str, file_content: str) -> Dict[str, Any]:
-        """计算代码质量指标"""
+    async def calculate_metrics(self, file_path: str, file_content: str,
+                                tree: Optional[ast.AST] = None) -> Dict[str, Any]:
+        """计算代码质量指标（tree 可由调用方传入，复用 StyleChecker 的同一次解析）"""
         metrics = {
             'lines_of_code': 0,
             'comment_lines': 0,
@@ -222,28 +246,32 @@ class QualityMetricsCalculator:
         try:
             # 基础统计
             lines = file_content.split('\n')
-            metrics['lines_of_code'] = len([line for line in lines if line.strip()])
-            metrics['comment_lines'] = len([line for line in lines if line.strip().startswith('#')])
-            metrics['blank_lines'] = len([line for line in lines if not line.strip()])
+            for line in lines:
+                stripped = line.strip()
+                if not stripped:
+                    metrics['blank_lines'] += 1
+                    continue
+                metrics['lines_of_code'] += 1
+                if stripped.startswith('#'):
+                    metrics['comment_lines'] += 1
             
             # Python AST分析
             if file_path.endswith('.py'):
-                tree = ast.parse(file_content, file_path)
+                if tree is None:
+                    tree = ast.parse(file_content, file_path)
                 
-                # 计算函数和类数量
+                # 计算函数和类数量、函数长度
+                function_lines = 0
                 for node in ast.walk(tree):
                     if isinstance(node, ast.FunctionDef):
                         metrics['function_count'] += 1
                         metrics['cyclomatic_complexity'] += self._calculate_complexity(node)
+                        function_lines += self._get_function_length(node, lines)
                     elif isinstance(node, ast.ClassDef):
                         metrics['class_count'] += 1
                 
                 # 计算平均函数长度
                 if metrics['function_count'] > 0:
-                    function_lines = 0
-                    for node in ast.walk(tree):
-                        if isinstance(node, ast.FunctionDef):
-                            function_lines += self._get_function_length(node, lines)
                     metrics['average_function_length'] = function_lines / metrics['function_count']
                 
                 # 计算复杂度分数 (1-10，分数越低越好)
@@ -287,6 +315,7 @@ class AICodeQualityAnalyzer:
         self.config = config
         self.api_key = config.get('ai_api_key')
         self.base_url = config.get('ai_base_url', 'https://api.deepseek.com/v1/chat/completions')
+        self.model = config.get('ai_model', 'deepseek-coder')
     
     async def generate_quality_report(self, file_path: str, file_content: str, 
                                     style_issues: List[Dict], metrics: Dict[str, Any]) -> Dict[str, Any]:
@@ -388,7 +417,7 @@ class AICodeQualityAnalyzer:
         }
         
         data = {
-            'model': 'deepseek-coder',
+            'model': self.model,
             'messages': [
                 {
                     'role': 'system',
@@ -475,25 +504,55 @@ class AICodeQualityAnalyzer:
         }
 
 
-async def analyze_file_quality(file_path: str, file_content: str, config: Dict[str, Any]) -> Dict[str, Any]:
-    """分析单文件质量的入口函数"""
+async def analyze_file_quality(file_path: str, file_content: str, config: Dict[str, Any],
+                               cache: Optional[QualityResultCache] = None) -> Dict[str, Any]:
+    """分析单文件质量的入口函数（提供cache时复用相同内容的分析结果）"""
     try:
         # 初始化分析器
         style_checker = StyleChecker(config)
         metrics_calculator = QualityMetricsCalculator(config)
         ai_analyzer = AICodeQualityAnalyzer(config)
         
-        # 执行风格检查
-        style_issues = await style_checker.analyze_single_file(file_path, file_content)
-        
-        # 计算质量指标
-        metrics = await metrics_calculator.calculate_metrics(file_path, file_content)
+        # 缓存键：内容哈希 + 语言（扩展名）+ 检查器配置，AI报告另加模型和文件路径（提示词中包含路径）
+        language = os.path.splitext(file_path)[1].lower()
+        config_hash = checker_config_hash(config)
+        static_key = make_quality_cache_key('static', file_content, language, config_hash)
+        ai_key = make_quality_cache_key('ai', file_content, language, config_hash, ai_analyzer.model, file_path)
+        cache_status = {}
+        
+        # 缓存读写是阻塞的SQLite操作，放到线程中执行
+        cached_static = await asyncio.to_thread(cache.get, 'static', static_key) if cache is not None else None
+        if cached_static is not None:
+            style_issues = cached_static['style_issues']
+            metrics = cached_static['metrics']
+            cache_status['static'] = 'hit'
+        else:
+            # 只解析一次，风格检查和指标计算共用同一棵语法树
+            tree = parse_python_source(file_content)
+            
+            # 执行风格检查
+            style_issues = await style_checker.analyze_single_file(file_path, file_content, tree)
+            
+            # 计算质量指标
+            metrics = await metrics_calculator.calculate_metrics(file_path, file_content, tree)
+            
+            if cache is not None:
+                await asyncio.to_thread(cache.put, 'static', static_key, {'style_issues': style_issues, 'metrics': metrics})
+            cache_status['static'] = 'miss'
         
-        # 生成AI质量报告
-        ai_report = await ai_analyzer.generate_quality_report(file_path, file_content, style_issues, metrics)
+        ai_report = await asyncio.to_thread(cache.get, 'ai', ai_key) if cache is not None else None
+        if ai_report is not None:
+            cache_status['ai'] = 'hit'
+        else:
+            # 生成AI质量报告
+            ai_report = await ai_analyzer.generate_quality_report(file_path, file_content, style_issues, metrics)
+            # AI失败时的备用报告不缓存，下次请求重试
+            if cache is not None and 'error' not in ai_report:
+                await asyncio.to_thread(cache.put, 'ai', ai_key, ai_report)
+            cache_status['ai'] = 'miss'
         
         # 汇总结果
-        return {
+        result = {
             'success': True,
             'file_path': file_path,
             'file_size': len(file_content),
@@ -509,6 +568,9 @@ async def analyze_file_quality(file_path: str, file_content: str, config: Dict[s
                 'grade': ai_report.get('grade', 'F')
             }
         }
+        if cache is not None:
+            result['cache'] = cache_status
+        return result
         
     except Exception as e:
         return {
@@ -0,0 +1,189 @@
+"""
+代码质量分析结果缓存
+同一文件内容的风格检查、质量指标和AI报告在每次请求时都会重新计算，结果按内容哈希复用。
+
+两级缓存：进程内LRU（按条目数）+ 磁盘SQLite（utils.sqlite_lru，按大小LRU淘汰，跨进程重启保留）。
+缓存分两类，TTL各自独立：
+- static：风格问题和质量指标，确定性结果，键为 (内容哈希, 语言, 检查器配置哈希)
+- ai：AI质量报告，键额外包含AI模型和文件路径（提示词中包含文件路径）；只缓存成功生成的报告
+
+读写是阻塞的SQLite操作，异步代码中应通过 asyncio.to_thread 调用。
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+from utils.metrics import record_cache
+from utils.sqlite_lru import DEFAULT_CACHE_ROOT, SqliteLRUStore
+
+# 影响风格检查和指标计算结果的配置项
+CHECKER_CONFIG_KEYS = ("max_line_length",)
+# 检查器实现版本，修改检查逻辑时递增以使缓存结果失效
+CHECKER_VERSION = "2"
+
+CACHE_KINDS = ("static", "ai")
+
+
+def checker_config_hash(config: Dict[str, Any]) -> str:
+    """计算检查器配置哈希（只包含影响结果的配置项）"""
+    payload = {key: config.get(key) for key in CHECKER_CONFIG_KEYS}
+    payload["checker_version"] = CHECKER_VERSION
+    serialized = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()[:16]
+
+
+def make_quality_cache_key(
+    kind: str,
+    file_content: str,
+    language: str,
+    config_hash: str,
+    model: Optional[str] = None,
+    file_path: Optional[str] = None
+) -> str:
+    """
+    生成缓存键
+
+    Args:
+        kind: 缓存类别，static 或 ai
+        file_content: 文件内容（只参与哈希，不保存）
+        language: 文件语言（按扩展名判断）
+        config_hash: 检查器配置哈希
+        model: AI模型，只用于 ai 类别；static 结果与模型无关
+        file_path: 文件路径，只用于 ai 类别（AI提示词中包含文件路径）；static 结果与路径无关
+    """
+    payload = {
+        "kind": kind,
+        "content": hashlib.sha256(file_content.encode("utf-8", errors="replace")).hexdigest(),
+        "language": language,
+        "config": config_hash,
+        "model": model if kind == "ai" else None,
+        "file_path": file_path if kind == "ai" else None,
+    }
+    serialized = json.dumps(payload, sort_keys=True)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class QualityResultCache:
+    """内存LRU + 磁盘SQLite 两级的代码质量结果缓存（线程安全）"""
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        max_memory_entries: int = 256,
+        max_disk_bytes: Optional[int] = None,
+        ttl: Optional[Dict[str, float]] = None
+    ):
+        if path is None:
+            cache_dir = Path(os.getenv("QUALITY_CACHE_DIR") or DEFAULT_CACHE_ROOT / "code_quality")
+            path = cache_dir / "code_quality.sqlite"
+        if max_disk_bytes is None:
+            max_disk_bytes = int(float(os.getenv("QUALITY_CACHE_MAX_MB", "128")) * 1024 * 1024)
+        self._store = SqliteLRUStore(
+            path, "quality_results", value_column="result", columns=("kind TEXT", "expires REAL"),
+            max_size_bytes=max_disk_bytes
+        )
+        self.path = self._store.path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        # 确定性结果可以长期保留；AI报告随模型行为变化，默认保留较短时间
+        self.ttl = {"static": 7 * 24 * 3600.0, "ai": 24 * 3600.0}
+        self.ttl.update(ttl or {})
+        self._lock = threading.Lock()
+        # 键 -> (类别, 过期时间, 序列化结果)；命中时反序列化，调用方修改结果不影响缓存
+        self._memory: "OrderedDict[str, Tuple[str, float, str]]" = OrderedDict()
+        self.stats = {
+            kind: {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "puts": 0}
+            for kind in CACHE_KINDS
+        }
+        self.stats["evictions"] = {"memory": 0, "disk": 0}
+
+    def get(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        """查找缓存结果，先查内存再查磁盘；过期条目删除并视为未命中"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self.stats[kind]["memory_hits"] += 1
+                    record_cache(f"quality_{kind}", True)
+                    return json.loads(entry[2])
+                del self._memory[key]
+
+        row = self._store.get(key, ("expires",))
+        expired = row is not None and row[1] <= now
+        if expired:
+            self._store.delete(key)
+        with self._lock:
+            if row is None or expired:
+                self.stats[kind]["expired"] += expired
+                self.stats[kind]["misses"] += 1
+                record_cache(f"quality_{kind}", False)
+                return None
+            self._remember(key, kind, row[1], row[0])
+            self.stats[kind]["disk_hits"] += 1
+            record_cache(f"quality_{kind}", True)
+        return json.loads(row[0])
+
+    def put(self, kind: str, key: str, result: Dict[str, Any]) -> None:
+        """保存结果到两级缓存"""
+        serialized = json.dumps(result, ensure_ascii=False, default=str)
+        expires = time.time() + self.ttl[kind]
+        evicted = self._store.put(key, serialized, kind=kind, expires=expires)
+        with self._lock:
+            self._remember(key, kind, expires, serialized)
+            self.stats[kind]["puts"] += 1
+            for evicted_key in evicted:
+                self._memory.pop(evicted_key, None)
+            self.stats["evictions"]["disk"] += len(evicted)
+
+    def clear(self) -> int:
+        """清空两级缓存，返回删除的磁盘条目数"""
+        with self._lock:
+            self._memory.clear()
+        return self._store.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """返回命中率、淘汰数和容量信息"""
+        disk_entries = len(self._store)
+        with self._lock:
+            stats = {kind: dict(self.stats[kind]) for kind in CACHE_KINDS}
+            evictions = dict(self.stats["evictions"])
+            memory_entries = len(self._memory)
+
+        lookups = 0
+        hits = 0
+        for kind_stats in stats.values():
+            kind_hits = kind_stats["memory_hits"] + kind_stats["disk_hits"]
+            kind_lookups = kind_hits + kind_stats["misses"]
+            kind_stats["hit_rate"] = kind_hits / kind_lookups if kind_lookups else 0.0
+            hits += kind_hits
+            lookups += kind_lookups
+
+        return {
+            **stats,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "evictions": evictions,
+            "memory_entries": memory_entries,
+            "max_memory_entries": self.max_memory_entries,
+            "disk_entries": disk_entries,
+            "disk_bytes": self._store.size_bytes,
+            "max_disk_bytes": self.max_disk_bytes,
+            "ttl": dict(self.ttl),
+        }
+
+    def _remember(self, key: str, kind: str, expires: float, serialized: str) -> None:
+        self._memory[key] = (kind, expires, serialized)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"]["memory"] += 1
+
+    def close(self) -> None:
+        self._store.close()
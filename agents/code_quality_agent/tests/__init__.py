@@ -0,0 +1,3 @@
+"""
+CodeQualityAgent测试模块
+"""
@@ -0,0 +1,127 @@
+"""
+代码质量分析结果两级缓存测试
+"""
+
+import asyncio
+
+import pytest
+
+from agents.code_quality_agent.agent import CodeQualityAgent
+from agents.code_quality_agent.quality_checker import AICodeQualityAnalyzer, StyleChecker
+from agents.code_quality_agent.result_cache import QualityResultCache, make_quality_cache_key
+
+SOURCE = "def Add(a, b):\n    return a + b\n"
+
+
+@pytest.fixture
+def ai_calls(monkeypatch):
+    calls = []
+
+    async def call_ai_api(self, prompt):
+        calls.append(self.model)
+        return {'overall_score': 88, 'grade': 'B', 'summary': 'ok'}
+
+    monkeypatch.setattr(AICodeQualityAnalyzer, "_call_ai_api", call_ai_api)
+    return calls
+
+
+def make_agent(tmp_path, **config):
+    return CodeQualityAgent({
+        'ai_api_key': 'test', 'max_line_length': 120,
+        'result_cache_path': str(tmp_path / "quality.sqlite"), **config,
+    })
+
+
+def test_repeated_analysis_is_served_from_cache(tmp_path, ai_calls, monkeypatch):
+    agent = make_agent(tmp_path)
+    first = asyncio.run(agent.analyze_single_file("calc.py", SOURCE))
+
+    style_calls = []
+    original = StyleChecker.analyze_single_file
+
+    async def counting(self, file_path, file_content):
+        style_calls.append(file_path)
+        return await original(self, file_path, file_content)
+
+    monkeypatch.setattr(StyleChecker, "analyze_single_file", counting)
+    second = asyncio.run(agent.analyze_single_file("other/calc.py", SOURCE))
+
+    third = asyncio.run(agent.analyze_single_file("other/calc.py", SOURCE))
+
+    assert first['cache'] == {'static': 'miss', 'ai': 'miss'}
+    # 确定性结果与路径无关；AI提示词中包含文件路径，换路径需要重新生成报告
+    assert second['cache'] == {'static': 'hit', 'ai': 'miss'}
+    assert third['cache'] == {'static': 'hit', 'ai': 'hit'}
+    assert style_calls == [] and ai_calls == ['deepseek-coder', 'deepseek-coder']
+    assert second['style_issues'] == first['style_issues']
+    assert third['summary'] == second['summary']
+
+    stats = asyncio.run(agent.get_metrics())['result_cache']
+    assert stats['static']['memory_hits'] == 2 and stats['ai']['misses'] == 2
+    assert stats['hit_rate'] == 0.5
+
+
+def test_key_includes_checker_config_and_model(tmp_path, ai_calls):
+    asyncio.run(make_agent(tmp_path).analyze_single_file("calc.py", SOURCE))
+
+    stricter = asyncio.run(make_agent(tmp_path, max_line_length=10).analyze_single_file("calc.py", SOURCE))
+    other_model = asyncio.run(make_agent(tmp_path, ai_model="deepseek-chat").analyze_single_file("calc.py", SOURCE))
+    other_language = asyncio.run(make_agent(tmp_path).analyze_single_file("calc.txt", SOURCE))
+
+    assert stricter['cache']['static'] == 'miss'
+    assert any(issue['type'] == 'line_length' for issue in stricter['style_issues'])
+    # 换模型只需要重新生成AI报告，确定性结果从磁盘缓存读取
+    assert other_model['cache'] == {'static': 'hit', 'ai': 'miss'}
+    assert other_language['cache']['static'] == 'miss'
+    assert ai_calls == ['deepseek-coder', 'deepseek-coder', 'deepseek-chat', 'deepseek-coder']
+
+
+def test_failed_ai_report_is_not_cached(tmp_path, monkeypatch):
+    async def failing(self, prompt):
+        raise RuntimeError("HTTP 503")
+
+    monkeypatch.setattr(AICodeQualityAnalyzer, "_call_ai_api", failing)
+    agent = make_agent(tmp_path)
+    asyncio.run(agent.analyze_single_file("calc.py", SOURCE))
+    result = asyncio.run(agent.analyze_single_file("calc.py", SOURCE))
+
+    assert result['cache'] == {'static': 'hit', 'ai': 'miss'}
+    assert 'fallback_report' in result['ai_report']
+
+
+def test_ttl_and_eviction_are_tracked(tmp_path, monkeypatch):
+    cache = QualityResultCache(tmp_path / "quality.sqlite", max_memory_entries=2, ttl={'ai': 100})
+    clock = [1000.0]
+    monkeypatch.setattr("agents.code_quality_agent.result_cache.time.time", lambda: clock[0])
+    keys = [make_quality_cache_key('static', f"x = {i}\n", '.py', 'cfg') for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put('static', key, {'n': i})
+    ai_key = make_quality_cache_key('ai', "x = 0\n", '.py', 'cfg', 'model')
+    cache.put('ai', ai_key, {'grade': 'A'})
+
+    # 内存只保留2条，其余从磁盘命中
+    assert cache.get('static', keys[0]) == {'n': 0}
+    clock[0] += 101
+    assert cache.get('ai', ai_key) is None
+    assert cache.get('static', keys[1]) == {'n': 1}
+
+    stats = cache.get_stats()
+    assert stats['evictions']['memory'] >= 2
+    assert stats['static']['disk_hits'] == 2
+    assert stats['ai']['expired'] == 1
+    assert stats['disk_entries'] == 3
+    assert cache.clear() == 3
+    assert cache.get('static', keys[2]) is None
+
+
+def test_disk_size_limit_evicts_least_recently_used(tmp_path):
+    cache = QualityResultCache(tmp_path / "quality.sqlite", max_disk_bytes=300)
+    keys = [make_quality_cache_key('static', str(i), '.py', 'cfg') for i in range(5)]
+    for i, key in enumerate(keys):
+        cache.put('static', key, {'payload': 'x' * 100, 'n': i})
+
+    stats = cache.get_stats()
+    assert stats['disk_bytes'] <= 300
+    assert stats['evictions']['disk'] == 5 - stats['disk_entries']
+    assert cache.get('static', keys[0]) is None
+    assert cache.get('static', keys[-1])['n'] == 4
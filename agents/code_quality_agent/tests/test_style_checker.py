@@ -0,0 +1,80 @@
+"""
+单次遍历风格检查与语法树复用测试
+"""
+
+import ast
+import asyncio
+
+from agents.code_quality_agent import quality_checker
+from agents.code_quality_agent.quality_checker import (
+    QualityMetricsCalculator, StyleChecker, analyze_file_quality, parse_python_source
+)
+
+SOURCE = '''import os
+from collections import OrderedDict
+
+
+class bad_name:
+    def CamelMethod(self):
+        Value = 1
+        return """
+# 字符串里的行，不是注释
+"""
+
+
+long_text = "''' + "x" * 130 + '''"
+'''
+
+
+def check(content, **config):
+    return asyncio.run(StyleChecker({'max_line_length': 120, **config}).analyze_single_file("a.py", content))
+
+
+def test_checks_run_in_one_pass_with_same_results():
+    issues = check(SOURCE)
+
+    assert [i['type'] for i in issues] == ['line_length', 'naming', 'naming', 'naming']
+    assert issues[0]['line'] == 13
+    assert {i['message'].split('"')[1] for i in issues[1:]} == {'bad_name', 'CamelMethod', 'Value'}
+
+
+def test_comment_lines_come_from_tokens():
+    code = "\n".join(f"value_{i} = {i}" for i in range(12))
+    docstring = '"""\n' + "\n".join("# 标题" for _ in range(3)) + '\n"""\n'
+
+    # 字符串中以 # 开头的行不计为注释
+    assert [i['type'] for i in check(docstring + code)] == ['documentation']
+    assert check("# 注释\n# 注释\n" + code) == []
+    # 无法词法分析的内容按行首 # 判断
+    assert check("# 注释\n# 注释\n" + code + "\n'unterminated") == []
+
+
+def test_mixed_indentation_and_non_python_content():
+    mixed = "if True:\n\tx = 1\nif True:\n    y = 2\n    z = 3\n"
+    assert [i['type'] for i in check(mixed)] == ['indentation']
+    assert check(mixed)[0]['suggestion'] == '建议统一只使用space4缩进'
+
+    js = "function Foo() {\n  return 1;\n}\n"
+    assert check(js) == []
+
+
+def test_quality_pipeline_parses_once(monkeypatch):
+    calls = []
+    original = ast.parse
+
+    def counting_parse(*args, **kwargs):
+        calls.append(1)
+        return original(*args, **kwargs)
+
+    async def no_ai(self, prompt):
+        return {'overall_score': 90, 'grade': 'A'}
+
+    monkeypatch.setattr(quality_checker.ast, "parse", counting_parse)
+    monkeypatch.setattr(quality_checker.AICodeQualityAnalyzer, "_call_ai_api", no_ai)
+    result = asyncio.run(analyze_file_quality("a.py", SOURCE, {'max_line_length': 120}))
+
+    assert result['success'] is True
+    assert len(calls) == 1
+    tree = parse_python_source(SOURCE)
+    assert result['metrics'] == asyncio.run(QualityMetricsCalculator({}).calculate_metrics("a.py", SOURCE, tree))
+    assert result['metrics']['function_count'] == 1 and result['metrics']['class_count'] == 1
@@ -47,6 +47,8 @@ class Model(Protocol):
 
     def query(self, messages: list[dict[str, str]], **kwargs) -> dict: ...
 
+    async def aquery(self, messages: list[dict[str, str]], **kwargs) -> dict: ...
+
     def get_template_vars(self) -> dict[str, Any]: ...
 
 
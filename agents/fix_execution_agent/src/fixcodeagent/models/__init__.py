@@ -4,8 +4,10 @@ You can ignore this file completely if you explicitly set your model in your run
 
 import copy
 import importlib
+import math
 import os
 import threading
+from collections import deque
 
 from fixcodeagent import Model
 
@@ -13,20 +15,23 @@ from fixcodeagent import Model
 class GlobalModelStats:
     """Global model statistics tracker with optional limits."""
 
-    def __init__(self):
+    def __init__(self, latency_window: int = 1000):
         self._cost = 0.0
         self._n_calls = 0
+        self._latencies: deque[float] = deque(maxlen=latency_window)
         self._lock = threading.Lock()
         self.cost_limit = float(os.getenv("FIXCODE_GLOBAL_COST_LIMIT", "0"))
         self.call_limit = int(os.getenv("FIXCODE_GLOBAL_CALL_LIMIT", "0"))
         if (self.cost_limit > 0 or self.call_limit > 0) and not os.getenv("FIXCODE_SILENT_STARTUP"):
             print(f"Global cost/call limit: ${self.cost_limit:.4f} / {self.call_limit}")
 
-    def add(self, cost: float) -> None:
-        """Add a model call with its cost, checking limits."""
+    def add(self, cost: float, latency: float | None = None) -> None:
+        """Add a model call with its cost (and optionally its latency in seconds), checking limits."""
         with self._lock:
             self._cost += cost
             self._n_calls += 1
+            if latency is not None:
+                self._latencies.append(latency)
         if 0 < self.cost_limit < self._cost or 0 < self.call_limit < self._n_calls + 1:
             raise RuntimeError(f"Global cost/call limit exceeded: ${self._cost:.4f} / {self._n_calls + 1}")
 
@@ -38,9 +43,26 @@ class GlobalModelStats:
     def n_calls(self) -> int:
         return self._n_calls
 
+    def latency_percentiles(self, percentiles: tuple[float, ...] = (50, 90, 99)) -> dict[str, float]:
+        """Return latency percentiles (nearest-rank, in seconds) over the most recent calls.
+
+        Keys are formatted as ``p50``, ``p90``, ... Returns an empty dict if no latencies were recorded.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return {}
+        result = {}
+        for p in percentiles:
+            rank = min(len(latencies) - 1, max(0, math.ceil(p / 100 * len(latencies)) - 1))
+            result[f"p{p:g}"] = latencies[rank]
+        return result
+
 
 GLOBAL_MODEL_STATS = GlobalModelStats()
 
+RESPONSE_CACHE_MODES = ("off", "read_write", "record", "replay")
+
 
 def get_model(input_model_name: str | None = None, config: dict | None = None) -> Model:
     """Get an initialized model object from any kind of user input or settings."""
@@ -51,6 +73,17 @@ def get_model(input_model_name: str | None = None, config: dict | None = None) -
     config["model_name"] = resolved_model_name
 
     model_class = get_model_class(resolved_model_name, config.pop("model_class", ""))
+    response_cache_mode = config.pop("response_cache", None) or os.getenv("FIXCODE_RESPONSE_CACHE_MODE", "off")
+    if response_cache_mode not in RESPONSE_CACHE_MODES:
+        msg = f"Unknown response cache mode: {response_cache_mode} (available: {RESPONSE_CACHE_MODES})"
+        raise ValueError(msg)
+
+    if model_class.__name__ == "CachedModel":
+        # The wrapper has no API parameters of its own: the wrapped model is built with `get_model` from
+        # `model_kwargs`, which injects the API key and cache control defaults into that config instead
+        if response_cache_mode != "off":
+            config.setdefault("mode", response_cache_mode)
+        return model_class(**config)
 
     if (from_env := os.getenv("FIXCODE_MODEL_API_KEY")) and not str(type(model_class)).endswith("DeterministicModel"):
         config.setdefault("model_kwargs", {})["api_key"] = from_env
@@ -62,7 +95,12 @@ def get_model(input_model_name: str | None = None, config: dict | None = None) -
         # Select cache control for Anthropic models by default
         config["set_cache_control"] = "default_end"
 
-    return model_class(**config)
+    model = model_class(**config)
+    if response_cache_mode != "off":
+        from fixcodeagent.models.extra.cached import CachedModel
+
+        return CachedModel(model=model, mode=response_cache_mode)
+    return model
 
 
 def get_model_name(input_model_name: str | None = None, config: dict | None = None) -> str:
@@ -84,6 +122,7 @@ _MODEL_CLASS_MAPPING = {
     "openrouter": "fixcodeagent.models.openrouter_model.OpenRouterModel",
     "portkey": "fixcodeagent.models.portkey_model.PortkeyModel",
     "deterministic": "fixcodeagent.models.test_models.DeterministicModel",
+    "cached": "fixcodeagent.models.extra.cached.CachedModel",
 }
 
 
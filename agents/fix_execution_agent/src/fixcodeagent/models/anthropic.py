@@ -21,8 +21,8 @@ class AnthropicModel(LitellmModel):
     def __init__(self, *, config_class: type = AnthropicModelConfig, **kwargs):
         super().__init__(config_class=config_class, **kwargs)
 
-    def query(self, messages: list[dict], **kwargs) -> dict:
-        api_key = None
+    @staticmethod
+    def _get_legacy_api_key() -> str | None:
         # Legacy only
         if rotating_keys := os.getenv("ANTHROPIC_API_KEYS"):
             warnings.warn(
@@ -30,6 +30,15 @@ class AnthropicModel(LitellmModel):
                 "Simply use the ANTHROPIC_API_KEY environment variable instead. "
                 "Key rotation is no longer required."
             )
-            api_key = get_key_per_thread(rotating_keys.split("::"))
+            return get_key_per_thread(rotating_keys.split("::"))
+        return None
+
+    def query(self, messages: list[dict], **kwargs) -> dict:
+        api_key = self._get_legacy_api_key()
         messages = set_cache_control(messages, mode="default_end")
         return super().query(messages, api_key=api_key, **kwargs)
+
+    async def aquery(self, messages: list[dict], **kwargs) -> dict:
+        api_key = self._get_legacy_api_key()
+        messages = set_cache_control(messages, mode="default_end")
+        return await super().aquery(messages, api_key=api_key, **kwargs)
@@ -0,0 +1,97 @@
+import asyncio
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Literal
+
+from fixcodeagent import Model, global_config_dir
+from fixcodeagent.models.utils.response_cache import ResponseCache, get_cache_key
+
+
+class ResponseCacheMissError(RuntimeError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+@dataclass
+class CachedModelConfig:
+    model_kwargs: dict = field(default_factory=dict)
+    """Config of the wrapped model (ignored if a model instance is passed directly)"""
+    mode: Literal["read_write", "record", "replay"] = "read_write"
+    """read_write: serve hits, query and store misses. record: always query and overwrite.
+    replay: only serve hits, raise `ResponseCacheMissError` on a miss."""
+    cache_dir: str = ""
+    """Defaults to `$FIXCODE_RESPONSE_CACHE_DIR` or `response_cache` in the global config dir"""
+    max_size_mb: float = float(os.getenv("FIXCODE_RESPONSE_CACHE_MAX_MB", "1024"))
+    model_name: str = ""
+    """Defaults to the model name of the wrapped model"""
+
+
+class CachedModel:
+    def __init__(self, *, model: Model | None = None, config_class: type = CachedModelConfig, **kwargs):
+        """This "meta"-model answers byte-identical requests from an on-disk cache of previous responses.
+
+        Cache hits count towards `n_calls` (so step limits behave the same in replays), but not towards `cost`.
+        """
+        from fixcodeagent.models import RESPONSE_CACHE_MODES, get_model
+
+        self.config = config_class(**kwargs)
+        if self.config.mode not in RESPONSE_CACHE_MODES or self.config.mode == "off":
+            msg = f"Unknown response cache mode: {self.config.mode} (available: {RESPONSE_CACHE_MODES[1:]})"
+            raise ValueError(msg)
+        if model is None:
+            inner_config = {"model_name": self.config.model_name} if self.config.model_name else {}
+            model = get_model(config=inner_config | self.config.model_kwargs | {"response_cache": "off"})
+        self.model = model
+        if not self.config.model_name:
+            self.config.model_name = self.model.config.model_name
+        if not self.config.cache_dir:
+            self.config.cache_dir = os.getenv("FIXCODE_RESPONSE_CACHE_DIR", str(global_config_dir / "response_cache"))
+        self.cache = ResponseCache(
+            Path(self.config.cache_dir) / "responses.sqlite", int(self.config.max_size_mb * 1024**2)
+        )
+        self.n_cache_hits = 0
+
+    @property
+    def cost(self) -> float:
+        return self.model.cost
+
+    @property
+    def n_calls(self) -> int:
+        return self.model.n_calls + self.n_cache_hits
+
+    def _get_key(self, messages: list[dict], kwargs: dict) -> str:
+        model_kwargs = getattr(self.model.config, "model_kwargs", {}) or {}
+        return get_cache_key(self.model.config.model_name, model_kwargs | kwargs, messages)
+
+    def _lookup(self, key: str) -> dict | None:
+        if self.config.mode == "record":
+            return None
+        if (cached := self.cache.get(key)) is not None:
+            self.n_cache_hits += 1
+            return cached
+        if self.config.mode == "replay":
+            raise ResponseCacheMissError(f"No recorded response for request {key} in {self.cache.path}")
+        return None
+
+    def query(self, messages: list[dict[str, str]], **kwargs) -> dict:
+        key = self._get_key(messages, kwargs)
+        if (cached := self._lookup(key)) is not None:
+            return cached
+        response = self.model.query(messages, **kwargs)
+        self.cache.put(key, self.config.model_name, response)
+        return response
+
+    async def aquery(self, messages: list[dict[str, str]], **kwargs) -> dict:
+        key = self._get_key(messages, kwargs)
+        if (cached := await asyncio.to_thread(self._lookup, key)) is not None:
+            return cached
+        response = await self.model.aquery(messages, **kwargs)
+        await asyncio.to_thread(self.cache.put, key, self.config.model_name, response)
+        return response
+
+    def get_template_vars(self) -> dict[str, Any]:
+        return (
+            self.model.get_template_vars()
+            | asdict(self.config)
+            | {"n_model_calls": self.n_calls, "model_cost": self.cost, "n_cache_hits": self.n_cache_hits}
+        )
@@ -39,6 +39,12 @@ class RouletteModel:
         response["model_name"] = model.config.model_name
         return response
 
+    async def aquery(self, *args, **kwargs) -> dict:
+        model = self.select_model()
+        response = await model.aquery(*args, **kwargs)
+        response["model_name"] = model.config.model_name
+        return response
+
 
 @dataclass
 class InterleavingModelConfig:
@@ -1,6 +1,7 @@
 import json
 import logging
 import os
+import time
 from dataclasses import asdict, dataclass, field
 from pathlib import Path
 from typing import Any, Literal
@@ -16,6 +17,7 @@ from tenacity import (
 
 from fixcodeagent.models import GLOBAL_MODEL_STATS
 from fixcodeagent.models.utils.cache_control import set_cache_control
+from fixcodeagent.models.utils.rate_limit import RateLimitReservation, estimate_tokens, get_rate_limiter
 
 logger = logging.getLogger("litellm_model")
 
@@ -27,6 +29,29 @@ class LitellmModelConfig:
     litellm_model_registry: Path | str | None = os.getenv("LITELLM_MODEL_REGISTRY_PATH")
     set_cache_control: Literal["default_end"] | None = None
     """Set explicit cache control markers, for example for Anthropic models"""
+    requests_per_minute: int = int(os.getenv("FIXCODE_REQUESTS_PER_MINUTE", "0"))
+    """Client-side limit shared by all instances using the same model name in this process (0 = unlimited)"""
+    tokens_per_minute: int = int(os.getenv("FIXCODE_TOKENS_PER_MINUTE", "0"))
+    """Client-side limit shared by all instances using the same model name in this process (0 = unlimited)"""
+
+
+# tenacity picks asyncio.sleep for coroutine functions, so retries never block the event loop
+_retry = retry(
+    stop=stop_after_attempt(10),
+    wait=wait_exponential(multiplier=1, min=4, max=60),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+    retry=retry_if_not_exception_type(
+        (
+            litellm.exceptions.UnsupportedParamsError,
+            litellm.exceptions.NotFoundError,
+            litellm.exceptions.PermissionDeniedError,
+            litellm.exceptions.ContextWindowExceededError,
+            litellm.exceptions.APIError,
+            litellm.exceptions.AuthenticationError,
+            KeyboardInterrupt,
+        )
+    ),
+)
 
 
 class LitellmModel:
@@ -34,25 +59,13 @@ class LitellmModel:
         self.config = config_class(**kwargs)
         self.cost = 0.0
         self.n_calls = 0
+        self._rate_limiter = get_rate_limiter(
+            self.config.model_name, self.config.requests_per_minute, self.config.tokens_per_minute
+        )
         if self.config.litellm_model_registry and Path(self.config.litellm_model_registry).is_file():
             litellm.utils.register_model(json.loads(Path(self.config.litellm_model_registry).read_text()))
 
-    @retry(
-        stop=stop_after_attempt(10),
-        wait=wait_exponential(multiplier=1, min=4, max=60),
-        before_sleep=before_sleep_log(logger, logging.WARNING),
-        retry=retry_if_not_exception_type(
-            (
-                litellm.exceptions.UnsupportedParamsError,
-                litellm.exceptions.NotFoundError,
-                litellm.exceptions.PermissionDeniedError,
-                litellm.exceptions.ContextWindowExceededError,
-                litellm.exceptions.APIError,
-                litellm.exceptions.AuthenticationError,
-                KeyboardInterrupt,
-            )
-        ),
-    )
+    @_retry
     def _query(self, messages: list[dict[str, str]], **kwargs):
         try:
             return litellm.completion(
@@ -62,10 +75,43 @@ class LitellmModel:
             e.message += " You can permanently set your API key with `fix-code-extra config set KEY VALUE`."
             raise e
 
-    def query(self, messages: list[dict[str, str]], **kwargs) -> dict:
+    @_retry
+    async def _aquery(self, messages: list[dict[str, str]], **kwargs):
+        # litellm keeps its own per-event-loop cache of HTTP clients, so connections are reused across calls
+        try:
+            return await litellm.acompletion(
+                model=self.config.model_name, messages=messages, **(self.config.model_kwargs | kwargs)
+            )
+        except litellm.exceptions.AuthenticationError as e:
+            e.message += " You can permanently set your API key with `fix-code-extra config set KEY VALUE`."
+            raise e
+
+    def _prepare_messages(self, messages: list[dict[str, str]]) -> list[dict[str, str]]:
         if self.config.set_cache_control:
             messages = set_cache_control(messages, mode=self.config.set_cache_control)
+        return messages
+
+    def _estimate_tokens(self, messages: list[dict[str, str]]) -> int:
+        return estimate_tokens(messages) if self._rate_limiter.tokens_per_minute else 0
+
+    def query(self, messages: list[dict[str, str]], **kwargs) -> dict:
+        messages = self._prepare_messages(messages)
+        reservation = self._rate_limiter.acquire(self._estimate_tokens(messages))
+        start = time.perf_counter()
         response = self._query(messages, **kwargs)
+        return self._process_response(response, time.perf_counter() - start, reservation)
+
+    async def aquery(self, messages: list[dict[str, str]], **kwargs) -> dict:
+        """Async version of `query`. Waiting for rate limits and retries yields to the event loop."""
+        messages = self._prepare_messages(messages)
+        reservation = await self._rate_limiter.aacquire(self._estimate_tokens(messages))
+        start = time.perf_counter()
+        response = await self._aquery(messages, **kwargs)
+        return self._process_response(response, time.perf_counter() - start, reservation)
+
+    def _process_response(self, response, latency: float, reservation: RateLimitReservation | None) -> dict:
+        if reservation is not None and (usage := getattr(response, "usage", None)) is not None:
+            self._rate_limiter.settle(reservation, getattr(usage, "total_tokens", 0) or reservation.tokens)
         try:
             cost = litellm.cost_calculator.completion_cost(response)
         except Exception as e:
@@ -78,7 +124,7 @@ class LitellmModel:
         self.n_calls += 1
         assert cost >= 0.0, f"Cost is negative: {cost}"
         self.cost += cost
-        GLOBAL_MODEL_STATS.add(cost)
+        GLOBAL_MODEL_STATS.add(cost, latency=latency)
         return {
             "content": response.choices[0].message.content or "",  # type: ignore
             "extra": {
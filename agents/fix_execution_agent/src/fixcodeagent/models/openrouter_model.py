@@ -1,9 +1,11 @@
 import json
 import logging
 import os
+import time
 from dataclasses import asdict, dataclass, field
-from typing import Any, Literal
+from typing import Any, Literal, NoReturn
 
+import httpx
 import requests
 from tenacity import (
     before_sleep_log,
@@ -15,6 +17,8 @@ from tenacity import (
 
 from fixcodeagent.models import GLOBAL_MODEL_STATS
 from fixcodeagent.models.utils.cache_control import set_cache_control
+from fixcodeagent.models.utils.http_client import get_async_http_client
+from fixcodeagent.models.utils.rate_limit import RateLimitReservation, estimate_tokens, get_rate_limiter
 
 logger = logging.getLogger("openrouter_model")
 
@@ -25,6 +29,10 @@ class OpenRouterModelConfig:
     model_kwargs: dict[str, Any] = field(default_factory=dict)
     set_cache_control: Literal["default_end"] | None = None
     """Set explicit cache control markers, for example for Anthropic models"""
+    requests_per_minute: int = int(os.getenv("FIXCODE_REQUESTS_PER_MINUTE", "0"))
+    """Client-side limit shared by all instances using the same model name in this process (0 = unlimited)"""
+    tokens_per_minute: int = int(os.getenv("FIXCODE_TOKENS_PER_MINUTE", "0"))
+    """Client-side limit shared by all instances using the same model name in this process (0 = unlimited)"""
 
 
 class OpenRouterAPIError(Exception):
@@ -45,6 +53,30 @@ class OpenRouterRateLimitError(Exception):
     pass
 
 
+# tenacity picks asyncio.sleep for coroutine functions, so retries never block the event loop
+_retry = retry(
+    stop=stop_after_attempt(10),
+    wait=wait_exponential(multiplier=1, min=4, max=60),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+    retry=retry_if_not_exception_type(
+        (
+            OpenRouterAuthenticationError,
+            KeyboardInterrupt,
+        )
+    ),
+)
+
+
+def _raise_for_status_code(status_code: int, text: str, cause: Exception) -> NoReturn:
+    if status_code == 401:
+        error_msg = "Authentication failed. You can permanently set your API key with `fix-code-extra config set OPENROUTER_API_KEY YOUR_KEY`."
+        raise OpenRouterAuthenticationError(error_msg) from cause
+    elif status_code == 429:
+        raise OpenRouterRateLimitError("Rate limit exceeded") from cause
+    else:
+        raise OpenRouterAPIError(f"HTTP {status_code}: {text}") from cause
+
+
 class OpenRouterModel:
     def __init__(self, **kwargs):
         self.config = OpenRouterModelConfig(**kwargs)
@@ -52,19 +84,11 @@ class OpenRouterModel:
         self.n_calls = 0
         self._api_url = "https://openrouter.ai/api/v1/chat/completions"
         self._api_key = os.getenv("OPENROUTER_API_KEY", "")
+        self._rate_limiter = get_rate_limiter(
+            self.config.model_name, self.config.requests_per_minute, self.config.tokens_per_minute
+        )
 
-    @retry(
-        stop=stop_after_attempt(10),
-        wait=wait_exponential(multiplier=1, min=4, max=60),
-        before_sleep=before_sleep_log(logger, logging.WARNING),
-        retry=retry_if_not_exception_type(
-            (
-                OpenRouterAuthenticationError,
-                KeyboardInterrupt,
-            )
-        ),
-    )
-    def _query(self, messages: list[dict[str, str]], **kwargs):
+    def _build_request(self, messages: list[dict[str, str]], **kwargs) -> tuple[dict[str, str], dict]:
         headers = {
             "Authorization": f"Bearer {self._api_key}",
             "Content-Type": "application/json",
@@ -76,29 +100,61 @@ class OpenRouterModel:
             "usage": {"include": True},
             **(self.config.model_kwargs | kwargs),
         }
+        return headers, payload
+
+    @_retry
+    def _query(self, messages: list[dict[str, str]], **kwargs):
+        headers, payload = self._build_request(messages, **kwargs)
 
         try:
             response = requests.post(self._api_url, headers=headers, data=json.dumps(payload), timeout=60)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.HTTPError as e:
-            if response.status_code == 401:
-                error_msg = "Authentication failed. You can permanently set your API key with `fix-code-extra config set OPENROUTER_API_KEY YOUR_KEY`."
-                raise OpenRouterAuthenticationError(error_msg) from e
-            elif response.status_code == 429:
-                raise OpenRouterRateLimitError("Rate limit exceeded") from e
-            else:
-                raise OpenRouterAPIError(f"HTTP {response.status_code}: {response.text}") from e
+            _raise_for_status_code(response.status_code, response.text, e)
         except requests.exceptions.RequestException as e:
             raise OpenRouterAPIError(f"Request failed: {e}") from e
 
-    def query(self, messages: list[dict[str, str]], **kwargs) -> dict:
+    @_retry
+    async def _aquery(self, messages: list[dict[str, str]], **kwargs):
+        headers, payload = self._build_request(messages, **kwargs)
+
+        try:
+            response = await get_async_http_client().post(self._api_url, headers=headers, content=json.dumps(payload))
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            _raise_for_status_code(response.status_code, response.text, e)
+        except httpx.HTTPError as e:
+            raise OpenRouterAPIError(f"Request failed: {e}") from e
+
+    def _prepare_messages(self, messages: list[dict[str, str]]) -> list[dict[str, str]]:
         if self.config.set_cache_control:
             messages = set_cache_control(messages, mode=self.config.set_cache_control)
+        return messages
+
+    def _estimate_tokens(self, messages: list[dict[str, str]]) -> int:
+        return estimate_tokens(messages) if self._rate_limiter.tokens_per_minute else 0
+
+    def query(self, messages: list[dict[str, str]], **kwargs) -> dict:
+        messages = self._prepare_messages(messages)
+        reservation = self._rate_limiter.acquire(self._estimate_tokens(messages))
+        start = time.perf_counter()
         response = self._query(messages, **kwargs)
+        return self._process_response(response, time.perf_counter() - start, reservation)
+
+    async def aquery(self, messages: list[dict[str, str]], **kwargs) -> dict:
+        """Async version of `query` using the shared connection pool of the running event loop."""
+        messages = self._prepare_messages(messages)
+        reservation = await self._rate_limiter.aacquire(self._estimate_tokens(messages))
+        start = time.perf_counter()
+        response = await self._aquery(messages, **kwargs)
+        return self._process_response(response, time.perf_counter() - start, reservation)
 
+    def _process_response(self, response: dict, latency: float, reservation: RateLimitReservation | None) -> dict:
         # Extract cost from usage information
         usage = response.get("usage", {})
+        self._rate_limiter.settle(reservation, usage.get("total_tokens", reservation.tokens if reservation else 0))
         cost = usage.get("cost", 0.0)
         assert cost >= 0.0, f"Cost is negative: {cost}"
 
@@ -111,7 +167,7 @@ class OpenRouterModel:
 
         self.n_calls += 1
         self.cost += cost
-        GLOBAL_MODEL_STATS.add(cost)
+        GLOBAL_MODEL_STATS.add(cost, latency=latency)
 
         return {
             "content": response["choices"][0]["message"]["content"] or "",
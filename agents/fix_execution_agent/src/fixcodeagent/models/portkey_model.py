@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 import os
@@ -16,6 +17,7 @@ from tenacity import (
 
 from fixcodeagent.models import GLOBAL_MODEL_STATS
 from fixcodeagent.models.utils.cache_control import set_cache_control
+from fixcodeagent.models.utils.rate_limit import RateLimitReservation, estimate_tokens, get_rate_limiter
 
 logger = logging.getLogger("portkey_model")
 
@@ -40,6 +42,10 @@ class PortkeyModelConfig:
     """
     set_cache_control: Literal["default_end"] | None = None
     """Set explicit cache control markers, for example for Anthropic models"""
+    requests_per_minute: int = int(os.getenv("FIXCODE_REQUESTS_PER_MINUTE", "0"))
+    """Client-side limit shared by all instances using the same model name in this process (0 = unlimited)"""
+    tokens_per_minute: int = int(os.getenv("FIXCODE_TOKENS_PER_MINUTE", "0"))
+    """Client-side limit shared by all instances using the same model name in this process (0 = unlimited)"""
 
 
 class PortkeyModel:
@@ -51,6 +57,9 @@ class PortkeyModel:
         self.config = PortkeyModelConfig(**kwargs)
         self.cost = 0.0
         self.n_calls = 0
+        self._rate_limiter = get_rate_limiter(
+            self.config.model_name, self.config.requests_per_minute, self.config.tokens_per_minute
+        )
         if self.config.litellm_model_registry and Path(self.config.litellm_model_registry).is_file():
             litellm.utils.register_model(json.loads(Path(self.config.litellm_model_registry).read_text()))
 
@@ -87,10 +96,30 @@ class PortkeyModel:
             **(self.config.model_kwargs | kwargs),
         )
 
-    def query(self, messages: list[dict[str, str]], **kwargs) -> dict:
+    def _prepare_messages(self, messages: list[dict[str, str]]) -> list[dict[str, str]]:
         if self.config.set_cache_control:
             messages = set_cache_control(messages, mode=self.config.set_cache_control)
+        return messages
+
+    def _estimate_tokens(self, messages: list[dict[str, str]]) -> int:
+        return estimate_tokens(messages) if self._rate_limiter.tokens_per_minute else 0
+
+    def query(self, messages: list[dict[str, str]], **kwargs) -> dict:
+        messages = self._prepare_messages(messages)
+        reservation = self._rate_limiter.acquire(self._estimate_tokens(messages))
         response = self._query(messages, **kwargs)
+        return self._process_response(response, reservation)
+
+    async def aquery(self, messages: list[dict[str, str]], **kwargs) -> dict:
+        """Async version of `query`. The portkey client is synchronous, so only the HTTP call runs in a worker
+        thread; waiting for the rate limiter yields to the event loop.
+        """
+        messages = self._prepare_messages(messages)
+        reservation = await self._rate_limiter.aacquire(self._estimate_tokens(messages))
+        response = await asyncio.to_thread(self._query, messages, **kwargs)
+        return self._process_response(response, reservation)
+
+    def _process_response(self, response, reservation: RateLimitReservation | None) -> dict:
         response_for_cost_calc = response.model_copy()
         if self.config.litellm_model_name_override:
             if response_for_cost_calc.model:
@@ -106,6 +135,7 @@ class PortkeyModel:
                 "Setting prompt tokens based on total tokens and completion tokens. You might want to double check your costs."
             )
             response_for_cost_calc.usage.prompt_tokens = total_tokens - completion_tokens
+        self._rate_limiter.settle(reservation, total_tokens or (reservation.tokens if reservation else 0))
         try:
             cost = litellm.cost_calculator.completion_cost(
                 response_for_cost_calc, model=self.config.litellm_model_name_override or None
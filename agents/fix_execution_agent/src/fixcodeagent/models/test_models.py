@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import time
 from dataclasses import asdict, dataclass
@@ -38,5 +39,12 @@ class DeterministicModel:
         GLOBAL_MODEL_STATS.add(self.config.cost_per_call)
         return {"content": output}
 
+    async def aquery(self, messages: list[dict[str, str]], **kwargs) -> dict:
+        if "/sleep" in self.config.outputs[self.current_index + 1]:
+            self.current_index += 1
+            await asyncio.sleep(float(self.config.outputs[self.current_index].split("/sleep")[1]))
+            return await self.aquery(messages, **kwargs)
+        return self.query(messages, **kwargs)
+
     def get_template_vars(self) -> dict[str, Any]:
         return asdict(self.config) | {"n_model_calls": self.n_calls, "model_cost": self.cost}
@@ -0,0 +1,38 @@
+"""Shared async HTTP connection pool for model classes that talk to HTTP APIs directly.
+
+`httpx.AsyncClient` instances are bound to the event loop they were created on, so we keep one
+client per running loop. All concurrent agents on the same loop share its keep-alive connections.
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+
+import httpx
+
+_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Return the shared client for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(loop)
+        if client is None or client.is_closed:
+            max_connections = int(os.getenv("FIXCODE_HTTP_MAX_CONNECTIONS", "100"))
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+                timeout=httpx.Timeout(60.0),
+            )
+            _CLIENTS[loop] = client
+        return client
+
+
+async def aclose_async_http_client() -> None:
+    """Close the shared client of the running event loop (e.g., before the loop shuts down)."""
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
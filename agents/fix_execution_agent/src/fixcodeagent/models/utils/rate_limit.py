@@ -0,0 +1,132 @@
+"""Client-side rate limiting for model queries.
+
+Limiters are shared per model name within the process, so all agents (threads or asyncio tasks)
+that talk to the same model honour a single requests/tokens per minute budget.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+
+
+class RateLimitReservation:
+    """A slot in the sliding window. Can be settled with the actual token usage once known."""
+
+    def __init__(self, timestamp: float, tokens: int):
+        self.timestamp = timestamp
+        self.tokens = tokens
+
+
+class RateLimiter:
+    """Sliding-window limiter for requests per minute and tokens per minute.
+
+    A limit of 0 disables the respective check. Token counts for a request are estimated before the
+    call and can be corrected afterwards with `settle`.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        *,
+        window: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.window = window
+        self._clock = clock
+        self._reservations: deque[RateLimitReservation] = deque()
+        self._tokens_in_window = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests_per_minute > 0 or self.tokens_per_minute > 0
+
+    def _prune(self, now: float) -> None:
+        while self._reservations and self._reservations[0].timestamp <= now - self.window:
+            self._tokens_in_window -= self._reservations.popleft().tokens
+
+    def _try_reserve(self, tokens: int) -> RateLimitReservation | float:
+        """Reserve a slot, or return the number of seconds to wait before trying again."""
+        with self._lock:
+            now = self._clock()
+            self._prune(now)
+            wait = 0.0
+            if 0 < self.requests_per_minute <= len(self._reservations):
+                wait = self._reservations[0].timestamp + self.window - now
+            if self.tokens_per_minute > 0 and self._reservations:
+                # A single request larger than the whole budget is let through once the window is empty
+                excess = self._tokens_in_window + tokens - self.tokens_per_minute
+                if excess > 0:
+                    freed = 0
+                    for reservation in self._reservations:
+                        freed += reservation.tokens
+                        if freed >= excess:
+                            break
+                    wait = max(wait, reservation.timestamp + self.window - now)
+            if wait > 0:
+                return wait
+            reservation = RateLimitReservation(now, tokens)
+            self._reservations.append(reservation)
+            self._tokens_in_window += tokens
+            return reservation
+
+    def acquire(self, tokens: int = 0) -> RateLimitReservation | None:
+        """Block the calling thread until the request fits into the budget."""
+        if not self.enabled:
+            return None
+        while not isinstance(result := self._try_reserve(tokens), RateLimitReservation):
+            time.sleep(result)
+        return result
+
+    async def aacquire(self, tokens: int = 0) -> RateLimitReservation | None:
+        """Like `acquire`, but yields to the event loop while waiting."""
+        if not self.enabled:
+            return None
+        while not isinstance(result := self._try_reserve(tokens), RateLimitReservation):
+            await asyncio.sleep(result)
+        return result
+
+    def settle(self, reservation: RateLimitReservation | None, actual_tokens: int) -> None:
+        """Replace the estimated token count of a reservation with the actual usage."""
+        if reservation is None:
+            return
+        with self._lock:
+            if any(r is reservation for r in self._reservations):
+                self._tokens_in_window += actual_tokens - reservation.tokens
+            reservation.tokens = actual_tokens
+
+
+_RATE_LIMITERS: dict[str, RateLimiter] = {}
+_RATE_LIMITERS_LOCK = threading.Lock()
+
+
+def get_rate_limiter(key: str, requests_per_minute: int = 0, tokens_per_minute: int = 0) -> RateLimiter:
+    """Get the process-wide limiter for `key` (usually the model name).
+
+    If the limiter already exists, its limits are updated to the given values (if non-zero).
+    """
+    with _RATE_LIMITERS_LOCK:
+        limiter = _RATE_LIMITERS.get(key)
+        if limiter is None:
+            limiter = _RATE_LIMITERS[key] = RateLimiter(requests_per_minute, tokens_per_minute)
+        else:
+            limiter.requests_per_minute = requests_per_minute or limiter.requests_per_minute
+            limiter.tokens_per_minute = tokens_per_minute or limiter.tokens_per_minute
+        return limiter
+
+
+def estimate_tokens(messages: list[dict]) -> int:
+    """Cheap token estimate (~4 characters per token) used to reserve TPM budget before a call."""
+    n_chars = 0
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, list):
+            n_chars += sum(len(part.get("text", "")) for part in content if isinstance(part, dict))
+        else:
+            n_chars += len(str(content))
+    return n_chars // 4 + 1
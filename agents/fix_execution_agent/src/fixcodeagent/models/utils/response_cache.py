@@ -0,0 +1,106 @@
+"""Exact-match on-disk cache for model responses.
+
+Entries are keyed by a hash over the model name, the effective model kwargs and the full message list,
+so a hit only happens for byte-identical requests. The store is a single SQLite file; once it grows
+beyond `max_size_bytes`, the least recently used entries are evicted down to `EVICT_LOW_WATER` of the
+limit. The total size is tracked in memory, so a put does not scan the table; it is re-synced with
+`SUM(size)` only when evicting, since other processes may share the file.
+
+All methods block on SQLite; call them via `asyncio.to_thread` from async code.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+# Secrets must never end up in the cache key (or the cache would miss whenever a key is rotated)
+_IGNORED_KWARGS = {"api_key", "api_base", "base_url", "extra_headers", "headers", "timeout"}
+# Fraction of `max_size_bytes` to evict down to, so a full cache does not evict on every put
+EVICT_LOW_WATER = 0.9
+
+
+def get_cache_key(model_name: str, model_kwargs: dict[str, Any], messages: list[dict]) -> str:
+    payload = {
+        "model_name": model_name,
+        "model_kwargs": {k: v for k, v in model_kwargs.items() if k not in _IGNORED_KWARGS},
+        "messages": messages,
+    }
+    serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe, size-bounded LRU store of JSON-serializable responses."""
+
+    def __init__(self, path: Path | str, max_size_bytes: int = 1024**3):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = max_size_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model_name TEXT, response TEXT, size INTEGER, created REAL, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+        self.n_evictions = 0
+        self._size_bytes = self._total_size()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key: str, model_name: str, response: dict) -> None:
+        serialized = json.dumps(response, ensure_ascii=False, default=str)
+        size = len(serialized.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model_name, response, size, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, serialized, size, now, now),
+            )
+            self._size_bytes += size - (previous[0] if previous else 0)
+            if self._size_bytes > self.max_size_bytes:
+                self._evict()
+
+    def _total_size(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _evict(self) -> None:
+        total = self._total_size()
+        if total <= self.max_size_bytes:
+            self._size_bytes = total
+            return
+        target = int(self.max_size_bytes * EVICT_LOW_WATER)
+        evict = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC"):
+            if total <= target:
+                break
+            evict.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evict)
+        self._size_bytes = total
+        self.n_evictions += len(evict)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size_bytes
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,112 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from fixcodeagent.models import get_model
+from fixcodeagent.models.extra.cached import CachedModel, ResponseCacheMissError
+from fixcodeagent.models.litellm_model import LitellmModel
+from fixcodeagent.models.test_models import DeterministicModel
+from fixcodeagent.models.utils.response_cache import ResponseCache, get_cache_key
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+def test_cache_key_ignores_secrets_and_kwarg_order():
+    key = get_cache_key("gpt-4", {"temperature": 0.0, "top_p": 1.0}, MESSAGES)
+    assert key == get_cache_key("gpt-4", {"top_p": 1.0, "temperature": 0.0, "api_key": "secret"}, MESSAGES)
+    assert key != get_cache_key("gpt-4", {"temperature": 0.5, "top_p": 1.0}, MESSAGES)
+    assert key != get_cache_key("gpt-4o", {"temperature": 0.0, "top_p": 1.0}, MESSAGES)
+    assert key != get_cache_key("gpt-4", {"temperature": 0.0, "top_p": 1.0}, [{"role": "user", "content": "hello!"}])
+
+
+def test_response_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite", max_size_bytes=100)
+    response = {"content": "x" * 20}  # ~35 bytes serialized
+    cache.put("a", "m", response)
+    cache.put("b", "m", response)
+    assert cache.get("a") == response  # "a" is now more recently used than "b"
+    cache.put("c", "m", response)
+    assert cache.get("b") is None
+    assert cache.get("a") == response
+    assert cache.get("c") == response
+    assert cache.n_evictions == 1
+    assert cache.size_bytes <= 100
+
+
+def test_read_write_mode_serves_hits(tmp_path):
+    inner = DeterministicModel(outputs=["first", "second"])
+    model = CachedModel(model=inner, cache_dir=str(tmp_path))
+    assert model.config.model_name == "deterministic"
+    assert model.query(MESSAGES)["content"] == "first"
+    assert model.query(MESSAGES)["content"] == "first"
+    assert inner.n_calls == 1
+    assert model.n_cache_hits == 1
+    assert model.n_calls == 2
+    assert model.cost == 1.0
+    assert model.query([{"role": "user", "content": "other"}])["content"] == "second"
+
+
+def test_record_then_replay(tmp_path):
+    recorder = CachedModel(model=DeterministicModel(outputs=["a", "b"]), cache_dir=str(tmp_path), mode="record")
+    recorder.query(MESSAGES)
+    assert recorder.query(MESSAGES)["content"] == "b"  # record mode always queries and overwrites
+
+    replayer = CachedModel(model=DeterministicModel(outputs=[]), cache_dir=str(tmp_path), mode="replay")
+    assert replayer.query(MESSAGES)["content"] == "b"
+    assert replayer.cost == 0.0
+    with pytest.raises(ResponseCacheMissError):
+        replayer.query([{"role": "user", "content": "never recorded"}])
+
+
+async def test_aquery_uses_cache(tmp_path):
+    inner = DeterministicModel(outputs=["async"])
+    model = CachedModel(model=inner, cache_dir=str(tmp_path))
+    assert (await model.aquery(MESSAGES))["content"] == "async"
+    assert (await model.aquery(MESSAGES))["content"] == "async"
+    assert inner.n_calls == 1
+
+
+def test_get_model_wraps_when_response_cache_is_set(tmp_path):
+    with patch.dict(os.environ, {"FIXCODE_RESPONSE_CACHE_DIR": str(tmp_path)}):
+        model = get_model(
+            config={
+                "model_name": "test",
+                "model_class": "deterministic",
+                "outputs": ["x"],
+                "response_cache": "read_write",
+            }
+        )
+    assert isinstance(model, CachedModel)
+    assert isinstance(model.model, DeterministicModel)
+    assert model.config.mode == "read_write"
+
+    with patch.dict(os.environ, {"FIXCODE_RESPONSE_CACHE_MODE": "off"}):
+        model = get_model(config={"model_name": "test", "model_class": "deterministic", "outputs": ["x"]})
+    assert isinstance(model, DeterministicModel)
+
+
+@pytest.mark.parametrize("model_name", ["claude-sonnet-4", "gpt-4o"])
+def test_get_model_with_cached_model_class(tmp_path, model_name):
+    """Defaults injected by get_model (API key, cache control) must reach the wrapped model, not the wrapper."""
+    env = {"FIXCODE_RESPONSE_CACHE_DIR": str(tmp_path), "FIXCODE_MODEL_API_KEY": "test-key"}
+    with patch.dict(os.environ, env):
+        model = get_model(
+            model_name,
+            {"model_class": "cached", "mode": "replay", "model_kwargs": {"model_kwargs": {"temperature": 0}}},
+        )
+    assert isinstance(model, CachedModel)
+    assert isinstance(model.model, LitellmModel)
+    assert model.config.mode == "replay"
+    assert model.config.model_name == model.model.config.model_name == model_name
+    assert model.model.config.model_kwargs == {"temperature": 0, "api_key": "test-key"}
+    expected_cache_control = "default_end" if "claude" in model_name else None
+    assert model.model.config.set_cache_control == expected_cache_control
+
+
+def test_get_model_rejects_unknown_response_cache_mode(tmp_path):
+    config = {"model_name": "test", "model_class": "deterministic", "outputs": ["x"]}
+    with pytest.raises(ValueError, match="Unknown response cache mode"):
+        get_model(config=config | {"response_cache": "readwrite"})
+    with pytest.raises(ValueError, match="Unknown response cache mode"):
+        CachedModel(model=DeterministicModel(outputs=["x"]), mode="write", cache_dir=str(tmp_path))
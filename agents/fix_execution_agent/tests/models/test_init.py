@@ -193,3 +193,21 @@ class TestGlobalModelStats:
             GlobalModelStats()
             captured = capsys.readouterr()
             assert "Global cost/call limit" not in captured.out
+
+    def test_latency_percentiles(self):
+        """Test nearest-rank latency percentiles over recorded calls."""
+        with patch.dict(os.environ, {}, clear=True):
+            stats = GlobalModelStats()
+        assert stats.latency_percentiles() == {}
+        for latency in range(1, 101):
+            stats.add(0.0, latency=float(latency))
+        stats.add(0.0)  # calls without latency don't count towards percentiles
+        assert stats.latency_percentiles() == {"p50": 50.0, "p90": 90.0, "p99": 99.0}
+        assert stats.n_calls == 101
+
+    def test_latency_window_is_bounded(self):
+        with patch.dict(os.environ, {}, clear=True):
+            stats = GlobalModelStats(latency_window=10)
+        for latency in range(100):
+            stats.add(0.0, latency=float(latency))
+        assert stats.latency_percentiles((0, 100)) == {"p0": 90.0, "p100": 99.0}
@@ -76,3 +76,30 @@ def test_model_registry_not_provided():
 
         # Verify register_model was not called
         mock_register.assert_not_called()
+
+
+async def test_aquery_uses_acompletion_and_records_latency():
+    """Test that aquery goes through litellm.acompletion and records latency in the global stats."""
+    model = LitellmModel(model_name="gpt-4")
+    response = Mock()
+    response.choices = [Mock(message=Mock(content="Hello"))]
+    response.model_dump.return_value = {}
+
+    async def acompletion(*args, **kwargs):
+        return response
+
+    with (
+        patch("litellm.acompletion", side_effect=acompletion) as mock_acompletion,
+        patch("litellm.completion") as mock_completion,
+        patch("litellm.cost_calculator.completion_cost", return_value=0.5),
+        patch("fixcodeagent.models.litellm_model.GLOBAL_MODEL_STATS") as mock_stats,
+    ):
+        result = await model.aquery([{"role": "user", "content": "test"}])
+
+    assert result["content"] == "Hello"
+    mock_acompletion.assert_called_once()
+    mock_completion.assert_not_called()
+    assert model.n_calls == 1
+    assert model.cost == 0.5
+    assert mock_stats.add.call_args.args == (0.5,)
+    assert mock_stats.add.call_args.kwargs["latency"] >= 0.0
@@ -182,3 +182,31 @@ def test_openrouter_model_no_api_key():
             with patch("fixcodeagent.models.openrouter_model.retry", lambda **kwargs: lambda f: f):
                 with pytest.raises(OpenRouterAuthenticationError):
                     model._query(messages)
+
+
+async def test_openrouter_model_aquery_uses_shared_client(mock_response):
+    """Test that aquery posts through the shared async client of the running loop."""
+    import httpx
+
+    from fixcodeagent.models.utils.http_client import aclose_async_http_client, get_async_http_client
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.headers["Authorization"] == "Bearer test-key"
+        assert json.loads(request.content)["model"] == "anthropic/claude-3.5-sonnet"
+        return httpx.Response(200, json=mock_response)
+
+    with patch.dict(os.environ, {"OPENROUTER_API_KEY": "test-key"}):
+        model = OpenRouterModel(model_name="anthropic/claude-3.5-sonnet")
+    client = get_async_http_client()
+    assert get_async_http_client() is client
+    client._transport = httpx.MockTransport(handler)
+    try:
+        with patch("requests.post") as mock_post:
+            result = await model.aquery([{"role": "user", "content": "Hello! What is 2+2?"}])
+        mock_post.assert_not_called()
+    finally:
+        await aclose_async_http_client()
+
+    assert result["content"] == "Hello! 2+2 equals 4."
+    assert model.cost == 0.000243
+    assert model.n_calls == 1
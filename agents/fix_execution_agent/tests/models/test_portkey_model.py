@@ -100,3 +100,26 @@ def test_portkey_model_get_template_vars():
             assert template_vars["model_kwargs"] == {"temperature": 0.7}
             assert template_vars["n_model_calls"] == 0
             assert template_vars["model_cost"] == 0.0
+
+
+async def test_portkey_model_aquery_goes_through_rate_limiter():
+    """Test that aquery reserves a slot in the shared limiter and settles it with the actual token usage."""
+    mock_portkey_class = MagicMock()
+    mock_client = MagicMock()
+    mock_response = MagicMock()
+    mock_response.choices[0].message.content = "Hi"
+    mock_response.model_copy.return_value.usage.prompt_tokens = 10
+    mock_response.model_copy.return_value.usage.completion_tokens = 5
+    mock_response.model_copy.return_value.usage.total_tokens = 15
+    mock_client.chat.completions.create.return_value = mock_response
+    mock_portkey_class.return_value = mock_client
+
+    with patch("fixcodeagent.models.portkey_model.Portkey", mock_portkey_class):
+        with patch.dict(os.environ, {"PORTKEY_API_KEY": "test-key"}):
+            with patch("fixcodeagent.models.portkey_model.litellm.cost_calculator.completion_cost", return_value=0.01):
+                model = PortkeyModel(model_name="portkey-rate-limited", requests_per_minute=5, tokens_per_minute=1000)
+                result = await model.aquery([{"role": "user", "content": "Hello!"}])
+
+    assert result["content"] == "Hi"
+    assert len(model._rate_limiter._reservations) == 1
+    assert model._rate_limiter._tokens_in_window == 15
@@ -0,0 +1,75 @@
+import asyncio
+
+from fixcodeagent.models.utils.rate_limit import RateLimiter, estimate_tokens, get_rate_limiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_disabled_limiter_never_waits():
+    limiter = RateLimiter()
+    assert not limiter.enabled
+    assert limiter.acquire(10**9) is None
+
+
+def test_requests_per_minute():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=2, clock=clock)
+    assert limiter._try_reserve(0) is not None
+    clock.now = 10.0
+    assert not isinstance(limiter._try_reserve(0), float)
+    clock.now = 20.0
+    assert limiter._try_reserve(0) == 40.0  # first request leaves the window at t=60
+    clock.now = 60.0
+    assert not isinstance(limiter._try_reserve(0), float)
+
+
+def test_tokens_per_minute_and_settle():
+    clock = FakeClock()
+    limiter = RateLimiter(tokens_per_minute=100, clock=clock)
+    first = limiter._try_reserve(80)
+    assert not isinstance(first, float)
+    assert limiter._try_reserve(30) == 60.0
+    # The first request used fewer tokens than estimated, which frees budget
+    limiter.settle(first, 50)
+    assert not isinstance(limiter._try_reserve(30), float)
+
+
+def test_oversized_request_passes_on_empty_window():
+    limiter = RateLimiter(tokens_per_minute=10)
+    assert limiter.acquire(1000) is not None
+
+
+async def test_aacquire_waits_without_blocking_the_loop():
+    limiter = RateLimiter(requests_per_minute=1, window=0.2)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    task = asyncio.create_task(ticker())
+    await limiter.aacquire()
+    await limiter.aacquire()
+    task.cancel()
+    assert ticks > 5
+
+
+def test_get_rate_limiter_is_shared_per_key():
+    limiter = get_rate_limiter("test-shared-model", requests_per_minute=5)
+    assert get_rate_limiter("test-shared-model") is limiter
+    assert limiter.requests_per_minute == 5
+    assert get_rate_limiter("test-shared-model", tokens_per_minute=7).tokens_per_minute == 7
+    assert limiter.requests_per_minute == 5
+
+
+def test_estimate_tokens():
+    assert estimate_tokens([{"role": "user", "content": "a" * 40}]) == 11
+    assert estimate_tokens([{"role": "user", "content": [{"type": "text", "text": "a" * 8}]}]) == 3
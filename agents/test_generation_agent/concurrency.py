@@ -0,0 +1,107 @@
+"""
+测试生成并发工具
+提供共享时间预算与带超时取消的并发执行
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+
+
+class TimeBudget:
+    """共享时间预算（基于单调时钟），None 表示不限时，0 表示已没有剩余时间"""
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = seconds
+        self.deadline = time.monotonic() + max(0.0, seconds) if seconds is not None else None
+
+    def remaining(self) -> Optional[float]:
+        """剩余秒数，不限时返回None"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+
+async def run_concurrently(
+    coros: Dict[str, Awaitable[Any]],
+    timeout: Optional[float] = None
+) -> Tuple[Dict[str, Any], Dict[str, BaseException], List[str]]:
+    """
+    并发运行一组协程，超时后取消仍未完成的任务
+
+    Args:
+        coros: 名称 -> 协程
+        timeout: 总超时时间（秒），None表示不限时
+
+    Returns:
+        (成功结果, 异常, 被取消的任务名称列表)
+    """
+    tasks = {name: asyncio.ensure_future(coro) for name, coro in coros.items()}
+    if not tasks:
+        return {}, {}, []
+
+    try:
+        _, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+    except asyncio.CancelledError:
+        # 调用方被取消时，同时取消所有子任务
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+
+    for task in pending:
+        task.cancel()
+    if pending:
+        # 等待被取消的任务完成清理（例如终止子进程）
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    results: Dict[str, Any] = {}
+    errors: Dict[str, BaseException] = {}
+    cancelled: List[str] = []
+    for name, task in tasks.items():
+        if task in pending or task.cancelled():
+            cancelled.append(name)
+        elif task.exception() is not None:
+            errors[name] = task.exception()
+        else:
+            results[name] = task.result()
+    return results, errors, cancelled
+
+
+async def run_subprocess(
+    cmd: List[str],
+    cwd: Optional[str] = None,
+    timeout: Optional[float] = None
+) -> Tuple[int, str, str]:
+    """
+    异步运行子进程，超时或被取消时终止进程
+
+    Returns:
+        (返回码, stdout, stderr)
+
+    Raises:
+        asyncio.TimeoutError: 超时
+    """
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+    return (
+        process.returncode,
+        stdout.decode("utf-8", errors="replace"),
+        stderr.decode("utf-8", errors="replace")
+    )
@@ -10,6 +10,8 @@ from typing import Dict, List, Any, Optional
 import logging
 import httpx
 
+from ..concurrency import TimeBudget, run_concurrently
+
 logger = logging.getLogger(__name__)
 
 
@@ -34,15 +36,19 @@ class CppTestGenerator:
         self, 
         project_path: str, 
         issues: List[Dict] = None,
-        issue_description: str = None
+        issue_description: str = None,
+        time_budget: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         生成C/C++测试
         
+        重现测试与LLM覆盖性测试并发执行，超出时间预算的策略会被取消。
+        
         Args:
             project_path: 项目根路径
             issues: 检测到的问题列表
             issue_description: 问题描述
+            time_budget: 时间预算（秒），None表示不限时
             
         Returns:
             生成结果字典
@@ -53,31 +59,42 @@ class CppTestGenerator:
         generated_tests = []
         errors = []
         
+        strategies = {}
         # 1. 如果有问题描述，生成重现测试
         if issue_description or issues:
-            try:
-                reproduction_test = await self._generate_reproduction_test(
-                    project_path, issues, issue_description, tests_dir
-                )
-                if reproduction_test:
-                    generated_tests.append(reproduction_test)
-                    logger.info(f"✅ 生成重现测试: {reproduction_test}")
-            except Exception as e:
-                error_msg = f"生成重现测试失败: {e}"
-                logger.error(error_msg)
-                errors.append(error_msg)
-        
+            strategies["reproduction"] = self._generate_reproduction_test(
+                project_path, issues, issue_description, tests_dir
+            )
         # 2. 使用LLM生成覆盖性测试
         if self.use_llm and self.ai_analyzer:
-            try:
-                llm_result = await self._generate_with_llm(project_path, tests_dir, issues)
-                if llm_result.get("success"):
-                    generated_tests.extend(llm_result.get("test_files", []))
-                    logger.info(f"✅ LLM生成 {len(llm_result.get('test_files', []))} 个测试文件")
-            except Exception as e:
-                error_msg = f"LLM生成失败: {e}"
-                logger.warning(error_msg)
-                errors.append(error_msg)
+            strategies["llm"] = self._generate_with_llm(project_path, tests_dir, issues)
+        
+        results, failures, cancelled = await run_concurrently(
+            strategies, timeout=TimeBudget(time_budget).remaining()
+        )
+        
+        if results.get("reproduction"):
+            generated_tests.append(results["reproduction"])
+            logger.info(f"✅ 生成重现测试: {results['reproduction']}")
+        if "reproduction" in failures:
+            error_msg = f"生成重现测试失败: {failures['reproduction']}"
+            logger.error(error_msg)
+            errors.append(error_msg)
+        
+        if "llm" in results and results["llm"].get("success"):
+            generated_tests.extend(results["llm"].get("test_files", []))
+            logger.info(f"✅ LLM生成 {len(results['llm'].get('test_files', []))} 个测试文件")
+        if "llm" in failures:
+            error_msg = f"LLM生成失败: {failures['llm']}"
+            logger.warning(error_msg)
+            errors.append(error_msg)
+        
+        for name in cancelled:
+            error_msg = f"{name} 测试生成超出时间预算（{time_budget}秒），已取消"
+            logger.warning(error_msg)
+            errors.append(error_msg)
+        
+        generated_tests = list(dict.fromkeys(generated_tests))
         
         # 3. 生成或更新CMakeLists.txt
         try:
@@ -4,7 +4,6 @@ Java测试生成器
 """
 
 import os
-import subprocess
 import asyncio
 from pathlib import Path
 from typing import Dict, List, Any, Optional
@@ -12,6 +11,8 @@ import logging
 import json
 import httpx
 
+from ..concurrency import TimeBudget, run_concurrently, run_subprocess
+
 logger = logging.getLogger(__name__)
 
 
@@ -39,15 +40,19 @@ class JavaTestGenerator:
         self, 
         project_path: str, 
         issues: List[Dict] = None,
-        issue_description: str = None
+        issue_description: str = None,
+        time_budget: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         生成Java测试
         
+        重现测试、EvoSuite和LLM生成并发执行，超出时间预算的策略会被取消。
+        
         Args:
             project_path: 项目根路径
             issues: 检测到的问题列表
             issue_description: 问题描述
+            time_budget: 时间预算（秒），None表示不限时
             
         Returns:
             生成结果字典
@@ -60,44 +65,48 @@ class JavaTestGenerator:
         generated_tests = []
         errors = []
         
+        strategies = {}
         # 1. 如果有问题描述，生成重现测试
         if issue_description or issues:
-            try:
-                reproduction_test = await self._generate_reproduction_test(
-                    project_path, issues, issue_description, test_dir
-                )
-                if reproduction_test:
-                    generated_tests.append(reproduction_test)
-                    logger.info(f"✅ 生成重现测试: {reproduction_test}")
-            except Exception as e:
-                error_msg = f"生成重现测试失败: {e}"
-                logger.error(error_msg)
-                errors.append(error_msg)
-        
+            strategies["reproduction"] = self._generate_reproduction_test(
+                project_path, issues, issue_description, test_dir
+            )
         # 2. 使用EvoSuite生成覆盖性测试（如果可用）
         if self.use_evosuite:
-            try:
-                evosuite_result = await self._generate_with_evosuite(project_path, test_dir)
-                if evosuite_result.get("success"):
-                    generated_tests.extend(evosuite_result.get("test_files", []))
-                    logger.info(f"✅ EvoSuite生成 {len(evosuite_result.get('test_files', []))} 个测试文件")
-            except Exception as e:
-                error_msg = f"EvoSuite生成失败: {e}"
-                logger.warning(error_msg)
-                errors.append(error_msg)
-        
+            strategies["evosuite"] = self._generate_with_evosuite(project_path, test_dir)
         # 3. 使用LLM生成覆盖性测试
         if self.use_llm and self.ai_analyzer:
-            try:
-                llm_result = await self._generate_with_llm(project_path, test_dir, issues)
-                if llm_result.get("success"):
-                    generated_tests.extend(llm_result.get("test_files", []))
-                    logger.info(f"✅ LLM生成 {len(llm_result.get('test_files', []))} 个测试文件")
-            except Exception as e:
-                error_msg = f"LLM生成失败: {e}"
+            strategies["llm"] = self._generate_with_llm(project_path, test_dir, issues)
+        
+        results, failures, cancelled = await run_concurrently(
+            strategies, timeout=TimeBudget(time_budget).remaining()
+        )
+        
+        if results.get("reproduction"):
+            generated_tests.append(results["reproduction"])
+            logger.info(f"✅ 生成重现测试: {results['reproduction']}")
+        if "reproduction" in failures:
+            error_msg = f"生成重现测试失败: {failures['reproduction']}"
+            logger.error(error_msg)
+            errors.append(error_msg)
+        
+        for name, label in (("evosuite", "EvoSuite"), ("llm", "LLM")):
+            if name in results and results[name].get("success"):
+                generated_tests.extend(results[name].get("test_files", []))
+                logger.info(f"✅ {label}生成 {len(results[name].get('test_files', []))} 个测试文件")
+            if name in failures:
+                error_msg = f"{label}生成失败: {failures[name]}"
                 logger.warning(error_msg)
                 errors.append(error_msg)
         
+        for name in cancelled:
+            error_msg = f"{name} 测试生成超出时间预算（{time_budget}秒），已取消"
+            logger.warning(error_msg)
+            errors.append(error_msg)
+        
+        # EvoSuite按目录收集测试文件，可能与其他策略的文件重复
+        generated_tests = list(dict.fromkeys(generated_tests))
+        
         # 4. 检查并更新pom.xml或build.gradle（添加JUnit依赖）
         try:
             self._ensure_junit_dependency(project_path)
@@ -345,18 +354,16 @@ class JavaTestGenerator:
             if not classes_dir.exists():
                 # 尝试编译项目
                 logger.info("尝试编译Java项目...")
-                compile_result = subprocess.run(
+                compile_returncode, _, compile_stderr = await run_subprocess(
                     ["mvn", "compile"],
                     cwd=project_path,
-                    capture_output=True,
-                    text=True,
                     timeout=300
                 )
                 
-                if compile_result.returncode != 0:
+                if compile_returncode != 0:
                     return {
                         "success": False,
-                        "error": f"项目编译失败: {compile_result.stderr}",
+                        "error": f"项目编译失败: {compile_stderr}",
                         "test_files": []
                     }
             
@@ -371,7 +378,7 @@ class JavaTestGenerator:
             target_class = java_files[0].relative_to(project / "src" / "main" / "java")
             class_name = str(target_class).replace("/", ".").replace("\\", ".").replace(".java", "")
             
-            result = subprocess.run(
+            returncode, stdout, stderr = await run_subprocess(
                 [
                     "java",
                     "-jar", self.evosuite_jar,
@@ -380,28 +387,26 @@ class JavaTestGenerator:
                     "-class", class_name,
                     "-Dtest_dir", str(test_dir)
                 ],
-                capture_output=True,
-                text=True,
-                timeout=120,
-                cwd=project_path
+                cwd=project_path,
+                timeout=120
             )
             
-            if result.returncode == 0:
+            if returncode == 0:
                 # 查找生成的测试文件
                 test_files = list(test_dir.rglob("*Test.java"))
                 return {
                     "success": True,
                     "test_files": [str(f) for f in test_files],
-                    "output": result.stdout
+                    "output": stdout
                 }
             else:
                 return {
                     "success": False,
-                    "error": result.stderr,
+                    "error": stderr,
                     "test_files": []
                 }
         
-        except subprocess.TimeoutError:
+        except asyncio.TimeoutError:
             return {"success": False, "error": "EvoSuite执行超时", "test_files": []}
         except Exception as e:
             return {"success": False, "error": str(e), "test_files": []}
@@ -4,14 +4,19 @@ Python测试生成器
 """
 
 import os
-import subprocess
 import asyncio
+import shutil
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 import logging
 
+from ..concurrency import TimeBudget, run_concurrently, run_subprocess
+
 logger = logging.getLogger(__name__)
 
+# Pynguin 的输出目录（tests 下的子目录），与其他策略写入的测试文件分开收集
+PYNGUIN_OUTPUT_DIR = "pynguin"
+
 
 class PythonTestGenerator:
     """Python测试生成器"""
@@ -22,6 +27,8 @@ class PythonTestGenerator:
         self.use_llm = config.get("use_llm", True)
         self.use_docker = config.get("use_docker", False)
         self.docker_runner = config.get("docker_runner")
+        # LLM覆盖性测试的最大并发请求数
+        self.llm_concurrency = config.get("llm_concurrency", 3)
         
         # 复用AI测试生成器
         try:
@@ -36,77 +43,94 @@ class PythonTestGenerator:
         self, 
         project_path: str, 
         issues: List[Dict] = None,
-        issue_description: str = None
+        issue_description: str = None,
+        time_budget: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         生成Python测试
         
+        重现测试、Pynguin和LLM覆盖性测试写入不同的文件，因此并发执行；
+        超出时间预算仍未完成的策略会被取消，已完成策略的结果保留。
+        
         Args:
             project_path: 项目根路径
             issues: 检测到的问题列表
             issue_description: 问题描述
+            time_budget: 时间预算（秒），None表示不限时
             
         Returns:
             生成结果字典
         """
         tests_dir = Path(project_path) / "tests"
         tests_dir.mkdir(exist_ok=True)
+        budget = TimeBudget(time_budget)
         
         generated_tests = []
         errors = []
         
+        strategies = {}
         # 1. 如果有问题描述，生成重现测试
         if issue_description or issues:
-            try:
-                reproduction_test = await self._generate_reproduction_test(
-                    project_path, issues, issue_description
-                )
-                if reproduction_test:
-                    test_path = tests_dir / "test_reproduction.py"
-                    test_path.write_text(reproduction_test, encoding="utf-8")
-                    generated_tests.append(str(test_path))
-                    logger.info(f"✅ 生成重现测试: {test_path}")
-            except Exception as e:
-                error_msg = f"生成重现测试失败: {e}"
-                logger.error(error_msg)
-                errors.append(error_msg)
-        
+            strategies["reproduction"] = self._run_reproduction_strategy(
+                project_path, tests_dir, issues, issue_description
+            )
         # 2. 使用Pynguin生成覆盖性测试（如果可用）
         if self.use_pynguin:
-            try:
-                logger.info(f"开始使用Pynguin生成测试，项目路径: {project_path}")
-                pynguin_result = await self._generate_with_pynguin(project_path, tests_dir)
-                if pynguin_result.get("success"):
-                    pynguin_files = pynguin_result.get("test_files", [])
-                    generated_tests.extend(pynguin_files)
-                    logger.info(f"✅ Pynguin生成 {len(pynguin_files)} 个测试文件: {pynguin_files}")
-                else:
-                    error_msg = pynguin_result.get("error", "Pynguin生成失败")
-                    logger.warning(f"⚠️ Pynguin生成失败: {error_msg}")
-                    if pynguin_result.get("output"):
-                        logger.debug(f"Pynguin输出: {pynguin_result.get('output')[:500]}")
-            except Exception as e:
-                error_msg = f"Pynguin生成异常: {e}"
-                logger.error(error_msg, exc_info=True)
-                errors.append(error_msg)
-        
+            logger.info(f"开始使用Pynguin生成测试，项目路径: {project_path}")
+            strategies["pynguin"] = self._generate_with_pynguin(project_path, tests_dir)
         # 3. 使用LLM生成覆盖性测试（如果没有生成重现测试，至少生成覆盖性测试）
         if self.use_llm and self.ai_generator:
-            try:
-                llm_result = await self._generate_with_llm(project_path, tests_dir, issues)
-                if llm_result.get("success"):
-                    generated_tests.extend(llm_result.get("test_files", []))
-                    logger.info(f"✅ LLM生成 {len(llm_result.get('test_files', []))} 个测试文件")
-            except Exception as e:
-                error_msg = f"LLM生成失败: {e}"
-                logger.warning(error_msg)
-                errors.append(error_msg)
+            strategies["llm"] = self._generate_with_llm(project_path, tests_dir, issues)
+        
+        results, failures, cancelled = await run_concurrently(strategies, timeout=budget.remaining())
+        
+        if "reproduction" in results and results["reproduction"]:
+            generated_tests.append(results["reproduction"])
+        if "reproduction" in failures:
+            error_msg = f"生成重现测试失败: {failures['reproduction']}"
+            logger.error(error_msg)
+            errors.append(error_msg)
+        
+        if "pynguin" in results:
+            pynguin_result = results["pynguin"]
+            if pynguin_result.get("success"):
+                pynguin_files = pynguin_result.get("test_files", [])
+                generated_tests.extend(pynguin_files)
+                logger.info(f"✅ Pynguin生成 {len(pynguin_files)} 个测试文件: {pynguin_files}")
+            else:
+                error_msg = pynguin_result.get("error", "Pynguin生成失败")
+                logger.warning(f"⚠️ Pynguin生成失败: {error_msg}")
+                if pynguin_result.get("output"):
+                    logger.debug(f"Pynguin输出: {pynguin_result.get('output')[:500]}")
+        if "pynguin" in failures:
+            error_msg = f"Pynguin生成异常: {failures['pynguin']}"
+            logger.error(error_msg, exc_info=failures["pynguin"])
+            errors.append(error_msg)
+        
+        if "llm" in results and results["llm"].get("success"):
+            generated_tests.extend(results["llm"].get("test_files", []))
+            logger.info(f"✅ LLM生成 {len(results['llm'].get('test_files', []))} 个测试文件")
+        if "llm" in failures:
+            error_msg = f"LLM生成失败: {failures['llm']}"
+            logger.warning(error_msg)
+            errors.append(error_msg)
+        
+        for name in cancelled:
+            error_msg = f"{name} 测试生成超出时间预算（{time_budget}秒），已取消"
+            logger.warning(error_msg)
+            errors.append(error_msg)
+        
+        # 不同策略可能返回同一个文件
+        generated_tests = list(dict.fromkeys(generated_tests))
         
         # 如果没有任何测试文件生成，尝试生成基本的覆盖性测试
-        if len(generated_tests) == 0 and self.use_llm and self.ai_generator:
+        if len(generated_tests) == 0 and self.use_llm and self.ai_generator and not budget.expired:
             try:
                 logger.info("未生成任何测试文件，尝试生成基本覆盖性测试...")
-                basic_test = await self._generate_basic_coverage_test(project_path, tests_dir)
+                basic_test = await asyncio.wait_for(
+                    self._generate_basic_coverage_test(project_path, tests_dir),
+                    timeout=budget.remaining()
+                )
                 if basic_test:
                     test_path = tests_dir / "test_basic.py"
                     test_path.write_text(basic_test, encoding="utf-8")
@@ -135,7 +159,7 @@ class PythonTestGenerator:
             init_path.write_text("# Tests package\n", encoding="utf-8")
         
         # 最终统计：确保包含所有生成的测试文件
-        final_test_files = list(tests_dir.glob("test_*.py"))
+        final_test_files = list(tests_dir.glob("test_*.py")) + list((tests_dir / PYNGUIN_OUTPUT_DIR).glob("test_*.py"))
         final_count = len(final_test_files)
         
         logger.info(f"测试生成完成: 统计={len(generated_tests)}, 实际文件数={final_count}")
@@ -149,6 +173,24 @@ class PythonTestGenerator:
             "errors": errors
         }
     
+    async def _run_reproduction_strategy(
+        self,
+        project_path: str,
+        tests_dir: Path,
+        issues: List[Dict],
+        issue_description: str
+    ) -> Optional[str]:
+        """生成重现测试并写入 tests/test_reproduction.py，返回测试文件路径"""
+        reproduction_test = await self._generate_reproduction_test(
+            project_path, issues, issue_description
+        )
+        if not reproduction_test:
+            return None
+        test_path = tests_dir / "test_reproduction.py"
+        test_path.write_text(reproduction_test, encoding="utf-8")
+        logger.info(f"✅ 生成重现测试: {test_path}")
+        return str(test_path)
+    
     async def _generate_reproduction_test(
         self, 
         project_path: str, 
@@ -473,14 +515,25 @@ import {module_name}
             return None
     
     async def _generate_with_pynguin(self, project_path: str, tests_dir: Path) -> Dict[str, Any]:
-        """使用Pynguin生成测试（支持Docker）"""
+        """
+        使用Pynguin生成测试（支持Docker）
+        
+        Pynguin 写入独立的子目录并只从该目录收集结果，不会把并发运行的其他策略写入 tests_dir 的文件
+        算作自己的输出；每次运行前清空该目录，也不会收集到上一次运行留下的文件。
+        """
+        output_dir = tests_dir / PYNGUIN_OUTPUT_DIR
+        shutil.rmtree(output_dir, ignore_errors=True)
+        output_dir.mkdir(parents=True)
+        # 作为 tests 的子包，生成的模块与 tests 下的同名测试文件不冲突
+        (output_dir / "__init__.py").write_text("", encoding="utf-8")
+        
         # 如果启用Docker，在Docker内执行
         if self.use_docker and self.docker_runner:
-            return await self._generate_with_pynguin_docker(project_path, tests_dir)
+            return await self._generate_with_pynguin_docker(project_path, output_dir)
         else:
-            return await self._generate_with_pynguin_local(project_path, tests_dir)
+            return await self._generate_with_pynguin_local(project_path, output_dir)
     
-    async def _generate_with_pynguin_docker(self, project_path: str, tests_dir: Path) -> Dict[str, Any]:
+    async def _generate_with_pynguin_docker(self, project_path: str, output_dir: Path) -> Dict[str, Any]:
         """在Docker容器内使用Pynguin生成测试"""
         try:
             project = Path(project_path).absolute()
@@ -518,7 +571,7 @@ import {module_name}
                 "sh", "-c",
                 f"cd /app/test_project && "
                 f"pynguin --project-path /app/test_project "
-                f"--output-path /app/test_project/tests "
+                f"--output-path /app/test_project/tests/{PYNGUIN_OUTPUT_DIR} "
                 f"--module {module_name} "
                 f"--test-type pytest 2>&1"
             ]
@@ -539,7 +592,7 @@ import {module_name}
             
             if result.get("success"):
                 # 查找生成的测试文件（通过volume自动同步回本地）
-                test_files = list(tests_dir.glob("test_*.py"))
+                test_files = list(output_dir.glob("test_*.py"))
                 logger.info(f"找到 {len(test_files)} 个Pynguin生成的测试文件")
                 return {
                     "success": len(test_files) > 0,
@@ -562,17 +615,12 @@ import {module_name}
             logger.error(f"Docker内执行Pynguin失败: {e}")
             return {"success": False, "error": str(e), "test_files": []}
     
-    async def _generate_with_pynguin_local(self, project_path: str, tests_dir: Path) -> Dict[str, Any]:
+    async def _generate_with_pynguin_local(self, project_path: str, output_dir: Path) -> Dict[str, Any]:
         """在本地使用Pynguin生成测试"""
         try:
             # 检查Pynguin是否可用
-            result = subprocess.run(
-                ["pynguin", "--version"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode != 0:
+            returncode, _, _ = await run_subprocess(["pynguin", "--version"], timeout=5)
+            if returncode != 0:
                 return {"success": False, "error": "Pynguin未安装或不可用", "test_files": []}
         except FileNotFoundError:
             return {"success": False, "error": "Pynguin未安装", "test_files": []}
@@ -591,36 +639,35 @@ import {module_name}
             module_path = source_files[0].relative_to(project_path)
             module_name = str(module_path).replace("/", ".").replace("\\", ".").replace(".py", "")
             
-            result = subprocess.run(
+            # 异步子进程：超时或被取消时会终止Pynguin，不会阻塞事件循环
+            returncode, stdout, stderr = await run_subprocess(
                 [
                     "pynguin",
                     "--project-path", str(project_path),
-                    "--output-path", str(tests_dir),
+                    "--output-path", str(output_dir),
                     "--module", module_name,
                     "--test-type", "pytest"
                 ],
-                capture_output=True,
-                text=True,
-                timeout=60,
-                cwd=project_path
+                cwd=project_path,
+                timeout=60
             )
             
-            if result.returncode == 0:
+            if returncode == 0:
                 # 查找生成的测试文件
-                test_files = list(tests_dir.glob("test_*.py"))
+                test_files = list(output_dir.glob("test_*.py"))
                 return {
                     "success": True,
                     "test_files": [str(f) for f in test_files],
-                    "output": result.stdout
+                    "output": stdout
                 }
             else:
                 return {
                     "success": False,
-                    "error": result.stderr,
+                    "error": stderr,
                     "test_files": []
                 }
         
-        except subprocess.TimeoutError:
+        except asyncio.TimeoutError:
             return {"success": False, "error": "Pynguin执行超时", "test_files": []}
         except Exception as e:
             return {"success": False, "error": str(e), "test_files": []}
@@ -645,23 +692,27 @@ import {module_name}
                 and "__init__.py" != f.name
             ][:5]  # 最多为5个文件生成测试
             
-            generated_files = []
+            semaphore = asyncio.Semaphore(self.llm_concurrency)
             
-            for source_file in source_files:
-                try:
-                    result = await self.ai_generator.generate_test_file(
-                        str(source_file),
-                        project_path
-                    )
-                    
-                    if result.get("success"):
-                        test_file_path = result.get("test_file_path")
-                        if test_file_path and os.path.exists(test_file_path):
-                            generated_files.append(test_file_path)
-                
-                except Exception as e:
-                    logger.warning(f"为 {source_file} 生成测试失败: {e}")
-                    continue
+            async def generate_for_file(source_file: Path) -> Optional[str]:
+                async with semaphore:
+                    try:
+                        result = await self.ai_generator.generate_test_file(
+                            str(source_file),
+                            project_path
+                        )
+                    except Exception as e:
+                        logger.warning(f"为 {source_file} 生成测试失败: {e}")
+                        return None
+                if result.get("success"):
+                    test_file_path = result.get("test_file_path")
+                    if test_file_path and os.path.exists(test_file_path):
+                        return test_file_path
+                return None
+            
+            # 每个源文件对应不同的测试文件，可以并发调用LLM
+            results = await asyncio.gather(*(generate_for_file(f) for f in source_files))
+            generated_files = [f for f in results if f]
             
             return {
                 "success": len(generated_files) > 0,
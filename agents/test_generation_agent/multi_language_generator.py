@@ -3,10 +3,11 @@
 根据检测到的语言选择相应的生成器并协调生成任务
 """
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from pathlib import Path
 import logging
 
+from .concurrency import TimeBudget, run_concurrently
 from .language_detector import Language
 from .generators.python_generator import PythonTestGenerator
 from .generators.java_generator import JavaTestGenerator
@@ -14,6 +15,9 @@ from .generators.cpp_generator import CppTestGenerator
 
 logger = logging.getLogger(__name__)
 
+# 各语言生成器自身会在预算内取消慢任务并返回部分结果，这里额外留出收尾时间
+_CANCEL_GRACE_SECONDS = 10
+
 
 class MultiLanguageTestGenerator:
     """多语言测试生成协调器"""
@@ -22,6 +26,8 @@ class MultiLanguageTestGenerator:
         self.config = config
         self.docker_runner = config.get("docker_runner")
         self.use_docker = config.get("use_docker", False)
+        # 所有语言共享的时间预算（秒），None 表示不限时；超出预算仍未完成的生成任务会被取消
+        self.generation_timeout = config.get("generation_timeout", 600)
         
         # 初始化各语言生成器（传递docker_runner）
         generator_config = {
@@ -41,7 +47,8 @@ class MultiLanguageTestGenerator:
         project_path: str, 
         language: Language,
         issues: List[Dict] = None,
-        issue_description: str = None
+        issue_description: str = None,
+        time_budget: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         为指定语言生成测试
@@ -51,6 +58,7 @@ class MultiLanguageTestGenerator:
             language: 编程语言
             issues: 检测到的问题列表
             issue_description: 问题描述
+            time_budget: 该语言可用的时间预算（秒）
             
         Returns:
             生成结果字典
@@ -68,7 +76,8 @@ class MultiLanguageTestGenerator:
             result = await generator.generate(
                 project_path=project_path,
                 issues=issues,
-                issue_description=issue_description
+                issue_description=issue_description,
+                time_budget=time_budget
             )
             return result
         except Exception as e:
@@ -99,20 +108,47 @@ class MultiLanguageTestGenerator:
         Returns:
             所有语言的生成结果
         """
-        results = {}
-        
+        budget = TimeBudget(self.generation_timeout)
+        coros = {}
         for language in languages:
-            if language == Language.UNKNOWN:
+            if language == Language.UNKNOWN or language.value in coros:
                 continue
             
             logger.info(f"为语言 {language.value} 生成测试...")
-            result = await self.generate_tests(
+            coros[language.value] = self.generate_tests(
                 project_path=project_path,
                 language=language,
                 issues=issues,
-                issue_description=issue_description
+                issue_description=issue_description,
+                time_budget=budget.remaining()
             )
-            results[language.value] = result
+        
+        # 各语言并发生成，超出共享预算的语言被取消
+        remaining = budget.remaining()
+        completed, failed, cancelled = await run_concurrently(
+            coros, timeout=None if remaining is None else remaining + _CANCEL_GRACE_SECONDS
+        )
+        results = {}
+        for name in coros:
+            if name in completed:
+                results[name] = completed[name]
+            elif name in failed:
+                results[name] = {
+                    "success": False,
+                    "error": str(failed[name]),
+                    "tests_dir": None,
+                    "generated_tests": [],
+                    "errors": [f"为语言 {name} 生成测试失败: {failed[name]}"]
+                }
+            else:
+                logger.warning(f"为语言 {name} 生成测试超时，已取消")
+                results[name] = {
+                    "success": False,
+                    "error": "超出时间预算，已取消",
+                    "tests_dir": None,
+                    "generated_tests": [],
+                    "errors": [f"为语言 {name} 生成测试超出时间预算（{self.generation_timeout}秒），已取消"]
+                }
         
         # 汇总结果
         total_tests = sum(r.get("total_tests", 0) for r in results.values())
@@ -125,6 +161,7 @@ class MultiLanguageTestGenerator:
             "languages": list(results.keys()),
             "results": results,
             "total_tests": total_tests,
-            "errors": all_errors
+            "errors": all_errors,
+            "cancelled_languages": cancelled
         }
 
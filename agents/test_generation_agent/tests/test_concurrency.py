@@ -0,0 +1,132 @@
+"""
+测试生成并发执行测试
+"""
+
+import asyncio
+import sys
+import time
+
+import pytest
+
+from agents.test_generation_agent.concurrency import TimeBudget, run_concurrently, run_subprocess
+from agents.test_generation_agent.language_detector import Language
+from agents.test_generation_agent.multi_language_generator import MultiLanguageTestGenerator
+
+
+class SlowGenerator:
+    """模拟耗时的语言生成器"""
+
+    def __init__(self, delay: float, name: str):
+        self.delay = delay
+        self.name = name
+        self.cancelled = False
+
+    async def generate(self, project_path, issues=None, issue_description=None, time_budget=None):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return {"success": True, "generated_tests": [f"{self.name}_test"], "total_tests": 1, "errors": []}
+
+
+@pytest.mark.asyncio
+async def test_run_concurrently_cancels_stragglers():
+    """测试超时后取消未完成的任务并保留已完成结果"""
+    async def fast():
+        return "done"
+
+    async def fail():
+        raise ValueError("boom")
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    start = time.monotonic()
+    results, errors, cancelled = await run_concurrently(
+        {"fast": fast(), "fail": fail(), "slow": slow()}, timeout=0.2
+    )
+    assert time.monotonic() - start < 2
+    assert results == {"fast": "done"}
+    assert isinstance(errors["fail"], ValueError)
+    assert cancelled == ["slow"]
+
+
+@pytest.mark.asyncio
+async def test_run_subprocess_kills_on_timeout():
+    """测试子进程超时后被终止"""
+    with pytest.raises(asyncio.TimeoutError):
+        await run_subprocess([sys.executable, "-c", "import time; time.sleep(10)"], timeout=0.2)
+
+    returncode, stdout, _ = await run_subprocess([sys.executable, "-c", "print('ok')"])
+    assert returncode == 0
+    assert stdout.strip() == "ok"
+
+
+def test_time_budget():
+    """测试时间预算"""
+    assert TimeBudget(None).remaining() is None
+    assert not TimeBudget(None).expired
+    assert 0 < TimeBudget(5).remaining() <= 5
+    assert TimeBudget(0.000001).remaining() < 1
+    # 0 表示没有剩余时间（例如上层预算已用完后向下传递的剩余值），而不是不限时
+    assert TimeBudget(0).remaining() == 0
+    assert TimeBudget(0).expired
+
+
+@pytest.mark.asyncio
+async def test_languages_generated_concurrently(tmp_path):
+    """测试各语言并发生成，且共享时间预算"""
+    generator = MultiLanguageTestGenerator({"use_llm": False, "use_pynguin": False, "use_evosuite": False})
+    generator.generators = {
+        Language.PYTHON: SlowGenerator(0.3, "python"),
+        Language.JAVA: SlowGenerator(0.3, "java"),
+    }
+
+    start = time.monotonic()
+    result = await generator.generate_tests_for_all_languages(str(tmp_path), [Language.PYTHON, Language.JAVA])
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 0.55  # 串行执行至少需要0.6秒
+    assert result["total_tests"] == 2
+    assert result["cancelled_languages"] == []
+
+
+@pytest.mark.asyncio
+async def test_language_over_budget_is_cancelled(tmp_path, monkeypatch):
+    """测试超出预算的语言被取消，其他语言结果保留"""
+    monkeypatch.setattr("agents.test_generation_agent.multi_language_generator._CANCEL_GRACE_SECONDS", 0)
+    generator = MultiLanguageTestGenerator({"use_llm": False, "generation_timeout": 0.3})
+    slow = SlowGenerator(10, "java")
+    generator.generators = {Language.PYTHON: SlowGenerator(0.01, "python"), Language.JAVA: slow}
+
+    result = await generator.generate_tests_for_all_languages(str(tmp_path), [Language.PYTHON, Language.JAVA])
+
+    assert slow.cancelled
+    assert result["cancelled_languages"] == ["java"]
+    assert result["results"]["python"]["success"] is True
+    assert result["results"]["java"]["success"] is False
+    assert result["total_tests"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pynguin_collects_only_its_own_output(tmp_path):
+    """Pynguin 只从自己的输出目录收集测试文件，不包含其他策略写入 tests 的文件"""
+    from agents.test_generation_agent.generators.python_generator import PYNGUIN_OUTPUT_DIR, PythonTestGenerator
+
+    tests_dir = tmp_path / "tests"
+    tests_dir.mkdir()
+    (tests_dir / "test_from_llm.py").write_text("def test_llm():\n    pass\n", encoding="utf-8")
+    stale = tests_dir / PYNGUIN_OUTPUT_DIR
+    stale.mkdir()
+    (stale / "test_stale.py").write_text("", encoding="utf-8")
+
+    generator = PythonTestGenerator({"use_llm": False})
+
+    async def fake_local(project_path, output_dir):
+        (output_dir / "test_generated.py").write_text("def test_generated():\n    pass\n", encoding="utf-8")
+        return {"success": True, "test_files": sorted(p.name for p in output_dir.glob("test_*.py"))}
+
+    generator._generate_with_pynguin_local = fake_local
+    result = await generator._generate_with_pynguin(str(tmp_path), tests_dir)
+    assert result["test_files"] == ["test_generated.py"]
@@ -173,7 +173,9 @@ class TestValidationAgent(BaseAgent):
                     # 将普通Python文件转换为测试文件名
                     target_file = f"test_{target_file}"
             
-            unit_results = await self.unit_tester.run_tests(project_path, target_file)
+            unit_results = await self.unit_tester.run_tests(
+                project_path, target_file, full_run=test_options.get("full_test_run", False)
+            )
             validation_result["test_results"]["unit"] = unit_results
             
             # 添加AI生成信息到结果中
@@ -193,8 +195,10 @@ class TestValidationAgent(BaseAgent):
             validation_result["performance_metrics"] = performance_results
 
             # 计算代码覆盖率
-            coverage = await self.unit_tester.calculate_coverage(project_path)
+            coverage_report = await self.unit_tester.measure_coverage(project_path)
+            coverage = int(coverage_report["percent"])
             validation_result["coverage"] = coverage
+            validation_result["coverage_report"] = coverage_report
 
             # 判断验证是否通过
             validation_result["passed"] = (
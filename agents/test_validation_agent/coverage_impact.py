@@ -0,0 +1,426 @@
+"""
+变更感知的测试选择
+第一次完整运行测试时记录逐测试的行覆盖（coverage.py 动态上下文，上下文为测试ID），保存为
+“文件:行 -> 测试”的映射，同时保存当时各源码文件的逐行哈希（快照）和导入时执行的行（模块级语句）。
+之后的验证把当前源码与快照比较得到修复改动的行，只运行覆盖这些行的测试：
+- 改动的是模块级语句时（导入时执行，覆盖率只记在收集阶段而不是某个测试上），纳入执行过该文件
+  任意一行的测试，以及导入了该模块的测试文件
+- 改动 conftest.py 时运行完整测试；新增的测试文件整体运行
+- 每隔 full_run_interval 次选择性运行强制完整运行一次并重建映射，作为安全网
+- 快照推进时（完整运行或增量重新测量）记录失败测试所在的测试文件，之后每次选择都重新运行它们，
+  避免修复失败的改动被吸收进快照后不再被测试；运行没有通过却没有逐测试结果（收集错误、超时）时不推进快照
+
+映射对应的 coverage 数据文件同样按项目保存：源码改动后只重新测量执行过改动文件的测试，
+清除这些文件的旧数据后合并新数据，再从合并后的数据得到总计、文件和函数级的覆盖率。
+"""
+
+import ast
+import difflib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from utils.sqlite_lru import DEFAULT_CACHE_ROOT
+
+logger = logging.getLogger(__name__)
+
+IMPACT_MAP_VERSION = 1
+# 映射中表示“测试之外执行”（收集阶段的导入）的测试序号
+IMPORT_CONTEXT = -1
+SKIP_DIRS = {
+    ".git", "__pycache__", ".venv", "venv", "env", "node_modules", "site-packages",
+    ".tox", ".nox", ".pytest_cache", ".mypy_cache", "build", "dist",
+}
+
+
+def scan_sources(project_path: str) -> Dict[str, str]:
+    """项目中的全部 Python 源码：相对路径（/ 分隔）-> 内容"""
+    sources: Dict[str, str] = {}
+    for root, dirs, files in os.walk(project_path):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.endswith(".egg-info")]
+        for name in files:
+            if not name.endswith(".py"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                    sources[Path(os.path.relpath(path, project_path)).as_posix()] = f.read()
+            except OSError:
+                continue
+    return sources
+
+
+def line_hashes(source: str) -> List[str]:
+    return [hashlib.sha1(line.rstrip().encode("utf-8")).hexdigest()[:12] for line in source.splitlines()]
+
+
+def import_time_lines(source: str) -> Set[int]:
+    """导入时执行的行：函数体之外的全部行（类体、装饰器、默认参数都在导入时执行）；无法解析时视为全部"""
+    total = len(source.splitlines())
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return set(range(1, total + 1))
+    body_lines: Set[int] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.body[0].lineno > node.lineno:
+            body_lines.update(range(node.body[0].lineno, (node.end_lineno or node.lineno) + 1))
+    return set(range(1, total + 1)) - body_lines
+
+
+def changed_lines(old_hashes: List[str], new_hashes: List[str], import_lines: Set[int]) -> Set[int]:
+    """
+    快照中被修改或删除的行（旧行号）
+
+    插入的行映射到插入位置相邻的旧行，优先取函数体内的行，使在函数体开头插入代码不被当作模块级改动。
+    """
+    changed: Set[int] = set()
+    matcher = difflib.SequenceMatcher(None, old_hashes, new_hashes, autojunk=False)
+    for tag, i1, i2, _, _ in matcher.get_opcodes():
+        if tag in ("replace", "delete"):
+            changed.update(range(i1 + 1, i2 + 1))
+        elif tag == "insert":
+            neighbours = [line for line in (i1, i1 + 1) if 1 <= line <= len(old_hashes)]
+            inner = [line for line in neighbours if line not in import_lines]
+            changed.update(inner or neighbours or [1])
+    return changed
+
+
+def module_name(rel_path: str) -> str:
+    name = rel_path[:-3] if rel_path.endswith(".py") else rel_path
+    if name.endswith("/__init__"):
+        name = name[:-len("/__init__")]
+    return name.replace("/", ".")
+
+
+def imported_modules(source: str) -> Set[str]:
+    """源码中导入的模块名（from a import b 同时记录 a 和 a.b，b 可能是子模块）"""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return set()
+    names: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if base:
+                names.add(base)
+            names.update(f"{base}.{alias.name}" if base else alias.name for alias in node.names)
+    return names
+
+
+def imports_module(imported: Iterable[str], dotted: str) -> bool:
+    """导入名是否指向该模块：允许以项目内某个子目录为导入根（如 src/ 布局或测试目录加入 sys.path）"""
+    return any(
+        name == dotted or dotted.endswith("." + name) or name.startswith(dotted + ".")
+        for name in imported
+    )
+
+
+def is_test_file(rel_path: str) -> bool:
+    name = os.path.basename(rel_path)
+    return name.startswith("test_") or name.endswith("_test.py")
+
+
+def failed_test_files(result: Dict[str, Any]) -> Optional[List[str]]:
+    """运行结果中失败测试所在的测试文件；没有通过却没有逐测试的失败（收集错误、超时等）时返回 None"""
+    files = sorted({failure["nodeid"].split("::")[0] for failure in result.get("failures", [])})
+    if not files and not result.get("passed"):
+        return None
+    return files
+
+
+def full_selection(reason: str, changed_files: Optional[Dict[str, Optional[int]]] = None) -> Dict[str, Any]:
+    return {"mode": "full", "reason": reason, "tests": [], "changed_files": changed_files or {}}
+
+
+class CoverageImpactMap:
+    """按项目保存的逐测试覆盖映射与源码快照（本地缓存目录中的 JSON 文件）"""
+
+    def __init__(self, project_path: str, cache_dir: Optional[str] = None):
+        self.project_path = project_path
+        cache_dir = Path(cache_dir or os.getenv("TEST_IMPACT_CACHE_DIR") or DEFAULT_CACHE_ROOT / "test_impact")
+        key = hashlib.sha1(str(Path(project_path).resolve()).encode("utf-8")).hexdigest()[:16]
+        self.path = cache_dir / f"{key}.json"
+        # 与映射对应同一源码快照的 coverage 数据（上下文为测试ID）
+        self.coverage_path = cache_dir / f"{key}.coverage"
+        self.tests: List[str] = []
+        # 文件 -> {"hashes": 逐行哈希, "import_lines": 模块级行, "lines": {行号: [测试序号]}}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        # 没有被执行过的 Python 文件 -> 内容哈希（用于发现对它们的改动）
+        self.unmeasured: Dict[str, str] = {}
+        # 快照推进时仍有失败测试的测试文件（每次选择都会重新运行）
+        self.failed: List[str] = []
+        self.selective_runs = 0
+        self.recorded_at: Optional[float] = None
+        self.load()
+
+    @property
+    def available(self) -> bool:
+        return bool(self.tests)
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != IMPACT_MAP_VERSION:
+            return
+        self.tests = data.get("tests", [])
+        self.files = data.get("files", {})
+        self.unmeasured = data.get("unmeasured", {})
+        self.failed = data.get("failed", [])
+        self.selective_runs = data.get("selective_runs", 0)
+        self.recorded_at = data.get("recorded_at")
+
+    def save(self):
+        data = {
+            "version": IMPACT_MAP_VERSION,
+            "tests": self.tests,
+            "files": self.files,
+            "unmeasured": self.unmeasured,
+            "failed": self.failed,
+            "selective_runs": self.selective_runs,
+            "recorded_at": self.recorded_at,
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"保存测试影响映射失败: {e}")
+
+    def store_coverage(self, coverage_file: str, failed: Iterable[str] = ()):
+        """保存一次完整运行的 coverage 数据并据此重建映射；failed 为这次运行中有失败测试的测试文件"""
+        self.coverage_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(coverage_file, self.coverage_path)
+        self.rebuild(str(self.coverage_path))
+        self.failed = sorted(failed)
+
+    def merge_coverage(
+        self,
+        fresh_file: Optional[str],
+        changed_files: Iterable[str],
+        failed: Iterable[str] = ()
+    ) -> bool:
+        """
+        清除改动文件的旧 coverage 数据，合并重新测量的数据，并按合并结果刷新映射和快照
+
+        failed 为重新测量时有失败测试的测试文件（上次失败的测试文件总会被重新测量，因此直接替换）
+
+        Returns:
+            False 表示无法增量合并（没有已保存的数据，或 coverage 版本不支持 purge_files），需要完整运行
+        """
+        from coverage import CoverageData
+
+        if not self.coverage_path.exists():
+            return False
+        stored = CoverageData(basename=str(self.coverage_path))
+        if not hasattr(stored, "purge_files"):
+            return False
+        stored.read()
+        root = os.path.abspath(self.project_path)
+        changed = set(changed_files)
+        stale = [
+            measured for measured in stored.measured_files()
+            if Path(os.path.relpath(measured, root)).as_posix() in changed
+        ]
+        if stale:
+            stored.purge_files(stale)
+        if fresh_file:
+            fresh = CoverageData(basename=fresh_file)
+            fresh.read()
+            stored.update(fresh)
+        stored.write()
+        self.rebuild(str(self.coverage_path), reset_runs=False)
+        self.failed = sorted(failed)
+        return True
+
+    def rebuild(self, coverage_file: str, reset_runs: bool = True):
+        """从以测试ID为动态上下文的覆盖率数据重建映射，并以当前源码作为快照"""
+        from coverage import CoverageData
+
+        data = CoverageData(basename=coverage_file)
+        data.read()
+        sources = scan_sources(self.project_path)
+        root = os.path.abspath(self.project_path)
+        tests: Dict[str, int] = {}
+        files: Dict[str, Dict[str, Any]] = {}
+        for measured in data.measured_files():
+            rel = Path(os.path.relpath(measured, root)).as_posix()
+            if rel not in sources:
+                continue
+            lines: Dict[str, List[int]] = {}
+            for lineno, contexts in (data.contexts_by_lineno(measured) or {}).items():
+                ids = {tests.setdefault(context, len(tests)) if context else IMPORT_CONTEXT for context in contexts}
+                lines[str(lineno)] = sorted(ids)
+            files[rel] = {
+                "hashes": line_hashes(sources[rel]),
+                "import_lines": sorted(import_time_lines(sources[rel])),
+                "lines": lines,
+            }
+
+        self.tests = sorted(tests, key=tests.get)
+        self.files = files
+        self.unmeasured = {
+            rel: hashlib.sha1(text.encode("utf-8")).hexdigest()
+            for rel, text in sources.items() if rel not in files
+        }
+        if reset_runs:
+            self.selective_runs = 0
+            self.recorded_at = time.time()
+
+    def select(self, full_run_interval: int = 10, whole_files: bool = False) -> Dict[str, Any]:
+        """
+        根据当前源码与快照的差异选择测试
+
+        Args:
+            full_run_interval: 连续选择性运行达到该次数时要求完整运行（0 表示不限制）
+            whole_files: 选择执行过改动文件任意一行的测试（重新测量覆盖率时，改动文件的数据会整体替换）
+
+        Returns:
+            mode: full（需要完整运行）/ selective
+            reason: 选择原因
+            tests: pytest 目标（测试ID、新增的测试文件和上次失败的测试文件），selective 时可能为空
+            changed_files: 改动的文件 -> 改动行数（文件被删除时为 None）
+        """
+        if not self.available:
+            return full_selection("尚未记录逐测试覆盖")
+        if full_run_interval and self.selective_runs >= full_run_interval:
+            return full_selection(f"已连续 {self.selective_runs} 次选择性运行，定期完整运行")
+
+        sources = scan_sources(self.project_path)
+        selected: Set[int] = set()
+        targets: Set[str] = set()
+        changed_files: Dict[str, Optional[int]] = {}
+        module_level: List[str] = []
+
+        for rel in sorted(set(self.files) | set(self.unmeasured) | set(sources)):
+            text = sources.get(rel)
+            record = self.files.get(rel)
+            if record is None:
+                digest = hashlib.sha1(text.encode("utf-8")).hexdigest() if text is not None else None
+                if rel in self.unmeasured and digest == self.unmeasured[rel]:
+                    continue
+                # 新增或没有被执行过的文件：现有测试不会执行其中的代码，除非它是测试文件本身
+                changed_files[rel] = None if text is None else len(text.splitlines())
+                if os.path.basename(rel) == "conftest.py":
+                    return full_selection(f"{rel} 发生改动", changed_files)
+                if text is not None and is_test_file(rel):
+                    targets.add(rel)
+                continue
+
+            if text is None:
+                lines = None
+            else:
+                lines = changed_lines(record["hashes"], line_hashes(text), set(record["import_lines"]))
+                if not lines:
+                    continue
+            changed_files[rel] = None if lines is None else len(lines)
+            if os.path.basename(rel) == "conftest.py":
+                return full_selection(f"{rel} 发生改动", changed_files)
+
+            import_lines = set(record["import_lines"])
+            covering = record["lines"]
+            module_change = lines is None or any(
+                line in import_lines or IMPORT_CONTEXT in covering.get(str(line), []) for line in lines
+            )
+            if module_change:
+                module_level.append(rel)
+            if module_change or whole_files:
+                for ids in covering.values():
+                    selected.update(ids)
+            else:
+                for line in lines:
+                    selected.update(covering.get(str(line), []))
+
+        if module_level:
+            targets.update(self._importing_test_files(module_level, sources))
+        rerun = {test_file for test_file in self.failed if test_file in sources}
+        targets.update(rerun)
+
+        selected.discard(IMPORT_CONTEXT)
+        tests = [
+            self.tests[index] for index in sorted(selected)
+            if index < len(self.tests) and self.tests[index].split("::")[0] not in targets
+        ]
+        reason = f"修复改动了 {len(changed_files)} 个文件" if changed_files else "没有检测到源码改动"
+        if rerun:
+            reason += f"，重新运行上次失败的 {len(rerun)} 个测试文件"
+        return {
+            "mode": "selective",
+            "reason": reason,
+            "tests": tests + sorted(targets),
+            "changed_files": changed_files,
+            "module_level_changes": module_level,
+        }
+
+    def _importing_test_files(self, modules: List[str], sources: Dict[str, str]) -> Set[str]:
+        """导入了这些模块的测试文件（模块级语句只在第一次导入时执行，覆盖率无法归属到具体测试）"""
+        test_files = {test.split("::")[0] for test in self.tests}
+        dotted = [module_name(rel) for rel in modules]
+        result = set()
+        for test_file in test_files:
+            source = sources.get(test_file)
+            if source is None:
+                continue
+            imported = imported_modules(source)
+            if any(imports_module(imported, name) for name in dotted):
+                result.add(test_file)
+        return result
+
+
+def coverage_report(coverage_file: str, project_path: str) -> Dict[str, Any]:
+    """
+    用 coverage.py 的 JSON 报告汇总覆盖率
+
+    Returns:
+        percent: 总覆盖率；totals: 总计；files: 文件 -> 覆盖率、语句数、未覆盖行和函数级覆盖率
+    """
+    from coverage import Coverage
+
+    root = os.path.abspath(project_path)
+    cov = Coverage(data_file=coverage_file, config_file=False)
+    cov.load()
+    with tempfile.TemporaryDirectory(prefix="coverage_json_") as tmp_dir:
+        output = os.path.join(tmp_dir, "coverage.json")
+        try:
+            cov.json_report(outfile=output, include=[os.path.join(root, "*")], ignore_errors=True)
+            with open(output, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"生成覆盖率报告失败: {e}")
+            return {"percent": 0.0, "totals": {}, "files": {}}
+
+    files: Dict[str, Dict[str, Any]] = {}
+    for name, entry in data.get("files", {}).items():
+        path = name if os.path.isabs(name) else os.path.join(os.getcwd(), name)
+        summary = entry.get("summary", {})
+        files[Path(os.path.relpath(path, root)).as_posix()] = {
+            "percent": summary.get("percent_covered", 0.0),
+            "covered_lines": summary.get("covered_lines", 0),
+            "num_statements": summary.get("num_statements", 0),
+            "missing_lines": entry.get("missing_lines", []),
+            "functions": {
+                function: {
+                    "percent": info["summary"].get("percent_covered", 0.0),
+                    "covered_lines": info["summary"].get("covered_lines", 0),
+                    "num_statements": info["summary"].get("num_statements", 0),
+                    "start_line": info.get("start_line"),
+                }
+                for function, info in entry.get("functions", {}).items() if function
+            },
+        }
+    totals = data.get("totals", {})
+    return {"percent": totals.get("percent_covered", 0.0), "totals": totals, "files": files}
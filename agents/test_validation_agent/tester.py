@@ -3,15 +3,24 @@
 """
 
 import asyncio
+import importlib.util
 import json
 import os
 import subprocess
+import tempfile
 from typing import Dict, Any
 
+from utils.pytest_sharding import ShardedPytestRunner
+from .coverage_impact import CoverageImpactMap, coverage_report, failed_test_files, full_selection
+
 
 class UnitTester:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
+        self.pytest_runner = ShardedPytestRunner(config)
+        # 变更感知的测试选择：只运行覆盖了修复改动的测试，每隔若干次完整运行一次
+        self.impact_selection = config.get("test_impact_selection", True)
+        self.full_run_interval = config.get("full_test_run_interval", 10)
 
     async def generate_tests_with_ai(self, project_path: str, fix_result: Dict[str, Any] | None) -> None:
         # 预留：可调用外部AI服务生成测试；此处写入占位文件以标记
@@ -22,14 +31,23 @@ class UnitTester:
         with open(meta_path, "w", encoding="utf-8") as f:
             json.dump(payload, f, ensure_ascii=False, indent=2)
 
-    async def run_tests(self, project_path: str, target_file: str = None) -> Dict[str, Any]:
+    async def run_tests(self, project_path: str, target_file: str = None, full_run: bool = False) -> Dict[str, Any]:
         """
         运行测试
         Args:
             project_path: 项目路径
             target_file: 目标测试文件（可选），如果指定则只测试该文件
+            full_run: 不做测试选择，运行完整测试（并重建测试影响映射）
         """
-        # 优先使用 pytest
+        # 优先使用分片并行的 pytest（结果包含逐个测试的结构化结果）
+        if self.config.get("parallel_tests", True) and importlib.util.find_spec("pytest") is not None:
+            if target_file:
+                return await self.pytest_runner.run(project_path, [target_file])
+            if self.impact_selection:
+                return await self._run_impacted_tests(project_path, full_run)
+            return await self.pytest_runner.run(project_path)
+
+        # 直接运行 pytest
         try:
             if target_file:
                 # 如果指定了目标文件，只测试该文件
@@ -82,44 +100,111 @@ class UnitTester:
                 "stderr": stderr.decode("utf-8", errors="ignore").strip(),
             }
 
+    async def _run_impacted_tests(self, project_path: str, full_run: bool = False) -> Dict[str, Any]:
+        """按测试影响映射运行测试；需要完整运行时在 coverage 下运行并重建映射"""
+        impact = CoverageImpactMap(project_path, self.config.get("test_impact_cache_dir"))
+        if full_run:
+            selection = full_selection("请求完整运行")
+        else:
+            selection = await asyncio.to_thread(impact.select, self.full_run_interval)
+
+        if selection["mode"] == "full":
+            result = await self._run_with_coverage(project_path, impact)
+        elif not selection["tests"]:
+            result = {
+                "passed": True,
+                "skipped": True,
+                "returncode": 0,
+                "stdout": "",
+                "stderr": "",
+                "message": "改动的代码没有被任何测试覆盖，跳过单元测试",
+                "summary": {"passed": 0, "skipped": 0, "failed": 0, "error": 0, "total": 0},
+                "tests": [],
+                "failures": [],
+            }
+        else:
+            result = await self.pytest_runner.run(project_path, selection["tests"])
+            impact.selective_runs += 1
+            impact.save()
+
+        result["test_selection"] = {
+            "mode": selection["mode"],
+            "reason": selection["reason"],
+            "selected_tests": len(selection["tests"]),
+            "total_tests": len(impact.tests),
+            "changed_files": selection["changed_files"],
+        }
+        return result
+
+    async def _run_with_coverage(self, project_path: str, impact: CoverageImpactMap) -> Dict[str, Any]:
+        """在 coverage 下完整运行测试（以测试ID为上下文），保存数据并重建测试影响映射"""
+        with tempfile.TemporaryDirectory(prefix="test_impact_") as tmp_dir:
+            result = await self.pytest_runner.run(project_path, coverage_file=os.path.join(tmp_dir, ".coverage"))
+            failed = failed_test_files(result)
+            if result.get("coverage_file") and failed is not None:
+                await asyncio.to_thread(impact.store_coverage, result["coverage_file"], failed)
+                impact.save()
+        return result
+
+    async def measure_coverage(self, project_path: str) -> Dict[str, Any]:
+        """
+        计算覆盖率（总计、文件级和函数级，数据来自 coverage.py 的 JSON 报告）
+
+        每个项目保存一份与源码快照对应的逐测试覆盖数据：没有数据时完整运行一次；
+        之后只重新测量执行过改动文件的测试（以及上次失败的测试文件），替换这些文件的数据，无需重跑整个测试套件；
+        重新测量没有得到逐测试结果时保留原有数据和快照（mode 为 stale），下次再重新测量。
+        """
+        if importlib.util.find_spec("coverage") is None or importlib.util.find_spec("pytest") is None:
+            return {"percent": await self._estimate_coverage_simple(project_path), "mode": "estimated", "files": {}}
+
+        impact = CoverageImpactMap(project_path, self.config.get("test_impact_cache_dir"))
+        selection = await asyncio.to_thread(impact.select, self.full_run_interval, True)
+        if selection["mode"] != "full" and not impact.coverage_path.exists():
+            selection = full_selection("没有已保存的覆盖率数据")
+
+        mode = "cached"
+        if selection["mode"] == "full":
+            await self._run_with_coverage(project_path, impact)
+            mode = "full"
+        elif selection["changed_files"] or selection["tests"]:
+            changed = list(selection["changed_files"])
+            if selection["tests"]:
+                with tempfile.TemporaryDirectory(prefix="test_impact_") as tmp_dir:
+                    result = await self.pytest_runner.run(
+                        project_path, selection["tests"], coverage_file=os.path.join(tmp_dir, ".coverage")
+                    )
+                    failed = failed_test_files(result)
+                    if result.get("coverage_file") and failed is not None:
+                        merged = await asyncio.to_thread(
+                            impact.merge_coverage, result["coverage_file"], changed, failed
+                        )
+                    else:
+                        # 没有得到逐测试结果（收集错误、超时）：保留原有数据和快照，下次再重新测量
+                        merged, mode = True, "stale"
+            else:
+                merged = await asyncio.to_thread(impact.merge_coverage, None, changed)
+            if not merged:
+                await self._run_with_coverage(project_path, impact)
+                mode = "full"
+            elif mode != "stale":
+                impact.save()
+                mode = "incremental"
+
+        if not impact.coverage_path.exists():
+            return {"percent": await self._estimate_coverage_simple(project_path), "mode": "estimated", "files": {}}
+        report = await asyncio.to_thread(coverage_report, str(impact.coverage_path), project_path)
+        report.update({
+            "mode": mode,
+            "reason": selection["reason"],
+            "changed_files": selection["changed_files"],
+            "remeasured_tests": len(selection["tests"]) if mode == "incremental" else None,
+        })
+        return report
+
     async def calculate_coverage(self, project_path: str) -> int:
-        # 使用 coverage 进行简单覆盖率计算（行覆盖率近似）
-        try:
-            # 首先尝试使用 coverage 工具
-            run_proc = await asyncio.create_subprocess_exec(
-                "coverage", "run", "-m", "pytest", "-q",
-                cwd=project_path,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            await run_proc.communicate()
-
-            report_proc = await asyncio.create_subprocess_exec(
-                "coverage", "report",
-                cwd=project_path,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            stdout, _ = await report_proc.communicate()
-            text = stdout.decode("utf-8", errors="ignore")
-            # 简单解析最后一行的 TOTAL 百分比
-            percent = 0
-            for line in text.splitlines():
-                if line.strip().startswith("TOTAL"):
-                    parts = [p for p in line.split(" ") if p]
-                    if parts and parts[-1].endswith("%"):
-                        try:
-                            percent = int(float(parts[-1].strip("%")))
-                        except Exception:
-                            percent = 0
-            return int(percent)
-        except FileNotFoundError:
-            # 如果没有 coverage 工具，使用简化的覆盖率估算
-            return await self._estimate_coverage_simple(project_path)
-        except Exception:
-            # 其他错误也使用简化估算
-            return await self._estimate_coverage_simple(project_path)
-    
+        report = await self.measure_coverage(project_path)
+        return int(report["percent"])
+
     async def _estimate_coverage_simple(self, project_path: str) -> int:
         """简化的覆盖率估算（当没有coverage工具时使用）"""
         try:
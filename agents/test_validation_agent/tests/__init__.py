@@ -0,0 +1,3 @@
+"""
+TestValidationAgent测试模块
+"""
@@ -0,0 +1,200 @@
+"""
+变更感知测试选择测试（在生成的小项目上用 coverage 记录逐测试覆盖）
+"""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("coverage")
+
+from agents.test_validation_agent.coverage_impact import changed_lines, import_time_lines, line_hashes
+from agents.test_validation_agent.tester import UnitTester
+
+CALC = '''RATE = 2
+
+
+def add(a, b):
+    return a + b
+
+
+def mul(a, b):
+    total = a * b
+    return total
+'''
+
+TESTS = {
+    "tests/test_add.py": "from calc import add\n\n\ndef test_add():\n    assert add(1, 2) == 3\n",
+    "tests/test_mul.py": "from calc import mul\n\n\ndef test_mul():\n    assert mul(2, 3) == 6\n\n\ndef test_mul_zero():\n    assert mul(0, 3) == 0\n",
+    "tests/test_rate.py": "from calc import RATE\n\n\ndef test_rate():\n    assert RATE == 2\n",
+}
+
+
+@pytest.fixture
+def project(tmp_path: Path) -> Path:
+    root = tmp_path / "project"
+    (root / "tests").mkdir(parents=True)
+    (root / "calc.py").write_text(CALC, encoding="utf-8")
+    (root / "conftest.py").write_text("import sys, os\nsys.path.insert(0, os.path.dirname(__file__))\n", encoding="utf-8")
+    for name, text in TESTS.items():
+        (root / name).write_text(text, encoding="utf-8")
+    return root
+
+
+@pytest.fixture
+def tester(tmp_path: Path, monkeypatch) -> UnitTester:
+    monkeypatch.setenv("PYTEST_DISABLE_PLUGIN_AUTOLOAD", "1")
+    return UnitTester({
+        "test_workers": 2,
+        "test_backend": "subprocess",
+        "full_test_run_interval": 3,
+        "test_duration_cache_dir": str(tmp_path / "durations"),
+        "test_impact_cache_dir": str(tmp_path / "impact"),
+    })
+
+
+def edit(path: Path, old: str, new: str):
+    path.write_text(path.read_text(encoding="utf-8").replace(old, new), encoding="utf-8")
+
+
+def run(tester: UnitTester, project: Path, **kwargs):
+    return asyncio.run(tester.run_tests(str(project), **kwargs))
+
+
+def test_import_time_lines_exclude_function_bodies():
+    lines = import_time_lines(CALC)
+    assert {1, 4, 8} <= lines
+    assert not {5, 9, 10} & lines
+
+
+def test_changed_lines_maps_insertions_into_function_body():
+    old = CALC.splitlines()
+    new = old[:8] + ["    a = abs(a)"] + old[8:]
+    assert changed_lines(line_hashes(CALC), line_hashes("\n".join(new)), import_time_lines(CALC)) == {9}
+
+    new = ["RATE = 3"] + old[1:]
+    assert changed_lines(line_hashes(CALC), line_hashes("\n".join(new)), import_time_lines(CALC)) == {1}
+
+
+def test_selects_only_tests_covering_changed_lines(project, tester):
+    first = run(tester, project)
+    assert first["test_selection"]["mode"] == "full"
+    assert first["passed"] is True
+    assert first["test_selection"]["total_tests"] == 4
+
+    unchanged = run(tester, project)
+    assert unchanged["skipped"] is True
+    assert unchanged["test_selection"]["selected_tests"] == 0
+
+    edit(project / "calc.py", "    total = a * b", "    total = a * b + 1")
+    result = run(tester, project)
+    assert result["test_selection"]["mode"] == "selective"
+    assert result["test_selection"]["changed_files"] == {"calc.py": 1}
+    assert sorted(test["nodeid"] for test in result["tests"]) == [
+        "tests/test_mul.py::test_mul", "tests/test_mul.py::test_mul_zero",
+    ]
+    assert result["passed"] is False
+
+
+def test_module_level_change_includes_importing_tests(project, tester):
+    run(tester, project)
+
+    edit(project / "calc.py", "RATE = 2", "RATE = 3")
+    result = run(tester, project)
+
+    assert result["test_selection"]["mode"] == "selective"
+    nodeids = {test["nodeid"] for test in result["tests"]}
+    assert "tests/test_rate.py::test_rate" in nodeids
+    assert result["failures"][0]["nodeid"] == "tests/test_rate.py::test_rate"
+
+
+def test_new_test_file_runs_alone(project, tester):
+    run(tester, project)
+
+    (project / "tests" / "test_new.py").write_text("def test_new():\n    assert True\n", encoding="utf-8")
+    result = run(tester, project)
+
+    assert [test["nodeid"] for test in result["tests"]] == ["tests/test_new.py::test_new"]
+
+
+def test_full_run_safety_net(project, tester):
+    run(tester, project)
+
+    edit(project / "conftest.py", "import sys, os", "import os, sys")
+    assert run(tester, project)["test_selection"]["mode"] == "full"
+
+    for i in range(3):
+        edit(project / "calc.py", f"return a + b{' + 0' * i}", f"return a + b{' + 0' * (i + 1)}")
+        assert run(tester, project)["test_selection"]["mode"] == "selective"
+    edit(project / "calc.py", "return total", "return total + 0")
+    periodic = run(tester, project)
+    assert periodic["test_selection"]["mode"] == "full"
+    assert periodic["summary"]["total"] == 4
+
+    assert run(tester, project, full_run=True)["test_selection"]["reason"] == "请求完整运行"
+
+
+def test_coverage_is_remeasured_incrementally(project, tester, tmp_path):
+    first = asyncio.run(tester.measure_coverage(str(project)))
+    assert first["mode"] == "full"
+    assert set(first["files"]["calc.py"]["functions"]) == {"add", "mul"}
+    assert first["files"]["calc.py"]["percent"] == 100.0
+
+    assert asyncio.run(tester.measure_coverage(str(project)))["mode"] == "cached"
+
+    edit(project / "calc.py", "    total = a * b\n", "    total = a * b\n    if total < 0:\n        total = -total\n")
+    incremental = asyncio.run(tester.measure_coverage(str(project)))
+    assert incremental["mode"] == "incremental"
+    # 只重新测量执行过 calc.py 的测试（test_rate 只在导入时用到它）
+    assert incremental["remeasured_tests"] == 3
+    mul = incremental["files"]["calc.py"]["functions"]["mul"]
+    assert (mul["covered_lines"], mul["num_statements"]) == (3, 4)
+    assert incremental["files"]["calc.py"]["missing_lines"] == [11]
+
+    # 与重新完整测量的结果一致
+    fresh = UnitTester({**tester.config, "test_impact_cache_dir": str(tmp_path / "fresh")})
+    full = asyncio.run(fresh.measure_coverage(str(project)))
+    assert full["mode"] == "full"
+    assert full["files"] == incremental["files"]
+    assert full["percent"] == pytest.approx(incremental["percent"])
+
+
+def test_failed_tests_are_reselected_after_snapshot_advances(project, tester):
+    first = asyncio.run(tester.measure_coverage(str(project)))
+    assert first["mode"] == "full"
+
+    # 错误的修复：重新测量时 test_mul 失败，快照随之推进
+    edit(project / "calc.py", "    total = a * b", "    total = a * b + 1")
+    assert asyncio.run(tester.measure_coverage(str(project)))["mode"] == "incremental"
+
+    # 没有新的改动，但上次失败的测试文件仍会被选中，而不是跳过
+    result = run(tester, project)
+    assert "上次失败" in result["test_selection"]["reason"]
+    assert result["passed"] is False
+    assert {test["nodeid"] for test in result["tests"]} == {
+        "tests/test_mul.py::test_mul", "tests/test_mul.py::test_mul_zero",
+    }
+
+    # 修正后重新测量，失败记录清空，之后不再重复运行
+    edit(project / "calc.py", "    total = a * b + 1", "    total = a * b")
+    assert asyncio.run(tester.measure_coverage(str(project)))["mode"] == "incremental"
+    assert run(tester, project)["skipped"] is True
+
+
+def test_remeasure_without_per_test_results_keeps_snapshot(project, tester, monkeypatch):
+    asyncio.run(tester.measure_coverage(str(project)))
+    edit(project / "calc.py", "    total = a * b", "    total = a * b + 1")
+
+    async def timed_out(project_path, targets=None, coverage_file=None):
+        return {"passed": False, "returncode": -1, "failures": [], "coverage_file": None}
+
+    real_run = tester.pytest_runner.run
+    monkeypatch.setattr(tester.pytest_runner, "run", timed_out)
+    assert asyncio.run(tester.measure_coverage(str(project)))["mode"] == "stale"
+
+    # 快照没有推进：下次仍会检测到 calc.py 的改动并重新测量
+    monkeypatch.setattr(tester.pytest_runner, "run", real_run)
+    remeasured = asyncio.run(tester.measure_coverage(str(project)))
+    assert remeasured["mode"] == "incremental"
+    assert remeasured["changed_files"] == {"calc.py": 1}
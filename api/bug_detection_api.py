@@ -15,13 +15,16 @@ from datetime import datetime
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 
-from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks, Query
+from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks, Query, Request, Response
 from pydantic import BaseModel, Field
 
 # 添加项目根目录到Python路径
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
+from utils.artifact_store import Artifact, get_artifact_store, if_none_match_matches
+from api.core.tenant import tenant_of
+
 # 数据模型
 class BaseResponse(BaseModel):
     """基础响应模型"""
@@ -73,6 +76,7 @@ async def health_check():
 
 @router.post("/api/v1/detection/upload", response_model=BaseResponse)
 async def upload_file_for_detection(
+    request: Request,
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     enable_static: bool = Query(True, description="启用自定义静态检测"),
@@ -113,10 +117,11 @@ async def upload_file_for_detection(
             detail=f"不支持的文件类型。支持的类型: {', '.join(supported_extensions)}"
         )
     
-    # 保存文件
-    upload_dir = Path("uploads")
-    upload_dir.mkdir(exist_ok=True)
-    file_path = upload_dir / f"{file.filename}"
+    # 保存文件（每次上传使用独立目录，并发上传同名文件不会相互覆盖）
+    upload_id = f"upload_{uuid.uuid4().hex[:12]}"
+    upload_dir = Path("uploads") / upload_id
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    file_path = upload_dir / Path(file.filename).name
     
     with open(file_path, "wb") as f:
         f.write(content)
@@ -156,7 +161,9 @@ async def upload_file_for_detection(
     
     try:
         # 通过协调中心创建 detect_bugs 任务并分配给 bug_detection_agent
-        task_id = await coordinator.create_task('detect_bugs', task_data)
+        # 每次上传是独立的工作流，按租户（X-Tenant-ID 请求头，缺省为客户端地址）公平共享Agent
+        task_id = await coordinator.create_task('detect_bugs', task_data,
+                                                workflow_id=upload_id, tenant_id=tenant_of(request))
         await coordinator.assign_task(task_id, 'bug_detection_agent')
 
         # 后台任务：基于协调中心的任务结果生成报告与结构化数据
@@ -170,7 +177,10 @@ async def upload_file_for_detection(
                 "filename": file.filename,
                 "file_size": file_size,
                 "agent_id": "bug_detection_agent",
-                "analysis_type": analysis_type
+                "analysis_type": analysis_type,
+                "workflow_id": upload_id,
+                # SSE 实时进度（阶段、工具完成、逐个缺陷）
+                "events_url": f"/api/v1/workflows/{upload_id}/events"
             }
         )
 
@@ -193,8 +203,14 @@ async def get_detection_rules():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取检测规则失败: {str(e)}")
 
+def _not_modified(request: Request, artifact: Artifact) -> Optional[Response]:
+    """客户端缓存的 ETag 与当前产物一致时返回 304 响应"""
+    if if_none_match_matches(request.headers.get("if-none-match"), artifact.etag):
+        return Response(status_code=304, headers={"ETag": artifact.etag})
+    return None
+
 @router.get("/api/v1/ai-reports/{task_id}")
-async def get_ai_report(task_id: str):
+async def get_ai_report(task_id: str, request: Request, response: Response):
     """获取AI生成的自然语言报告"""
     # 从管理器获取 coordinator
     coordinator = _coordinator_manager.coordinator if _coordinator_manager else None
@@ -208,65 +224,56 @@ async def get_ai_report(task_id: str):
         if task['status'].value != "completed":
             raise HTTPException(status_code=400, detail="任务尚未完成")
         
-        # 检查AI报告文件是否存在
-        ai_report_path = Path("reports") / f"ai_report_{task_id}.md"
-        
-        if ai_report_path.exists():
-            # 读取AI报告内容
-            with open(ai_report_path, 'r', encoding='utf-8') as f:
-                ai_report_content = f.read()
-            
-            return BaseResponse(
-                message="获取AI报告成功",
-                data={
-                    "task_id": task_id,
-                    "ai_report": ai_report_content,
-                    "report_type": "markdown"
-                }
-            )
-        else:
-            # 如果没有AI报告文件，实时生成一个
+        async def _generate() -> Optional[str]:
+            # 报告文件不存在时实时生成；并发请求同一报告只生成一次
             detection_results = (task.get('result') or {}).get("detection_results", {})
             file_path = (task.get('result') or {}).get("file_path", "")
-            
-            if detection_results:
-                ai_report = await generate_ai_report(detection_results, file_path)
-                
-                # 保存AI报告
-                ai_report_path.parent.mkdir(exist_ok=True)
-                with open(ai_report_path, 'w', encoding='utf-8') as f:
-                    f.write(ai_report)
-                
-                return BaseResponse(
-                    message="获取AI报告成功",
-                    data={
-                        "task_id": task_id,
-                        "ai_report": ai_report,
-                        "report_type": "markdown"
-                    }
-                )
-            else:
-                raise HTTPException(status_code=404, detail="检测结果不存在")
+            if not detection_results:
+                return None
+            return await generate_ai_report(detection_results, file_path)
+        
+        ai_report_path = Path("reports") / f"ai_report_{task_id}.md"
+        artifact = await get_artifact_store().get_or_generate(ai_report_path, _generate)
+        if artifact is None:
+            raise HTTPException(status_code=404, detail="检测结果不存在")
         
+        not_modified = _not_modified(request, artifact)
+        if not_modified:
+            return not_modified
+        response.headers["ETag"] = artifact.etag
+        return BaseResponse(
+            message="获取AI报告成功",
+            data={
+                "task_id": task_id,
+                "ai_report": artifact.text(),
+                "report_type": "markdown"
+            }
+        )
+        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取AI报告失败: {str(e)}")
 
 @router.get("/api/v1/ai-reports/{task_id}/download")
-async def download_ai_report(task_id: str):
+async def download_ai_report(task_id: str, request: Request):
     """下载AI报告文件"""
     try:
-        # 检查AI报告文件是否存在
         ai_report_path = Path("reports") / f"ai_report_{task_id}.md"
-        
-        if not ai_report_path.exists():
+        artifact = await get_artifact_store().read(ai_report_path)
+        if artifact is None:
             raise HTTPException(status_code=404, detail="AI报告文件不存在")
         
-        # 返回文件下载
-        from fastapi.responses import FileResponse
-        return FileResponse(
-            path=str(ai_report_path),
-            filename=f"ai_report_{task_id}.md",
-            media_type="text/markdown"
+        not_modified = _not_modified(request, artifact)
+        if not_modified:
+            return not_modified
+        return Response(
+            content=artifact.content,
+            media_type="text/markdown",
+            headers={
+                "ETag": artifact.etag,
+                "Content-Disposition": f'attachment; filename="ai_report_{task_id}.md"'
+            }
         )
         
     except HTTPException:
@@ -275,29 +282,32 @@ async def download_ai_report(task_id: str):
         raise HTTPException(status_code=500, detail=f"下载AI报告失败: {str(e)}")
 
 @router.get("/api/v1/structured-data/{task_id}", response_model=BaseResponse)
-async def get_structured_data(task_id: str):
+async def get_structured_data(task_id: str, request: Request, response: Response):
     """获取结构化数据给修复agent"""
     try:
-        # 检查结构化数据文件是否存在
         structured_file = Path("structured_data") / f"structured_data_{task_id}.json"
-        
-        if not structured_file.exists():
+        artifact = await get_artifact_store().read(structured_file)
+        if artifact is None:
             raise HTTPException(status_code=404, detail="结构化数据不存在")
         
-        # 读取结构化数据
-        with open(structured_file, 'r', encoding='utf-8') as f:
-            structured_data = json.load(f)
-        
+        not_modified = _not_modified(request, artifact)
+        if not_modified:
+            return not_modified
+        # 结构化数据可能较大，解析放到线程中执行
+        structured_data = await asyncio.to_thread(json.loads, artifact.content)
+        response.headers["ETag"] = artifact.etag
         return BaseResponse(
             message="获取结构化数据成功",
             data=structured_data
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取结构化数据失败: {str(e)}")
 
 @router.get("/api/v1/reports/{task_id}")
-async def download_report(task_id: str):
+async def download_report(task_id: str, request: Request):
     """下载检测报告"""
     # 从管理器获取实例
     coordinator = _coordinator_manager.coordinator if _coordinator_manager else None
@@ -314,66 +324,71 @@ async def download_report(task_id: str):
         if task['status'].value != "completed":
             raise HTTPException(status_code=400, detail="任务尚未完成")
         
-        # 生成报告
         detection_results = (task.get('result') or {}).get("detection_results", {})
         file_path = (task.get('result') or {}).get("file_path", "")
         
         if not detection_results:
             raise HTTPException(status_code=404, detail="检测结果不存在")
         
-        # 检查BugDetectionAgent是否有generate_downloadable_report方法
-        if hasattr(bug_detection_agent, 'generate_downloadable_report'):
-            report_path = await bug_detection_agent.generate_downloadable_report(detection_results, file_path)
-        else:
-            # 如果没有该方法，创建一个简化的报告
-            report_path = await create_simple_report(detection_results, file_path, task_id)
+        async def _generate() -> str:
+            # 检查BugDetectionAgent是否有build_downloadable_report方法
+            if hasattr(bug_detection_agent, 'build_downloadable_report'):
+                report_data = bug_detection_agent.build_downloadable_report(detection_results, file_path)
+            else:
+                # 如果没有该方法，创建一个简化的报告
+                report_data = _build_simple_report(detection_results, file_path, task_id)
+            return await asyncio.to_thread(json.dumps, report_data, ensure_ascii=False, indent=2)
         
-        if not report_path or not Path(report_path).exists():
+        # 每个任务的报告只生成一次，内容直接原子写入任务自己的路径，之后的下载直接复用
+        artifact = await get_artifact_store().get_or_generate(_report_path(task_id), _generate)
+        if artifact is None:
             raise HTTPException(status_code=404, detail="报告文件不存在")
         
-        # 返回文件
-        from fastapi.responses import FileResponse
-        return FileResponse(
-            path=report_path,
-            filename=f"bug_detection_report_{task_id}.json",
-            media_type="application/json"
+        not_modified = _not_modified(request, artifact)
+        if not_modified:
+            return not_modified
+        return Response(
+            content=artifact.content,
+            media_type="application/json",
+            headers={
+                "ETag": artifact.etag,
+                "Content-Disposition": f'attachment; filename="bug_detection_report_{task_id}.json"'
+            }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"下载报告失败: {str(e)}")
 
+def _report_path(task_id: str) -> Path:
+    """任务的可下载报告路径（每个任务一个文件，不依赖生成时间）"""
+    return Path("reports") / f"bug_detection_report_{task_id}.json"
+
+def _build_simple_report(detection_results: Dict[str, Any], file_path: str, task_id: str) -> Dict[str, Any]:
+    """构造简化的检测报告内容"""
+    return {
+        "report_info": {
+            "generated_at": datetime.now().isoformat(),
+            "file_path": file_path,
+            "task_id": task_id,
+            "total_issues": detection_results.get("total_issues", 0),
+            "summary": detection_results.get("summary", {}),
+            "detection_tools": detection_results.get("detection_tools", [])
+        },
+        "issues": detection_results.get("issues", []),
+        "statistics": {
+            "by_severity": _get_issues_by_severity(detection_results.get("issues", [])),
+            "by_type": _get_issues_by_type(detection_results.get("issues", [])),
+        }
+    }
+
 async def create_simple_report(detection_results: Dict[str, Any], file_path: str, task_id: str) -> str:
-    """创建简化的检测报告"""
+    """创建简化的检测报告（写入任务的报告路径，下载时直接复用）"""
     try:
-        # 创建报告目录
-        report_dir = Path("reports")
-        report_dir.mkdir(exist_ok=True)
-        
-        # 生成报告文件名
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"bug_detection_report_{timestamp}.json"
-        report_path = report_dir / filename
-        
-        # 生成报告内容
-        report_data = {
-            "report_info": {
-                "generated_at": datetime.now().isoformat(),
-                "file_path": file_path,
-                "task_id": task_id,
-                "total_issues": detection_results.get("total_issues", 0),
-                "summary": detection_results.get("summary", {}),
-                "detection_tools": detection_results.get("detection_tools", [])
-            },
-            "issues": detection_results.get("issues", []),
-            "statistics": {
-                "by_severity": _get_issues_by_severity(detection_results.get("issues", [])),
-                "by_type": _get_issues_by_type(detection_results.get("issues", [])),
-            }
-        }
-        
-        # 保存报告
-        with open(report_path, 'w', encoding='utf-8') as f:
-            json.dump(report_data, f, ensure_ascii=False, indent=2)
+        report_path = _report_path(task_id)
+        report_data = _build_simple_report(detection_results, file_path, task_id)
+        await get_artifact_store().write(report_path, json.dumps(report_data, ensure_ascii=False, indent=2))
         
         print(f"简化检测报告已生成: {report_path}")
         return str(report_path)
@@ -496,8 +511,9 @@ async def store_structured_data(task_id: str, file_path: str, analysis_type: str
         
         # 保存结构化数据
         structured_file = structured_dir / f"structured_data_{task_id}.json"
-        with open(structured_file, 'w', encoding='utf-8') as f:
-            json.dump(structured_data, f, ensure_ascii=False, indent=2)
+        await get_artifact_store().write(
+            structured_file, json.dumps(structured_data, ensure_ascii=False, indent=2), kind=None
+        )
         
         print(f"结构化数据已存储: {structured_file}")
         
@@ -203,7 +203,7 @@ async def get_capabilities():
 
 @router.get("/metrics")
 async def get_agent_metrics():
-    """获取Agent指标"""
+    """获取Agent指标（含结果缓存命中率、淘汰数）"""
     try:
         agent = get_or_create_agent()
         metrics = await agent.get_metrics()
@@ -214,10 +214,11 @@ async def get_agent_metrics():
 
 @router.delete("/cache")
 async def clear_cache():
-    """清除分析缓存"""
+    """清除分析缓存（内存和磁盘两级）"""
     try:
-        # 这里可以添加清除缓存的逻辑
-        return {"message": "缓存已清除", "success": True}
+        agent = get_or_create_agent()
+        removed = await asyncio.to_thread(agent.clear_result_cache)
+        return {"message": "缓存已清除", "success": True, "removed_entries": removed}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"清除缓存失败: {str(e)}")
 
@@ -6,6 +6,8 @@
 import asyncio
 import tempfile
 import os
+import re
+import uuid
 import json
 import sys
 import httpx
@@ -15,7 +17,7 @@ from datetime import datetime
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 
-from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks, Form
+from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks, Form, Request
 from pydantic import BaseModel, Field
 
 # 导入检测组件
@@ -28,6 +30,7 @@ sys.path.append(str(Path(__file__).parent.parent))
 from agents.dynamic_detection_agent.agent import DynamicDetectionAgent
 from agents.bug_detection_agent.agent import BugDetectionAgent
 from api.deepseek_config import deepseek_config
+from api.core.tenant import tenant_of
 
 # 数据模型
 class BaseResponse(BaseModel):
@@ -56,6 +59,7 @@ def set_managers(coord_mgr, agent_mgr):
     _coordinator_manager = coord_mgr
     _agent_manager = agent_mgr
 
+
 # 全局检测器（保留用于直接调用，作为备用方案）
 dynamic_agent = DynamicDetectionAgent({
     "monitor_interval": 5,
@@ -92,6 +96,20 @@ class ComprehensiveDetector:
         self.enable_dynamic_detection = True
         self.enable_flask_specific_tests = True
         self.enable_server_testing = True
+        # 检测所属的工作流和租户：通过Coordinator创建的任务归入该工作流，客户端可通过SSE接收进度
+        self.workflow_id = None
+        self.tenant_id = None
+    
+    def _report_stage(self, stage: str, **data):
+        """向工作流的进度流上报阶段切换"""
+        if not self.workflow_id or not (_coordinator_manager and _coordinator_manager.coordinator):
+            return
+        from coordinator.message_types import EventType
+        _coordinator_manager.coordinator.event_bus.publish_nowait(
+            EventType.TASK_STAGE_CHANGED.value,
+            {"workflow_id": self.workflow_id, "tenant_id": self.tenant_id, "stage": stage, **data},
+            "comprehensive_detector"
+        )
     
     async def detect_defects(self, zip_file_path: str, 
                            static_analysis: bool = True,
@@ -149,6 +167,7 @@ class ComprehensiveDetector:
             print(f"🔧 开始解压项目并创建虚拟环境: {zip_file_path}")
             print(f"⏱️  注意：虚拟环境创建和依赖安装可能需要较长时间（最多5分钟）...")
             extract_dir = None  # 初始化为None，确保在所有情况下都有值
+            self._report_stage("extracting")
             try:
                 # 设置更长的超时时间，给虚拟环境创建和依赖安装足够时间
                 # 虚拟环境创建可能需要30-180秒，依赖安装可能需要1-5分钟
@@ -217,6 +236,7 @@ class ComprehensiveDetector:
             
             # ========== 步骤1: 执行初步代码分析 ==========
             print("🔍 开始初步代码分析...")
+            self._report_stage("preliminary_analysis", files=len(results["files"]))
             preliminary_analysis = await self._perform_preliminary_analysis(extract_dir)
             results["preliminary_analysis"] = preliminary_analysis
             
@@ -734,7 +754,8 @@ class ComprehensiveDetector:
                     }
                     
                     # 通过Coordinator创建任务并分配
-                    task_id = await coordinator.create_task('detect_bugs', task_data)
+                    task_id = await coordinator.create_task('detect_bugs', task_data,
+                                                            workflow_id=self.workflow_id, tenant_id=self.tenant_id)
                     await coordinator.assign_task(task_id, 'bug_detection_agent')
                     
                     print(f"✅ [Coordinator] 静态检测任务已创建并分配: {task_id}")
@@ -930,7 +951,8 @@ class ComprehensiveDetector:
                         }
                         
                         # 通过Coordinator创建任务并分配
-                        task_id = await coordinator.create_task('dynamic_detect', task_data)
+                        task_id = await coordinator.create_task('dynamic_detect', task_data,
+                                                                workflow_id=self.workflow_id, tenant_id=self.tenant_id)
                         await coordinator.assign_task(task_id, 'dynamic_detection_agent')
                         
                         print(f"✅ [Coordinator] 动态检测任务已创建并分配: {task_id}")
@@ -2067,6 +2089,7 @@ async def health():
 
 @router.post("/detect", response_model=BaseResponse)
 async def comprehensive_detect(
+    request: Request,
     background_tasks: BackgroundTasks,
     file: UploadFile = File(None),
     files: List[UploadFile] = File(None),
@@ -2084,7 +2107,9 @@ async def comprehensive_detect(
     enable_semgrep: str = Form("true"),
     enable_ruff: str = Form("true"),
     enable_bandit: str = Form("true"),
-    enable_llm_filter: str = Form("true")
+    enable_llm_filter: str = Form("true"),
+    # 客户端可预先指定工作流ID，并通过 /api/v1/workflows/{workflow_id}/events 接收实时进度
+    workflow_id: Optional[str] = Form(None)
 ):
     """综合检测 - 并行执行静态检测和动态检测"""
     
@@ -2133,6 +2158,21 @@ async def comprehensive_detect(
         upload_files = files
         filename = f"directory_{len(files)}_files"
     
+    workflow_id = (workflow_id or "").strip() or f"comprehensive_{uuid.uuid4().hex[:12]}"
+    if not re.fullmatch(r"[A-Za-z0-9_.-]{1,64}", workflow_id):
+        raise HTTPException(status_code=400, detail="workflow_id 只能包含字母、数字、下划线、点和连字符，且不超过64个字符")
+    tenant_id = tenant_of(request)
+    
+    # 检测期间的任务、阶段和缺陷事件记录在该工作流的进度流中，检测结束时关闭
+    progress_stream = None
+    stream_status = "failed"
+    if _coordinator_manager and _coordinator_manager.coordinator:
+        progress_stream = _coordinator_manager.coordinator.progress_stream
+        existing = progress_stream.get(workflow_id)
+        if existing is not None and not existing.closed:
+            raise HTTPException(status_code=409, detail=f"工作流 {workflow_id} 正在检测中")
+        progress_stream.open(workflow_id, tenant_id, auto_close=False)
+    
     temp_file_path = None
     temp_dir = None
     
@@ -2186,6 +2226,8 @@ async def comprehensive_detect(
         detector.enable_dynamic_detection = enable_dynamic_detection
         detector.enable_flask_specific_tests = enable_flask_specific_tests
         detector.enable_server_testing = enable_server_testing
+        detector.workflow_id = workflow_id
+        detector.tenant_id = tenant_id
         
         # 执行检测（添加超时处理）
         print("=" * 60)
@@ -2322,10 +2364,12 @@ async def comprehensive_detect(
             print("⚠️ [API] 警告: 未生成任务信息文件")
         
         # 返回结果
+        stream_status = "completed"
         return BaseResponse(
             success=True,
             message="综合检测完成",
             data={
+                "workflow_id": workflow_id,
                 "results": results,
                 "report": report,
                 "ai_report": ai_report,
@@ -2336,6 +2380,9 @@ async def comprehensive_detect(
         )
     
     finally:
+        if progress_stream is not None:
+            progress_stream.close(workflow_id, stream_status)
+        
         # 注意：临时文件保留，不删除上传的文件，以便修复Agent使用
         # 只删除上传的ZIP压缩包（如果存在）
         if temp_file_path and os.path.exists(temp_file_path):
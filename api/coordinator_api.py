@@ -4,11 +4,14 @@ Coordinator 管理 API
 从 bug_detection_api.py 分离出来
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Dict, Any, Optional
 from datetime import datetime
 
+from api.core.tenant import tenant_of
+
 router = APIRouter(prefix="/api/v1", tags=["协调中心"])
 
 # 全局引用（在 main_api.py 中设置）
@@ -22,6 +25,7 @@ def set_managers(coord_mgr, agent_mgr):
     _agent_manager = agent_mgr
 
 
+
 class BaseResponse(BaseModel):
     """基础响应模型"""
     success: bool = Field(True, description="是否成功")
@@ -155,3 +159,81 @@ async def cancel_task(task_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"取消任务失败: {str(e)}")
 
+
+@router.get("/workflows/{workflow_id}/events")
+async def stream_workflow_events(
+    workflow_id: str,
+    request: Request,
+    last_event_id: Optional[int] = Query(None, description="已收到的最后一个事件ID（也可通过 Last-Event-ID 请求头传递）"),
+    wait: float = Query(30.0, ge=0, le=120, description="工作流尚未开始时等待的秒数")
+):
+    """
+    以 Server-Sent Events 推送工作流进度
+    
+    事件包括工作流状态、任务创建与完成、阶段切换（task_stage_changed）、单个工具完成（tool_completed）
+    和通过误报过滤的缺陷（issue_found），以 stream_closed 结束。断线后带 Last-Event-ID 重连即可续传。
+    workflow_id 为上传接口返回的 workflow_id，或综合检测请求中指定的 workflow_id。
+    只返回与请求 X-Tenant-ID 相同租户的工作流；该请求头未经认证，不能替代访问控制。
+    """
+    if not _coordinator_manager or not _coordinator_manager.coordinator:
+        raise HTTPException(status_code=500, detail="Coordinator 未启动")
+    
+    from coordinator.progress_stream import StreamLimitExceeded
+    from coordinator.task_manager import DEFAULT_TENANT
+    progress_stream = _coordinator_manager.coordinator.progress_stream
+    
+    stream = await progress_stream.wait_for_stream(workflow_id, wait)
+    # 其他租户的工作流按不存在处理（租户来自客户端自报的 X-Tenant-ID，见 tenant_of）
+    if stream is None or stream.tenant_id not in (None, DEFAULT_TENANT, tenant_of(request)):
+        raise HTTPException(status_code=404, detail="工作流不存在")
+    
+    header = request.headers.get("last-event-id")
+    if header and header.strip().isdigit():
+        last_event_id = int(header.strip())
+    
+    try:
+        events = progress_stream.connect(workflow_id, last_event_id)
+    except StreamLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    
+    async def event_source():
+        # 告诉浏览器 EventSource 断线后的重连间隔
+        yield "retry: 3000\n\n"
+        async for stream_event in events:
+            if await request.is_disconnected():
+                break
+            yield ": keepalive\n\n" if stream_event is None else stream_event.encode()
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/workflows/{workflow_id}/trace", response_model=BaseResponse)
+async def get_workflow_trace(workflow_id: str, request: Request):
+    """
+    获取工作流的调用链：工作流节点、Agent任务、外部工具和 LLM 请求的 span
+    
+    只保留最近的 span，结束较早的工作流可能只剩部分记录。
+    """
+    if not _coordinator_manager or not _coordinator_manager.coordinator:
+        raise HTTPException(status_code=500, detail="Coordinator 未启动")
+    
+    from coordinator.task_manager import DEFAULT_TENANT
+    from utils.tracing import trace_id_for
+    coordinator = _coordinator_manager.coordinator
+    
+    workflow = coordinator.get_workflow(workflow_id)
+    stream = coordinator.progress_stream.get(workflow_id)
+    spans = coordinator.get_workflow_trace(workflow_id)
+    tenant_id = workflow['tenant_id'] if workflow else (stream.tenant_id if stream else None)
+    # 其他租户的工作流按不存在处理（租户来自客户端自报的 X-Tenant-ID，见 tenant_of）
+    if (workflow is None and stream is None and not spans) or tenant_id not in (None, DEFAULT_TENANT, tenant_of(request)):
+        raise HTTPException(status_code=404, detail="工作流不存在")
+    
+    return BaseResponse(
+        message="获取调用链成功",
+        data={"workflow_id": workflow_id, "trace_id": trace_id_for(workflow_id), "spans": spans}
+    )
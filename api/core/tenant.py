@@ -0,0 +1,25 @@
+"""
+请求租户识别
+各 API 路由共用：上传/综合检测按租户做公平调度，进度流和调用链查询按租户隔离
+"""
+
+from typing import Optional
+
+from fastapi import Request
+
+# 租户ID的最大长度，超出部分截断
+MAX_TENANT_ID_LENGTH = 64
+
+
+def tenant_of(request: Request) -> Optional[str]:
+    """
+    请求所属的租户：优先使用 X-Tenant-ID 请求头，否则按客户端地址区分
+
+    注意：X-Tenant-ID 由客户端自行提供，服务端没有做身份认证，任何客户端都可以声明
+    任意租户。因此基于它的隔离（进度流 SSE、调用链查询的租户检查）只能防止误访问，
+    不能作为安全边界；需要真正隔离时应在前置网关完成认证并由网关改写该请求头。
+    """
+    tenant_id = request.headers.get("x-tenant-id")
+    if tenant_id:
+        return tenant_id.strip()[:MAX_TENANT_ID_LENGTH]
+    return request.client.host if request.client else None
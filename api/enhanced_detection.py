@@ -14,6 +14,8 @@ from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
+from utils.metrics import observe_tool
+
 # 尝试导入astroid
 try:
     import astroid
@@ -43,6 +45,84 @@ class DetectionIssue:
     flask_version: str = "2.0.0"
     category: str = ""
 
+class SourceFile:
+    """单个Python源文件（内容只读取一次）"""
+    
+    def __init__(self, path: str, content: str):
+        self.path = path
+        self.content = content
+        self._lines: Optional[List[str]] = None
+        self._astroid_tree = None
+    
+    @property
+    def lines(self) -> List[str]:
+        if self._lines is None:
+            self._lines = self.content.split('\n')
+        return self._lines
+    
+    def astroid_tree(self):
+        """按需解析并缓存astroid语法树"""
+        if self._astroid_tree is None:
+            self._astroid_tree = astroid.parse(self.content)
+        return self._astroid_tree
+
+class ProjectSources:
+    """项目源码的共享表示 - 一次遍历目录、一次读取文件，供所有检测共用"""
+    
+    SKIP_DIRS = {'.git', '__pycache__', 'node_modules', '.venv', 'venv'}
+    MAX_FILES = 50  # 限制文件数量
+    
+    def __init__(self, project_path: str):
+        self.project_path = project_path
+        self.files: List[SourceFile] = []
+        for py_file in self.get_python_files(project_path):
+            try:
+                with open(py_file, 'r', encoding='utf-8') as f:
+                    self.files.append(SourceFile(py_file, f.read()))
+            except Exception as e:
+                print(f"读取文件失败 {py_file}: {e}")
+    
+    @classmethod
+    def get_python_files(cls, project_path: str) -> List[str]:
+        """获取Python文件列表"""
+        python_files = []
+        
+        for root, dirs, files in os.walk(project_path):
+            dirs[:] = [d for d in dirs if d not in cls.SKIP_DIRS]
+            for file in files:
+                if file.endswith('.py') and not file.startswith('.'):
+                    python_files.append(os.path.join(root, file))
+        
+        return python_files[:cls.MAX_FILES]
+    
+    @classmethod
+    async def load(cls, project_path: str) -> "ProjectSources":
+        """在线程中读取项目文件，避免阻塞事件循环"""
+        return await asyncio.to_thread(cls, project_path)
+
+async def _run_tool(cmd: List[str], timeout: int = 60) -> Tuple[str, str]:
+    """异步运行外部检查工具，超时则终止进程（耗时和结果按工具记入指标）"""
+    try:
+        with observe_tool(Path(cmd[0]).name, 'project'):
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                # 超时或调用方取消时结束子进程，避免留下孤儿进程
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+                await process.wait()
+                raise
+    except asyncio.TimeoutError:
+        raise RuntimeError(f"{cmd[0]} 执行超时（{timeout}秒）")
+    return stdout.decode('utf-8', errors='replace'), stderr.decode('utf-8', errors='replace')
+
 class TypeCheckerIntegration:
     """类型检查器集成 - 解决S类问题"""
     
@@ -80,10 +160,10 @@ class TypeCheckerIntegration:
             
             # 运行mypy
             cmd = ['mypy', '--config-file', mypy_config, project_path]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+            stdout, stderr = await _run_tool(cmd, timeout=60)
             
             # 解析mypy输出
-            issues.extend(self._parse_mypy_output(result.stdout, result.stderr))
+            issues.extend(self._parse_mypy_output(stdout, stderr))
             
         except Exception as e:
             print(f"mypy分析失败: {e}")
@@ -102,10 +182,10 @@ class TypeCheckerIntegration:
             
             # 运行pyright
             cmd = ['pyright', '--project', pyright_config, project_path]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+            stdout, stderr = await _run_tool(cmd, timeout=60)
             
             # 解析pyright输出
-            issues.extend(self._parse_pyright_output(result.stdout, result.stderr))
+            issues.extend(self._parse_pyright_output(stdout, stderr))
             
         except Exception as e:
             print(f"pyright分析失败: {e}")
@@ -318,45 +398,42 @@ class StaticAnalysisIntegration:
             
             # 运行pylint
             cmd = ['pylint', '--rcfile', pylint_config, project_path]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+            stdout, stderr = await _run_tool(cmd, timeout=60)
             
             # 解析pylint输出
-            issues.extend(self._parse_pylint_output(result.stdout, result.stderr))
+            issues.extend(self._parse_pylint_output(stdout, stderr))
             
         except Exception as e:
             print(f"pylint分析失败: {e}")
         
         return issues
     
-    async def run_astroid_analysis(self, project_path: str) -> List[DetectionIssue]:
+    async def run_astroid_analysis(
+        self, project_path: str, sources: Optional[ProjectSources] = None
+    ) -> List[DetectionIssue]:
         """运行astroid深度静态分析"""
         if not self.astroid_available:
             return []
         
-        issues = []
         try:
-            import astroid
-            
-            # 分析Python文件
-            for py_file in self._get_python_files(project_path):
-                try:
-                    with open(py_file, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    # 使用astroid解析
-                    tree = astroid.parse(content)
-                    
-                    # 检测Flask特定问题
-                    flask_issues = self._detect_flask_issues_with_astroid(tree, py_file)
-                    issues.extend(flask_issues)
-                    
-                except Exception as e:
-                    print(f"astroid分析文件失败 {py_file}: {e}")
-                    continue
-            
+            if sources is None:
+                sources = await ProjectSources.load(project_path)
+            # astroid解析为CPU密集型操作，放到线程中执行
+            return await asyncio.to_thread(self._analyze_sources_with_astroid, sources)
         except Exception as e:
             print(f"astroid分析失败: {e}")
-        
+            return []
+    
+    def _analyze_sources_with_astroid(self, sources: ProjectSources) -> List[DetectionIssue]:
+        """使用astroid分析共享的项目源码"""
+        issues = []
+        for source in sources.files:
+            try:
+                # 检测Flask特定问题
+                issues.extend(self._detect_flask_issues_with_astroid(source.astroid_tree(), source.path))
+            except Exception as e:
+                print(f"astroid分析文件失败 {source.path}: {e}")
+                continue
         return issues
     
     def _create_pylint_config(self, project_path: str) -> str:
@@ -403,16 +480,7 @@ ignored-modules=flask
     
     def _get_python_files(self, project_path: str) -> List[str]:
         """获取Python文件列表"""
-        python_files = []
-        skip_dirs = {'.git', '__pycache__', 'node_modules', '.venv', 'venv'}
-        
-        for root, dirs, files in os.walk(project_path):
-            dirs[:] = [d for d in dirs if d not in skip_dirs]
-            for file in files:
-                if file.endswith('.py') and not file.startswith('.'):
-                    python_files.append(os.path.join(root, file))
-        
-        return python_files[:50]  # 限制文件数量
+        return ProjectSources.get_python_files(project_path)
     
     def _detect_flask_issues_with_astroid(self, tree, file_path: str) -> List[DetectionIssue]:
         """使用astroid检测Flask问题"""
@@ -666,272 +734,201 @@ class APIChangeDetection:
             }
         }
     
-    async def detect_api_changes(self, project_path: str) -> List[DetectionIssue]:
-        """检测API变更问题"""
-        issues = []
-        
-        # 检测send_from_directory参数问题
-        issues.extend(await self._detect_send_from_directory_issue(project_path))
-        
-        # 检测Config.from_json问题
-        issues.extend(await self._detect_config_from_json_issue(project_path))
-        
-        # 检测装饰器工厂问题
-        issues.extend(await self._detect_decorator_factory_issue(project_path))
-        
-        # 检测蓝图注册问题
-        issues.extend(await self._detect_blueprint_registration_issue(project_path))
-        
-        # 检测Decimal JSON序列化问题
-        issues.extend(await self._detect_decimal_json_issue(project_path))
-        
-        # 检测嵌套蓝图问题
-        issues.extend(await self._detect_nested_blueprint_issue(project_path))
-        
-        # 检测装饰器工厂问题
-        issues.extend(await self._detect_decorator_factory_advanced(project_path))
+    async def detect_api_changes(
+        self, project_path: str, sources: Optional[ProjectSources] = None
+    ) -> List[DetectionIssue]:
+        """检测API变更问题
+        
+        所有检查在一次遍历中完成：每个文件只读取一次，依次交给各项检查。
+        """
+        if sources is None:
+            sources = await ProjectSources.load(project_path)
+        return await asyncio.to_thread(self._run_api_checks, sources)
+    
+    def _run_api_checks(self, sources: ProjectSources) -> List[DetectionIssue]:
+        """对共享源码执行全部API变更检查，结果按检查项顺序输出"""
+        checks = [
+            # 检测send_from_directory参数问题
+            ("send_from_directory", self._check_send_from_directory),
+            # 检测Config.from_json问题
+            ("Config.from_json", self._check_config_from_json),
+            # 检测装饰器工厂问题
+            ("装饰器工厂", self._check_decorator_factory),
+            # 检测蓝图注册问题
+            ("蓝图注册", self._check_blueprint_registration),
+            # 检测Decimal JSON序列化问题
+            ("Decimal JSON", self._check_decimal_json),
+            # 检测嵌套蓝图问题
+            ("嵌套蓝图", self._check_nested_blueprint),
+            # 检测装饰器工厂问题（高级版本）
+            ("装饰器工厂", self._check_decorator_factory_advanced),
+        ]
+        results: List[List[DetectionIssue]] = [[] for _ in checks]
+        
+        for source in sources.files:
+            for bucket, (name, check) in zip(results, checks):
+                try:
+                    bucket.extend(check(source))
+                except Exception as e:
+                    print(f"检测{name}问题失败 {source.path}: {e}")
         
-        return issues
+        return [issue for bucket in results for issue in bucket]
     
-    async def _detect_send_from_directory_issue(self, project_path: str) -> List[DetectionIssue]:
+    def _check_send_from_directory(self, source: SourceFile) -> List[DetectionIssue]:
         """检测send_from_directory参数问题"""
-        issues = []
+        content = source.content
         
-        for py_file in self._get_python_files(project_path):
-            try:
-                with open(py_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # 检测使用filename参数的情况
-                if 'send_from_directory' in content and 'filename=' in content:
-                    issues.append(DetectionIssue(
-                        id="4019",
-                        title="send_from_directory重新加入filename参数",
-                        severity="warning",
-                        capability=DetectionCapability.AI_ASSISTED,
-                        file_path=py_file,
-                        message="使用了已弃用的filename参数",
-                        suggestion="将filename参数改为path参数",
-                        github_issue="https://github.com/pallets/flask/issues/4019",
-                        category="api_change"
-                    ))
-                    
-            except Exception as e:
-                print(f"检测send_from_directory问题失败 {py_file}: {e}")
-                continue
-        
-        return issues
-    
-    async def _detect_config_from_json_issue(self, project_path: str) -> List[DetectionIssue]:
+        # 检测使用filename参数的情况
+        if 'send_from_directory' in content and 'filename=' in content:
+            return [DetectionIssue(
+                id="4019",
+                title="send_from_directory重新加入filename参数",
+                severity="warning",
+                capability=DetectionCapability.AI_ASSISTED,
+                file_path=source.path,
+                message="使用了已弃用的filename参数",
+                suggestion="将filename参数改为path参数",
+                github_issue="https://github.com/pallets/flask/issues/4019",
+                category="api_change"
+            )]
+        return []
+    
+    def _check_config_from_json(self, source: SourceFile) -> List[DetectionIssue]:
         """检测Config.from_json问题"""
-        issues = []
+        content = source.content
         
-        for py_file in self._get_python_files(project_path):
-            try:
-                with open(py_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # 检测使用from_json方法的情况
-                if 'from_json' in content and 'Config' in content:
-                    issues.append(DetectionIssue(
-                        id="4078",
-                        title="误删的Config.from_json回退恢复",
-                        severity="error",
-                        capability=DetectionCapability.AI_ASSISTED,
-                        file_path=py_file,
-                        message="使用了已删除的Config.from_json方法",
-                        suggestion="使用新的配置加载方式",
-                        github_issue="https://github.com/pallets/flask/issues/4078",
-                        category="api_change"
-                    ))
-                    
-            except Exception as e:
-                print(f"检测Config.from_json问题失败 {py_file}: {e}")
-                continue
-        
-        return issues
-    
-    async def _detect_decorator_factory_issue(self, project_path: str) -> List[DetectionIssue]:
+        # 检测使用from_json方法的情况
+        if 'from_json' in content and 'Config' in content:
+            return [DetectionIssue(
+                id="4078",
+                title="误删的Config.from_json回退恢复",
+                severity="error",
+                capability=DetectionCapability.AI_ASSISTED,
+                file_path=source.path,
+                message="使用了已删除的Config.from_json方法",
+                suggestion="使用新的配置加载方式",
+                github_issue="https://github.com/pallets/flask/issues/4078",
+                category="api_change"
+            )]
+        return []
+    
+    def _check_decorator_factory(self, source: SourceFile) -> List[DetectionIssue]:
         """检测装饰器工厂问题"""
-        issues = []
-        
-        for py_file in self._get_python_files(project_path):
-            try:
-                with open(py_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # 检测装饰器工厂的使用
-                if 'Callable' in content and ('@' in content or 'decorator' in content):
-                    issues.append(DetectionIssue(
-                        id="4060",
-                        title="若干装饰器工厂的Callable类型改进",
-                        severity="error",
-                        capability=DetectionCapability.STATIC,
-                        file_path=py_file,
-                        message="装饰器工厂的Callable类型问题",
-                        suggestion="改进装饰器工厂的类型注解",
-                        github_issue="https://github.com/pallets/flask/issues/4060",
-                        category="typing"
-                    ))
-                    
-            except Exception as e:
-                print(f"检测装饰器工厂问题失败 {py_file}: {e}")
-                continue
+        content = source.content
         
-        return issues
+        # 检测装饰器工厂的使用
+        if 'Callable' in content and ('@' in content or 'decorator' in content):
+            return [DetectionIssue(
+                id="4060",
+                title="若干装饰器工厂的Callable类型改进",
+                severity="error",
+                capability=DetectionCapability.STATIC,
+                file_path=source.path,
+                message="装饰器工厂的Callable类型问题",
+                suggestion="改进装饰器工厂的类型注解",
+                github_issue="https://github.com/pallets/flask/issues/4060",
+                category="typing"
+            )]
+        return []
     
-    async def _detect_blueprint_registration_issue(self, project_path: str) -> List[DetectionIssue]:
+    def _check_blueprint_registration(self, source: SourceFile) -> List[DetectionIssue]:
         """检测蓝图注册问题"""
-        issues = []
-        
-        for py_file in self._get_python_files(project_path):
-            try:
-                with open(py_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # 检测重复注册蓝图的情况
-                if 'register_blueprint' in content:
-                    # 简单的重复检测
-                    register_count = content.count('register_blueprint')
-                    if register_count > 1:
-                        issues.append(DetectionIssue(
-                            id="1091",
-                            title="register_blueprint支持name=修改注册名",
-                            severity="warning",
-                            capability=DetectionCapability.AI_ASSISTED,
-                            file_path=py_file,
-                            message="可能存在重复注册同名蓝图",
-                            suggestion="使用name参数修改注册名或检查重复注册",
-                            github_issue="https://github.com/pallets/flask/issues/1091",
-                            category="blueprint"
-                        ))
-                    
-            except Exception as e:
-                print(f"检测蓝图注册问题失败 {py_file}: {e}")
-                continue
-        
-        return issues
+        # 检测重复注册蓝图的情况（简单的重复检测）
+        if source.content.count('register_blueprint') > 1:
+            return [DetectionIssue(
+                id="1091",
+                title="register_blueprint支持name=修改注册名",
+                severity="warning",
+                capability=DetectionCapability.AI_ASSISTED,
+                file_path=source.path,
+                message="可能存在重复注册同名蓝图",
+                suggestion="使用name参数修改注册名或检查重复注册",
+                github_issue="https://github.com/pallets/flask/issues/1091",
+                category="blueprint"
+            )]
+        return []
     
     def _get_python_files(self, project_path: str) -> List[str]:
         """获取Python文件列表"""
-        python_files = []
-        skip_dirs = {'.git', '__pycache__', 'node_modules', '.venv', 'venv'}
-        
-        for root, dirs, files in os.walk(project_path):
-            dirs[:] = [d for d in dirs if d not in skip_dirs]
-            for file in files:
-                if file.endswith('.py') and not file.startswith('.'):
-                    python_files.append(os.path.join(root, file))
-        
-        return python_files[:50]  # 限制文件数量
+        return ProjectSources.get_python_files(project_path)
     
-    async def _detect_decimal_json_issue(self, project_path: str) -> List[DetectionIssue]:
+    def _check_decimal_json(self, source: SourceFile) -> List[DetectionIssue]:
         """检测Decimal JSON序列化问题"""
-        issues = []
+        content = source.content
         
-        for py_file in self._get_python_files(project_path):
-            try:
-                with open(py_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # 检测Decimal和jsonify的使用
-                if 'decimal' in content and 'jsonify' in content:
-                    issues.append(DetectionIssue(
-                        id="4157",
-                        title="Decimal JSON序列化问题",
-                        severity="error",
-                        capability=DetectionCapability.AI_ASSISTED,
-                        file_path=py_file,
-                        message="Decimal类型在Flask 2.0.0中JSON序列化可能失败",
-                        suggestion="使用自定义JSON编码器处理Decimal类型",
-                        github_issue="https://github.com/pallets/flask/issues/4157",
-                        category="serialization"
-                    ))
-                    
-            except Exception as e:
-                print(f"检测Decimal JSON问题失败 {py_file}: {e}")
-                continue
-        
-        return issues
-    
-    async def _detect_nested_blueprint_issue(self, project_path: str) -> List[DetectionIssue]:
+        # 检测Decimal和jsonify的使用
+        if 'decimal' in content and 'jsonify' in content:
+            return [DetectionIssue(
+                id="4157",
+                title="Decimal JSON序列化问题",
+                severity="error",
+                capability=DetectionCapability.AI_ASSISTED,
+                file_path=source.path,
+                message="Decimal类型在Flask 2.0.0中JSON序列化可能失败",
+                suggestion="使用自定义JSON编码器处理Decimal类型",
+                github_issue="https://github.com/pallets/flask/issues/4157",
+                category="serialization"
+            )]
+        return []
+    
+    def _check_nested_blueprint(self, source: SourceFile) -> List[DetectionIssue]:
         """检测嵌套蓝图问题"""
-        issues = []
+        content = source.content
         
-        for py_file in self._get_python_files(project_path):
-            try:
-                with open(py_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # 检测嵌套蓝图注册
-                if 'Blueprint' in content and 'register_blueprint' in content:
-                    # 检查是否有嵌套的蓝图注册
-                    lines = content.split('\n')
-                    blueprint_names = []
-                    for line in lines:
-                        if 'Blueprint(' in line:
-                            # 提取蓝图名称
-                            if 'name=' in line:
-                                start = line.find('name=') + 5
-                                end = line.find(',', start)
-                                if end == -1:
-                                    end = line.find(')', start)
-                                name = line[start:end].strip().strip('"\'')
-                                blueprint_names.append(name)
-                    
-                    # 检查是否有重复的蓝图名称
-                    if len(blueprint_names) != len(set(blueprint_names)):
-                        issues.append(DetectionIssue(
-                            id="4069",
-                            title="嵌套蓝图注册为点分名",
-                            severity="warning",
-                            capability=DetectionCapability.AI_ASSISTED,
-                            file_path=py_file,
-                            message="嵌套蓝图可能导致端点命名冲突",
-                            suggestion="使用点分命名避免冲突",
-                            github_issue="https://github.com/pallets/flask/issues/4069",
-                            category="blueprint"
-                        ))
-                    
-            except Exception as e:
-                print(f"检测嵌套蓝图问题失败 {py_file}: {e}")
-                continue
+        # 检测嵌套蓝图注册
+        if not ('Blueprint' in content and 'register_blueprint' in content):
+            return []
         
-        return issues
+        # 检查是否有嵌套的蓝图注册
+        blueprint_names = []
+        for line in source.lines:
+            if 'Blueprint(' in line:
+                # 提取蓝图名称
+                if 'name=' in line:
+                    start = line.find('name=') + 5
+                    end = line.find(',', start)
+                    if end == -1:
+                        end = line.find(')', start)
+                    name = line[start:end].strip().strip('"\'')
+                    blueprint_names.append(name)
+        
+        # 检查是否有重复的蓝图名称
+        if len(blueprint_names) != len(set(blueprint_names)):
+            return [DetectionIssue(
+                id="4069",
+                title="嵌套蓝图注册为点分名",
+                severity="warning",
+                capability=DetectionCapability.AI_ASSISTED,
+                file_path=source.path,
+                message="嵌套蓝图可能导致端点命名冲突",
+                suggestion="使用点分命名避免冲突",
+                github_issue="https://github.com/pallets/flask/issues/4069",
+                category="blueprint"
+            )]
+        return []
     
-    async def _detect_decorator_factory_advanced(self, project_path: str) -> List[DetectionIssue]:
+    def _check_decorator_factory_advanced(self, source: SourceFile) -> List[DetectionIssue]:
         """检测装饰器工厂问题（高级版本）"""
+        content = source.content
         issues = []
         
-        for py_file in self._get_python_files(project_path):
-            try:
-                with open(py_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # 检测装饰器工厂模式
-                if 'def ' in content and '@' in content:
-                    lines = content.split('\n')
-                    for i, line in enumerate(lines):
-                        # 检测装饰器工厂函数
-                        if 'def ' in line and ('decorator' in line.lower() or 'wrapper' in line.lower()):
-                            # 检查是否有类型注解
-                            if 'Callable' not in content and 'typing' not in content:
-                                issues.append(DetectionIssue(
-                                    id="4060",
-                                    title="装饰器工厂类型改进",
-                                    severity="warning",
-                                    capability=DetectionCapability.STATIC,
-                                    file_path=py_file,
-                                    line_number=i + 1,
-                                    message="装饰器工厂缺少类型注解",
-                                    suggestion="为装饰器工厂添加Callable类型注解",
-                                    github_issue="https://github.com/pallets/flask/issues/4060",
-                                    category="typing"
-                                ))
-                    
-            except Exception as e:
-                print(f"检测装饰器工厂问题失败 {py_file}: {e}")
-                continue
+        # 检测装饰器工厂模式；已有类型注解时无需逐行检查
+        if 'def ' in content and '@' in content and 'Callable' not in content and 'typing' not in content:
+            for i, line in enumerate(source.lines):
+                # 检测装饰器工厂函数
+                if 'def ' in line and ('decorator' in line.lower() or 'wrapper' in line.lower()):
+                    issues.append(DetectionIssue(
+                        id="4060",
+                        title="装饰器工厂类型改进",
+                        severity="warning",
+                        capability=DetectionCapability.STATIC,
+                        file_path=source.path,
+                        line_number=i + 1,
+                        message="装饰器工厂缺少类型注解",
+                        suggestion="为装饰器工厂添加Callable类型注解",
+                        github_issue="https://github.com/pallets/flask/issues/4060",
+                        category="typing"
+                    ))
         
         return issues
 
@@ -947,26 +944,27 @@ class EnhancedFlaskDetector:
         """检测Flask 2.0.0问题"""
         print("开始增强Flask 2.0.0问题检测...")
         
-        all_issues = []
-        
-        # 类型检查器检测 (S类问题)
-        print("运行类型检查器...")
-        mypy_issues = await self.type_checker.run_mypy_analysis(project_path)
-        pyright_issues = await self.type_checker.run_pyright_analysis(project_path)
-        all_issues.extend(mypy_issues)
-        all_issues.extend(pyright_issues)
-        
-        # 静态分析工具检测 (S类和A类问题)
-        print("运行静态分析工具...")
-        pylint_issues = await self.static_analyzer.run_pylint_analysis(project_path)
-        astroid_issues = await self.static_analyzer.run_astroid_analysis(project_path)
-        all_issues.extend(pylint_issues)
-        all_issues.extend(astroid_issues)
-        
-        # API变更检测 (A类问题)
-        print("运行API变更检测...")
-        api_issues = await self.api_detector.detect_api_changes(project_path)
-        all_issues.extend(api_issues)
+        # 项目源码只遍历和读取一次，供astroid与API变更检测共用
+        sources = await ProjectSources.load(project_path)
+        
+        # 类型检查器(S类问题)、静态分析工具(S类和A类问题)与API变更检测(A类问题)并发运行
+        print("并发运行类型检查器、静态分析工具与API变更检测...")
+        (
+            mypy_issues,
+            pyright_issues,
+            pylint_issues,
+            astroid_issues,
+            api_issues,
+        ) = await asyncio.gather(
+            self.type_checker.run_mypy_analysis(project_path),
+            self.type_checker.run_pyright_analysis(project_path),
+            self.static_analyzer.run_pylint_analysis(project_path),
+            self.static_analyzer.run_astroid_analysis(project_path, sources),
+            self.api_detector.detect_api_changes(project_path, sources),
+        )
+        
+        # 保持与各工具顺序执行时一致的结果顺序
+        all_issues = mypy_issues + pyright_issues + pylint_issues + astroid_issues + api_issues
         
         # 按能力分类统计
         issues_by_capability = {
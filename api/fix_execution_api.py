@@ -11,12 +11,13 @@ import logging
 from datetime import datetime
 import sys
 import os
-import shutil
 from pathlib import Path
 
 # 添加项目根目录到 Python 路径
 sys.path.append(str(Path(__file__).parent.parent))
 
+from utils.storage_manager import get_storage_manager
+
 # 设置日志
 logger = logging.getLogger(__name__)
 
@@ -76,7 +77,9 @@ def cleanup_temp_directory(project_path: str) -> bool:
         if temp_dir_to_clean and temp_dir_to_clean.exists():
             logger.info(f"🧹 开始清理临时目录: {temp_dir_to_clean}")
             try:
-                shutil.rmtree(temp_dir_to_clean, ignore_errors=True)
+                # 重命名到回收站后在后台删除
+                if not get_storage_manager().reclaim(temp_dir_to_clean):
+                    return False
                 logger.info(f"✅ 成功清理临时目录: {temp_dir_to_clean}")
                 return True
             except Exception as e:
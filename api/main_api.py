@@ -9,6 +9,7 @@ import logging
 from pathlib import Path
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any
 from datetime import datetime
@@ -32,6 +33,8 @@ logging.getLogger("uvicorn.access").setLevel(logging.INFO)
 # 导入核心管理器
 from core.agent_manager import AgentManager
 from core.coordinator_manager import CoordinatorManager
+from utils.metrics import CONTENT_TYPE, get_registry
+from utils.storage_manager import get_storage_manager
 
 # 导入各个 API 模块
 # 注意：这些文件需要改为使用 APIRouter
@@ -88,6 +91,14 @@ async def startup_event():
         print("⚠️  Docker支持未启用（使用虚拟环境）")
     print("="*60)
     
+    # 0. 登记遗留的临时工作区（计算大小需要遍历目录，放到线程中执行）
+    try:
+        adopted = await asyncio.to_thread(get_storage_manager().adopt_existing, "temp_extract")
+        if adopted:
+            print(f"🗄️  已登记 {adopted} 个遗留临时工作区")
+    except Exception as e:
+        print(f"⚠️ 登记遗留临时工作区失败: {e}")
+    
     # 1. 启动 Coordinator
     try:
         coordinator_manager = CoordinatorManager()
@@ -262,11 +273,32 @@ async def health_check():
             "agents": {
                 "total": agent_manager.active_count if agent_manager else 0,
                 "details": agents_status
-            }
+            },
+            "storage": get_storage_manager().get_metrics()
         }
     )
 
 
+@app.get("/api/v1/storage", response_model=HealthResponse)
+async def storage_status():
+    """存储使用情况（磁盘预算、各类工作区占用、回收统计）"""
+    storage = get_storage_manager()
+    return HealthResponse(
+        status="ok",
+        message="存储使用情况",
+        data={
+            "metrics": storage.get_metrics(),
+            "workspaces": storage.list_workspaces()
+        }
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """运行指标（Prometheus 文本格式）：任务排队与耗时、事件总线、外部工具、LLM 请求与 token、缓存命中"""
+    return PlainTextResponse(get_registry().render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/")
 async def root():
     """根路径"""
@@ -275,11 +307,14 @@ async def root():
         "version": "2.0.0",
         "docs": "/docs",
         "health": "/health",
+        "storage": "/api/v1/storage",
+        "metrics": "/metrics",
         "endpoints": {
             "协调中心": {
                 "任务状态": "GET /api/v1/tasks/{task_id}",
                 "Agent列表": "GET /api/v1/agents",
-                "Coordinator状态": "GET /api/v1/coordinator/status"
+                "Coordinator状态": "GET /api/v1/coordinator/status",
+                "工作流调用链": "GET /api/v1/workflows/{workflow_id}/trace"
             },
             "缺陷检测": {
                 "上传检测": "POST /api/v1/detection/upload",
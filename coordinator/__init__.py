@@ -7,6 +7,9 @@ from .coordinator import Coordinator
 from .task_manager import TaskManager, TaskPriority
 from .event_bus import EventBus
 from .decision_engine import DecisionEngine
+from .workflow_graph import WorkflowGraph, WorkflowNode, WorkflowContext, ItemStream, WorkflowCancelled
+from .workflow_registry import WorkflowRegistry, WorkflowQuotaExceeded
+from .progress_stream import ProgressStream, StreamEvent, StreamLimitExceeded
 from .message_types import (
     MessageType, TaskStatus, EventType,
     TaskMessage, ResultMessage, EventMessage, StatusMessage, ErrorMessage,
@@ -16,6 +19,9 @@ from .message_types import (
 __all__ = [
     'Coordinator', 'TaskManager', 'TaskPriority',
     'EventBus', 'DecisionEngine',
+    'WorkflowGraph', 'WorkflowNode', 'WorkflowContext', 'ItemStream', 'WorkflowCancelled',
+    'WorkflowRegistry', 'WorkflowQuotaExceeded',
+    'ProgressStream', 'StreamEvent', 'StreamLimitExceeded',
     'MessageType', 'TaskStatus', 'EventType',
     'TaskMessage', 'ResultMessage', 'EventMessage', 'StatusMessage', 'ErrorMessage',
     'MessageFactory', 'DEFECT_TYPES', 'FIX_STRATEGIES'
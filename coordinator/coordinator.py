@@ -5,13 +5,22 @@
 
 import asyncio
 import logging
+import time
+import traceback
+import uuid
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
-from .task_manager import TaskManager, TaskPriority
+from .task_manager import TaskManager, TaskPriority, DEFAULT_TASK_GROUP, DEFAULT_TENANT
 from .event_bus import EventBus
 from .decision_engine import DecisionEngine
 from .message_types import EventType, MessageFactory
+from .workflow_graph import WorkflowContext, WorkflowGraph, WorkflowNode, WorkflowCancelled
+from .workflow_registry import WorkflowRegistry
+from .progress_stream import ProgressStream
+from utils.metrics import WORKFLOW_DURATION
+from utils.progress import bind_progress_reporter, reset_progress_reporter
+from utils.tracing import bind_trace, get_trace, reset_trace, span, trace_id_for
 
 
 class Coordinator:
@@ -26,14 +35,22 @@ class Coordinator:
         self.is_running = False
         self.logger = logging.getLogger(__name__)
         
-        # 工作流状态
-        self.current_workflow = None
-        self.workflow_history = []
+        # 工作流状态：每个工作流按ID登记在注册表中，各自拥有执行上下文，并受租户并发配额限制
+        self.workflow_config = config.get("workflow", {})
+        self.workflow_registry = WorkflowRegistry(self.workflow_config)
+        self._agent_waiters = set()
+        
+        # 按工作流记录事件，供 SSE 等长连接客户端实时获取进度
+        self.progress_stream = ProgressStream(self.event_bus, config.get("progress_stream", {}))
+        
+        # 任务由任务管理器按Agent容量调度，调度到的任务通过事件总线发送给Agent
+        self.task_manager.set_dispatcher(self._send_task_to_agent)
         
         # 统计信息
         self.stats = {
             "workflows_completed": 0,
             "workflows_failed": 0,
+            "workflows_cancelled": 0,
             "total_issues_processed": 0,
             "total_fixes_applied": 0
         }
@@ -91,7 +108,6 @@ class Coordinator:
                     self.logger.debug("Coordinator 收到 TaskMessage，忽略")
             except Exception as e:
                 self.logger.error(f"协调中心消息处理失败: {e}")
-                import traceback
                 self.logger.error(f"错误详情: {traceback.format_exc()}")
         await self.event_bus.subscribe("agent_message", "coordinator", _coordinator_bus_handler)
         
@@ -99,10 +115,17 @@ class Coordinator:
     
     async def stop(self):
         """停止协调中心"""
-        import asyncio
-        
         self.logger.info("协调中心停止中...")
         self.is_running = False
+        self.progress_stream.close_all()
+        
+        # 取消仍在等待Agent完成任务的后台协程
+        waiters = list(self._agent_waiters)
+        for waiter in waiters:
+            waiter.cancel()
+        if waiters:
+            await asyncio.gather(*waiters, return_exceptions=True)
+            self.logger.info(f"已取消 {len(waiters)} 个等待Agent任务的协程")
         
         # 停止核心组件（添加超时和异常处理）
         components = [
@@ -128,96 +151,29 @@ class Coordinator:
     async def register_agent(self, agent_id: str, agent):
         """注册Agent"""
         self.agents[agent_id] = agent
+        self.task_manager.register_agent(
+            agent_id,
+            max_workers=(getattr(agent, 'config', None) or {}).get('max_workers', 1),
+            queue_depth=getattr(agent, 'get_queue_depth', None)
+        )
         
         # 为Agent设置消息处理函数：接收 TaskMessage -> 交给该 Agent 执行 -> 回传 ResultMessage 给 Coordinator
+        # 等待Agent完成在后台进行，不阻塞事件总线的消息循环，多个任务才能并发执行
         async def agent_handler(message):
             try:
                 from .message_types import TaskMessage
                 if hasattr(message, 'task_id') and hasattr(message, 'payload'):
                     # 仅处理指向该Agent的任务
                     if isinstance(message, TaskMessage):
-                        await agent.submit_task(message.task_id, message.payload)
-                        # 轮询等待Agent完成（添加超时保护，最多30分钟）
-                        import time
-                        start_time = time.time()
-                        max_wait_time = 1800.0  # 30分钟
-                        poll_interval = 0.1  # 优化：每0.1秒检查一次，提高响应速度
-                        status = None
-                        last_status = None
-                        consecutive_same_status = 0
-                        
-                        self.logger.info(f"🔄 开始轮询等待Agent {agent_id} 任务 {message.task_id} 完成...")
-                        
-                        while True:
-                            # 检查超时
-                            elapsed = time.time() - start_time
-                            if elapsed > max_wait_time:
-                                self.logger.warning(f"Agent {agent_id} 任务 {message.task_id} 等待超时（30分钟）")
-                                result = {
-                                    'error': f'任务执行超时（30分钟）',
-                                    'success': False,
-                                    'task_id': message.task_id
-                                }
-                                await self.event_bus.send_result_message(
-                                    source_agent=agent_id,
-                                    target_agent='coordinator',
-                                    task_id=message.task_id,
-                                    result=result,
-                                    success=False,
-                                    error='任务执行超时（30分钟）'
-                                )
-                                break
-                            
-                            try:
-                                status = await agent.get_task_status(message.task_id)
-                                if status:
-                                    task_status = status.get('status')
-                                    
-                                    # 记录状态变化
-                                    if task_status != last_status:
-                                        self.logger.debug(f"Agent {agent_id} 任务 {message.task_id} 状态变化: {last_status} -> {task_status}")
-                                        last_status = task_status
-                                        consecutive_same_status = 0
-                                    else:
-                                        consecutive_same_status += 1
-                                    
-                                    if task_status in ["completed", "failed"]:
-                                        success = task_status == 'completed'
-                                        result = status.get('result') if success else { 'error': status.get('error', 'Unknown error') }
-                                        
-                                        elapsed_time = time.time() - start_time
-                                        self.logger.info(f"✅ Agent {agent_id} 任务 {message.task_id} 完成，耗时: {elapsed_time:.2f}秒")
-                                        
-                                        await self.event_bus.send_result_message(
-                                            source_agent=agent_id,
-                                            target_agent='coordinator',
-                                            task_id=message.task_id,
-                                            result=result,
-                                            success=success,
-                                            error=None if success else status.get('error')
-                                        )
-                                        break
-                                    # 如果状态是running或processing，继续等待
-                                    elif task_status in ["running", "processing"]:
-                                        # 正常情况，继续等待
-                                        # 每10次检查（约1秒）记录一次日志，避免日志过多
-                                        if consecutive_same_status % 10 == 0:
-                                            self.logger.debug(f"Agent {agent_id} 任务 {message.task_id} 执行中... (已等待 {elapsed:.1f}秒)")
-                                    else:
-                                        # 其他状态，记录日志但继续等待
-                                        self.logger.debug(f"Agent {agent_id} 任务 {message.task_id} 状态: {task_status}")
-                                else:
-                                    # status为None，可能是任务还未创建，继续等待
-                                    if consecutive_same_status % 10 == 0:  # 每1秒记录一次
-                                        self.logger.debug(f"Agent {agent_id} 任务 {message.task_id} 状态为None，继续等待...")
-                                    consecutive_same_status += 1
-                            except Exception as status_error:
-                                self.logger.warning(f"获取Agent {agent_id} 任务状态失败: {status_error}")
-                                import traceback
-                                self.logger.debug(traceback.format_exc())
-                                # 继续等待，不中断循环
-                            
-                            await asyncio.sleep(poll_interval)
+                        # Agent 在 submit_task 中启动的处理协程会继承这里绑定的进度上报函数
+                        token = bind_progress_reporter(self._progress_reporter(agent_id, message.task_id))
+                        try:
+                            await agent.submit_task(message.task_id, message.payload)
+                        finally:
+                            reset_progress_reporter(token)
+                        waiter = asyncio.create_task(self._wait_agent_task(agent_id, agent, message))
+                        self._agent_waiters.add(waiter)
+                        waiter.add_done_callback(self._agent_waiters.discard)
             except Exception as e:
                 self.logger.error(f"Agent任务处理失败: {agent_id} - {e}")
         await self.event_bus.subscribe("agent_message", agent_id, agent_handler)
@@ -232,6 +188,91 @@ class Coordinator:
         
         self.logger.info(f"Agent {agent_id} 已注册")
     
+    async def _wait_agent_task(self, agent_id: str, agent, message):
+        """轮询等待Agent完成任务，并把结果以 ResultMessage 回传给协调中心"""
+        try:
+            # 轮询等待Agent完成（添加超时保护，最多30分钟）
+            start_time = time.time()
+            max_wait_time = 1800.0  # 30分钟
+            poll_interval = 0.1  # 优化：每0.1秒检查一次，提高响应速度
+            status = None
+            last_status = None
+            consecutive_same_status = 0
+            
+            self.logger.info(f"🔄 开始轮询等待Agent {agent_id} 任务 {message.task_id} 完成...")
+            
+            while True:
+                # 检查超时
+                elapsed = time.time() - start_time
+                if elapsed > max_wait_time:
+                    self.logger.warning(f"Agent {agent_id} 任务 {message.task_id} 等待超时（30分钟）")
+                    result = {
+                        'error': f'任务执行超时（30分钟）',
+                        'success': False,
+                        'task_id': message.task_id
+                    }
+                    await self.event_bus.send_result_message(
+                        source_agent=agent_id,
+                        target_agent='coordinator',
+                        task_id=message.task_id,
+                        result=result,
+                        success=False,
+                        error='任务执行超时（30分钟）'
+                    )
+                    break
+                
+                try:
+                    status = await agent.get_task_status(message.task_id)
+                    if status:
+                        task_status = status.get('status')
+                        
+                        # 记录状态变化
+                        if task_status != last_status:
+                            self.logger.debug(f"Agent {agent_id} 任务 {message.task_id} 状态变化: {last_status} -> {task_status}")
+                            last_status = task_status
+                            consecutive_same_status = 0
+                        else:
+                            consecutive_same_status += 1
+                        
+                        if task_status in ["completed", "failed"]:
+                            success = task_status == 'completed'
+                            result = status.get('result') if success else { 'error': status.get('error', 'Unknown error') }
+                            
+                            elapsed_time = time.time() - start_time
+                            self.logger.info(f"✅ Agent {agent_id} 任务 {message.task_id} 完成，耗时: {elapsed_time:.2f}秒")
+                            
+                            await self.event_bus.send_result_message(
+                                source_agent=agent_id,
+                                target_agent='coordinator',
+                                task_id=message.task_id,
+                                result=result,
+                                success=success,
+                                error=None if success else status.get('error')
+                            )
+                            break
+                        # 如果状态是running或processing，继续等待
+                        elif task_status in ["running", "processing"]:
+                            # 正常情况，继续等待
+                            # 每10次检查（约1秒）记录一次日志，避免日志过多
+                            if consecutive_same_status % 10 == 0:
+                                self.logger.debug(f"Agent {agent_id} 任务 {message.task_id} 执行中... (已等待 {elapsed:.1f}秒)")
+                        else:
+                            # 其他状态，记录日志但继续等待
+                            self.logger.debug(f"Agent {agent_id} 任务 {message.task_id} 状态: {task_status}")
+                    else:
+                        # status为None，可能是任务还未创建，继续等待
+                        if consecutive_same_status % 10 == 0:  # 每1秒记录一次
+                            self.logger.debug(f"Agent {agent_id} 任务 {message.task_id} 状态为None，继续等待...")
+                        consecutive_same_status += 1
+                except Exception as status_error:
+                    self.logger.warning(f"获取Agent {agent_id} 任务状态失败: {status_error}")
+                    self.logger.debug(traceback.format_exc())
+                    # 继续等待，不中断循环
+                
+                await asyncio.sleep(poll_interval)
+        except Exception as e:
+            self.logger.error(f"Agent任务处理失败: {agent_id} - {e}")
+    
     async def unregister_agent(self, agent_id: str):
         """注销Agent"""
         if agent_id in self.agents:
@@ -245,6 +286,7 @@ class Coordinator:
             
             # 取消订阅
             await self.event_bus.unsubscribe("agent_message", agent_id)
+            await self.task_manager.unregister_agent(agent_id)
             
             # 从注册表移除
             del self.agents[agent_id]
@@ -252,14 +294,28 @@ class Coordinator:
             self.logger.info(f"Agent {agent_id} 已注销")
     
     async def create_task(self, task_type: str, task_data: Dict[str, Any], 
-                         priority: TaskPriority = TaskPriority.NORMAL) -> str:
-        """创建任务"""
-        task_id = await self.task_manager.create_task(task_type, task_data, priority)
+                         priority: TaskPriority = TaskPriority.NORMAL,
+                         deadline: Optional[float] = None,
+                         workflow_id: Optional[str] = None,
+                         tenant_id: Optional[str] = None) -> str:
+        """
+        创建任务
+        
+        Args:
+            deadline: 必须开始执行的期限秒数
+            workflow_id / tenant_id: 任务所属的工作流和租户，用于并发工作流、租户间的公平调度和事件隔离
+        """
+        if workflow_id:
+            self.progress_stream.open(workflow_id, tenant_id or DEFAULT_TENANT)
+        task_id = await self.task_manager.create_task(task_type, task_data, priority, deadline=deadline,
+                                                      group=workflow_id, tenant=tenant_id,
+                                                      trace_id=trace_id_for(workflow_id) if workflow_id else None)
         
         # 发布任务创建事件
         await self.event_bus.publish(
             EventType.TASK_CREATED.value,
-            {"task_id": task_id, "task_type": task_type, "priority": priority.name},
+            {"task_id": task_id, "task_type": task_type, "priority": priority.name,
+             **self._task_scope(self.task_manager.tasks[task_id])},
             "coordinator",
             broadcast=True
         )
@@ -267,26 +323,63 @@ class Coordinator:
         return task_id
     
     async def assign_task(self, task_id: str, agent_id: str):
-        """分配任务给Agent"""
+        """分配任务给Agent（Agent有空闲容量时由任务管理器派发）"""
         if agent_id in self.agents:
             success = await self.task_manager.assign_task(task_id, agent_id)
             if success:
-                # 发送任务消息给Agent
-                task = self.task_manager.tasks.get(task_id)
-                if task:
-                    await self.event_bus.send_task_message(
-                        source_agent="coordinator",
-                        target_agent=agent_id,
-                        task_id=task_id,
-                        task_type=task['type'],
-                        payload=task['data']
-                    )
                 self.logger.info(f"任务 {task_id} 已分配给 {agent_id}")
             else:
                 self.logger.error(f"任务分配失败: {task_id} -> {agent_id}")
         else:
             self.logger.error(f"Agent不存在: {agent_id}")
     
+    async def _send_task_to_agent(self, task: Dict[str, Any]):
+        """任务管理器的派发函数：发送任务消息给Agent"""
+        await self.event_bus.send_task_message(
+            source_agent="coordinator",
+            target_agent=task['assigned_agent'],
+            task_id=task['id'],
+            task_type=task['type'],
+            payload=task['data'],
+            trace_id=task.get('trace_id')
+        )
+    
+    @staticmethod
+    def _task_scope(task: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """任务所属的工作流和租户（写入事件负载，供作用域订阅过滤）"""
+        if not task:
+            return {}
+        return {"workflow_id": task['group'], "tenant_id": task['tenant']}
+    
+    def subscribe_workflow_events(self, handler, workflow_id: Optional[str] = None,
+                                  tenant_id: Optional[str] = None,
+                                  event_types: Optional[List[str]] = None) -> str:
+        """订阅某个工作流（或某个租户）的事件，其他工作流的事件不会传给 handler；返回订阅ID"""
+        return self.event_bus.subscribe_scoped(handler, workflow_id=workflow_id, tenant_id=tenant_id,
+                                               event_types=event_types)
+    
+    def unsubscribe_workflow_events(self, subscription_id: str) -> bool:
+        """取消工作流事件订阅"""
+        return self.event_bus.unsubscribe_scoped(subscription_id)
+    
+    def _progress_reporter(self, agent_id: str, task_id: str):
+        """任务的进度上报函数：进度作为事件发布到任务所属的工作流；不属于任何工作流的任务不上报"""
+        scope = self._task_scope(self.task_manager.tasks.get(task_id))
+        if scope.get("workflow_id") in (None, DEFAULT_TASK_GROUP):
+            return None
+        
+        def report(event_type: str, data: Dict[str, Any]):
+            self.event_bus.publish_nowait(event_type, {"task_id": task_id, "agent_id": agent_id, **scope, **data}, agent_id)
+        return report
+    
+    async def _publish_workflow_event(self, event_type: EventType, workflow: Dict[str, Any], **data):
+        await self.event_bus.publish(
+            event_type.value,
+            {"workflow_id": workflow['id'], "tenant_id": workflow['tenant_id'], "status": workflow['status'], **data},
+            "coordinator",
+            broadcast=True
+        )
+    
     async def _setup_event_handlers(self):
         """设置事件处理器"""
         # 订阅任务完成事件
@@ -324,9 +417,10 @@ class Coordinator:
         
         # 发布任务完成事件
         event_type = EventType.TASK_COMPLETED.value if success else EventType.TASK_FAILED.value
+        task = self.task_manager.tasks.get(task_id)
         await self.event_bus.publish(
             event_type,
-            {"task_id": task_id, "agent_id": agent_id, "result": result},
+            {"task_id": task_id, "agent_id": agent_id, "result": result, **self._task_scope(task)},
             "coordinator",
             broadcast=True
         )
@@ -411,94 +505,62 @@ class Coordinator:
         # 修复任务应该由前端用户选择要修复的问题后，通过 /api/v1/fix/execute 接口创建
     
     
-    async def process_workflow(self, file_path: Optional[str] = None, project_path: Optional[str] = None) -> Dict[str, Any]:
+    async def process_workflow(self, file_path: Optional[str] = None, project_path: Optional[str] = None,
+                               tenant_id: Optional[str] = None,
+                               workflow_id: Optional[str] = None) -> Dict[str, Any]:
         """
-        处理完整的工作流 
+        处理完整的工作流
+        
+        主工作流程（按照workflow_diagram.md），以工作流图的形式执行：
+        1. Bug Detection Agent - 检测缺陷，生成缺陷清单（单文件时静态检测与动态检测并发执行）
+        2. Decision Engine - 判断缺陷复杂度（检测结果一到达即逐批决策）
+        2.5. Test Generation Agent - 生成tests文件夹（如果项目没有tests文件夹），与决策并发执行
+        3. Fix Execution Agent - 执行修复（检测和测试生成结束后开始，已决策的缺陷按批提交修复，无需等待全部决策完成）
+        
+        每个工作流有独立的状态和任务命名空间，可同时运行多个工作流，并可通过 cancel_workflow 取消。
+        同一租户（tenant_id）同时运行的工作流数受配额限制，超出的工作流排队等待；
+        所有工作流共享Agent的执行容量，任务管理器在租户和工作流之间公平派发。
+        调用方可以预先指定 workflow_id，以便在工作流启动前通过 subscribe_workflow_events 订阅其事件。
         
-        主工作流程（按照workflow_diagram.md）：
-        1. Bug Detection Agent - 检测缺陷，生成缺陷清单
-        2. Decision Engine - 判断缺陷复杂度
-        2.5. Test Generation Agent - 生成tests文件夹（如果项目没有tests文件夹）
-        3. Fix Execution Agent - 执行修复
+        Raises:
+            ValueError: 指定的 workflow_id 已有工作流在排队或运行
+            WorkflowQuotaExceeded: 租户排队中的工作流数已达上限
         """
-        workflow_id = f"workflow_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        self.current_workflow = {
-            'id': workflow_id,
-            'project_path': project_path,
-            'file_path': file_path,
-            'start_time': datetime.now(),
-            'status': 'running',
-            'tasks': []
-        }
+        workflow_id = workflow_id or self.new_workflow_id()
+        workflow, context = self.workflow_registry.register(
+            workflow_id, tenant_id, {'file_path': file_path, 'project_path': project_path}
+        )
+        # 工作流的事件、任务及Agent中的工具调用都归入工作流的调用链
+        trace_token = bind_trace(trace_id_for(workflow_id))
+        # 工作流的进度流在工作流结束事件时关闭
+        self.progress_stream.open(workflow_id, workflow['tenant_id'], auto_close=False)
         
         try:
             if not file_path and not project_path:
                 raise Exception("process_workflow 需要提供 file_path 或 project_path 之一")
-            self.logger.info(f"开始处理工作流: {workflow_id} (file_path={file_path}, project_path={project_path})")
-            
-            # ===== 阶段1: 缺陷检测 =====
-            self.logger.info("=== 阶段1: Bug Detection Agent - 缺陷检测 ===")
-            # 同时支持单文件/项目两种入口
-            if file_path:
-                detection_task_payload = {
-                    'file_path': file_path,
-                    'options': {
-                        'enable_static': True,
-                        'enable_pylint': True,
-                        'enable_flake8': True,
-                        'enable_bandit': True,
-                        'enable_mypy': True,
-                        'enable_ai_analysis': True,
-                        'enable_dynamic': True  # 启用动态检测
-                    }
-                }
-            else:
-                detection_task_payload = {
-                    'project_path': project_path,
-                    'options': {
-                        'enable_static': True,
-                        'enable_pylint': True,
-                        'enable_flake8': True,
-                        'enable_bandit': True,
-                        'enable_mypy': True,
-                        'enable_ai_analysis': True,
-                        'enable_dynamic': True  # 启用动态检测
-                    }
-                }
-            detection_task_id = await self.create_task('detect_bugs', detection_task_payload, TaskPriority.HIGH)
-
-            
-            self.current_workflow['tasks'].append({
-                'task_id': detection_task_id,
-                'type': 'detect_bugs',
-                'status': 'created',
-                'stage': 1,
-                'agent': 'bug_detection_agent'
-            })
+            await self._publish_workflow_event(EventType.WORKFLOW_QUEUED, workflow)
+            await self.workflow_registry.acquire(workflow_id)
+            await self._publish_workflow_event(EventType.WORKFLOW_STARTED, workflow, queue_time=workflow['queue_time'])
+            self.logger.info(f"开始处理工作流: {workflow_id} (租户={workflow['tenant_id']}, "
+                             f"file_path={file_path}, project_path={project_path})")
             
-            # 分配给Bug Detection Agent
-            if 'bug_detection_agent' in self.agents:
-                await self.assign_task(detection_task_id, 'bug_detection_agent')
-                self.logger.info("缺陷检测任务已分配给Bug Detection Agent")
-            else:
-                raise Exception("Bug Detection Agent未注册")
-            
-            # 等待检测完成
-            self.logger.info("等待缺陷检测完成...")
-            detection_result = await self.task_manager.get_task_result(detection_task_id, timeout=600)
-            
-            if not detection_result.get('success', False):
-                raise Exception(f"缺陷检测失败: {detection_result.get('error', '未知错误')}")
+            graph = self._build_workflow_graph(workflow, file_path, project_path)
+            with span("workflow", workflow_id=workflow_id, tenant_id=workflow['tenant_id']):
+                results = await graph.run(context)
             
+            detection_result = self._merge_detection_results(
+                results.get('static_detection'), results.get('dynamic_detection')
+            )
             issues = detection_result.get('detection_results', {}).get('issues', [])
             self.stats["total_issues_processed"] += len(issues)
             
             if not issues:
                 # 没有发现缺陷，工作流结束
                 self.logger.info("未发现需要修复的缺陷，工作流完成")
-                self.current_workflow['status'] = 'completed'
-                self.current_workflow['end_time'] = datetime.now()
+                workflow['status'] = 'completed'
+                workflow['end_time'] = datetime.now()
                 self.stats["workflows_completed"] += 1
+                await self._publish_workflow_event(EventType.WORKFLOW_COMPLETED, workflow, total_issues=0)
                 
                 return {
                     'workflow_id': workflow_id,
@@ -508,107 +570,32 @@ class Coordinator:
                     'summary': {
                         'total_issues': 0,
                         'fixed_issues': 0,
-                        'processing_time': (self.current_workflow['end_time'] - self.current_workflow['start_time']).total_seconds()
+                        'processing_time': (workflow['end_time'] - workflow['start_time']).total_seconds()
                     }
                 }
             
-            # ===== 阶段2: 智能决策 =====
-            self.logger.info("=== 阶段2: Decision Engine - 智能决策 ===")
-            self.logger.info(f"决策引擎开始分析 {len(issues)} 个缺陷")
-            
-            # 使用决策引擎分析缺陷复杂度
-            decisions = await self.decision_engine.analyze_complexity(issues)
+            decisions = results.get('decision')
+            test_gen_result = results.get('test_generation')
+            fix_result = results.get('fix')
             
             auto_fixable_count = len(decisions.get('auto_fixable', []))
             ai_assisted_count = len(decisions.get('ai_assisted', []))
             manual_review_count = len(decisions.get('manual_review', []))
             
-            self.logger.info(f"决策分析完成: 自动修复={auto_fixable_count}, AI辅助={ai_assisted_count}, 人工审查={manual_review_count}")
-            
-            # ===== 阶段2.5: 测试生成（新增）=====
-            test_gen_result = None
-            if project_path:
-                self.logger.info("=== 阶段2.5: Test Generation Agent - 测试生成 ===")
-                if not self._has_tests_folder(project_path):
-                    self.logger.info("检测到项目没有tests文件夹，开始生成测试...")
-                    test_gen_task_id = await self.create_task('generate_tests', {
-                        'project_path': project_path,
-                        'issues': issues,
-                        'issue_description': None  # 可以从detection_result中提取
-                    }, TaskPriority.HIGH)
-                    
-                    self.current_workflow['tasks'].append({
-                        'task_id': test_gen_task_id,
-                        'type': 'generate_tests',
-                        'status': 'created',
-                        'stage': 2.5,
-                        'agent': 'test_generation_agent'
-                    })
-                    
-                    # 分配给Test Generation Agent
-                    if 'test_generation_agent' in self.agents:
-                        await self.assign_task(test_gen_task_id, 'test_generation_agent')
-                        self.logger.info("测试生成任务已分配给Test Generation Agent")
-                        
-                        # 等待测试生成完成
-                        self.logger.info("等待测试生成完成...")
-                        test_gen_result = await self.task_manager.get_task_result(test_gen_task_id, timeout=300)
-                        
-                        if test_gen_result.get('success'):
-                            self.logger.info(f"测试生成成功: 生成 {test_gen_result.get('total_tests', 0)} 个测试文件")
-                        else:
-                            self.logger.warning(f"测试生成失败: {test_gen_result.get('error', '未知错误')}，但继续执行修复流程")
-                    else:
-                        self.logger.warning("Test Generation Agent未注册，跳过测试生成步骤")
-                else:
-                    self.logger.info("项目已有tests文件夹，跳过测试生成")
-            
-            # ===== 阶段3: 修复执行 =====
-            self.logger.info("=== 阶段3: Fix Execution Agent - 修复执行 ===")
-            fix_task_id = await self.create_task('fix_issues', {
-                'project_path': project_path,
-                'issues': issues,
-                'decisions': decisions,
-                'fix_options': {
-                    'backup_enabled': True,
-                    'rollback_enabled': True,
-                    'auto_fix_enabled': True,
-                    'ai_assisted_enabled': True
-                }
-            }, TaskPriority.HIGH)
-            
-            self.current_workflow['tasks'].append({
-                'task_id': fix_task_id,
-                'type': 'fix_issues',
-                'status': 'created',
-                'stage': 3,
-                'agent': 'fix_execution_agent'
-            })
-            
-            # 分配给Fix Execution Agent
-            if 'fix_execution_agent' in self.agents:
-                await self.assign_task(fix_task_id, 'fix_execution_agent')
-                self.logger.info("修复任务已分配给Fix Execution Agent")
-            else:
-                raise Exception("Fix Execution Agent未注册")
-                
-                # 等待修复完成
-            self.logger.info("等待修复完成...")
-            fix_result = await self.task_manager.get_task_result(fix_task_id, timeout=900)
-            
             if not fix_result.get('success', False):
-                raise Exception(f"修复失败: {fix_result.get('error', '未知错误')}")
+                raise Exception(f"修复失败: {fix_result.get('error') or '; '.join(fix_result.get('errors', [])) or '未知错误'}")
             
             self.stats["total_fixes_applied"] += len(fix_result.get('fix_results', []))
             
             # ===== 工作流完成 =====
-            self.logger.info("=== 工作流完成 ===")
-            self.current_workflow['status'] = 'completed'
-            self.current_workflow['end_time'] = datetime.now()
+            self.logger.info(f"=== 工作流完成: {workflow_id} ===")
+            workflow['status'] = 'completed'
+            workflow['end_time'] = datetime.now()
             self.stats["workflows_completed"] += 1
+            await self._publish_workflow_event(EventType.WORKFLOW_COMPLETED, workflow, total_issues=len(issues))
             
             # 生成统计信息
-            workflow_duration = (self.current_workflow['end_time'] - self.current_workflow['start_time']).total_seconds()
+            workflow_duration = (workflow['end_time'] - workflow['start_time']).total_seconds()
             
             return {
                 'workflow_id': workflow_id,
@@ -619,7 +606,8 @@ class Coordinator:
                     'ai_assisted': ai_assisted_count,
                     'manual_review': manual_review_count,
                     'workflow_duration_seconds': workflow_duration,
-                    'stages_completed': 3  # 检测、决策、修复（测试生成是2.5阶段）
+                    'stages_completed': 3,  # 检测、决策、修复（测试生成是2.5阶段）
+                    'node_timings': dict(context.node_timings)
                 },
                 'results': {
                     'detection_result': detection_result,
@@ -633,36 +621,314 @@ class Coordinator:
                     'processing_time': workflow_duration
                 }
             }
-                
-        except Exception as e:
-            self.logger.error(f"工作流处理失败: {e}")
-            self.current_workflow['status'] = 'failed'
-            self.current_workflow['error'] = str(e)
-            self.current_workflow['end_time'] = datetime.now()
-            self.stats["workflows_failed"] += 1
+        
+        except (Exception, asyncio.CancelledError) as e:
+            cancelled = isinstance(e, (WorkflowCancelled, asyncio.CancelledError))
+            error = f"工作流已取消: {workflow_id}" if cancelled else str(e)
+            self.logger.error(f"工作流处理失败: {error}")
+            workflow['status'] = 'cancelled' if cancelled else 'failed'
+            workflow['error'] = error
+            workflow['end_time'] = datetime.now()
+            self.stats["workflows_cancelled" if cancelled else "workflows_failed"] += 1
+            await self._publish_workflow_event(
+                EventType.WORKFLOW_CANCELLED if cancelled else EventType.WORKFLOW_FAILED, workflow, error=error
+            )
+            if isinstance(e, asyncio.CancelledError):
+                raise
             
             return {
                 'workflow_id': workflow_id,
                 'success': False,
-                'error': str(e),
+                'error': error,
                 'summary': {
-                    'processing_time': (self.current_workflow['end_time'] - self.current_workflow['start_time']).total_seconds()
+                    'processing_time': (workflow['end_time'] - workflow['start_time']).total_seconds()
                 }
             }
         finally:
-            # 记录工作流历史
-            if self.current_workflow:
-                self.workflow_history.append(self.current_workflow.copy())
-                # 限制历史记录数量
-                if len(self.workflow_history) > 100:
-                    self.workflow_history = self.workflow_history[-50:]
+            # 归还租户配额、记录工作流历史，并清理该工作流已结束的任务记录
+            WORKFLOW_DURATION.observe((datetime.now() - workflow['queued_at']).total_seconds(),
+                                      status=workflow['status'])
+            self.workflow_registry.finish(workflow_id)
+            self.task_manager.forget_group(workflow_id)
+            reset_trace(trace_token)
+    
+    @staticmethod
+    def new_workflow_id() -> str:
+        """生成工作流ID"""
+        return f"workflow_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    
+    async def cancel_workflow(self, workflow_id: str) -> bool:
+        """
+        取消排队中或运行中的工作流
+        
+        尚未派发的任务被取消；已在Agent上执行的任务会继续执行，但其结果不再被使用。
+        """
+        context = self.workflow_registry.contexts.get(workflow_id)
+        if context is None:
+            return False
+        context.cancel()
+        self.workflow_registry.cancel_queued(workflow_id)
+        await self.task_manager.cancel_group(workflow_id)
+        self.logger.info(f"工作流取消请求已发出: {workflow_id}")
+        return True
+    
+    def get_workflow(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        """获取排队中、运行中或历史工作流的状态"""
+        return self.workflow_registry.get(workflow_id)
+    
+    def list_workflows(self, tenant_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """列出排队中和运行中的工作流，可按租户过滤"""
+        return self.workflow_registry.list_workflows(tenant_id)
+    
+    def get_workflow_tasks(self, workflow_id: str) -> List[Dict[str, Any]]:
+        """获取工作流自己的任务（运行中的工作流）"""
+        return self.task_manager.get_group_tasks(workflow_id)
+    
+    def get_workflow_trace(self, workflow_id: str) -> List[Dict[str, Any]]:
+        """获取工作流调用链中仍在缓冲区内的 span（工作流节点、Agent任务、工具和 LLM 调用）"""
+        return get_trace(trace_id_for(workflow_id))
+    
+    def _build_workflow_graph(self, workflow: Dict[str, Any], file_path: Optional[str],
+                              project_path: Optional[str]) -> WorkflowGraph:
+        """
+        构建工作流图
+        
+        static_detection ──┬──> decision（逐批消费检测结果）──> fix（逐批消费决策结果）
+        dynamic_detection ─┤
+                           └──> test_generation（与决策并发）
+        
+        项目检测的动态检测在 Bug Detection Agent 内部完成，因此只有单文件入口会拆分出 dynamic_detection 节点。
+        检测和测试生成都会读取被修复的文件/项目，fix 会改写它们，因此 fix 要等所有检测节点和
+        test_generation 结束后才启动（此时决策数据流中已到达的结果立即开始修复，之后的逐批到达）。
+        """
+        detection_options = {
+            'enable_static': True,
+            'enable_pylint': True,
+            'enable_flake8': True,
+            'enable_bandit': True,
+            'enable_mypy': True,
+            'enable_ai_analysis': True,
+            'enable_dynamic': True  # 启用动态检测
+        }
+        target = {'file_path': file_path} if file_path else {'project_path': project_path}
+        detection_nodes = ['static_detection']
+        split_dynamic = bool(file_path)
+        
+        async def static_detection(context: WorkflowContext):
+            options = dict(detection_options, enable_dynamic=not split_dynamic)
+            return await self._run_detection_node(workflow, context, 'static_detection',
+                                                  {**target, 'options': options})
+        
+        async def dynamic_detection(context: WorkflowContext):
+            options = {key: False for key in detection_options}
+            options['enable_dynamic'] = True
+            return await self._run_detection_node(workflow, context, 'dynamic_detection',
+                                                  {**target, 'options': options})
+        
+        nodes = [WorkflowNode('static_detection', static_detection, timeout=600)]
+        if split_dynamic:
+            nodes.append(WorkflowNode('dynamic_detection', dynamic_detection, optional=True, timeout=600))
+            detection_nodes.append('dynamic_detection')
+        
+        async def decision(context: WorkflowContext):
+            return await self._run_decision_node(context, detection_nodes)
+        
+        async def test_generation(context: WorkflowContext):
+            issues = []
+            for name in detection_nodes:
+                result = context.results.get(name) or {}
+                issues.extend(result.get('detection_results', {}).get('issues', []))
+            return await self._run_test_generation_node(workflow, project_path, issues)
+        
+        async def fix(context: WorkflowContext):
+            return await self._run_fix_node(workflow, context, project_path)
+        
+        nodes.extend([
+            WorkflowNode('decision', decision, streams=detection_nodes),
+            WorkflowNode('test_generation', test_generation, deps=detection_nodes, optional=True, timeout=300),
+            WorkflowNode('fix', fix, deps=detection_nodes + ['test_generation'], streams=['decision'])
+        ])
+        return WorkflowGraph(nodes)
+    
+    async def _dispatch_task(self, workflow: Dict[str, Any], task_type: str, payload: Dict[str, Any],
+                             agent_id: str, stage: float, timeout: float) -> Dict[str, Any]:
+        """创建任务、分配给Agent并等待结果"""
+        if agent_id not in self.agents:
+            raise Exception(f"{agent_id} 未注册")
+        task_id = await self.create_task(task_type, payload, TaskPriority.HIGH, deadline=timeout,
+                                         workflow_id=workflow['id'], tenant_id=workflow['tenant_id'])
+        workflow['tasks'].append({
+            'task_id': task_id,
+            'type': task_type,
+            'status': 'created',
+            'stage': stage,
+            'agent': agent_id
+        })
+        await self.assign_task(task_id, agent_id)
+        result = await self.task_manager.get_task_result(task_id, timeout=timeout)
+        return result or {'success': False, 'error': f'任务不存在: {task_id}'}
+    
+    async def _run_detection_node(self, workflow: Dict[str, Any], context: WorkflowContext,
+                                  node_name: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """阶段1：缺陷检测，检测到的缺陷逐条写入节点数据流"""
+        self.logger.info(f"=== 阶段1: Bug Detection Agent - 缺陷检测 ({node_name}) ===")
+        detection_result = await self._dispatch_task(
+            workflow, 'detect_bugs', payload, 'bug_detection_agent', stage=1, timeout=600
+        )
+        if not detection_result.get('success', False):
+            raise Exception(f"缺陷检测失败: {detection_result.get('error', '未知错误')}")
+        
+        stream = context.stream(node_name)
+        for issue in detection_result.get('detection_results', {}).get('issues', []):
+            await stream.emit(issue)
+        return detection_result
+    
+    async def _run_decision_node(self, context: WorkflowContext, detection_nodes: List[str]) -> Dict[str, Any]:
+        """阶段2：智能决策，逐批消费检测结果，每个缺陷决策完成后立即交给修复阶段"""
+        self.logger.info("=== 阶段2: Decision Engine - 智能决策 ===")
+        batch_size = self.workflow_config.get("decision_batch_size", 20)
+        output = context.stream('decision')
+        decision_list = []
+        
+        async def consume(name: str):
+            async for batch in context.stream(name).batches(batch_size):
+                decisions = await self.decision_engine.analyze_complexity(batch)
+                for item in self._iter_decisions(decisions):
+                    decision_list.append(item['decision'])
+                    await output.emit(item)
+        
+        await asyncio.gather(*(consume(name) for name in detection_nodes))
+        merged = self._group_decisions(decision_list)
+        self.logger.info(
+            f"决策分析完成: 自动修复={len(merged['auto_fixable'])}, AI辅助={len(merged['ai_assisted'])}, "
+            f"人工审查={len(merged['manual_review'])}"
+        )
+        return merged
+    
+    async def _run_test_generation_node(self, workflow: Dict[str, Any], project_path: Optional[str],
+                                        issues: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """阶段2.5：测试生成（项目没有tests文件夹时），与决策并发执行，修复在其结束后开始"""
+        if not project_path or not issues:
+            return None
+        self.logger.info("=== 阶段2.5: Test Generation Agent - 测试生成 ===")
+        if await asyncio.to_thread(self._has_tests_folder, project_path):
+            self.logger.info("项目已有tests文件夹，跳过测试生成")
+            return None
+        if 'test_generation_agent' not in self.agents:
+            self.logger.warning("Test Generation Agent未注册，跳过测试生成步骤")
+            return None
+        
+        self.logger.info("检测到项目没有tests文件夹，开始生成测试...")
+        test_gen_result = await self._dispatch_task(workflow, 'generate_tests', {
+            'project_path': project_path,
+            'issues': issues,
+            'issue_description': None  # 可以从detection_result中提取
+        }, 'test_generation_agent', stage=2.5, timeout=300)
+        
+        if test_gen_result.get('success'):
+            self.logger.info(f"测试生成成功: 生成 {test_gen_result.get('total_tests', 0)} 个测试文件")
+        else:
+            self.logger.warning(f"测试生成失败: {test_gen_result.get('error', '未知错误')}，但继续执行修复流程")
+        return test_gen_result
+    
+    async def _run_fix_node(self, workflow: Dict[str, Any], context: WorkflowContext,
+                            project_path: Optional[str]) -> Optional[Dict[str, Any]]:
+        """阶段3：修复执行，已决策的缺陷按 fix_chunk_size 分批提交，最多 fix_concurrency 批同时修复"""
+        chunk_size = self.workflow_config.get("fix_chunk_size", 10)
+        semaphore = asyncio.Semaphore(self.workflow_config.get("fix_concurrency", 1))
+        chunk_tasks = []
+        
+        async def fix_chunk(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+            async with semaphore:
+                self.logger.info(f"=== 阶段3: Fix Execution Agent - 修复执行 ({len(items)} 个缺陷) ===")
+                return await self._dispatch_task(workflow, 'fix_issues', {
+                    'project_path': project_path,
+                    'issues': [item['issue'] for item in items],
+                    'decisions': self._group_decisions([item['decision'] for item in items]),
+                    'fix_options': {
+                        'backup_enabled': True,
+                        'rollback_enabled': True,
+                        'auto_fix_enabled': True,
+                        'ai_assisted_enabled': True
+                    }
+                }, 'fix_execution_agent', stage=3, timeout=900)
+        
+        try:
+            async for items in context.stream('decision').batches(chunk_size):
+                chunk_tasks.append(asyncio.create_task(fix_chunk(items)))
+            chunk_results = await asyncio.gather(*chunk_tasks)
+        finally:
+            for task in chunk_tasks:
+                task.cancel()
+        
+        if not chunk_results:
+            return None
+        return self._merge_fix_results(chunk_results)
+    
+    def _merge_detection_results(self, static_result: Optional[Dict[str, Any]],
+                                 dynamic_result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """合并静态检测与动态检测结果"""
+        detection_result = dict(static_result or {})
+        dynamic_issues = ((dynamic_result or {}).get('detection_results') or {}).get('issues', [])
+        if dynamic_issues:
+            detection_results = dict(detection_result.get('detection_results') or {})
+            detection_results['issues'] = list(detection_results.get('issues', [])) + dynamic_issues
+            detection_results['total_issues'] = len(detection_results['issues'])
+            detection_result['detection_results'] = detection_results
+            detection_result['dynamic_detection_result'] = dynamic_result
+        return detection_result
+    
+    @staticmethod
+    def _iter_decisions(decisions: Dict[str, Any]):
+        for category in ("auto_fixable", "ai_assisted", "manual_review", "skip"):
+            for decision in decisions.get(category, []):
+                yield {'issue': decision.get('issue'), 'decision': decision}
+    
+    @staticmethod
+    def _group_decisions(decision_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """把单个缺陷的决策按类别分组（与 DecisionEngine.analyze_complexity 的返回格式一致）"""
+        grouped = {"auto_fixable": [], "ai_assisted": [], "manual_review": [], "skip": []}
+        for decision in decision_list:
+            grouped.get(decision.get("category"), grouped["skip"]).append(decision)
+        grouped["summary"] = {
+            "total_issues": len(decision_list),
+            **{f"{category}_count": len(items) for category, items in grouped.items() if category != "summary"}
+        }
+        return grouped
+    
+    @staticmethod
+    def _merge_fix_results(chunk_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """合并各批修复任务的结果"""
+        fix_results, errors = [], []
+        total = fixed = failed = 0
+        for result in chunk_results:
+            for item in result.get('fix_results', []):
+                fix_results.append({**item, 'issue_index': len(fix_results) + 1})
+            errors.extend(result.get('errors', []))
+            if result.get('error'):
+                errors.append(result['error'])
+            total += result.get('total_issues', 0)
+            fixed += result.get('fixed_issues', 0)
+            failed += result.get('failed_issues', 0)
+        return {
+            'success': all(result.get('success', False) for result in chunk_results),
+            'total_issues': total,
+            'fixed_issues': fixed,
+            'failed_issues': failed,
+            'fix_results': fix_results,
+            'errors': errors,
+            'chunks': len(chunk_results),
+            'message': f"修复完成: {fixed}/{total} 个问题 (失败: {failed})"
+        }
     
     async def get_stats(self) -> Dict[str, Any]:
         """获取统计信息"""
         return {
             **self.stats,
             "registered_agents": list(self.agents.keys()),
-            "current_workflow": self.current_workflow,
+            "active_workflows": list(self.workflow_registry.workflows.keys()),
+            "workflow_registry": self.workflow_registry.get_stats(),
+            "progress_stream": self.progress_stream.get_stats(),
             "task_manager_stats": await self.task_manager.get_stats(),
             "decision_engine_stats": await self.decision_engine.get_stats(),
             "event_bus_stats": await self.event_bus.get_stats()
@@ -673,7 +939,7 @@ class Coordinator:
         return {
             "is_running": self.is_running,
             "registered_agents": len(self.agents),
-            "current_workflow": self.current_workflow,
+            "active_workflows": len(self.workflow_registry.workflows),
             "task_manager": await self.task_manager.health_check(),
             "decision_engine": await self.decision_engine.health_check(),
             "event_bus": await self.event_bus.health_check()
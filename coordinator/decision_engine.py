@@ -8,9 +8,14 @@ import logging
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 import json
+from pathlib import Path
 
+from .decision_memo import DecisionMemo, issue_signature
 from .message_types import DEFECT_TYPES, FIX_STRATEGIES
 
+# 默认备忘录位置：项目根目录下的 cache/，与启动时的工作目录无关
+DEFAULT_MEMO_PATH = Path(__file__).resolve().parent.parent / "cache" / "decision_memo.json"
+
 
 class DecisionEngine:
     """决策引擎 - 系统的智能决策核心"""
@@ -25,6 +30,16 @@ class DecisionEngine:
         self.confidence_threshold = config.get("confidence_threshold", 0.8)
         self.max_retry_attempts = config.get("max_retry_attempts", 3)
         
+        # 批量决策配置
+        self.max_concurrency = config.get("max_concurrency", 8)  # 并发评估的缺陷数上限
+        self.ai_batch_size = config.get("ai_batch_size", 20)  # 每次AI调用分类的缺陷数（1表示逐个调用）
+        
+        # 决策备忘录：签名相同的缺陷复用决策（memo_path 为空时只在内存中缓存）
+        self.memo = DecisionMemo(
+            config.get("memo_path", DEFAULT_MEMO_PATH),
+            max_entries=config.get("memo_max_entries", 10000)
+        )
+        
         # 决策规则
         self.simple_rules = DEFECT_TYPES.get("simple", {})
         self.medium_rules = DEFECT_TYPES.get("medium", {})
@@ -43,7 +58,10 @@ class DecisionEngine:
             "ai_assisted_decisions": 0,
             "manual_review_decisions": 0,
             "successful_decisions": 0,
-            "failed_decisions": 0
+            "failed_decisions": 0,
+            "memo_hits": 0,
+            "ai_calls": 0,
+            "ai_batch_calls": 0
         }
     
     async def start(self):
@@ -59,7 +77,12 @@ class DecisionEngine:
         self.logger.info("决策引擎已停止")
     
     async def analyze_complexity(self, issues: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """分析缺陷复杂度并制定修复策略"""
+        """
+        分析缺陷复杂度并制定修复策略
+        
+        签名相同的缺陷只决策一次（并复用历史决策），其余缺陷在并发上限内评估，
+        需要AI判断的缺陷按 ai_batch_size 合并为一次AI调用。
+        """
         self.logger.info(f"开始分析 {len(issues)} 个缺陷的复杂度")
         
         decisions = {
@@ -76,53 +99,169 @@ class DecisionEngine:
             }
         }
         
-        for issue in issues:
-            try:
-                decision = await self._analyze_single_issue(issue)
-                
-                if decision["category"] == "auto_fixable":
-                    decisions["auto_fixable"].append(decision)
-                    decisions["summary"]["auto_fixable_count"] += 1
-                elif decision["category"] == "ai_assisted":
-                    decisions["ai_assisted"].append(decision)
-                    decisions["summary"]["ai_assisted_count"] += 1
-                elif decision["category"] == "manual_review":
-                    decisions["manual_review"].append(decision)
-                    decisions["summary"]["manual_review_count"] += 1
-                else:
-                    decisions["skip"].append(decision)
-                    decisions["summary"]["skip_count"] += 1
-                    
-            except Exception as e:
-                self.logger.error(f"分析缺陷失败: {issue.get('type', 'unknown')} - {e}")
+        results = await self._decide_issues(issues)
+        
+        for issue, decision in zip(issues, results):
+            if isinstance(decision, Exception):
+                self.logger.error(f"分析缺陷失败: {issue.get('type', 'unknown')} - {decision}")
                 # 将失败的缺陷标记为需要人工审查
                 decisions["manual_review"].append({
                     "issue": issue,
                     "category": "manual_review",
                     "strategy": "manual_review",
                     "confidence": 0.0,
-                    "reason": f"分析失败: {str(e)}"
+                    "reason": f"分析失败: {str(decision)}"
                 })
-        
+                continue
+            
+            # 决策可能来自备忘录（多个缺陷共享同一个决策对象），复制后再关联到具体缺陷
+            decision = {**decision, "issue": issue}
+            if decision["category"] == "auto_fixable":
+                decisions["auto_fixable"].append(decision)
+                decisions["summary"]["auto_fixable_count"] += 1
+            elif decision["category"] == "ai_assisted":
+                decisions["ai_assisted"].append(decision)
+                decisions["summary"]["ai_assisted_count"] += 1
+            elif decision["category"] == "manual_review":
+                decisions["manual_review"].append(decision)
+                decisions["summary"]["manual_review_count"] += 1
+            else:
+                decisions["skip"].append(decision)
+                decisions["summary"]["skip_count"] += 1
+        
+        await asyncio.to_thread(self.memo.save)
         self.stats["decisions_made"] += len(issues)
         self.logger.info(f"复杂度分析完成: {decisions['summary']}")
         
         return decisions
     
-    async def _analyze_single_issue(self, issue: Dict[str, Any]) -> Dict[str, Any]:
-        """分析单个缺陷的复杂度"""
+    async def _decide_issues(self, issues: List[Dict[str, Any]]) -> List[Any]:
+        """为一组缺陷做决策，返回与输入顺序一致的决策（失败的缺陷对应异常对象）"""
+        results: List[Any] = [None] * len(issues)
+        
+        # 1. 按签名分组，备忘录命中的直接复用
+        groups: Dict[str, List[int]] = {}
+        for index, issue in enumerate(issues):
+            try:
+                signature = issue_signature(issue)
+            except Exception as e:
+                results[index] = e
+                continue
+            groups.setdefault(signature, []).append(index)
+        
+        pending: Dict[str, List[int]] = {}
+        for signature, indexes in groups.items():
+            cached = self.memo.get(signature)
+            if cached is not None:
+                self.stats["memo_hits"] += len(indexes)
+                for index in indexes:
+                    results[index] = dict(cached)
+                    self._record_decision(cached, issues[index], from_memo=True)
+            else:
+                pending[signature] = indexes
+        
+        # 2. 每组取一个代表，在并发上限内进行规则和上下文决策
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def pre_ai(signature: str):
+            async with semaphore:
+                return await self._pre_ai_decision(issues[pending[signature][0]])
+        
+        signatures = list(pending)
+        pre_results = await asyncio.gather(*(pre_ai(sig) for sig in signatures), return_exceptions=True)
+        
+        needs_ai: List[Tuple[str, Dict[str, Any], Dict[str, Any]]] = []
+        for signature, pre in zip(signatures, pre_results):
+            if isinstance(pre, Exception):
+                for index in pending[signature]:
+                    results[index] = pre
+                continue
+            rule_decision, context_decision, decided = pre
+            if decided is not None:
+                self._resolve(signature, decided, pending[signature], results, issues)
+            else:
+                needs_ai.append((signature, rule_decision, context_decision))
+        
+        # 3. AI增强决策（批量或逐个），再综合决策
+        if needs_ai:
+            representatives = [issues[pending[signature][0]] for signature, _, _ in needs_ai]
+            ai_decisions = await self._ai_decisions(representatives, semaphore)
+            for (signature, rule_decision, context_decision), ai_decision in zip(needs_ai, ai_decisions):
+                final_decision = self._combine_decisions(rule_decision, context_decision, ai_decision)
+                self._resolve(signature, final_decision, pending[signature], results, issues)
+        
+        return results
+    
+    def _resolve(
+        self,
+        signature: str,
+        decision: Dict[str, Any],
+        indexes: List[int],
+        results: List[Any],
+        issues: List[Dict[str, Any]]
+    ):
+        """将决策写回同一签名的所有缺陷并记录历史，同时记入备忘录（AI调用失败的决策不缓存）"""
+        if decision.get("rule_source") != "ai_enhanced_failed":
+            self.memo.put(signature, decision)
+        for index in indexes:
+            results[index] = dict(decision)
+            self._record_decision(decision, issues[index])
+    
+    async def _ai_decisions(
+        self,
+        issues: List[Dict[str, Any]],
+        semaphore: asyncio.Semaphore
+    ) -> List[Dict[str, Any]]:
+        """对一组缺陷进行AI增强决策：ai_batch_size>1 时按批调用，结果按索引映射回缺陷"""
+        if self.ai_batch_size <= 1:
+            async def single(issue: Dict[str, Any]) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self._ai_enhanced_decision(issue)
+            return list(await asyncio.gather(*(single(issue) for issue in issues)))
+        
+        async def batch(chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await self._ai_enhanced_batch_decision(chunk)
+        
+        chunks = [issues[i:i + self.ai_batch_size] for i in range(0, len(issues), self.ai_batch_size)]
+        batch_results = await asyncio.gather(*(batch(chunk) for chunk in chunks))
+        return [decision for chunk_result in batch_results for decision in chunk_result]
+    
+    async def _pre_ai_decision(
+        self,
+        issue: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any], Optional[Dict[str, Any]]]:
+        """规则和上下文决策；返回 (规则决策, 上下文决策, 已确定的决策或None)"""
         issue_type = issue.get("type", "unknown")
         severity = issue.get("severity", "info")
         
         # 1. 基于规则的决策
         rule_decision = self._rule_based_decision(issue_type, severity)
         if rule_decision["confidence"] > self.confidence_threshold:
-            return rule_decision
+            return rule_decision, rule_decision, rule_decision
         
         # 2. 基于上下文的增强决策
         context_decision = await self._context_enhanced_decision(issue)
         if context_decision["confidence"] > self.confidence_threshold:
-            return context_decision
+            return rule_decision, context_decision, context_decision
+        
+        return rule_decision, context_decision, None
+    
+    async def _analyze_single_issue(self, issue: Dict[str, Any]) -> Dict[str, Any]:
+        """分析单个缺陷的复杂度"""
+        signature = issue_signature(issue)
+        cached = self.memo.get(signature)
+        if cached is not None:
+            self.stats["memo_hits"] += 1
+            self._record_decision(cached, issue, from_memo=True)
+            return cached
+        
+        # 1-2. 规则和上下文决策
+        rule_decision, context_decision, decided = await self._pre_ai_decision(issue)
+        if decided is not None:
+            self._record_decision(decided, issue)
+            self.memo.put(signature, decided)
+            return decided
         
         # 3. AI增强决策
         ai_decision = await self._ai_enhanced_decision(issue)
@@ -132,6 +271,8 @@ class DecisionEngine:
         
         # 记录决策历史
         self._record_decision(final_decision, issue)
+        if final_decision.get("rule_source") != "ai_enhanced_failed":
+            self.memo.put(signature, final_decision)
         
         return final_decision
     
@@ -268,6 +409,28 @@ class DecisionEngine:
                 "rule_source": "ai_enhanced_failed"
             }
     
+    async def _ai_enhanced_batch_decision(self, issues: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """批量AI增强决策：一次调用分类多个缺陷，按索引映射回结果，缺失的结果逐个补调"""
+        try:
+            prompt = self._build_batch_ai_prompt(issues)
+            ai_result = await self._call_ai_batch_api(prompt, len(issues))
+            by_index = {}
+            for item in ai_result.get("results", []):
+                index = item.get("index")
+                if isinstance(index, int) and 0 <= index < len(issues):
+                    by_index[index] = item
+        except Exception as e:
+            self.logger.warning(f"批量AI决策失败，改为逐个调用: {e}")
+            by_index = {}
+        
+        decisions = []
+        for index, issue in enumerate(issues):
+            if index in by_index:
+                decisions.append(self._parse_ai_result(by_index[index], issue))
+            else:
+                decisions.append(await self._ai_enhanced_decision(issue))
+        return decisions
+    
     def _build_ai_prompt(self, issue: Dict[str, Any]) -> str:
         """构建AI分析提示"""
         issue_type = issue.get("type", "unknown")
@@ -296,6 +459,42 @@ class DecisionEngine:
     "reason": "分析理由",
     "suggestions": ["修复建议1", "修复建议2"]
 }}
+"""
+        return prompt
+    
+    def _build_batch_ai_prompt(self, issues: List[Dict[str, Any]]) -> str:
+        """构建批量AI分析提示（每个缺陷带索引，结果按索引返回）"""
+        lines = []
+        for index, issue in enumerate(issues):
+            lines.append(
+                f"[{index}] 缺陷类型: {issue.get('type', 'unknown')} | 错误信息: {issue.get('message', '')} | "
+                f"文件路径: {issue.get('file_path', '')} | 行号: {issue.get('line', 0)}"
+            )
+        issue_list = "\n".join(lines)
+        
+        prompt = f"""
+请分析以下 {len(issues)} 个代码缺陷的复杂度和修复策略：
+
+{issue_list}
+
+对每个缺陷判断复杂度：
+1. 简单 - 可以直接自动修复（如格式化、删除未使用导入等）
+2. 中等 - 需要AI辅助修复（如重命名、重构建议等）
+3. 复杂 - 需要人工审查（如安全漏洞、业务逻辑错误等）
+
+请以JSON格式返回分析结果，results 中每一项的 index 对应上面的缺陷编号：
+{{
+    "results": [
+        {{
+            "index": 0,
+            "complexity": "simple|medium|complex",
+            "strategy": "auto_fix|ai_assisted|manual_review",
+            "confidence": 0.0-1.0,
+            "reason": "分析理由",
+            "suggestions": ["修复建议1", "修复建议2"]
+        }}
+    ]
+}}
 """
         return prompt
     
@@ -303,6 +502,7 @@ class DecisionEngine:
         """调用AI API进行分析"""
         # 这里是模拟实现，实际需要调用DeepSeek API
         # 模拟AI返回结果
+        self.stats["ai_calls"] += 1
         await asyncio.sleep(0.1)  # 模拟API调用延迟
         
         # 模拟AI分析结果
@@ -314,6 +514,26 @@ class DecisionEngine:
             "suggestions": ["建议使用AI辅助修复", "需要进一步分析代码上下文"]
         }
     
+    async def _call_ai_batch_api(self, prompt: str, count: int) -> Dict[str, Any]:
+        """调用AI API对多个缺陷进行一次性分析"""
+        # 这里是模拟实现，实际需要调用DeepSeek API
+        self.stats["ai_batch_calls"] += 1
+        await asyncio.sleep(0.1)  # 模拟API调用延迟（与单个缺陷相同的一次往返）
+        
+        return {
+            "results": [
+                {
+                    "index": index,
+                    "complexity": "medium",
+                    "strategy": "ai_assisted",
+                    "confidence": 0.7,
+                    "reason": "AI分析认为这是一个中等复杂度的缺陷",
+                    "suggestions": ["建议使用AI辅助修复", "需要进一步分析代码上下文"]
+                }
+                for index in range(count)
+            ]
+        }
+    
     def _parse_ai_result(self, ai_result: Dict[str, Any], issue: Dict[str, Any]) -> Dict[str, Any]:
         """解析AI分析结果"""
         complexity = ai_result.get("complexity", "medium")
@@ -356,14 +576,15 @@ class DecisionEngine:
         
         return best_decision
     
-    def _record_decision(self, decision: Dict[str, Any], issue: Dict[str, Any]):
-        """记录决策历史"""
+    def _record_decision(self, decision: Dict[str, Any], issue: Dict[str, Any], from_memo: bool = False):
+        """记录决策历史（包括备忘录命中的决策，from_memo 标记来源）"""
         record = {
             "timestamp": datetime.now().isoformat(),
             "issue_type": issue.get("type", "unknown"),
             "issue_severity": issue.get("severity", "info"),
             "decision": decision,
-            "issue_id": issue.get("id", "unknown")
+            "issue_id": issue.get("id", "unknown"),
+            "from_memo": from_memo
         }
         
         self.decision_history.append(record)
@@ -441,8 +662,11 @@ class DecisionEngine:
             "config": {
                 "ai_model": self.ai_model,
                 "confidence_threshold": self.confidence_threshold,
-                "max_retry_attempts": self.max_retry_attempts
-            }
+                "max_retry_attempts": self.max_retry_attempts,
+                "max_concurrency": self.max_concurrency,
+                "ai_batch_size": self.ai_batch_size
+            },
+            "memo_entries": len(self.memo)
         }
     
     async def health_check(self) -> Dict[str, Any]:
@@ -0,0 +1,123 @@
+"""
+决策备忘录
+按缺陷签名（类型、严重性、归一化消息与代码片段的哈希等）缓存决策结果，并持久化到磁盘，
+大量同类缺陷只需决策一次。
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"(\"[^\"]*\"|'[^']*')")
+_NUMBER = re.compile(r"\b\d+(\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """归一化消息/代码片段：替换字符串字面量和数字，合并空白"""
+    text = _STRING_LITERAL.sub("<str>", text or "")
+    text = _NUMBER.sub("<num>", text)
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+def issue_signature(issue: Dict[str, Any]) -> str:
+    """
+    计算缺陷签名
+
+    包含决策所依赖的全部信息：类型、严重性、是否Python文件、是否位于文件开头（行号<=10）、
+    归一化后的消息和代码片段。签名相同的缺陷会得到相同的决策。
+    """
+    file_path = issue.get("file_path", "") or ""
+    line = issue.get("line", 0) or 0
+    snippet = issue.get("code_snippet") or issue.get("code") or ""
+    payload = {
+        "type": issue.get("type", "unknown"),
+        "severity": issue.get("severity", "info"),
+        "python": file_path.endswith((".py", ".pyw")),
+        "head": isinstance(line, int) and line <= 10,
+        "message": hashlib.sha256(normalize_text(issue.get("message", "")).encode("utf-8")).hexdigest(),
+        "snippet": hashlib.sha256(normalize_text(snippet).encode("utf-8")).hexdigest(),
+    }
+    serialized = json.dumps(payload, sort_keys=True)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class DecisionMemo:
+    """有容量上限的LRU决策缓存，可选持久化到JSON文件"""
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, max_entries: int = 10000):
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 串行化写文件：save 可能在多个线程中同时执行
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not self.path or not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for signature, decision in data.get("entries", []):
+                self._entries[signature] = decision
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        except Exception as e:
+            logger.warning(f"加载决策备忘录失败，忽略: {e}")
+            self._entries.clear()
+
+    def get(self, signature: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            decision = self._entries.get(signature)
+            if decision is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(signature)
+            self.hits += 1
+        return dict(decision)
+
+    def put(self, signature: str, decision: Dict[str, Any]):
+        with self._lock:
+            self._entries[signature] = dict(decision)
+            self._entries.move_to_end(signature)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def save(self):
+        """
+        将新增的决策写回磁盘（先写临时文件再替换，避免写到一半的文件）
+
+        同步阻塞，在异步代码中应通过 asyncio.to_thread 调用。
+        """
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                entries = list(self._entries.items())
+                self._dirty = False
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"entries": entries}, f, ensure_ascii=False)
+                tmp_path.replace(self.path)
+            except Exception as e:
+                logger.warning(f"保存决策备忘录失败: {e}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,11 +1,17 @@
 """
 事件总线实现
 负责Agent间的异步通信和事件分发
+
+除按Agent订阅外，还支持按作用域订阅（subscribe_scoped）：订阅者只收到负载中 workflow_id / tenant_id
+与作用域一致的事件，多个工作流（或租户）同时运行时互相看不到对方的事件。
+
+消息携带发送时所在调用链的 trace_id，处理消息时（包括调用订阅者）在该 trace 下进行。
 """
 
 import asyncio
 import logging
-from typing import Dict, List, Any, Optional, Callable, Set
+import uuid
+from typing import Dict, List, Any, Optional, Callable, Set, Tuple
 from datetime import datetime
 from collections import defaultdict
 import json
@@ -14,6 +20,8 @@ from .message_types import (
     BaseMessage, EventMessage, EventType, MessageType,
     MessageFactory, TaskMessage, ResultMessage, StatusMessage, ErrorMessage
 )
+from utils.metrics import EVENT_BUS_QUEUE_DEPTH, EVENTS_DROPPED, EVENTS_PUBLISHED
+from utils.tracing import bind_trace, current_trace_id, reset_trace
 
 
 class EventBus:
@@ -24,6 +32,8 @@ class EventBus:
         self.subscribers: Dict[str, Set[str]] = defaultdict(set)  # event_type -> agent_ids
         self.message_queue = asyncio.Queue(maxsize=config.get("max_queue_size", 10000))
         self.agent_handlers: Dict[str, Callable] = {}  # agent_id -> handler_function
+        # subscription_id -> (事件类型集合（None 表示全部）, 作用域, handler)
+        self.scoped_subscriptions: Dict[str, Tuple[Optional[Set[str]], Dict[str, str], Callable]] = {}
         self.is_running = False
         self.logger = logging.getLogger(__name__)
         
@@ -42,8 +52,10 @@ class EventBus:
             "messages_sent": 0,
             "messages_received": 0,
             "messages_failed": 0,
-            "events_published": 0
+            "events_published": 0,
+            "events_dropped": 0
         }
+        EVENT_BUS_QUEUE_DEPTH.add_function(self.message_queue.qsize)
     
     async def start(self):
         """启动事件总线"""
@@ -58,6 +70,7 @@ class EventBus:
     async def stop(self):
         """停止事件总线"""
         self.is_running = False
+        EVENT_BUS_QUEUE_DEPTH.remove_function(self.message_queue.qsize)
         self.logger.info("事件总线已停止")
     
     async def subscribe(self, event_type: str, agent_id: str, handler: Callable):
@@ -72,6 +85,30 @@ class EventBus:
             self.subscribers[event_type].discard(agent_id)
         self.logger.info(f"Agent {agent_id} 已取消订阅事件类型: {event_type}")
     
+    def subscribe_scoped(self, handler: Callable, workflow_id: Optional[str] = None,
+                         tenant_id: Optional[str] = None,
+                         event_types: Optional[List[str]] = None) -> str:
+        """
+        按作用域订阅事件，返回订阅ID
+        
+        Args:
+            handler: 接收 EventMessage 的异步函数（在消息循环中调用，应尽快返回，例如只放入队列）
+            workflow_id / tenant_id: 只接收负载中对应字段一致的事件，至少指定一个
+            event_types: 只接收这些类型的事件，默认全部
+        """
+        scope = {key: value for key, value in (("workflow_id", workflow_id), ("tenant_id", tenant_id)) if value}
+        if not scope:
+            raise ValueError("作用域订阅需要指定 workflow_id 或 tenant_id")
+        subscription_id = str(uuid.uuid4())
+        types = set(event_types) if event_types else None
+        self.scoped_subscriptions[subscription_id] = (types, scope, handler)
+        self.logger.debug(f"作用域订阅已创建: {subscription_id} {scope}")
+        return subscription_id
+    
+    def unsubscribe_scoped(self, subscription_id: str) -> bool:
+        """取消作用域订阅"""
+        return self.scoped_subscriptions.pop(subscription_id, None) is not None
+    
     async def publish(self, event_type: str, data: Dict[str, Any], source_agent: str, 
                      target_agent: Optional[str] = None, broadcast: bool = False):
         """发布事件"""
@@ -81,11 +118,13 @@ class EventBus:
                 event_type=EventType(event_type),
                 payload=data,
                 target_agent=target_agent,
-                broadcast=broadcast
+                broadcast=broadcast,
+                trace_id=current_trace_id()
             )
             
             await self.message_queue.put(event_message)
             self.stats["events_published"] += 1
+            EVENTS_PUBLISHED.inc(event_type=event_type)
             
             self.logger.debug(f"事件已发布: {event_type} from {source_agent}")
             
@@ -93,9 +132,38 @@ class EventBus:
             self.logger.error(f"发布事件失败: {e}")
             self.stats["messages_failed"] += 1
     
+    def publish_nowait(self, event_type: str, data: Dict[str, Any], source_agent: str) -> bool:
+        """
+        同步发布广播事件，不等待队列空位（用于Agent执行过程中的高频进度事件）
+        
+        队列已满时丢弃事件并返回 False：进度事件只用于实时展示，最终结果仍以任务结果为准
+        """
+        try:
+            event_message = MessageFactory.create_event_message(
+                source_agent=source_agent,
+                event_type=EventType(event_type),
+                payload=data,
+                broadcast=True,
+                trace_id=current_trace_id()
+            )
+            self.message_queue.put_nowait(event_message)
+        except asyncio.QueueFull:
+            self.stats["events_dropped"] += 1
+            EVENTS_DROPPED.inc(event_type=event_type)
+            return False
+        except Exception as e:
+            self.logger.error(f"发布事件失败: {e}")
+            self.stats["messages_failed"] += 1
+            return False
+        self.stats["events_published"] += 1
+        EVENTS_PUBLISHED.inc(event_type=event_type)
+        return True
+    
     async def send_message(self, message: BaseMessage):
-        """发送消息"""
+        """发送消息（未指定 trace_id 时使用当前调用链）"""
         try:
+            if getattr(message, 'trace_id', None) is None:
+                message.trace_id = current_trace_id()
             await self.message_queue.put(message)
             self.stats["messages_sent"] += 1
             
@@ -106,14 +174,16 @@ class EventBus:
             self.stats["messages_failed"] += 1
     
     async def send_task_message(self, source_agent: str, target_agent: str, 
-                              task_id: str, task_type: str, payload: Dict[str, Any]):
+                              task_id: str, task_type: str, payload: Dict[str, Any],
+                              trace_id: Optional[str] = None):
         """发送任务消息"""
         task_message = MessageFactory.create_task_message(
             source_agent=source_agent,
             target_agent=target_agent,
             task_id=task_id,
             task_type=task_type,
-            payload=payload
+            payload=payload,
+            trace_id=trace_id
         )
         await self.send_message(task_message)
     
@@ -158,6 +228,7 @@ class EventBus:
     
     async def _process_message(self, message: BaseMessage):
         """处理单个消息"""
+        token = bind_trace(getattr(message, 'trace_id', None))
         try:
             if isinstance(message, EventMessage):
                 await self._handle_event_message(message)
@@ -182,11 +253,16 @@ class EventBus:
                 error_message=str(e)
             )
             await self.send_message(error_message)
+        finally:
+            reset_trace(token)
     
     async def _handle_event_message(self, message: EventMessage):
         """处理事件消息"""
         event_type = message.event_type.value
         
+        if self.scoped_subscriptions:
+            await self._deliver_scoped(event_type, message)
+        
         # 如果是广播消息，发送给所有订阅者
         if message.broadcast:
             for agent_id in self.subscribers.get(event_type, set()):
@@ -202,6 +278,20 @@ class EventBus:
                     if agent_id in self.agent_handlers:
                         await self._deliver_message_to_agent(agent_id, message)
     
+    async def _deliver_scoped(self, event_type: str, message: EventMessage):
+        """把事件传递给作用域匹配的订阅者（单个订阅者失败不影响其他订阅者，不重试）"""
+        payload = message.payload or {}
+        for subscription_id, (types, scope, handler) in list(self.scoped_subscriptions.items()):
+            if types is not None and event_type not in types:
+                continue
+            if any(payload.get(key) != value for key, value in scope.items()):
+                continue
+            try:
+                await handler(message)
+            except Exception as e:
+                self.logger.error(f"作用域订阅 {subscription_id} 处理事件失败: {e}")
+                self.stats["messages_failed"] += 1
+    
     async def _handle_task_message(self, message: TaskMessage):
         """处理任务消息"""
         if message.target_agent and message.target_agent in self.agent_handlers:
@@ -272,6 +362,7 @@ class EventBus:
         return {
             **self.stats,
             "subscribers_count": sum(len(agents) for agents in self.subscribers.values()),
+            "scoped_subscriptions": len(self.scoped_subscriptions),
             "queue_size": self.message_queue.qsize(),
             "registered_agents": list(self.agent_handlers.keys())
         }
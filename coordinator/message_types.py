@@ -40,6 +40,14 @@ class EventType(Enum):
     FIX_COMPLETED = "fix_completed"
     VALIDATION_COMPLETED = "validation_completed"
     SYSTEM_ERROR = "system_error"
+    WORKFLOW_QUEUED = "workflow_queued"
+    WORKFLOW_STARTED = "workflow_started"
+    WORKFLOW_COMPLETED = "workflow_completed"
+    WORKFLOW_FAILED = "workflow_failed"
+    WORKFLOW_CANCELLED = "workflow_cancelled"
+    TASK_STAGE_CHANGED = "task_stage_changed"
+    TOOL_COMPLETED = "tool_completed"
+    ISSUE_FOUND = "issue_found"
 
 
 @dataclass
@@ -53,6 +61,7 @@ class BaseMessage:
     priority: int = 1
     timeout: int = 300
     retry_count: int = 0
+    trace_id: Optional[str] = None  # 所属调用链（工作流）的 trace_id
     
     def __post_init__(self):
         if self.timestamp is None:
@@ -90,6 +99,7 @@ class TaskMessage:
     priority: int = 1
     timeout: int = 300
     retry_count: int = 0
+    trace_id: Optional[str] = None
     
     def __post_init__(self):
         if self.timestamp is None:
@@ -108,7 +118,8 @@ class TaskMessage:
             'timestamp': self.timestamp.isoformat() if self.timestamp else None,
             'priority': self.priority,
             'timeout': self.timeout,
-            'retry_count': self.retry_count
+            'retry_count': self.retry_count,
+            'trace_id': self.trace_id
         }
         return result
 
@@ -127,6 +138,7 @@ class ResultMessage:
     priority: int = 1
     timeout: int = 300
     retry_count: int = 0
+    trace_id: Optional[str] = None
     error: Optional[str] = None
     
     def __post_init__(self):
@@ -147,6 +159,7 @@ class EventMessage:
     priority: int = 1
     timeout: int = 300
     retry_count: int = 0
+    trace_id: Optional[str] = None
     broadcast: bool = False
     
     def __post_init__(self):
@@ -167,6 +180,7 @@ class StatusMessage:
     priority: int = 1
     timeout: int = 300
     retry_count: int = 0
+    trace_id: Optional[str] = None
     
     def __post_init__(self):
         if self.timestamp is None:
@@ -186,6 +200,7 @@ class ErrorMessage:
     priority: int = 1
     timeout: int = 300
     retry_count: int = 0
+    trace_id: Optional[str] = None
     details: Optional[Dict[str, Any]] = None
     
     def __post_init__(self):
@@ -203,7 +218,8 @@ class MessageFactory:
         task_id: str,
         task_type: str,
         payload: Dict[str, Any],
-        priority: int = 1
+        priority: int = 1,
+        trace_id: Optional[str] = None
     ) -> TaskMessage:
         """创建任务消息"""
         import uuid
@@ -215,7 +231,8 @@ class MessageFactory:
             task_id=task_id,
             task_type=task_type,
             payload=payload,
-            priority=priority
+            priority=priority,
+            trace_id=trace_id
         )
     
     @staticmethod
@@ -225,7 +242,8 @@ class MessageFactory:
         task_id: str,
         result: Dict[str, Any],
         status: TaskStatus,
-        error: Optional[str] = None
+        error: Optional[str] = None,
+        trace_id: Optional[str] = None
     ) -> ResultMessage:
         """创建结果消息"""
         import uuid
@@ -237,7 +255,8 @@ class MessageFactory:
             task_id=task_id,
             result=result,
             status=status,
-            error=error
+            error=error,
+            trace_id=trace_id
         )
     
     @staticmethod
@@ -246,7 +265,8 @@ class MessageFactory:
         event_type: EventType,
         payload: Dict[str, Any],
         target_agent: Optional[str] = None,
-        broadcast: bool = False
+        broadcast: bool = False,
+        trace_id: Optional[str] = None
     ) -> EventMessage:
         """创建事件消息"""
         import uuid
@@ -257,7 +277,8 @@ class MessageFactory:
             target_agent=target_agent,
             event_type=event_type,
             payload=payload,
-            broadcast=broadcast
+            broadcast=broadcast,
+            trace_id=trace_id
         )
     
     @staticmethod
@@ -0,0 +1,301 @@
+"""
+工作流进度流
+把事件总线上某个工作流的事件（工作流状态、任务创建与完成、阶段切换、工具完成、通过过滤的缺陷）
+按顺序编号后推送给 SSE 等长连接客户端：
+
+- 每个工作流保留有界的事件历史，事件ID单调递增；客户端断线后带 Last-Event-ID 重连，从历史中补齐之后的事件，
+  需要的事件已被挤出历史时先收到一个 stream_gap 事件（此时应通过任务接口获取完整结果）
+- 每个连接有独立的有界缓冲区，慢客户端不会拖慢事件总线：缓冲区满时该连接转为从历史补发，不影响其他连接
+- 工作流结束（或单独任务全部完成）时追加 stream_closed 事件，连接随之结束；结束的流再保留一段时间供重连
+"""
+
+import asyncio
+import json
+import logging
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set
+
+from .message_types import EventType
+
+STREAM_CLOSED = "stream_closed"
+STREAM_GAP = "stream_gap"
+
+# 收到后关闭流的工作流事件 -> 流的最终状态
+TERMINAL_EVENTS = {
+    EventType.WORKFLOW_COMPLETED.value: "completed",
+    EventType.WORKFLOW_FAILED.value: "failed",
+    EventType.WORKFLOW_CANCELLED.value: "cancelled",
+}
+
+
+class StreamLimitExceeded(Exception):
+    """工作流的并发连接数已达上限"""
+
+
+@dataclass(frozen=True)
+class StreamEvent:
+    """进度流中的一条事件；id 为 None 的事件（如 stream_gap）不参与断点续传"""
+    id: Optional[int]
+    event: str
+    data: Dict[str, Any]
+
+    def encode(self) -> str:
+        """编码为 SSE 帧"""
+        lines = [] if self.id is None else [f"id: {self.id}"]
+        lines.append(f"event: {self.event}")
+        lines.append("data: " + json.dumps(self.data, ensure_ascii=False, default=str))
+        return "\n".join(lines) + "\n\n"
+
+
+class _Connection:
+    """单个客户端连接的有界缓冲区"""
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        # 缓冲区溢出后置位，读取方丢弃缓冲区并改为从历史补发
+        self.lagged = False
+
+
+class WorkflowStream:
+    """单个工作流的事件历史与连接"""
+
+    def __init__(self, workflow_id: str, tenant_id: Optional[str], history_size: int, auto_close: bool):
+        self.workflow_id = workflow_id
+        self.tenant_id = tenant_id
+        self.auto_close = auto_close
+        self.history: Deque[StreamEvent] = deque(maxlen=history_size)
+        self.next_id = 1
+        self.connections: Set[_Connection] = set()
+        self.pending_tasks: Set[str] = set()
+        self.subscription_id: Optional[str] = None
+        self.closed = False
+        self.closed_at: Optional[float] = None
+        self.lagged_connections = 0
+
+    def append(self, event: str, data: Dict[str, Any]) -> StreamEvent:
+        stream_event = StreamEvent(self.next_id, event, data)
+        self.next_id += 1
+        self.history.append(stream_event)
+        for connection in self.connections:
+            if connection.lagged:
+                continue
+            try:
+                connection.queue.put_nowait(stream_event)
+            except asyncio.QueueFull:
+                connection.lagged = True
+                self.lagged_connections += 1
+        return stream_event
+
+    def replay(self, last_event_id: int) -> List[StreamEvent]:
+        """返回 last_event_id 之后仍在历史中的事件；中间有事件已被挤出时以 stream_gap 开头"""
+        events = [e for e in self.history if e.id > last_event_id]
+        oldest = events[0].id if events else self.next_id
+        if oldest > last_event_id + 1:
+            gap = StreamEvent(None, STREAM_GAP, {
+                "workflow_id": self.workflow_id,
+                "missed_from": last_event_id + 1,
+                "missed_to": oldest - 1
+            })
+            events.insert(0, gap)
+        return events
+
+
+class ProgressStream:
+    """
+    按工作流组织的进度事件流
+
+    配置项：history_size（每个工作流保留的事件数）、connection_buffer（每个连接的缓冲事件数）、
+    max_connections_per_stream、retention_seconds（结束的流保留时间）、max_streams、heartbeat_interval
+    """
+
+    def __init__(self, event_bus, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.event_bus = event_bus
+        self.history_size = config.get("history_size", 1000)
+        self.connection_buffer = config.get("connection_buffer", 256)
+        self.max_connections_per_stream = config.get("max_connections_per_stream", 16)
+        self.retention_seconds = config.get("retention_seconds", 600)
+        self.max_streams = config.get("max_streams", 200)
+        self.heartbeat_interval = config.get("heartbeat_interval", 15.0)
+        self.logger = logging.getLogger(__name__)
+
+        self.streams: Dict[str, WorkflowStream] = {}
+        # 工作流ID -> 等待该流创建的信号（客户端可以先于工作流启动连接）
+        self._opened: Dict[str, asyncio.Event] = {}
+        self._open_waiters: Dict[str, int] = {}
+        self.stats = {
+            "streams_opened": 0,
+            "events_streamed": 0,
+            "connections_total": 0,
+            "connections_rejected": 0
+        }
+
+    def open(self, workflow_id: str, tenant_id: Optional[str] = None, auto_close: bool = True) -> WorkflowStream:
+        """
+        开始记录工作流的事件（重复调用无副作用）
+
+        Args:
+            auto_close: 为 True 时，流中登记的任务全部完成后自动关闭（单独提交的任务）；
+                为 False 时只在工作流结束事件或显式调用 close 时关闭
+        """
+        stream = self.streams.get(workflow_id)
+        if stream is not None and not stream.closed:
+            return stream
+
+        previous = stream
+        self._prune()
+        stream = WorkflowStream(workflow_id, tenant_id, self.history_size, auto_close)
+        if previous is not None:
+            # 结束后再次打开（同一ID提交了新任务）：事件ID接着编号，客户端带 Last-Event-ID 重连即可续传
+            stream.next_id = previous.next_id
+        stream.subscription_id = self.event_bus.subscribe_scoped(self._make_handler(stream), workflow_id=workflow_id)
+        self.streams[workflow_id] = stream
+        self.stats["streams_opened"] += 1
+        opened = self._opened.pop(workflow_id, None)
+        if opened is not None:
+            opened.set()
+        return stream
+
+    def close(self, workflow_id: str, status: str = "completed", **data: Any) -> bool:
+        """结束工作流的事件流：追加 stream_closed 事件并停止订阅"""
+        stream = self.streams.get(workflow_id)
+        if stream is None or stream.closed:
+            return False
+        stream.append(STREAM_CLOSED, {"workflow_id": workflow_id, "status": status, **data})
+        stream.closed = True
+        stream.closed_at = time.monotonic()
+        if stream.subscription_id is not None:
+            self.event_bus.unsubscribe_scoped(stream.subscription_id)
+            stream.subscription_id = None
+        return True
+
+    def close_all(self, status: str = "shutdown"):
+        for workflow_id in list(self.streams):
+            self.close(workflow_id, status)
+
+    def get(self, workflow_id: str) -> Optional[WorkflowStream]:
+        return self.streams.get(workflow_id)
+
+    async def wait_for_stream(self, workflow_id: str, timeout: float) -> Optional[WorkflowStream]:
+        """获取工作流的事件流，尚未创建时最多等待 timeout 秒"""
+        stream = self.streams.get(workflow_id)
+        if stream is not None or timeout <= 0:
+            return stream
+        opened = self._opened.setdefault(workflow_id, asyncio.Event())
+        self._open_waiters[workflow_id] = self._open_waiters.get(workflow_id, 0) + 1
+        try:
+            await asyncio.wait_for(opened.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            # 最后一个等待者离开时移除信号，避免无效ID堆积
+            self._open_waiters[workflow_id] -= 1
+            if not self._open_waiters[workflow_id]:
+                del self._open_waiters[workflow_id]
+                if self._opened.get(workflow_id) is opened:
+                    del self._opened[workflow_id]
+        return self.streams.get(workflow_id)
+
+    def connect(self, workflow_id: str, last_event_id: Optional[int] = None) -> AsyncIterator[Optional[StreamEvent]]:
+        """
+        连接工作流的事件流，返回按顺序产出事件的异步迭代器，产出 stream_closed 后结束；
+        空闲超过 heartbeat_interval 时产出 None（用于发送心跳）
+
+        Args:
+            last_event_id: 客户端已收到的最后一个事件ID，从其后补发
+
+        Raises:
+            KeyError: 工作流的事件流不存在
+            StreamLimitExceeded: 连接数已达上限
+        """
+        stream = self.streams[workflow_id]
+        if len(stream.connections) >= self.max_connections_per_stream:
+            self.stats["connections_rejected"] += 1
+            raise StreamLimitExceeded(f"工作流 {workflow_id} 的连接数已达上限 ({self.max_connections_per_stream})")
+        # 在返回前登记连接，并发的连接请求才能看到彼此；之后的事件在连接缓冲区中等待首次读取
+        connection = _Connection(self.connection_buffer)
+        stream.connections.add(connection)
+        self.stats["connections_total"] += 1
+        iterator = self._iterate(stream, connection, last_event_id or 0)
+        # 迭代器从未被读取时 finally 不会执行，回收时同样释放连接
+        weakref.finalize(iterator, stream.connections.discard, connection)
+        return iterator
+
+    async def _iterate(self, stream: WorkflowStream, connection: _Connection,
+                       last: int) -> AsyncIterator[Optional[StreamEvent]]:
+        pending = stream.replay(last)
+        try:
+            while True:
+                for stream_event in pending:
+                    if stream_event.id is not None:
+                        if stream_event.id <= last:
+                            continue
+                        last = stream_event.id
+                    self.stats["events_streamed"] += 1
+                    yield stream_event
+                    if stream_event.event == STREAM_CLOSED:
+                        return
+
+                if connection.lagged:
+                    # 缓冲区溢出：丢弃缓冲的事件，改为从历史补发
+                    while not connection.queue.empty():
+                        connection.queue.get_nowait()
+                    connection.lagged = False
+                    pending = stream.replay(last)
+                    continue
+
+                try:
+                    pending = [await asyncio.wait_for(connection.queue.get(), self.heartbeat_interval)]
+                except asyncio.TimeoutError:
+                    pending = []
+                    yield None
+        finally:
+            stream.connections.discard(connection)
+
+    def get_stats(self) -> Dict[str, Any]:
+        active = [s for s in self.streams.values() if not s.closed]
+        return {
+            **self.stats,
+            "active_streams": len(active),
+            "retained_streams": len(self.streams) - len(active),
+            "connections": sum(len(s.connections) for s in self.streams.values()),
+            "lagged_connections": sum(s.lagged_connections for s in self.streams.values())
+        }
+
+    def _make_handler(self, stream: WorkflowStream):
+        async def handler(message):
+            if stream.closed:
+                return
+            event_type = message.event_type.value
+            payload = message.payload or {}
+            timestamp = getattr(message, "timestamp", None)
+            data = {**payload, "timestamp": timestamp.isoformat() if hasattr(timestamp, "isoformat") else timestamp}
+            stream.append(event_type, data)
+
+            task_id = payload.get("task_id")
+            if event_type == EventType.TASK_CREATED.value and task_id:
+                stream.pending_tasks.add(task_id)
+            elif event_type in (EventType.TASK_COMPLETED.value, EventType.TASK_FAILED.value) and task_id:
+                stream.pending_tasks.discard(task_id)
+                if stream.auto_close and not stream.pending_tasks:
+                    failed = event_type == EventType.TASK_FAILED.value
+                    self.close(stream.workflow_id, "failed" if failed else "completed")
+            elif event_type in TERMINAL_EVENTS:
+                self.close(stream.workflow_id, TERMINAL_EVENTS[event_type])
+        return handler
+
+    def _prune(self):
+        """移除超过保留时间的已结束流；流总数超过上限时从最早结束的开始移除"""
+        now = time.monotonic()
+        closed = sorted(
+            (s for s in self.streams.values() if s.closed and not s.connections),
+            key=lambda s: s.closed_at
+        )
+        excess = len(self.streams) - self.max_streams + 1
+        for stream in closed:
+            if now - stream.closed_at > self.retention_seconds or excess > 0:
+                del self.streams[stream.workflow_id]
+                excess -= 1
@@ -1,16 +1,30 @@
 """
 任务管理器
 负责任务创建、分配、执行和状态管理
+
+分配给Agent的任务先进入该Agent的等待队列，由调度循环按以下规则派发：
+- 容量感知：每个Agent同时执行的任务数不超过其 max_workers（并扣除Agent自身队列中的积压）
+- 优先级老化：等待越久有效优先级越高（每 aging_interval 秒提升一级），低优先级任务不会饿死
+- 截止时间：在截止时间前未能派发的任务直接判定为超时失败
+- 公平共享：同一有效优先级内，优先派发当前运行任务最少的租户的任务，其次是运行任务最少的工作流（任务组）
+  ——同一租户提交再多工作流，也不会挤占其他租户的Agent容量
+
+任务按任务组（工作流）建立索引，取消或查询某个工作流的任务只涉及该工作流自己的任务。
 """
 
 import asyncio
+import math
+import time
 import uuid
 import logging
-from typing import Dict, List, Any, Optional
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Any, Optional, Tuple
 from datetime import datetime
 from enum import Enum
 
 from .message_types import TaskStatus, TaskMessage, ResultMessage, MessageFactory
+from utils.metrics import AGENT_RUNNING_TASKS, TASK_DURATION, TASK_QUEUE_DELAY, TASK_QUEUE_DEPTH, TASKS_TOTAL
+from utils.tracing import bind_trace, current_trace_id, new_trace_id, reset_trace
 
 
 class TaskPriority(Enum):
@@ -21,14 +35,26 @@ class TaskPriority(Enum):
     URGENT = 4
 
 
+DEFAULT_TASK_GROUP = "default"
+DEFAULT_TENANT = "default"
+
+
+def percentile(values: List[float], q: float) -> float:
+    """计算百分位数（最近秩法），values 为空时返回 0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
 class TaskManager:
     """任务管理器 - 负责任务调度和状态管理"""
     
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.tasks = {}
-        self.task_queue = asyncio.PriorityQueue()
-        self.agent_loads = {}  # agent_id -> current_load
+        self.agent_loads = {}  # agent_id -> 已分配未完成的任务数
         self.is_running = False
         self.logger = logging.getLogger(__name__)
         
@@ -36,6 +62,24 @@ class TaskManager:
         self.max_concurrent_tasks = config.get("max_concurrent_tasks", 10)
         self.task_timeout = config.get("task_timeout", 300)
         self.retry_attempts = config.get("retry_attempts", 3)
+        self.aging_interval = config.get("aging_interval", 30.0)  # 等待多少秒提升一级优先级
+        
+        # 调度状态
+        self.dispatcher: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+        self.agent_capacity: Dict[str, int] = {}  # agent_id -> 最大并发任务数
+        self.agent_queue_depth: Dict[str, Callable[[], int]] = {}  # agent_id -> Agent自身积压任务数
+        self.agent_running: Dict[str, int] = defaultdict(int)  # agent_id -> 已派发未完成的任务数
+        self.group_running: Dict[str, int] = defaultdict(int)  # 任务组 -> 已派发未完成的任务数
+        self.tenant_running: Dict[str, int] = defaultdict(int)  # 租户 -> 已派发未完成的任务数
+        self.group_tasks: Dict[str, List[str]] = defaultdict(list)  # 任务组 -> 按创建顺序排列的任务ID
+        # agent_id -> (任务组, 基础优先级) -> 按分配顺序排列的等待任务
+        self._waiting: Dict[str, Dict[Tuple[str, int], Deque[str]]] = defaultdict(dict)
+        self._wakeup = asyncio.Event()
+        self._last_sweep = 0.0
+        self._scheduler_task: Optional[asyncio.Task] = None
+        self._monitor_task: Optional[asyncio.Task] = None
+        self.queue_delays: Deque[float] = deque(maxlen=config.get("delay_samples", 10000))
+        self.queue_delays_by_type: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=1000))
         
         # 统计信息
         self.stats = {
@@ -43,30 +87,92 @@ class TaskManager:
             "tasks_completed": 0,
             "tasks_failed": 0,
             "tasks_retried": 0,
+            "tasks_dispatched": 0,
+            "tasks_expired": 0,
             "average_completion_time": 0.0
         }
+        # 进程内可能有多个任务管理器：各自登记取值函数，导出时按Agent求和
+        TASK_QUEUE_DEPTH.add_function(self._waiting_by_agent)
+        AGENT_RUNNING_TASKS.add_function(self._running_by_agent)
     
     async def start(self):
         """启动任务管理器"""
         self.is_running = True
         self.logger.info("任务管理器启动中...")
         
-        # 启动任务处理循环
-        asyncio.create_task(self._process_tasks())
+        # 启动调度循环
+        self._scheduler_task = asyncio.create_task(self._process_tasks())
         
         # 启动负载监控
-        asyncio.create_task(self._monitor_agent_loads())
+        self._monitor_task = asyncio.create_task(self._monitor_agent_loads())
         
         self.logger.info("任务管理器已启动")
     
     async def stop(self):
         """停止任务管理器"""
         self.is_running = False
+        self._wakeup.set()
+        TASK_QUEUE_DEPTH.remove_function(self._waiting_by_agent)
+        AGENT_RUNNING_TASKS.remove_function(self._running_by_agent)
         self.logger.info("任务管理器已停止")
     
-    async def create_task(self, task_type: str, task_data: Dict[str, Any], 
-                         priority: TaskPriority = TaskPriority.NORMAL) -> str:
-        """创建任务"""
+    def set_dispatcher(self, dispatcher: Callable[[Dict[str, Any]], Awaitable[None]]):
+        """设置任务派发函数（接收任务字典，把任务真正发送给目标Agent）"""
+        self.dispatcher = dispatcher
+    
+    def register_agent(self, agent_id: str, max_workers: int = 1,
+                       queue_depth: Optional[Callable[[], int]] = None):
+        """
+        登记Agent的执行容量
+        
+        Args:
+            max_workers: Agent可同时处理的任务数
+            queue_depth: 可选，返回Agent当前积压（排队+处理中）任务数的函数，
+                         用于扣除不经过任务管理器提交给该Agent的任务
+        """
+        self.agent_capacity[agent_id] = max(1, int(max_workers or 1))
+        if queue_depth is not None:
+            self.agent_queue_depth[agent_id] = queue_depth
+        self._wakeup.set()
+    
+    async def unregister_agent(self, agent_id: str) -> int:
+        """
+        注销Agent的执行容量，并立即让其等待队列中尚未派发的任务失败
+        
+        这些任务不会再有Agent处理，不必等到截止时间才超时。返回失败的任务数。
+        """
+        self.agent_capacity.pop(agent_id, None)
+        self.agent_queue_depth.pop(agent_id, None)
+        
+        failed = 0
+        for queue in self._waiting.pop(agent_id, {}).values():
+            for task_id in queue:
+                task = self.tasks.get(task_id)
+                if not task or task['status'] != TaskStatus.ASSIGNED or task['assigned_agent'] != agent_id:
+                    continue
+                await self.update_task_result(
+                    task_id, {'error': f'Agent {agent_id} 已注销', 'success': False}, False
+                )
+                failed += 1
+        if failed:
+            self.logger.warning(f"Agent {agent_id} 已注销，{failed} 个等待中的任务已失败")
+        return failed
+    
+    async def create_task(self, task_type: str, task_data: Dict[str, Any],
+                         priority: TaskPriority = TaskPriority.NORMAL,
+                         deadline: Optional[float] = None,
+                         group: Optional[str] = None,
+                         tenant: Optional[str] = None,
+                         trace_id: Optional[str] = None) -> str:
+        """
+        创建任务
+        
+        Args:
+            deadline: 任务必须在创建后多少秒内开始执行，默认使用 task_timeout
+            group: 任务组（通常为工作流ID），用于在并发工作流之间公平分配Agent
+            tenant: 租户（提交工作流的客户端），用于在租户之间公平分配Agent
+            trace_id: 任务所属的调用链，默认使用当前调用链；派发给Agent的消息携带该 trace_id
+        """
         task_id = str(uuid.uuid4())
         task = {
             'id': task_id,
@@ -75,22 +181,26 @@ class TaskManager:
             'status': TaskStatus.PENDING,
             'assigned_agent': None,
             'priority': priority,
+            'group': group or DEFAULT_TASK_GROUP,
+            'tenant': tenant or DEFAULT_TENANT,
+            'trace_id': trace_id or current_trace_id() or new_trace_id(),
             'created_at': datetime.now(),
+            'assigned_at': None,
             'started_at': None,
             'completed_at': None,
             'result': None,
             'error': None,
             'retry_count': 0,
-            'timeout_at': None
+            'timeout_at': None,
+            'queue_delay': None,
+            'dispatched': False
         }
         
         self.tasks[task_id] = task
+        self.group_tasks[task['group']].append(task_id)
         
-        # 设置超时时间
-        task['timeout_at'] = datetime.now().timestamp() + self.task_timeout
-        
-        # 添加到优先级队列
-        await self.task_queue.put((priority.value, task_id))
+        # 设置截止时间
+        task['timeout_at'] = time.time() + (deadline if deadline is not None else self.task_timeout)
         
         self.stats["tasks_created"] += 1
         self.logger.info(f"任务已创建: {task_id} (类型: {task_type}, 优先级: {priority.name})")
@@ -98,21 +208,69 @@ class TaskManager:
         return task_id
     
     async def assign_task(self, task_id: str, agent_id: str):
-        """分配任务给Agent"""
+        """分配任务给Agent（进入该Agent的等待队列，由调度循环按容量派发；未设置派发函数时任务立即失败）"""
         if task_id not in self.tasks:
             self.logger.error(f"任务不存在: {task_id}")
             return False
         
+        if self.dispatcher is None:
+            # 没有派发函数时任务永远不会被执行，立即失败，避免调用方一直等到超时
+            self.logger.error(f"未设置派发函数，任务无法分配: {task_id}")
+            await self.update_task_result(task_id, {'error': '任务管理器未设置派发函数'}, False)
+            return False
+        
         task = self.tasks[task_id]
         task['assigned_agent'] = agent_id
         task['status'] = TaskStatus.ASSIGNED
+        task['assigned_at'] = time.monotonic()
+        task['dispatched'] = False
         
         # 更新Agent负载
         self.agent_loads[agent_id] = self.agent_loads.get(agent_id, 0) + 1
         
+        key = (task['group'], task['priority'].value)
+        self._waiting[agent_id].setdefault(key, deque()).append(task_id)
+        self._wakeup.set()
+        
         self.logger.info(f"任务 {task_id} 已分配给 {agent_id}")
         return True
     
+    async def cancel_group(self, group: str) -> int:
+        """取消某任务组（工作流）中尚未派发的任务，返回取消的任务数（等待队列中的条目由调度循环跳过）"""
+        cancelled = 0
+        for task_id in self.group_tasks.get(group, []):
+            task = self.tasks.get(task_id)
+            if task and task['status'] == TaskStatus.ASSIGNED and not task['dispatched']:
+                task['status'] = TaskStatus.CANCELLED
+                task['error'] = 'Task cancelled'
+                task['completed_at'] = datetime.now()
+                agent_id = task['assigned_agent']
+                self.agent_loads[agent_id] = max(0, self.agent_loads.get(agent_id, 0) - 1)
+                cancelled += 1
+        if cancelled:
+            self.logger.info(f"已取消任务组 {group} 中 {cancelled} 个未派发的任务")
+        return cancelled
+    
+    def get_group_tasks(self, group: str) -> List[Dict[str, Any]]:
+        """获取某任务组（工作流）的全部任务"""
+        return [self.tasks[task_id] for task_id in self.group_tasks.get(group, []) if task_id in self.tasks]
+    
+    def forget_group(self, group: str) -> int:
+        """删除某任务组中已结束的任务记录（工作流结束后调用，避免任务表无限增长），返回删除的任务数"""
+        task_ids = self.group_tasks.pop(group, [])
+        kept = []
+        for task_id in task_ids:
+            task = self.tasks.get(task_id)
+            if task is None:
+                continue
+            if task['status'] in (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED):
+                del self.tasks[task_id]
+            else:
+                kept.append(task_id)
+        if kept:
+            self.group_tasks[group] = kept
+        return len(task_ids) - len(kept)
+    
     async def get_task_result(self, task_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
         """获取任务结果"""
         if task_id not in self.tasks:
@@ -175,6 +333,13 @@ class TaskManager:
             task['error'] = result.get('error', 'Unknown error')
             self.stats["tasks_failed"] += 1
         
+        TASKS_TOTAL.inc(type=task['type'], status=task['status'].value)
+        if task['started_at']:
+            TASK_DURATION.observe((task['completed_at'] - task['started_at']).total_seconds(), type=task['type'])
+        
+        # 释放派发占用的执行槽位
+        self._release(task)
+        
         # 更新Agent负载
         if task['assigned_agent']:
             agent_id = task['assigned_agent']
@@ -184,7 +349,7 @@ class TaskManager:
         self.logger.info(f"任务结果已更新: {task_id} (成功: {success})")
     
     async def retry_task(self, task_id: str) -> bool:
-        """重试失败的任务"""
+        """重试失败的任务（重置为待分配状态，需重新分配后才会派发）"""
         if task_id not in self.tasks:
             return False
         
@@ -194,89 +359,166 @@ class TaskManager:
             self.logger.warning(f"任务重试次数已达上限: {task_id}")
             return False
         
+        self._release(task)
         task['retry_count'] += 1
         task['status'] = TaskStatus.PENDING
         task['assigned_agent'] = None
         task['error'] = None
-        
-        # 重新加入队列
-        await self.task_queue.put((task['priority'].value, task_id))
+        task['timeout_at'] = time.time() + self.task_timeout
         
         self.stats["tasks_retried"] += 1
         self.logger.info(f"任务已重试: {task_id} (第 {task['retry_count']} 次)")
         
         return True
     
+    def _release(self, task: Dict[str, Any]):
+        """任务结束后归还Agent和任务组的执行槽位，并唤醒调度循环"""
+        if not task.get('dispatched'):
+            return
+        task['dispatched'] = False
+        agent_id = task['assigned_agent']
+        self.agent_running[agent_id] = max(0, self.agent_running[agent_id] - 1)
+        self.group_running[task['group']] = max(0, self.group_running[task['group']] - 1)
+        if self.group_running[task['group']] == 0:
+            del self.group_running[task['group']]
+        self.tenant_running[task['tenant']] = max(0, self.tenant_running[task['tenant']] - 1)
+        if self.tenant_running[task['tenant']] == 0:
+            del self.tenant_running[task['tenant']]
+        self._wakeup.set()
+    
     async def _process_tasks(self):
-        """处理任务队列"""
+        """调度循环：有任务分配或完成时立即调度，否则每秒检查一次（用于优先级老化和截止时间）"""
         self.logger.info("任务处理循环已启动")
         
         while self.is_running:
             try:
-                # 从优先级队列获取任务
-                priority, task_id = await asyncio.wait_for(
-                    self.task_queue.get(), 
-                    timeout=1.0
-                )
-                
-                task = self.tasks[task_id]
-                
-                # 检查任务是否已超时
-                if task.get('timeout_at') and datetime.now().timestamp() > task['timeout_at']:
-                    self.logger.warning(f"任务已超时: {task_id}")
-                    await self.update_task_result(task_id, {'error': 'Task timeout'}, False)
-                    continue
-                
-                # 如果任务已分配但未执行，开始执行
-                if task['status'] == TaskStatus.ASSIGNED:
-                    await self._execute_task(task_id)
-                
-            except asyncio.TimeoutError:
-                # 超时是正常的，继续循环
-                continue
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                await self._schedule()
+            
             except Exception as e:
                 self.logger.error(f"任务处理错误: {e}")
     
+    def _free_slots(self, agent_id: str) -> int:
+        """Agent当前可接受的新任务数"""
+        if agent_id not in self.agent_capacity:
+            return 0
+        busy = self.agent_running[agent_id]
+        probe = self.agent_queue_depth.get(agent_id)
+        if probe is not None:
+            try:
+                busy = max(busy, int(probe()))
+            except Exception as e:
+                self.logger.debug(f"获取Agent {agent_id} 队列深度失败: {e}")
+        return self.agent_capacity[agent_id] - busy
+    
+    def _effective_priority(self, task: Dict[str, Any], now: float) -> int:
+        """有效优先级 = 基础优先级 + 等待时间 / aging_interval"""
+        age = now - task['assigned_at']
+        return task['priority'].value + int(age / self.aging_interval if self.aging_interval > 0 else 0)
+    
+    def _pick_next(self, agent_id: str, now: float) -> Optional[str]:
+        """
+        从Agent的等待队列中选出下一个任务
+        
+        每个 (任务组, 基础优先级) 队列按分配顺序排列，队首就是该队列中等待最久、有效优先级最高的任务，
+        因此只需比较各队首：有效优先级高者优先，其次是运行任务少的租户、运行任务少的任务组，再次是截止时间早的任务。
+        """
+        queues = self._waiting.get(agent_id)
+        best_key, best_queue = None, None
+        for key, queue in list(queues.items()):
+            if not queue:
+                del queues[key]
+                continue
+            task = self.tasks[queue[0]]
+            rank = (
+                -self._effective_priority(task, now),
+                self.tenant_running.get(task['tenant'], 0),
+                self.group_running.get(task['group'], 0),
+                task['timeout_at'],
+                task['assigned_at']
+            )
+            if best_key is None or rank < best_key:
+                best_key, best_queue = rank, queue
+        return best_queue.popleft() if best_queue is not None else None
+    
+    async def _schedule(self):
+        """按容量派发各Agent等待队列中的任务"""
+        now = time.monotonic()
+        if now - self._last_sweep >= 1.0:
+            self._last_sweep = now
+            await self._expire_waiting()
+        
+        for agent_id in list(self._waiting.keys()):
+            while self._waiting.get(agent_id) and self._free_slots(agent_id) > 0:
+                task_id = self._pick_next(agent_id, time.monotonic())
+                if task_id is None:
+                    break
+                task = self.tasks[task_id]
+                if task['status'] != TaskStatus.ASSIGNED or task['assigned_agent'] != agent_id:
+                    continue
+                if time.time() > task['timeout_at']:
+                    await self._expire(task)
+                    continue
+                await self._execute_task(task_id)
+            if not self._waiting.get(agent_id):
+                self._waiting.pop(agent_id, None)
+    
+    async def _expire_waiting(self):
+        """清理等待队列中已过截止时间或已不再等待的任务"""
+        wall_now = time.time()
+        for agent_id, queues in list(self._waiting.items()):
+            for key, queue in list(queues.items()):
+                kept = deque()
+                for task_id in queue:
+                    task = self.tasks.get(task_id)
+                    if not task or task['status'] != TaskStatus.ASSIGNED or task['assigned_agent'] != agent_id:
+                        continue
+                    if wall_now > task['timeout_at']:
+                        await self._expire(task)
+                        continue
+                    kept.append(task_id)
+                queues[key] = kept
+    
+    async def _expire(self, task: Dict[str, Any]):
+        self.logger.warning(f"任务在截止时间前未能派发，已超时: {task['id']}")
+        self.stats["tasks_expired"] += 1
+        await self.update_task_result(task['id'], {'error': 'Task timeout', 'success': False}, False)
+    
     async def _execute_task(self, task_id: str):
-        """执行任务"""
+        """派发任务：占用执行槽位，记录排队时间，并通过派发函数发送给目标Agent"""
         task = self.tasks[task_id]
         task['status'] = TaskStatus.RUNNING
         task['started_at'] = datetime.now()
-
+        task['dispatched'] = True
+        
         agent_id = task['assigned_agent']
         task_type = task['type']
-        task_data = task['data']
-
-        self.logger.info(f"开始执行任务: {task_id} (Agent: {agent_id}, 类型: {task_type})")
-
+        self.agent_running[agent_id] += 1
+        self.group_running[task['group']] += 1
+        self.tenant_running[task['tenant']] += 1
+        
+        delay = time.monotonic() - task['assigned_at']
+        task['queue_delay'] = delay
+        self.queue_delays.append(delay)
+        self.queue_delays_by_type[task_type].append(delay)
+        TASK_QUEUE_DELAY.observe(delay, type=task_type)
+        self.stats["tasks_dispatched"] += 1
+        
+        self.logger.info(f"开始执行任务: {task_id} (Agent: {agent_id}, 类型: {task_type}, 排队 {delay:.2f}秒)")
+        
+        # 调度循环不属于任何调用链，派发时切换到任务自己的调用链
+        token = bind_trace(task.get('trace_id'))
         try:
-            # 通过事件总线发送任务消息，实际执行由目标Agent完成
-            from .event_bus import EventBus
-            # 这里无法直接获取 EventBus 实例，实际发送由 Coordinator.assign_task 完成
-            # TaskManager 在此仅推进状态，等待 Coordinator 侧回写结果
-            pass
-
+            await self.dispatcher(task)
         except Exception as e:
             self.logger.error(f"任务执行失败: {task_id} - {e}")
             await self.update_task_result(task_id, {'error': str(e)}, False)
-    
-    async def _simulate_task_execution(self, task_id: str):
-        """模拟任务执行（实际实现中应该调用真实的Agent）"""
-        task = self.tasks[task_id]
-        
-        # 模拟任务执行时间
-        await asyncio.sleep(1)
-        
-        # 模拟任务结果
-        result = {
-            'task_id': task_id,
-            'type': task['type'],
-            'success': True,
-            'message': f"任务 {task['type']} 执行完成",
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        await self.update_task_result(task_id, result, True)
+        finally:
+            reset_trace(token)
     
     async def _monitor_agent_loads(self):
         """监控Agent负载"""
@@ -288,7 +530,7 @@ class TaskManager:
                         del self.agent_loads[agent_id]
                 
                 await asyncio.sleep(10)  # 每10秒监控一次
-                
+            
             except Exception as e:
                 self.logger.error(f"Agent负载监控错误: {e}")
     
@@ -301,14 +543,40 @@ class TaskManager:
         new_avg = (current_avg * (completed_count - 1) + completion_time) / completed_count
         self.stats["average_completion_time"] = new_avg
     
+    def _waiting_count(self) -> int:
+        return sum(len(queue) for queues in self._waiting.values() for queue in queues.values())
+    
+    def _waiting_by_agent(self) -> Dict[str, int]:
+        return {agent_id: sum(len(queue) for queue in queues.values()) for agent_id, queues in list(self._waiting.items())}
+    
+    def _running_by_agent(self) -> Dict[str, int]:
+        return dict(self.agent_running)
+    
+    def get_queue_delay_stats(self) -> Dict[str, Any]:
+        """排队时间（分配到派发）的 p50/p99，整体及按任务类型"""
+        overall = list(self.queue_delays)
+        return {
+            "samples": len(overall),
+            "p50": percentile(overall, 50),
+            "p99": percentile(overall, 99),
+            "by_type": {
+                task_type: {"p50": percentile(list(delays), 50), "p99": percentile(list(delays), 99)}
+                for task_type, delays in self.queue_delays_by_type.items()
+            }
+        }
+    
     async def get_stats(self) -> Dict[str, Any]:
         """获取统计信息"""
         return {
             **self.stats,
-            "active_tasks": len([t for t in self.tasks.values() 
+            "active_tasks": len([t for t in self.tasks.values()
                                if t['status'] in [TaskStatus.PENDING, TaskStatus.ASSIGNED, TaskStatus.RUNNING]]),
-            "queue_size": self.task_queue.qsize(),
-            "agent_loads": self.agent_loads.copy()
+            "queue_size": self._waiting_count(),
+            "agent_loads": self.agent_loads.copy(),
+            "agent_running": dict(self.agent_running),
+            "agent_capacity": self.agent_capacity.copy(),
+            "tenant_running": dict(self.tenant_running),
+            "queue_delay": self.get_queue_delay_stats()
         }
     
     async def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
@@ -324,16 +592,17 @@ class TaskManager:
             'created_at': task['created_at'].isoformat(),
             'started_at': task.get('started_at').isoformat() if task.get('started_at') else None,
             'completed_at': task.get('completed_at').isoformat() if task.get('completed_at') else None,
+            'queue_delay': task.get('queue_delay'),
             'result': task.get('result'),
             'error': task.get('error')
         }
-
+    
     async def health_check(self) -> Dict[str, Any]:
         """健康检查"""
         return {
             "is_running": self.is_running,
-            "queue_size": self.task_queue.qsize(),
-            "active_tasks": len([t for t in self.tasks.values() 
+            "queue_size": self._waiting_count(),
+            "active_tasks": len([t for t in self.tasks.values()
                                if t['status'] in [TaskStatus.PENDING, TaskStatus.ASSIGNED, TaskStatus.RUNNING]]),
             "stats": self.stats
         }
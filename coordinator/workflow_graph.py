@@ -0,0 +1,244 @@
+"""
+工作流图执行器
+以声明式的节点依赖图描述工作流：每个节点在其依赖节点完成后立即启动，相互独立的节点并发执行；
+节点之间可以通过数据流逐条传递数据（例如逐个缺陷），下游节点无需等待上游整体完成。
+每次执行使用独立的 WorkflowContext，多个工作流可以同时运行并各自取消。
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class WorkflowCancelled(Exception):
+    """工作流被取消"""
+
+
+class ItemStream:
+    """
+    节点输出的数据流
+
+    上游节点逐条 emit，节点结束时由执行器关闭；每个消费者都能从头读到全部数据，
+    因此多个下游节点可以独立消费同一个数据流。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._items: List[Any] = []
+        self._closed = False
+        self._changed = asyncio.Condition()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    async def emit(self, item: Any):
+        if self._closed:
+            raise RuntimeError(f"数据流 {self.name} 已关闭")
+        async with self._changed:
+            self._items.append(item)
+            self._changed.notify_all()
+
+    async def close(self):
+        async with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+
+    async def batches(self, max_size: int = 1):
+        """按批读取：有数据时立即返回当前已到达的数据（最多 max_size 条），直到数据流关闭且读完"""
+        position = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: position < len(self._items) or self._closed)
+                batch = self._items[position:position + max_size]
+            if not batch:
+                return
+            position += len(batch)
+            yield batch
+
+    async def __aiter__(self):
+        async for batch in self.batches(1):
+            yield batch[0]
+
+
+@dataclass
+class WorkflowNode:
+    """
+    工作流节点
+
+    Attributes:
+        name: 节点名称（同时也是其输出数据流的名称）
+        run: 节点执行函数，参数为 WorkflowContext，返回值记录为节点结果
+        deps: 必须等待其完成后才能启动的上游节点
+        streams: 需要逐条消费其输出的上游节点（不等待其完成，节点启动后即可读取）
+        optional: 可选节点失败时结果记为 None，下游节点照常执行；必需节点失败会终止整个工作流
+        timeout: 节点超时时间（秒）
+    """
+    name: str
+    run: Callable[["WorkflowContext"], Awaitable[Any]]
+    deps: List[str] = field(default_factory=list)
+    streams: List[str] = field(default_factory=list)
+    optional: bool = False
+    timeout: Optional[float] = None
+
+    @property
+    def upstream(self) -> List[str]:
+        return list(dict.fromkeys(self.deps + self.streams))
+
+
+class WorkflowContext:
+    """单次工作流执行的状态：输入、节点结果/状态/耗时、节点间数据流和取消信号"""
+
+    def __init__(self, workflow_id: str, inputs: Optional[Dict[str, Any]] = None):
+        self.workflow_id = workflow_id
+        self.inputs = inputs or {}
+        self.results: Dict[str, Any] = {}
+        self.node_status: Dict[str, str] = {}
+        self.node_timings: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self._streams: Dict[str, ItemStream] = {}
+        self._cancel_event = asyncio.Event()
+
+    def stream(self, name: str) -> ItemStream:
+        """获取节点的输出数据流"""
+        if name not in self._streams:
+            self._streams[name] = ItemStream(name)
+        return self._streams[name]
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+
+class WorkflowGraph:
+    """工作流图：校验依赖关系并按依赖并发执行节点"""
+
+    def __init__(self, nodes: Optional[List[WorkflowNode]] = None):
+        self.nodes: Dict[str, WorkflowNode] = {}
+        for node in nodes or []:
+            self.add_node(node)
+
+    def add_node(self, node: WorkflowNode) -> "WorkflowGraph":
+        if node.name in self.nodes:
+            raise ValueError(f"重复的工作流节点: {node.name}")
+        self.nodes[node.name] = node
+        return self
+
+    def validate(self):
+        """检查未知依赖和环（数据流依赖同样计入）"""
+        for node in self.nodes.values():
+            for upstream in node.upstream:
+                if upstream not in self.nodes:
+                    raise ValueError(f"节点 {node.name} 依赖未知节点: {upstream}")
+
+        indegree = {name: len(node.upstream) for name, node in self.nodes.items()}
+        ready = [name for name, count in indegree.items() if count == 0]
+        visited = 0
+        while ready:
+            name = ready.pop()
+            visited += 1
+            for other in self.nodes.values():
+                if name in other.upstream:
+                    indegree[other.name] -= 1
+                    if indegree[other.name] == 0:
+                        ready.append(other.name)
+        if visited != len(self.nodes):
+            cyclic = sorted(name for name, count in indegree.items() if count > 0)
+            raise ValueError(f"工作流图存在环: {cyclic}")
+
+    async def run(self, context: WorkflowContext) -> Dict[str, Any]:
+        """
+        执行工作流
+
+        Returns:
+            节点名称 -> 节点结果
+
+        Raises:
+            WorkflowCancelled: 工作流被取消
+            Exception: 必需节点失败时抛出该节点的异常（其余节点会被取消）
+        """
+        self.validate()
+        for name in self.nodes:
+            context.stream(name)
+            context.node_status[name] = "pending"
+
+        done = {name: asyncio.Event() for name in self.nodes}
+        failure: List[BaseException] = []
+
+        async def run_node(node: WorkflowNode):
+            try:
+                for dep in node.deps:
+                    await done[dep].wait()
+                if context.cancelled:
+                    # 依赖中的必需节点失败（或工作流被取消）时不再启动下游节点
+                    context.node_status[node.name] = "cancelled"
+                    return
+                context.node_status[node.name] = "running"
+                start = time.monotonic()
+                try:
+                    with span("workflow.node", node=node.name):
+                        if node.timeout:
+                            result = await asyncio.wait_for(node.run(context), timeout=node.timeout)
+                        else:
+                            result = await node.run(context)
+                    context.results[node.name] = result
+                    context.node_status[node.name] = "completed"
+                except asyncio.CancelledError:
+                    context.node_status[node.name] = "cancelled"
+                    raise
+                except Exception as e:
+                    error = f"节点超时（{node.timeout}秒）" if isinstance(e, asyncio.TimeoutError) else str(e)
+                    context.errors[node.name] = error
+                    context.node_status[node.name] = "failed"
+                    context.results[node.name] = None
+                    if node.optional:
+                        logger.warning(f"工作流 {context.workflow_id} 可选节点 {node.name} 失败: {error}")
+                    else:
+                        logger.error(f"工作流 {context.workflow_id} 节点 {node.name} 失败: {error}")
+                        failure.append(e)
+                        context.cancel()
+                finally:
+                    context.node_timings[node.name] = time.monotonic() - start
+            except asyncio.CancelledError:
+                if context.node_status.get(node.name) == "pending":
+                    context.node_status[node.name] = "cancelled"
+                raise
+            finally:
+                await context.stream(node.name).close()
+                done[node.name].set()
+
+        tasks = [asyncio.create_task(run_node(node)) for node in self.nodes.values()]
+        cancel_waiter = asyncio.create_task(context._cancel_event.wait())
+        try:
+            all_done = asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.wait({all_done, cancel_waiter}, return_when=asyncio.FIRST_COMPLETED)
+            if context.cancelled:
+                for task in tasks:
+                    task.cancel()
+            await all_done
+        except asyncio.CancelledError:
+            context.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            cancel_waiter.cancel()
+
+        if failure:
+            raise failure[0]
+        if context.cancelled:
+            raise WorkflowCancelled(f"工作流 {context.workflow_id} 已取消")
+        return context.results
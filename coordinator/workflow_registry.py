@@ -0,0 +1,220 @@
+"""
+工作流注册表
+按工作流ID登记所有排队中和运行中的工作流，并按租户限制并发：
+
+- 每个租户同时运行的工作流数不超过其配额（max_workflows_per_tenant，可用 tenant_quotas 单独设置），
+  超出配额的工作流排队等待
+- 不论是受租户配额还是全局上限限制，租户排队中的工作流数达到 max_queued_workflows_per_tenant 时直接拒绝
+- 全局同时运行的工作流数不超过 max_active_workflows（0 表示不限制）；全局槽位空出时，
+  优先分给当前运行工作流最少的租户，同一租户内按提交顺序
+- 工作流结束后移入有界的历史记录
+"""
+
+import asyncio
+import logging
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from .task_manager import DEFAULT_TENANT
+from .workflow_graph import WorkflowCancelled, WorkflowContext
+
+
+class WorkflowQuotaExceeded(Exception):
+    """租户排队中的工作流数已达上限"""
+
+
+class WorkflowRegistry:
+    """工作流注册表与租户并发配额"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.max_active_workflows = config.get("max_active_workflows", 8)
+        self.max_workflows_per_tenant = config.get("max_workflows_per_tenant", 2)
+        self.max_queued_per_tenant = config.get("max_queued_workflows_per_tenant", 20)
+        self.tenant_quotas: Dict[str, int] = dict(config.get("tenant_quotas", {}))
+        self.logger = logging.getLogger(__name__)
+
+        self.workflows: Dict[str, Dict[str, Any]] = {}
+        self.contexts: Dict[str, WorkflowContext] = {}
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=config.get("history_size", 100))
+
+        self._running: Set[str] = set()
+        self._running_by_tenant: Dict[str, int] = defaultdict(int)
+        # 租户 -> 按提交顺序排队的 (工作流ID, 放行信号)
+        self._waiting: Dict[str, Deque[Tuple[str, asyncio.Future]]] = defaultdict(deque)
+        self.stats = {
+            "workflows_registered": 0,
+            "workflows_queued": 0,
+            "workflows_rejected": 0,
+            "max_queue_time": 0.0
+        }
+
+    def quota_for(self, tenant_id: str) -> int:
+        """租户可同时运行的工作流数"""
+        return max(1, int(self.tenant_quotas.get(tenant_id, self.max_workflows_per_tenant)))
+
+    def register(self, workflow_id: str, tenant_id: Optional[str] = None,
+                 inputs: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], WorkflowContext]:
+        """
+        登记工作流（状态为 queued），返回工作流状态字典和独立的执行上下文
+
+        Raises:
+            ValueError: 已有同ID的工作流在排队或运行
+            WorkflowQuotaExceeded: 租户排队中的工作流数已达上限
+        """
+        if workflow_id in self.workflows:
+            raise ValueError(f"工作流 {workflow_id} 已在排队或运行")
+        tenant_id = tenant_id or DEFAULT_TENANT
+        if len(self._waiting.get(tenant_id, ())) >= self.max_queued_per_tenant:
+            self.stats["workflows_rejected"] += 1
+            raise WorkflowQuotaExceeded(
+                f"租户 {tenant_id} 排队中的工作流已达上限 ({self.max_queued_per_tenant})"
+            )
+
+        inputs = inputs or {}
+        now = datetime.now()
+        workflow = {
+            'id': workflow_id,
+            'tenant_id': tenant_id,
+            'project_path': inputs.get('project_path'),
+            'file_path': inputs.get('file_path'),
+            'queued_at': now,
+            'start_time': now,
+            'queue_time': 0.0,
+            'status': 'queued',
+            'tasks': [],
+            'nodes': {}
+        }
+        context = WorkflowContext(workflow_id, inputs)
+        workflow['nodes'] = context.node_status
+        self.workflows[workflow_id] = workflow
+        self.contexts[workflow_id] = context
+        self.stats["workflows_registered"] += 1
+        return workflow, context
+
+    async def acquire(self, workflow_id: str):
+        """
+        等待租户配额和全局槽位，获得后工作流状态变为 running
+
+        Raises:
+            WorkflowCancelled: 排队期间工作流被取消
+        """
+        workflow = self.workflows[workflow_id]
+        tenant_id = workflow['tenant_id']
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[tenant_id].append((workflow_id, future))
+        self._grant()
+        if not future.done():
+            self.stats["workflows_queued"] += 1
+            self.logger.info(f"工作流 {workflow_id} 排队等待（租户 {tenant_id}）")
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # 已获得槽位时由调用方通过 finish 归还；仍在排队时移出队列
+            if not future.done() or future.cancelled():
+                self._remove_waiter(tenant_id, workflow_id)
+            raise
+
+        started = datetime.now()
+        workflow['status'] = 'running'
+        workflow['start_time'] = started
+        workflow['queue_time'] = (started - workflow['queued_at']).total_seconds()
+        self.stats["max_queue_time"] = max(self.stats["max_queue_time"], workflow['queue_time'])
+
+    def release(self, workflow_id: str):
+        """归还工作流占用的槽位，并放行排队中的工作流"""
+        if workflow_id not in self._running:
+            return
+        self._running.discard(workflow_id)
+        tenant_id = self.workflows[workflow_id]['tenant_id'] if workflow_id in self.workflows else None
+        if tenant_id is not None:
+            self._running_by_tenant[tenant_id] = max(0, self._running_by_tenant[tenant_id] - 1)
+            if self._running_by_tenant[tenant_id] == 0:
+                del self._running_by_tenant[tenant_id]
+        self._grant()
+
+    def cancel_queued(self, workflow_id: str) -> bool:
+        """取消排队中的工作流（acquire 抛出 WorkflowCancelled），工作流已在运行时返回 False"""
+        workflow = self.workflows.get(workflow_id)
+        if workflow is None:
+            return False
+        for queued_id, future in self._waiting.get(workflow['tenant_id'], ()):
+            if queued_id == workflow_id and not future.done():
+                future.set_exception(WorkflowCancelled(f"工作流 {workflow_id} 已取消"))
+                self._remove_waiter(workflow['tenant_id'], workflow_id)
+                return True
+        return False
+
+    def finish(self, workflow_id: str):
+        """工作流结束：释放槽位并移入历史记录"""
+        self.release(workflow_id)
+        workflow = self.workflows.pop(workflow_id, None)
+        context = self.contexts.pop(workflow_id, None)
+        if workflow is None:
+            return
+        if context is not None:
+            workflow['nodes'] = dict(context.node_status)
+        self.history.append(workflow.copy())
+
+    def get(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        """获取排队中、运行中或历史工作流的状态"""
+        if workflow_id in self.workflows:
+            return self.workflows[workflow_id]
+        for workflow in reversed(self.history):
+            if workflow['id'] == workflow_id:
+                return workflow
+        return None
+
+    def list_workflows(self, tenant_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """列出排队中和运行中的工作流，可按租户过滤"""
+        return [w for w in self.workflows.values() if tenant_id is None or w['tenant_id'] == tenant_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        tenants: Dict[str, Dict[str, int]] = {}
+        for tenant_id in set(self._running_by_tenant) | {t for t, q in self._waiting.items() if q}:
+            tenants[tenant_id] = {
+                "running": self._running_by_tenant.get(tenant_id, 0),
+                "queued": len(self._waiting.get(tenant_id, ())),
+                "quota": self.quota_for(tenant_id)
+            }
+        return {
+            **self.stats,
+            "running_workflows": len(self._running),
+            "queued_workflows": sum(len(queue) for queue in self._waiting.values()),
+            "max_active_workflows": self.max_active_workflows,
+            "tenants": tenants
+        }
+
+    def _has_global_slot(self) -> bool:
+        return self.max_active_workflows <= 0 or len(self._running) < self.max_active_workflows
+
+    def _grant(self):
+        """在配额允许的范围内放行排队的工作流：运行工作流最少的租户优先"""
+        while self._has_global_slot():
+            candidates = [
+                tenant_id for tenant_id, queue in self._waiting.items()
+                if queue and self._running_by_tenant.get(tenant_id, 0) < self.quota_for(tenant_id)
+            ]
+            if not candidates:
+                break
+            tenant_id = min(candidates, key=lambda t: (self._running_by_tenant.get(t, 0),
+                                                       self.workflows[self._waiting[t][0][0]]['queued_at']))
+            workflow_id, future = self._waiting[tenant_id].popleft()
+            if not self._waiting[tenant_id]:
+                del self._waiting[tenant_id]
+            if future.done():
+                continue
+            self._running.add(workflow_id)
+            self._running_by_tenant[tenant_id] += 1
+            future.set_result(None)
+
+    def _remove_waiter(self, tenant_id: str, workflow_id: str):
+        queue = self._waiting.get(tenant_id)
+        if not queue:
+            return
+        remaining = deque(item for item in queue if item[0] != workflow_id)
+        if remaining:
+            self._waiting[tenant_id] = remaining
+        else:
+            del self._waiting[tenant_id]
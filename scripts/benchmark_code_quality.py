@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+代码质量分析基准测试脚本
+生成合成项目，对比不同工作进程数下 CodeAnalyzer.analyze_code_quality 的耗时，
+并用定时器任务测量分析期间事件循环的最大延迟（衡量API是否保持响应）。
+
+用法:
+    python scripts/benchmark_code_quality.py
+    python scripts/benchmark_code_quality.py --files 2000 --workers 1 2 4
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.code_analysis_agent.analyzer import CodeAnalyzer
+
+MODULE_TEMPLATE = '''
+import os.path
+from collections import defaultdict
+
+
+class Service{i}:
+    """合成模块 {i}"""
+
+    def __init__(self, items):
+        self.items = list(items)
+
+    def process(self, limit):
+        result = defaultdict(int)
+        for index, item in enumerate(self.items):
+            if index > limit and item:
+                break
+            while item and item % 7:
+                item -= 1
+            result[item] += 1
+        return result
+'''
+
+
+class NoopAIService:
+    """不调用模型的AI服务，基准只衡量静态分析"""
+
+    async def analyze_code_intent(self, content, file_path, complexity_metrics=None, issues=None):
+        return {'success': False, 'error': 'benchmark', 'file_path': file_path}
+
+
+def generate_project(root: Path, files: int, functions_per_file: int):
+    """生成合成项目：每个文件包含重复的类和函数以放大解析开销"""
+    for i in range(files):
+        package = root / f"pkg{i % 40}"
+        package.mkdir(parents=True, exist_ok=True)
+        body = "\n".join(MODULE_TEMPLATE.format(i=f"{i}_{j}") for j in range(functions_per_file))
+        (package / f"module_{i}.py").write_text(body, encoding="utf-8")
+
+
+async def measure(project: Path, workers: int) -> Dict[str, float]:
+    """运行一次分析，返回耗时和事件循环最大延迟"""
+    analyzer = CodeAnalyzer(NoopAIService(), {'quality_workers': workers})
+    lags: List[float] = []
+    stop = asyncio.Event()
+
+    async def ticker():
+        while not stop.is_set():
+            before = time.monotonic()
+            await asyncio.sleep(0.01)
+            lags.append(time.monotonic() - before - 0.01)
+
+    tick = asyncio.create_task(ticker())
+    start = time.monotonic()
+    result = await analyzer.analyze_code_quality(str(project))
+    elapsed = time.monotonic() - start
+    stop.set()
+    await tick
+    return {
+        'files': result['analyzed_files'],
+        'elapsed': elapsed,
+        'max_lag_ms': max(lags, default=0.0) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="代码质量分析基准测试")
+    parser.add_argument("--files", type=int, default=2000, help="合成文件数")
+    parser.add_argument("--functions", type=int, default=8, help="每个文件重复的类数")
+    parser.add_argument("--workers", type=int, nargs="+", default=None, help="要对比的工作进程数")
+    args = parser.parse_args()
+
+    cpu_count = os.cpu_count() or 1
+    workers_list = args.workers or sorted({1, max(1, cpu_count // 2), cpu_count})
+
+    with tempfile.TemporaryDirectory(prefix="quality_bench_") as tmp:
+        project = Path(tmp) / "project"
+        generate_project(project, args.files, args.functions)
+        print(f"合成项目: {args.files} 个文件, CPU核数: {cpu_count}")
+
+        baseline = None
+        for workers in workers_list:
+            stats = asyncio.run(measure(project, workers))
+            baseline = baseline or stats['elapsed']
+            print(
+                f"workers={workers:<3} 文件={stats['files']:<6} 耗时={stats['elapsed']:.2f}s "
+                f"加速比={baseline / stats['elapsed']:.2f}x 事件循环最大延迟={stats['max_lag_ms']:.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
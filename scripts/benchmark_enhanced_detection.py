@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+增强Flask检测基准测试脚本
+对比 API变更检测 的逐项遍历（每项检查各自遍历并读取全部文件）与单次遍历，
+以及外部工具（mypy/pyright/pylint/astroid）顺序执行与并发执行的耗时，
+并对比关闭与开启指标/调用链埋点时完整检测的耗时（埋点开销）。
+
+用法:
+    python scripts/benchmark_enhanced_detection.py
+    python scripts/benchmark_enhanced_detection.py --project flask_simple_test --modules 50 --lines 100
+"""
+
+import argparse
+import asyncio
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Tuple
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from api.enhanced_detection import EnhancedFlaskDetector, ProjectSources
+from utils.metrics import observe_tool, set_instrumentation_enabled
+from utils.tracing import get_trace, span
+
+MODULE_TEMPLATE = '''
+from decimal import Decimal
+from flask import Blueprint, Flask, jsonify, send_from_directory
+
+bp_{index} = Blueprint(name="bp_{index}", import_name=__name__)
+app = Flask(__name__)
+
+
+def wrapper_{index}(func):
+    def decorator(*args, **kwargs):
+        return func(*args, **kwargs)
+    return decorator
+
+
+@bp_{index}.route("/files/<path:name>")
+def download_{index}(name):
+    return send_from_directory("static", filename=name)
+
+
+@bp_{index}.route("/price")
+def price_{index}():
+    return jsonify(value=str(Decimal("1.0")))
+
+
+app.register_blueprint(bp_{index})
+app.register_blueprint(bp_{index}, name="bp_{index}_alt")
+'''
+
+
+def generate_flask_app(target: Path, modules: int, lines: int) -> Path:
+    """生成一个较大的合成Flask应用"""
+    target.mkdir(parents=True, exist_ok=True)
+    for index in range(modules):
+        body = MODULE_TEMPLATE.format(index=index)
+        filler = "\n".join(f"CONSTANT_{index}_{i} = {i}" for i in range(lines))
+        (target / f"module_{index}.py").write_text(body + "\n" + filler + "\n", encoding="utf-8")
+    return target
+
+
+def time_per_check_walks(detector: EnhancedFlaskDetector, project_path: str) -> float:
+    """模拟逐项遍历：每项检查都重新遍历目录并读取所有文件"""
+    api = detector.api_detector
+    checks = [
+        api._check_send_from_directory,
+        api._check_config_from_json,
+        api._check_decorator_factory,
+        api._check_blueprint_registration,
+        api._check_decimal_json,
+        api._check_nested_blueprint,
+        api._check_decorator_factory_advanced,
+    ]
+    start = time.perf_counter()
+    for check in checks:
+        for source in ProjectSources(project_path).files:
+            check(source)
+    return time.perf_counter() - start
+
+
+def time_single_walk(detector: EnhancedFlaskDetector, project_path: str) -> float:
+    """单次遍历：所有检查共享同一份源码"""
+    start = time.perf_counter()
+    detector.api_detector._run_api_checks(ProjectSources(project_path))
+    return time.perf_counter() - start
+
+
+async def time_sequential_tools(detector: EnhancedFlaskDetector, project_path: str) -> float:
+    """外部工具顺序执行（原实现方式）"""
+    start = time.perf_counter()
+    await detector.type_checker.run_mypy_analysis(project_path)
+    await detector.type_checker.run_pyright_analysis(project_path)
+    await detector.static_analyzer.run_pylint_analysis(project_path)
+    await detector.static_analyzer.run_astroid_analysis(project_path)
+    await detector.api_detector.detect_api_changes(project_path)
+    return time.perf_counter() - start
+
+
+async def time_full_detection(detector: EnhancedFlaskDetector, project_path: str) -> float:
+    """完整检测（工具并发执行）"""
+    start = time.perf_counter()
+    await detector.detect_flask_2_0_0_issues(project_path)
+    return time.perf_counter() - start
+
+
+def time_instrumentation_overhead(detector: EnhancedFlaskDetector, project_path: str,
+                                  runs: int) -> Tuple[float, float]:
+    """交替关闭、开启埋点运行完整检测，返回（关闭, 开启）各自的最短耗时"""
+    timings = {False: [], True: []}
+    try:
+        for _ in range(runs):
+            for enabled in (False, True):
+                set_instrumentation_enabled(enabled)
+                timings[enabled].append(asyncio.run(time_full_detection(detector, project_path)))
+    finally:
+        set_instrumentation_enabled(True)
+    return min(timings[False]), min(timings[True])
+
+
+def time_instrumentation_cost(iterations: int = 20000) -> float:
+    """单次工具埋点（span + 直方图 + 计数器）的耗时，扣除关闭埋点时的空转耗时"""
+    def loop() -> float:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            with observe_tool("benchmark", "noop"):
+                pass
+        return (time.perf_counter() - start) / iterations
+
+    try:
+        set_instrumentation_enabled(False)
+        baseline = loop()
+        set_instrumentation_enabled(True)
+        return max(0.0, loop() - baseline)
+    finally:
+        set_instrumentation_enabled(True)
+
+
+def count_spans(detector: EnhancedFlaskDetector, project_path: str) -> int:
+    """完整检测一次产生的 span 数"""
+    async def traced():
+        with span("benchmark") as root:
+            await detector.detect_flask_2_0_0_issues(project_path)
+        return root.trace_id
+
+    return len(get_trace(asyncio.run(traced())))
+
+
+def run_benchmark(name: str, project_path: str, repeat: int) -> None:
+    detector = EnhancedFlaskDetector()
+    file_count = len(ProjectSources.get_python_files(project_path))
+
+    per_check = min(time_per_check_walks(detector, project_path) for _ in range(repeat))
+    single = min(time_single_walk(detector, project_path) for _ in range(repeat))
+    sequential = asyncio.run(time_sequential_tools(detector, project_path))
+    concurrent = asyncio.run(time_full_detection(detector, project_path))
+    plain, instrumented = time_instrumentation_overhead(detector, project_path, repeat)
+    spans = count_spans(detector, project_path)
+    cost = spans * time_instrumentation_cost()
+
+    print(f"\n📊 {name}（{file_count} 个Python文件）")
+    print(f"  API变更检测 逐项遍历: {per_check * 1000:8.1f} ms")
+    print(f"  API变更检测 单次遍历: {single * 1000:8.1f} ms  (加速 {per_check / max(single, 1e-9):.1f}x)")
+    print(f"  完整检测 工具顺序执行: {sequential:8.2f} s")
+    print(f"  完整检测 工具并发执行: {concurrent:8.2f} s  (加速 {sequential / max(concurrent, 1e-9):.1f}x)")
+    print(f"  完整检测 关闭埋点:     {plain:8.2f} s")
+    print(f"  完整检测 开启埋点:     {instrumented:8.2f} s  (差异 {(instrumented / max(plain, 1e-9) - 1) * 100:+.2f}%，含工具耗时波动)")
+    print(f"  埋点自身耗时: {spans} 个 span，共 {cost * 1e6:.1f} µs  (占完整检测 {cost / max(plain, 1e-9) * 100:.4f}%)")
+    available = {
+        "mypy": detector.type_checker.mypy_available,
+        "pyright": detector.type_checker.pyright_available,
+        "pylint": detector.static_analyzer.pylint_available,
+        "astroid": detector.static_analyzer.astroid_available,
+    }
+    print(f"  可用工具: {', '.join(name for name, ok in available.items() if ok) or '无'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="增强Flask检测基准测试")
+    parser.add_argument("--project", default="flask_simple_test", help="真实项目路径（相对项目根目录）")
+    parser.add_argument("--modules", type=int, default=50, help="合成Flask应用的模块数")
+    parser.add_argument("--lines", type=int, default=100, help="每个合成模块的额外行数")
+    parser.add_argument("--repeat", type=int, default=3, help="API变更检测和埋点开销的重复次数（取最小值）")
+    args = parser.parse_args()
+
+    # 工具会在项目目录中写入配置文件，因此所有基准都在临时目录中运行
+    temp_dir = Path(tempfile.mkdtemp(prefix="flask_bench_"))
+    try:
+        real_project = project_root / args.project
+        if real_project.exists():
+            copy_path = shutil.copytree(real_project, temp_dir / real_project.name)
+            run_benchmark(args.project, str(copy_path), args.repeat)
+        else:
+            print(f"⚠️ 项目不存在，跳过: {real_project}")
+
+        app_path = generate_flask_app(temp_dir / "large_flask_app", args.modules, args.lines)
+        run_benchmark(f"合成Flask应用 ({args.modules}×{args.lines}行)", str(app_path), args.repeat)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+代码风格检查微基准测试脚本
+生成约2万行的合成Python文件，测量 StyleChecker 单次遍历检查、
+QualityMetricsCalculator 复用语法树与重新解析两种方式的耗时。
+
+用法:
+    python scripts/benchmark_style_checker.py
+    python scripts/benchmark_style_checker.py --lines 20000 --repeat 5
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.code_quality_agent.quality_checker import (
+    QualityMetricsCalculator, StyleChecker, parse_python_source
+)
+
+BLOCK_TEMPLATE = '''
+# 订单处理模块 {i}
+from collections import OrderedDict
+import os
+
+
+class OrderService{i}:
+    """订单服务 {i}"""
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.Cache = OrderedDict()
+
+    def processOrders(self, limit):
+        total = 0
+        for index, item in enumerate(self.items):
+            if index > limit:
+                break
+            while item > 0 and item % 3:
+                item -= 1
+            total += item
+        return total
+
+    def describe(self):
+        return """多行字符串
+# 不是注释的一行
+        """ + "x" * {width}
+'''
+
+
+def generate_source(lines: int) -> str:
+    block_lines = BLOCK_TEMPLATE.count('\n')
+    blocks = [BLOCK_TEMPLATE.format(i=i, width=i % 200) for i in range(lines // block_lines + 1)]
+    return ''.join(blocks)
+
+
+def measure(func, repeat: int) -> float:
+    """返回多次运行的中位耗时（毫秒）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="代码风格检查微基准测试")
+    parser.add_argument("--lines", type=int, default=20000, help="合成文件行数")
+    parser.add_argument("--repeat", type=int, default=5, help="每项测量的重复次数")
+    args = parser.parse_args()
+
+    source = generate_source(args.lines)
+    config = {'max_line_length': 120}
+    style_checker = StyleChecker(config)
+    calculator = QualityMetricsCalculator(config)
+    tree = parse_python_source(source)
+
+    results = {
+        "ast.parse": measure(lambda: parse_python_source(source), args.repeat),
+        "风格检查（共享语法树）": measure(
+            lambda: asyncio.run(style_checker.analyze_single_file("bench.py", source, tree)), args.repeat),
+        "风格检查（自行解析）": measure(
+            lambda: asyncio.run(style_checker.analyze_single_file("bench.py", source)), args.repeat),
+        "质量指标（共享语法树）": measure(
+            lambda: asyncio.run(calculator.calculate_metrics("bench.py", source, tree)), args.repeat),
+        "质量指标（重新解析）": measure(
+            lambda: asyncio.run(calculator.calculate_metrics("bench.py", source)), args.repeat),
+    }
+
+    issues = asyncio.run(style_checker.analyze_single_file("bench.py", source, tree))
+    print(f"合成文件: {source.count(chr(10))} 行, {len(source)} 字符, 风格问题 {len(issues)} 个")
+    for name, elapsed in results.items():
+        print(f"{name:<16} {elapsed:8.1f} ms")
+    pipeline = results["ast.parse"] + results["风格检查（共享语法树）"] + results["质量指标（共享语法树）"]
+    print(f"单文件分析（解析一次）合计 {pipeline:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+任务调度基准测试脚本
+用混合时长的合成负载对比两种派发方式的排队时间（分配 -> 开始执行）：
+- FIFO：分配即派发，任务在Agent内部队列中按到达顺序执行（原实现方式）
+- 调度器：TaskManager 按容量、优先级老化、截止时间和工作流公平共享派发
+
+用法:
+    python scripts/benchmark_task_scheduler.py
+    python scripts/benchmark_task_scheduler.py --tasks 2000 --workers 2 --load 0.85
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from coordinator.task_manager import TaskManager, TaskPriority, percentile
+
+AGENT_ID = "bench_agent"
+
+# (任务类型, 优先级, 执行时长秒, 占比)
+TASK_MIX = [
+    ("detect_bugs", TaskPriority.HIGH, 0.002, 0.7),
+    ("generate_tests", TaskPriority.NORMAL, 0.010, 0.2),
+    ("fix_issues", TaskPriority.LOW, 0.040, 0.1),
+]
+
+
+def generate_load(tasks: int, workers: int, load: float, workflows: int, seed: int) -> List[Tuple[float, str, TaskPriority, float, str]]:
+    """生成泊松到达的任务序列：(到达时刻, 类型, 优先级, 时长, 工作流)；第一个工作流提交一半的任务"""
+    rng = random.Random(seed)
+    mean_service = sum(duration * share for _, _, duration, share in TASK_MIX)
+    rate = load * workers / mean_service
+    arrivals, now = [], 0.0
+    for _ in range(tasks):
+        now += rng.expovariate(rate)
+        task_type, priority, duration, _ = rng.choices(TASK_MIX, weights=[m[3] for m in TASK_MIX])[0]
+        workflow = "workflow_0" if rng.random() < 0.5 else f"workflow_{rng.randrange(1, workflows)}"
+        arrivals.append((now, task_type, priority, duration, workflow))
+    return arrivals
+
+
+async def run_fifo(arrivals, workers: int) -> Dict[str, List[float]]:
+    """原实现：分配即发送，Agent的工作线程按到达顺序处理"""
+    queue: asyncio.Queue = asyncio.Queue()
+    delays: Dict[str, List[float]] = defaultdict(list)
+
+    async def worker():
+        while True:
+            assigned_at, task_type, duration, workflow = await queue.get()
+            delay = time.monotonic() - assigned_at
+            delays[task_type].append(delay)
+            delays[workflow].append(delay)
+            await asyncio.sleep(duration)
+            queue.task_done()
+
+    worker_tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    start = time.monotonic()
+    for at, task_type, _, duration, workflow in arrivals:
+        await asyncio.sleep(max(0.0, start + at - time.monotonic()))
+        queue.put_nowait((time.monotonic(), task_type, duration, workflow))
+    await queue.join()
+    for task in worker_tasks:
+        task.cancel()
+    return delays
+
+
+async def run_scheduler(arrivals, workers: int, aging_interval: float) -> Dict[str, List[float]]:
+    """TaskManager 调度：按容量派发，派发后模拟执行并回写结果"""
+    manager = TaskManager({"aging_interval": aging_interval, "task_timeout": 3600})
+    delays: Dict[str, List[float]] = defaultdict(list)
+    durations: Dict[str, float] = {}
+    running = set()
+
+    async def execute(task):
+        await asyncio.sleep(durations[task['id']])
+        await manager.update_task_result(task['id'], {"success": True}, True)
+
+    async def dispatcher(task):
+        delays[task['type']].append(task['queue_delay'])
+        delays[task['group']].append(task['queue_delay'])
+        job = asyncio.create_task(execute(task))
+        running.add(job)
+        job.add_done_callback(running.discard)
+
+    manager.set_dispatcher(dispatcher)
+    manager.register_agent(AGENT_ID, max_workers=workers)
+    await manager.start()
+
+    start = time.monotonic()
+    task_ids = []
+    for at, task_type, priority, duration, workflow in arrivals:
+        await asyncio.sleep(max(0.0, start + at - time.monotonic()))
+        task_id = await manager.create_task(task_type, {}, priority, group=workflow)
+        durations[task_id] = duration
+        await manager.assign_task(task_id, AGENT_ID)
+        task_ids.append(task_id)
+
+    while any(manager.tasks[t]['status'].value not in ("completed", "failed") for t in task_ids):
+        await asyncio.sleep(0.05)
+    await manager.stop()
+    return delays
+
+
+def report(name: str, delays: Dict[str, List[float]]) -> None:
+    print(f"\n📊 {name}")
+    print(f"  {'类别':<16}{'任务数':>8}{'p50(ms)':>12}{'p99(ms)':>12}")
+    all_delays = [d for task_type, *_ in TASK_MIX for d in delays.get(task_type, [])]
+    for key in [m[0] for m in TASK_MIX] + sorted(k for k in delays if k.startswith("workflow_")):
+        values = delays.get(key, [])
+        print(f"  {key:<16}{len(values):>8}{percentile(values, 50) * 1000:>12.1f}{percentile(values, 99) * 1000:>12.1f}")
+    print(f"  {'全部':<16}{len(all_delays):>8}{percentile(all_delays, 50) * 1000:>12.1f}{percentile(all_delays, 99) * 1000:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="任务调度基准测试")
+    parser.add_argument("--tasks", type=int, default=1500, help="任务数")
+    parser.add_argument("--workers", type=int, default=2, help="Agent的 max_workers")
+    parser.add_argument("--load", type=float, default=0.85, help="目标利用率（0-1）")
+    parser.add_argument("--workflows", type=int, default=4, help="并发工作流数")
+    parser.add_argument("--aging", type=float, default=0.5, help="优先级老化间隔（秒）")
+    parser.add_argument("--seed", type=int, default=7, help="随机种子")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    arrivals = generate_load(args.tasks, args.workers, args.load, args.workflows, args.seed)
+    print(f"负载: {args.tasks} 个任务, {args.workers} 个工作线程, 目标利用率 {args.load:.0%}, "
+          f"{args.workflows} 个工作流（workflow_0 提交约一半任务）")
+
+    report("FIFO（分配即派发）", asyncio.run(run_fifo(arrivals, args.workers)))
+    report("TaskManager 调度", asyncio.run(run_scheduler(arrivals, args.workers, args.aging)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
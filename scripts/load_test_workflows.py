@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+多租户工作流压测脚本
+用桩Agent（固定时长的缺陷检测与修复）驱动多个并发工作流通过真实的 Coordinator，检查：
+- 每个工作流得到独立的流水线：结果只包含自己的缺陷，任务只出现在自己的命名空间中
+- 每个租户同时运行的工作流数不超过配额
+- 按租户订阅的事件只包含该租户自己的工作流
+- 每个工作流的进度流（SSE 数据源）事件ID递增、只包含自己的事件、逐个上报的缺陷与结果一致，
+  断线后按 Last-Event-ID 续传不丢事件
+- 并发执行相对逐个执行的加速比
+
+用法:
+    python scripts/load_test_workflows.py
+    python scripts/load_test_workflows.py --workflows 20 --tenants 4 --quota 2 --workers 4
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from coordinator.coordinator import Coordinator
+from coordinator.message_types import EventType
+from coordinator.progress_stream import STREAM_CLOSED
+from utils.progress import report_issue, report_stage, report_tool_completed
+from utils.tracing import span
+
+ISSUE_TYPES = ["unused_imports", "unused_variables", "missing_docstrings", "bad_formatting"]
+
+
+class StubAgent:
+    """桩Agent：每个任务睡眠固定时长后返回按任务负载构造的结果"""
+
+    def __init__(self, agent_id: str, max_workers: int, duration: float, issues_per_file: int = 3):
+        self.agent_id = agent_id
+        self.config = {"max_workers": max_workers}
+        self.duration = duration
+        self.issues_per_file = issues_per_file
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self.running = 0
+        self.peak_running = 0
+
+    def get_capabilities(self) -> List[str]:
+        return []
+
+    def get_queue_depth(self) -> int:
+        return self.running
+
+    async def submit_task(self, task_id: str, task_data: Dict[str, Any]) -> bool:
+        self.tasks[task_id] = {"status": "running", "result": None, "error": None}
+        asyncio.create_task(self._run(task_id, task_data))
+        return True
+
+    async def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
+        task = self.tasks.get(task_id)
+        return dict(task, task_id=task_id) if task else None
+
+    async def _run(self, task_id: str, task_data: Dict[str, Any]):
+        self.running += 1
+        self.peak_running = max(self.peak_running, self.running)
+        try:
+            report_stage("analyzing")
+            with span("agent.process_task", agent_id=self.agent_id, task_id=task_id):
+                await asyncio.sleep(self.duration)
+            result = self._result(task_data)
+            for issue in result.get("detection_results", {}).get("issues", []):
+                report_issue(issue)
+            report_tool_completed("stub", len(result.get("detection_results", {}).get("issues", [])), self.duration)
+            self.tasks[task_id].update(status="completed", result=result)
+        except Exception as e:
+            self.tasks[task_id].update(status="failed", error=str(e))
+        finally:
+            self.running -= 1
+
+    def _result(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
+        if "issues" in task_data:
+            fixed = [{"file": issue["file"], "type": issue["type"], "success": True} for issue in task_data["issues"]]
+            return {"success": True, "fix_results": fixed, "total_issues": len(fixed),
+                    "fixed_issues": len(fixed), "failed_issues": 0}
+        file_path = task_data["file_path"]
+        # 动态检测不产生缺陷，静态检测为每个文件产生 issues_per_file 个缺陷
+        count = 0 if task_data["options"].get("enable_static") is False else self.issues_per_file
+        issues = [
+            {"file": file_path, "line": i + 1, "type": ISSUE_TYPES[i % len(ISSUE_TYPES)],
+             "severity": "warning", "message": f"{file_path} 第 {i + 1} 个缺陷"}
+            for i in range(count)
+        ]
+        return {"success": True, "detection_results": {"issues": issues, "total_issues": len(issues)}}
+
+
+async def run_load(workflows: int, tenants: int, quota: int, workers: int, duration: float,
+                   concurrent: bool) -> Dict[str, Any]:
+    coordinator = Coordinator({
+        "task_manager": {"task_timeout": 3600},
+        "decision_engine": {"memo_path": None},
+        "workflow": {"max_workflows_per_tenant": quota, "max_active_workflows": 0,
+                     "max_queued_workflows_per_tenant": workflows}
+    })
+    detector = StubAgent("bug_detection_agent", workers, duration)
+    fixer = StubAgent("fix_execution_agent", workers, duration)
+    await coordinator.start()
+    await coordinator.register_agent("bug_detection_agent", detector)
+    await coordinator.register_agent("fix_execution_agent", fixer)
+
+    # 每个租户一个作用域订阅，记录收到的事件，并跟踪租户同时运行的工作流数
+    tenant_events: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    running: Dict[str, int] = defaultdict(int)
+    peak_running: Dict[str, int] = defaultdict(int)
+
+    def make_handler(tenant_id: str):
+        async def handler(message):
+            tenant_events[tenant_id].append(message.payload)
+            event_type = message.event_type.value
+            if event_type == EventType.WORKFLOW_STARTED.value:
+                running[tenant_id] += 1
+                peak_running[tenant_id] = max(peak_running[tenant_id], running[tenant_id])
+            elif event_type in (EventType.WORKFLOW_COMPLETED.value, EventType.WORKFLOW_FAILED.value):
+                running[tenant_id] -= 1
+        return handler
+
+    tenant_ids = [f"tenant_{i}" for i in range(tenants)]
+    for tenant_id in tenant_ids:
+        coordinator.subscribe_workflow_events(make_handler(tenant_id), tenant_id=tenant_id)
+
+    jobs = [(f"src/tenant_{i % tenants}/module_{i}.py", tenant_ids[i % tenants]) for i in range(workflows)]
+    workflow_tasks: Dict[str, List[Dict[str, Any]]] = {}
+    stream_events: Dict[str, List[Any]] = {}
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+
+    async def consume_stream(workflow_id: str, reconnect: bool):
+        """模拟 SSE 客户端：reconnect 时收到几个事件后断开，再带最后的事件ID重连"""
+        received = stream_events.setdefault(workflow_id, [])
+        await coordinator.progress_stream.wait_for_stream(workflow_id, timeout=30)
+        last_event_id = None
+        while True:
+            async for event in coordinator.progress_stream.connect(workflow_id, last_event_id):
+                if event is None:
+                    continue
+                received.append(event)
+                if event.id is not None:
+                    last_event_id = event.id
+                if event.event == STREAM_CLOSED:
+                    return
+                if reconnect and len(received) == 3:
+                    break
+            reconnect = False
+
+    async def run_one(index: int, file_path: str, tenant_id: str) -> Dict[str, Any]:
+        workflow_id = coordinator.new_workflow_id()
+        # 客户端先于工作流连接进度流；一半的客户端中途断线重连
+        consumer = asyncio.create_task(consume_stream(workflow_id, reconnect=index % 2 == 1))
+        result_task = asyncio.create_task(
+            coordinator.process_workflow(file_path=file_path, tenant_id=tenant_id, workflow_id=workflow_id)
+        )
+        # 工作流运行期间记录其任务命名空间（结束后任务记录会被清理）
+        while not result_task.done():
+            workflow_tasks[workflow_id] = [dict(t) for t in coordinator.get_workflow_tasks(workflow_id)]
+            await asyncio.sleep(0.05)
+        await asyncio.wait_for(consumer, timeout=10)
+        traces[workflow_id] = coordinator.get_workflow_trace(workflow_id)
+        return {"file_path": file_path, "tenant_id": tenant_id, **result_task.result()}
+
+    start = time.monotonic()
+    if concurrent:
+        results = await asyncio.gather(*(run_one(i, file_path, tenant_id) for i, (file_path, tenant_id) in enumerate(jobs)))
+    else:
+        results = [await run_one(i, file_path, tenant_id) for i, (file_path, tenant_id) in enumerate(jobs)]
+    elapsed = time.monotonic() - start
+    # 等事件总线把最后的事件投递完
+    await asyncio.sleep(1.2)
+    await coordinator.stop()
+
+    return {
+        "elapsed": elapsed,
+        "results": results,
+        "workflow_tasks": workflow_tasks,
+        "tenant_events": tenant_events,
+        "stream_events": stream_events,
+        "traces": traces,
+        "peak_running": dict(peak_running),
+        "agent_peak": {"bug_detection_agent": detector.peak_running, "fix_execution_agent": fixer.peak_running},
+        "registry": coordinator.workflow_registry.get_stats()
+    }
+
+
+def check(run: Dict[str, Any], quota: int) -> List[str]:
+    """检查隔离性和配额，返回发现的问题"""
+    problems = []
+    for result in run["results"]:
+        if not result.get("success"):
+            problems.append(f"{result['workflow_id']} 失败: {result.get('error')}")
+            continue
+        issues = result["results"]["detection_result"]["detection_results"]["issues"]
+        fixed = result["results"]["fix_result"]["fix_results"]
+        if any(issue["file"] != result["file_path"] for issue in issues + fixed):
+            problems.append(f"{result['workflow_id']} 的结果混入了其他工作流的缺陷")
+
+    for workflow_id, tasks in run["workflow_tasks"].items():
+        if any(task["group"] != workflow_id for task in tasks):
+            problems.append(f"{workflow_id} 的任务命名空间包含其他工作流的任务")
+
+    tenant_of = {result["workflow_id"]: result["tenant_id"] for result in run["results"]}
+    for tenant_id, events in run["tenant_events"].items():
+        foreign = [e for e in events if e.get("tenant_id") != tenant_id or tenant_of.get(e.get("workflow_id")) != tenant_id]
+        if foreign:
+            problems.append(f"{tenant_id} 收到了 {len(foreign)} 个其他租户的事件")
+
+    for result in run["results"]:
+        workflow_id = result["workflow_id"]
+        events = run["stream_events"].get(workflow_id, [])
+        ids = [e.id for e in events if e.id is not None]
+        if not events or events[-1].event != STREAM_CLOSED:
+            problems.append(f"{workflow_id} 的进度流没有以 {STREAM_CLOSED} 结束")
+        if ids != list(range(1, len(ids) + 1)):
+            problems.append(f"{workflow_id} 的进度流事件ID不连续（重连后丢失或重复）")
+        if any(e.data.get("workflow_id") != workflow_id for e in events):
+            problems.append(f"{workflow_id} 的进度流混入了其他工作流的事件")
+        if result.get("success"):
+            issues = result["results"]["detection_result"]["detection_results"]["issues"]
+            streamed = [e for e in events if e.event == EventType.ISSUE_FOUND.value]
+            if len(streamed) != len(issues):
+                problems.append(f"{workflow_id} 的进度流上报了 {len(streamed)} 个缺陷，结果中有 {len(issues)} 个")
+
+    for workflow_id, spans in run["traces"].items():
+        names = {s["name"] for s in spans}
+        if "workflow" not in names or "workflow.node" not in names:
+            problems.append(f"{workflow_id} 的调用链缺少工作流或节点 span")
+        traced = {s["attributes"]["task_id"] for s in spans if s["name"] == "agent.process_task"}
+        expected = {task["id"] for task in run["workflow_tasks"].get(workflow_id, [])}
+        if traced != expected:
+            problems.append(f"{workflow_id} 的调用链包含 {len(traced)} 个Agent任务，工作流有 {len(expected)} 个")
+
+    for tenant_id, peak in run["peak_running"].items():
+        if peak > quota:
+            problems.append(f"{tenant_id} 同时运行 {peak} 个工作流，超过配额 {quota}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多租户工作流压测")
+    parser.add_argument("--workflows", type=int, default=20, help="工作流数")
+    parser.add_argument("--tenants", type=int, default=4, help="租户数")
+    parser.add_argument("--quota", type=int, default=2, help="每个租户同时运行的工作流上限")
+    parser.add_argument("--workers", type=int, default=4, help="每个桩Agent的 max_workers")
+    parser.add_argument("--duration", type=float, default=0.2, help="桩Agent每个任务的执行时长（秒）")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    print(f"负载: {args.workflows} 个工作流, {args.tenants} 个租户（配额 {args.quota}）, "
+          f"Agent max_workers={args.workers}, 任务时长 {args.duration}s")
+
+    # 逐个执行作为基线
+    serial = asyncio.run(run_load(args.workflows, args.tenants, args.quota, args.workers, args.duration, False))
+    concurrent = asyncio.run(run_load(args.workflows, args.tenants, args.quota, args.workers, args.duration, True))
+
+    print(f"\n📊 逐个执行: {serial['elapsed']:.2f}s")
+    print(f"📊 并发执行: {concurrent['elapsed']:.2f}s  (加速 {serial['elapsed'] / concurrent['elapsed']:.1f}x)")
+    print(f"  租户同时运行峰值: {concurrent['peak_running']}")
+    print(f"  Agent 同时执行峰值: {concurrent['agent_peak']}")
+    print(f"  最长排队时间: {concurrent['registry']['max_queue_time']:.2f}s, "
+          f"排队过的工作流: {concurrent['registry']['workflows_queued']}")
+    events = {tenant_id: len(events) for tenant_id, events in sorted(concurrent['tenant_events'].items())}
+    print(f"  各租户收到的事件数: {events}")
+    streamed = sum(len(events) for events in concurrent['stream_events'].values())
+    print(f"  进度流推送事件数: {streamed}, {concurrent['registry']['workflows_registered']} 个工作流")
+    spans = sum(len(spans) for spans in concurrent['traces'].values())
+    print(f"  调用链 span 数: {spans}")
+
+    problems = check(concurrent, args.quota)
+    if problems:
+        print("\n❌ 发现问题:")
+        for problem in problems:
+            print(f"  - {problem}")
+        return 1
+    print("\n✅ 所有工作流相互隔离，租户配额生效")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+报告产物存储测试（ETag、条件请求与并发生成合并）
+"""
+
+import asyncio
+import os
+
+import pytest
+
+from utils.artifact_store import ArtifactStore, compute_etag, if_none_match_matches
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_etag_is_content_hash_and_revalidated_on_change(tmp_path):
+    store = ArtifactStore()
+    path = tmp_path / "report.md"
+    path.write_text("# 报告\n", encoding="utf-8")
+
+    first = run(store.read(path))
+    again = run(store.read(path))
+    assert first.etag == compute_etag("# 报告\n".encode("utf-8"))
+    assert again is first
+    assert store.get_stats()["memory_hits"] == 1
+
+    path.write_text("# 新报告\n", encoding="utf-8")
+    os.utime(path, ns=(first.mtime_ns + 10**9, first.mtime_ns + 10**9))
+    changed = run(store.read(path))
+    assert changed.text() == "# 新报告\n"
+    assert changed.etag != first.etag
+
+    path.unlink()
+    assert run(store.read(path)) is None
+
+
+def test_if_none_match_parsing():
+    etag = compute_etag(b"data")
+    assert if_none_match_matches(etag, etag)
+    assert if_none_match_matches(f'"other", W/{etag}', etag)
+    assert if_none_match_matches("*", etag)
+    assert not if_none_match_matches('"other"', etag)
+    assert not if_none_match_matches(None, etag)
+
+
+def test_concurrent_requests_generate_once(tmp_path):
+    store = ArtifactStore()
+    path = tmp_path / "reports" / "ai_report_1.md"
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "# AI分析报告\n"
+
+    async def main():
+        return await asyncio.gather(*(store.get_or_generate(path, generate, kind=None) for _ in range(20)))
+
+    artifacts = run(main())
+    assert len(calls) == 1
+    assert {artifact.etag for artifact in artifacts} == {compute_etag("# AI分析报告\n".encode("utf-8"))}
+    assert path.read_text(encoding="utf-8") == "# AI分析报告\n"
+    assert store.get_stats()["coalesced_generations"] == 19
+    assert store.get_stats()["inflight_generations"] == 0
+
+    # 已存在的报告直接读取，不再生成
+    run(store.get_or_generate(path, generate, kind=None))
+    assert len(calls) == 1
+
+
+def test_generated_file_is_moved_into_place(tmp_path):
+    store = ArtifactStore()
+    generated = tmp_path / "bug_detection_report_20240101_000000.json"
+    target = tmp_path / "bug_detection_report_task.json"
+
+    async def generate():
+        generated.write_text('{"issues": []}', encoding="utf-8")
+        return generated
+
+    artifact = run(store.get_or_generate(target, generate, kind=None))
+    assert artifact.content == b'{"issues": []}'
+    assert target.exists() and not generated.exists()
+
+
+def test_failed_generation_is_shared_and_retried(tmp_path):
+    store = ArtifactStore()
+    path = tmp_path / "report.md"
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("AI服务不可用")
+
+    async def main():
+        return await asyncio.gather(*(store.get_or_generate(path, failing) for _ in range(3)), return_exceptions=True)
+
+    results = run(main())
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert not path.exists()
+
+    async def missing():
+        return None
+
+    assert run(store.get_or_generate(path, missing)) is None
+    with pytest.raises(RuntimeError):
+        run(store.get_or_generate(path, failing))
+    assert len(calls) == 2
+
+
+def test_cancelled_leader_does_not_cancel_generation(tmp_path):
+    store = ArtifactStore()
+    path = tmp_path / "report.md"
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "# 报告\n"
+
+    async def main():
+        leader = asyncio.create_task(store.get_or_generate(path, generate, kind=None))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(store.get_or_generate(path, generate, kind=None))
+        await asyncio.sleep(0.01)
+        # 发起生成的请求断开后，等待同一生成的其他请求照常拿到结果
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    artifact = run(main())
+    assert artifact.text() == "# 报告\n"
+    assert len(calls) == 1
+    assert path.read_text(encoding="utf-8") == "# 报告\n"
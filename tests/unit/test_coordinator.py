@@ -0,0 +1,37 @@
+"""
+协调中心测试（停止时取消等待Agent任务的后台协程）
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from coordinator.coordinator import Coordinator
+
+
+class PendingAgent:
+    """任务一直处于执行中的Agent"""
+
+    def __init__(self):
+        self.polls = 0
+
+    async def get_task_status(self, task_id):
+        self.polls += 1
+        return {"status": "running"}
+
+
+def test_stop_cancels_agent_waiters():
+    async def main():
+        coordinator = Coordinator({})
+        agent = PendingAgent()
+        message = SimpleNamespace(task_id="task_1", payload={})
+        waiter = asyncio.create_task(coordinator._wait_agent_task("bug_detection_agent", agent, message))
+        coordinator._agent_waiters.add(waiter)
+        waiter.add_done_callback(coordinator._agent_waiters.discard)
+        await asyncio.sleep(0.15)
+        assert agent.polls > 0
+
+        await coordinator.stop()
+        assert waiter.cancelled()
+        assert not coordinator._agent_waiters
+
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+"""
+决策引擎备忘录测试（命中/未命中、持久化、决策历史记录）
+"""
+
+import asyncio
+import json
+
+from coordinator.decision_engine import DEFAULT_MEMO_PATH, DecisionEngine
+
+
+def make_issue(issue_type, message, line=20, **extra):
+    return {"type": issue_type, "severity": "warning", "message": message, "file_path": "app.py", "line": line,
+            **extra}
+
+
+class CountingEngine(DecisionEngine):
+    """把AI调用替换为计数的固定决策"""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.ai_issues = []
+
+    async def _ai_enhanced_batch_decision(self, issues):
+        self.ai_issues.extend(issues)
+        return [{"category": "ai_assisted", "strategy": "ai_refactor", "confidence": 0.85,
+                 "reason": "AI判断", "rule_source": "ai_enhanced"} for _ in issues]
+
+
+def analyze(engine, issues):
+    return asyncio.run(engine.analyze_complexity(issues))
+
+
+def test_memo_hits_skip_ai_and_are_recorded(tmp_path):
+    engine = CountingEngine({"memo_path": tmp_path / "memo.json"})
+    issues = [
+        make_issue("unused_imports", "'os' imported but unused", id="a"),
+        make_issue("magic_numbers", "Magic number 42 used", id="b"),
+        make_issue("magic_numbers", "Magic number 7 used", id="c"),
+    ]
+
+    first = analyze(engine, issues)
+    # 签名相同的两个魔法数字缺陷只调用一次AI
+    assert [issue["id"] for issue in engine.ai_issues] == ["b"]
+    assert first["summary"]["auto_fixable_count"] == 1 and first["summary"]["ai_assisted_count"] == 2
+    assert engine.stats["memo_hits"] == 0
+    assert len(engine.decision_history) == 3
+
+    second = analyze(engine, issues)
+    assert len(engine.ai_issues) == 1
+    assert second["summary"] == first["summary"]
+    assert [d["issue"]["id"] for d in second["ai_assisted"]] == ["b", "c"]
+    assert engine.stats["memo_hits"] == 3
+    assert engine.stats["decisions_made"] == 6
+    history = engine.decision_history
+    assert len(history) == 6
+    assert [record["from_memo"] for record in history] == [False] * 3 + [True] * 3
+    assert sorted(record["issue_id"] for record in history[3:]) == ["a", "b", "c"]
+
+
+def test_memo_miss_for_different_signature(tmp_path):
+    engine = CountingEngine({"memo_path": tmp_path / "memo.json"})
+    analyze(engine, [make_issue("magic_numbers", "Magic number 42 used")])
+    # 行号位于文件开头会改变上下文决策，签名不同
+    analyze(engine, [make_issue("magic_numbers", "Magic number 42 used", line=3)])
+    assert engine.stats["memo_hits"] == 0
+    assert engine.memo.misses == 2
+
+
+def test_memo_persists_across_engines(tmp_path):
+    memo_path = tmp_path / "memo.json"
+    issues = [make_issue("magic_numbers", "Magic number 42 used")]
+    analyze(CountingEngine({"memo_path": memo_path}), issues)
+    assert len(json.loads(memo_path.read_text(encoding="utf-8"))["entries"]) == 1
+
+    restarted = CountingEngine({"memo_path": memo_path})
+    result = analyze(restarted, issues)
+    assert restarted.ai_issues == []
+    assert restarted.stats["memo_hits"] == 1
+    assert result["ai_assisted"][0]["strategy"] == "ai_refactor"
+
+
+def test_single_issue_path_records_memo_hits(tmp_path):
+    engine = CountingEngine({"memo_path": tmp_path / "memo.json"})
+    issue = make_issue("unused_imports", "'sys' imported but unused")
+    assert asyncio.run(engine.select_fix_strategy(issue)) == asyncio.run(engine.select_fix_strategy(issue))
+    assert [record["from_memo"] for record in engine.decision_history] == [False, True]
+
+
+def test_default_memo_path_is_anchored_to_project_root():
+    assert DEFAULT_MEMO_PATH.is_absolute()
+    assert (DEFAULT_MEMO_PATH.parent.parent / "coordinator" / "decision_engine.py").exists()
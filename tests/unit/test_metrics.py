@@ -0,0 +1,135 @@
+"""
+指标与调用链追踪测试（Prometheus 文本导出、span 父子关系、trace_id 随事件总线传递）
+"""
+
+import asyncio
+import gc
+import sys
+
+from coordinator.event_bus import EventBus
+from coordinator.task_manager import TaskManager
+from coordinator.message_types import EventType
+from utils.metrics import (
+    AGENT_RUNNING_TASKS, EVENT_BUS_QUEUE_DEPTH, TOOL_DURATION, TOOL_RUNS, MetricsRegistry, metrics_enabled, run_tool, set_instrumentation_enabled,
+)
+from utils.tracing import bind_trace, current_trace_id, get_trace, reset_trace, span, trace_id_for
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    requests = registry.counter("demo_requests_total", "请求数", ("path",))
+    latency = registry.histogram("demo_latency_seconds", "耗时", ("path",), buckets=(0.1, 1.0))
+    depth = registry.gauge("demo_queue_depth", "队列长度", ("agent",))
+    requests.inc(path='/a"b')
+    requests.inc(2, path='/a"b')
+    latency.observe(0.05, path="/a")
+    latency.observe(0.5, path="/a")
+    latency.observe(5, path="/a")
+    depth.set_function(lambda: {"bug_detection_agent": 3})
+
+    text = registry.render()
+    assert "# TYPE demo_requests_total counter" in text
+    assert 'demo_requests_total{path="/a\\"b"} 3' in text
+    assert 'demo_latency_seconds_bucket{path="/a",le="0.1"} 1' in text
+    assert 'demo_latency_seconds_bucket{path="/a",le="1.0"} 2' in text
+    assert 'demo_latency_seconds_bucket{path="/a",le="+Inf"} 3' in text
+    assert 'demo_latency_seconds_count{path="/a"} 3' in text
+    assert 'demo_queue_depth{agent="bug_detection_agent"} 3' in text
+    # 重复注册返回同一个指标
+    assert registry.counter("demo_requests_total", "请求数", ("path",)) is requests
+
+
+def test_gauge_sums_functions_of_live_instances():
+    first, second = TaskManager({}), TaskManager({})
+    first.agent_running["bug_detection_agent"] = 1
+    second.agent_running["bug_detection_agent"] = 2
+    second.agent_running["fix_execution_agent"] = 1
+    assert AGENT_RUNNING_TASKS.value(agent="bug_detection_agent") == 3
+    assert AGENT_RUNNING_TASKS.value(agent="fix_execution_agent") == 1
+
+    # 停止的实例移除自己的取值函数，不影响仍在运行的实例
+    asyncio.run(second.stop())
+    assert AGENT_RUNNING_TASKS.value(agent="bug_detection_agent") == 1
+    assert AGENT_RUNNING_TASKS.value(agent="fix_execution_agent") == 0
+
+    # 未停止就被回收的实例也不再参与导出
+    bus = EventBus({})
+    bus.message_queue.put_nowait("pending")
+    assert EVENT_BUS_QUEUE_DEPTH.value() == 1
+    del bus
+    gc.collect()
+    assert EVENT_BUS_QUEUE_DEPTH.value() == 0
+    asyncio.run(first.stop())
+
+
+def test_spans_follow_asyncio_tasks():
+    trace_id = trace_id_for("workflow_test_spans")
+
+    async def node(name: str):
+        with span("workflow.node", node=name):
+            await asyncio.sleep(0)
+            with span("tool.pylint"):
+                pass
+
+    async def main():
+        token = bind_trace(trace_id)
+        try:
+            with span("workflow") as root:
+                await asyncio.gather(asyncio.create_task(node("static")), asyncio.create_task(node("dynamic")))
+        finally:
+            reset_trace(token)
+        assert current_trace_id() is None
+        return root.span_id
+
+    root_id = asyncio.run(main())
+    spans = get_trace(trace_id)
+    by_id = {s["span_id"]: s for s in spans}
+    nodes = [s for s in spans if s["name"] == "workflow.node"]
+    assert len(nodes) == 2 and all(s["parent_id"] == root_id for s in nodes)
+    tools = [s for s in spans if s["name"] == "tool.pylint"]
+    assert sorted(by_id[s["parent_id"]]["attributes"]["node"] for s in tools) == ["dynamic", "static"]
+
+
+def test_trace_id_propagates_through_event_bus():
+    trace_id = trace_id_for("workflow_test_bus")
+    received = []
+
+    async def main():
+        bus = EventBus({})
+        await bus.start()
+
+        async def handler(message):
+            received.append((message.trace_id, current_trace_id()))
+
+        bus.subscribe_scoped(handler, workflow_id="workflow_test_bus")
+        token = bind_trace(trace_id)
+        try:
+            await bus.publish(EventType.TASK_CREATED.value, {"workflow_id": "workflow_test_bus"}, "coordinator",
+                              broadcast=True)
+        finally:
+            reset_trace(token)
+        for _ in range(50):
+            if received:
+                break
+            await asyncio.sleep(0.01)
+        await bus.stop()
+
+    asyncio.run(main())
+    assert received == [(trace_id, trace_id)]
+
+
+def test_run_tool_records_duration_and_status():
+    before = TOOL_RUNS.value(tool="python", mode="test", status="ok")
+    result = run_tool("python", "test", [sys.executable, "-c", "raise SystemExit(3)"])
+    assert result.returncode == 3
+    # 非零退出码表示工具发现了问题，不算运行失败
+    assert TOOL_RUNS.value(tool="python", mode="test", status="ok") == before + 1
+    assert TOOL_DURATION.count(tool="python", mode="test") >= 1
+
+    set_instrumentation_enabled(False)
+    try:
+        assert not metrics_enabled()
+        run_tool("python", "test", [sys.executable, "-c", "pass"])
+        assert TOOL_RUNS.value(tool="python", mode="test", status="ok") == before + 1
+    finally:
+        set_instrumentation_enabled(True)
@@ -0,0 +1,57 @@
+"""
+任务进度上报测试（上报函数随 asyncio 任务上下文传递）
+"""
+
+import asyncio
+
+from utils.progress import (
+    ISSUE_FOUND, STAGE_CHANGED, TOOL_COMPLETED,
+    bind_progress_reporter, progress_enabled, report_issue, report_stage, report_tool_completed,
+    reset_progress_reporter,
+)
+
+
+def test_report_without_reporter_is_noop():
+    assert not progress_enabled()
+    report_stage("analyzing")
+    report_issue({"file": "a.py"})
+
+
+def test_reporter_is_inherited_by_tasks_created_while_bound():
+    received = {"task_1": [], "task_2": []}
+
+    async def agent_work(stage: str):
+        # 模拟 Agent：submit_task 中启动的处理协程在绑定解除后才开始执行
+        await asyncio.sleep(0.01)
+        report_stage(stage)
+        report_tool_completed("pylint", 2, 0.12345)
+        report_issue({"file": f"{stage}.py", "line": 1})
+
+    async def main():
+        workers = []
+        for task_id in received:
+            token = bind_progress_reporter(lambda event_type, data, task_id=task_id: received[task_id].append((event_type, data)))
+            try:
+                workers.append(asyncio.create_task(agent_work(task_id)))
+            finally:
+                reset_progress_reporter(token)
+        assert not progress_enabled()
+        await asyncio.gather(*workers)
+
+    asyncio.run(main())
+    assert [event_type for event_type, _ in received["task_1"]] == [STAGE_CHANGED, TOOL_COMPLETED, ISSUE_FOUND]
+    assert received["task_1"][0][1] == {"stage": "task_1"}
+    assert received["task_1"][1][1] == {"tool": "pylint", "issues": 2, "duration": 0.123}
+    assert received["task_2"][2][1] == {"issue": {"file": "task_2.py", "line": 1}}
+
+
+def test_failing_reporter_does_not_break_the_task():
+    def reporter(event_type, data):
+        raise RuntimeError("事件总线已停止")
+
+    token = bind_progress_reporter(reporter)
+    try:
+        assert progress_enabled()
+        report_stage("reporting")
+    finally:
+        reset_progress_reporter(token)
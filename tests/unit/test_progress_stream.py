@@ -0,0 +1,51 @@
+"""
+工作流进度流测试（连接数上限、补发与结束）
+"""
+
+import asyncio
+import gc
+
+import pytest
+
+from coordinator.event_bus import EventBus
+from coordinator.progress_stream import STREAM_CLOSED, ProgressStream, StreamLimitExceeded
+
+
+def make_stream(**config):
+    progress = ProgressStream(EventBus({}), {"max_connections_per_stream": 2, **config})
+    progress.open("wf_1", "tenant_a", auto_close=False)
+    return progress
+
+
+def test_connection_limit_counts_connections_not_yet_read():
+    progress = make_stream()
+    first = progress.connect("wf_1")
+    second = progress.connect("wf_1")
+    # 两个连接都还没开始读取，也已占用名额
+    with pytest.raises(StreamLimitExceeded):
+        progress.connect("wf_1")
+    assert progress.stats["connections_rejected"] == 1
+
+    # 从未读取的迭代器被回收后释放名额
+    del first, second
+    gc.collect()
+    assert progress.get_stats()["connections"] == 0
+    progress.connect("wf_1")
+
+
+def test_events_published_before_first_read_are_delivered_once():
+    async def main():
+        progress = make_stream()
+        stream = progress.streams["wf_1"]
+        stream.append("task_created", {"task_id": "t1"})
+        events = progress.connect("wf_1")
+        # 连接后、首次读取前追加的事件同时在历史和连接缓冲区中
+        stream.append("task_completed", {"task_id": "t1"})
+        progress.close("wf_1")
+
+        received = [event async for event in events]
+        assert [event.event for event in received] == ["task_created", "task_completed", STREAM_CLOSED]
+        assert [event.id for event in received] == [1, 2, 3]
+        assert progress.get_stats()["connections"] == 0
+
+    asyncio.run(main())
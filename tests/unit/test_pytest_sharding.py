@@ -0,0 +1,178 @@
+"""
+分片并行 pytest 执行器测试（在生成的慢测试套件上运行）
+"""
+
+import asyncio
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from utils import pytest_sharding
+from utils.pytest_sharding import DurationHistory, ShardedPytestRunner, parse_junit_report, plan_shards
+
+SLOW_TEST_SECONDS = 0.6
+
+
+def build_suite(root: Path, files: int, slow_per_file: int, failing_file: int = -1) -> Path:
+    tests_dir = root / "tests"
+    tests_dir.mkdir(parents=True)
+    for i in range(files):
+        body = [
+            "import time",
+            "import pytest",
+            "",
+            f"@pytest.mark.parametrize('n', range({slow_per_file}))",
+            "def test_slow(n):",
+            f"    time.sleep({SLOW_TEST_SECONDS})",
+            "",
+            "class TestQuick:",
+            "    def test_quick(self):",
+            f"        assert {i} != {failing_file}",
+            "",
+        ]
+        (tests_dir / f"test_mod{i}.py").write_text("\n".join(body), encoding="utf-8")
+    return root
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_plan_shards_balances_by_duration():
+    durations = {"a": 4.0, "b": 1.0, "c": 1.0, "d": 1.0, "e": 1.0, "f": 0.5}
+    plan = plan_shards(durations, 2)
+
+    assert sorted(round(expected, 1) for _, expected in plan) == [4.0, 4.5]
+    assert [units for units, _ in plan] == [["a", "f"], ["b", "c", "d", "e"]]
+    # 分片内保持收集顺序
+    assert all(units == sorted(units) for units, _ in plan)
+    assert len(plan_shards({"a": 1.0}, 4)) == 1
+
+
+def test_parse_junit_report_maps_nodeids(tmp_path):
+    report = tmp_path / "report.xml"
+    report.write_text(
+        '<testsuites><testsuite name="pytest">'
+        '<testcase classname="tests.test_a" name="test_x[1]" file="tests/test_a.py" line="3" time="0.5"/>'
+        '<testcase classname="tests.test_a.TestB" name="test_y@codeagent_shard_1" time="0.1">'
+        '<failure message="assert 1 == 2">trace</failure></testcase>'
+        '<testcase classname="tests.test_a.TestB" name="test_y@codeagent_shard_1" time="0.2">'
+        '<error message="teardown failed">teardown</error></testcase>'
+        '<testcase classname="tests.test_a" name="test_skip" time="0"><skipped message="no"/></testcase>'
+        '</testsuite></testsuites>',
+        encoding="utf-8",
+    )
+    nodeids = ["tests/test_a.py::test_x[1]", "tests/test_a.py::TestB::test_y", "tests/test_a.py::test_skip"]
+    results = {r["nodeid"]: r for r in parse_junit_report(str(report), nodeids)}
+
+    assert set(results) == set(nodeids)
+    assert results["tests/test_a.py::test_x[1]"]["outcome"] == "passed"
+    assert results["tests/test_a.py::test_x[1]"]["line"] == 4
+    assert results["tests/test_a.py::TestB::test_y"]["outcome"] == "error"
+    assert results["tests/test_a.py::TestB::test_y"]["duration"] == pytest.approx(0.3)
+    assert results["tests/test_a.py::test_skip"]["outcome"] == "skipped"
+
+
+def test_duration_history_is_recorded_per_project(tmp_path):
+    history = DurationHistory(str(tmp_path / "project"), str(tmp_path / "cache"))
+    history.record([
+        {"nodeid": "t::a", "outcome": "passed", "duration": 2.0},
+        {"nodeid": "t::b", "outcome": "skipped", "duration": 0.0},
+    ])
+    history.save()
+
+    reloaded = DurationHistory(str(tmp_path / "project"), str(tmp_path / "cache"))
+    assert reloaded.estimate(["t::a", "t::c"]) == {"t::a": 2.0, "t::c": 2.0}
+    assert DurationHistory(str(tmp_path / "other"), str(tmp_path / "cache")).durations == {}
+
+
+def test_sharded_run_is_faster_and_structured(tmp_path, monkeypatch):
+    # 关闭插件自动加载，使 pytest 启动开销不掩盖分片的效果
+    monkeypatch.setenv("PYTEST_DISABLE_PLUGIN_AUTOLOAD", "1")
+    project = build_suite(tmp_path / "project", files=4, slow_per_file=2, failing_file=2)
+    cache_dir = str(tmp_path / "cache")
+
+    start = time.monotonic()
+    serial = run(ShardedPytestRunner({"test_workers": 1, "test_duration_cache_dir": cache_dir}).run(str(project)))
+    serial_time = time.monotonic() - start
+
+    runner = ShardedPytestRunner({"test_workers": 4, "test_backend": "subprocess", "test_duration_cache_dir": cache_dir})
+    start = time.monotonic()
+    sharded = run(runner.run(str(project)))
+    sharded_time = time.monotonic() - start
+
+    assert serial["backend"] == "single"
+    assert sharded["backend"] == "subprocess"
+    assert len(sharded["shards"]) == 4
+    # 历史耗时已由第一次运行记录：每个分片分到两个慢测试
+    assert all(shard["expected_duration"] == pytest.approx(2 * SLOW_TEST_SECONDS, rel=0.3) for shard in sharded["shards"])
+    assert sharded_time < serial_time / 1.5, (serial_time, sharded_time)
+
+    for result in (serial, sharded):
+        assert result["passed"] is False
+        assert result["summary"]["total"] == 12
+        assert result["summary"]["failed"] == 1
+        failure = result["failures"][0]
+        assert failure["nodeid"] == "tests/test_mod2.py::TestQuick::test_quick"
+        assert failure["file"] == "tests/test_mod2.py"
+        assert "assert 2 != 2" in failure["message"]
+
+
+def test_falls_back_to_subprocess_without_xdist(tmp_path, monkeypatch):
+    monkeypatch.setattr(pytest_sharding, "xdist_available", lambda: False)
+    project = build_suite(tmp_path / "project", files=2, slow_per_file=0)
+    runner = ShardedPytestRunner({
+        "test_workers": 2, "test_backend": "xdist", "test_duration_cache_dir": str(tmp_path / "cache"),
+    })
+    result = run(runner.run(str(project)))
+
+    assert result["backend"] == "subprocess"
+    assert result["passed"] is True
+    assert result["summary"]["passed"] == 2
+
+
+def test_xdist_backend_keeps_per_test_results(tmp_path):
+    pytest.importorskip("xdist")
+    project = build_suite(tmp_path / "project", files=2, slow_per_file=1, failing_file=0)
+    runner = ShardedPytestRunner({"test_workers": 2, "test_duration_cache_dir": str(tmp_path / "cache")})
+    result = run(runner.run(str(project)))
+
+    assert result["backend"] == "xdist"
+    assert result["summary"] == {"passed": 3, "skipped": 0, "failed": 1, "error": 0, "total": 4}
+    assert [f["nodeid"] for f in result["failures"]] == ["tests/test_mod0.py::TestQuick::test_quick"]
+
+
+def test_collection_error_is_reported(tmp_path):
+    project = tmp_path / "project"
+    (project / "tests").mkdir(parents=True)
+    (project / "tests" / "test_broken.py").write_text("import missing_module_xyz\n", encoding="utf-8")
+    runner = ShardedPytestRunner({"test_workers": 2, "test_duration_cache_dir": str(tmp_path / "cache")})
+    result = run(runner.run(str(project)))
+
+    assert result["backend"] == "single"
+    assert result["passed"] is False
+    assert result["summary"]["error"] == 1
+
+
+def test_overlong_targets_fall_back_to_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(pytest_sharding, "MAX_COMMAND_CHARS", 200)
+    project = build_suite(tmp_path / "project", files=2, slow_per_file=0)
+    targets = [f"tests/test_mod{i % 2}.py::TestQuick::test_quick" for i in range(20)]
+    assert pytest_sharding.command_targets(targets) == ["tests/test_mod0.py", "tests/test_mod1.py"]
+    assert pytest_sharding.command_targets([f"tests/test_{'x' * 50}_{i}.py" for i in range(10)]) == []
+
+    runner = ShardedPytestRunner({"test_workers": 1, "test_duration_cache_dir": str(tmp_path / "cache")})
+    nodeids, _ = run(runner.collect(str(project), targets))
+    # 按所在文件收集：与 _plan 按文件分片一样，文件中的其他测试也会被包含
+    assert "tests/test_mod1.py::TestQuick::test_quick" in nodeids
+    assert {nodeid.split("::")[0] for nodeid in nodeids} == {"tests/test_mod0.py", "tests/test_mod1.py"}
+
+
+def test_only_plugin_modules_are_put_on_pythonpath():
+    plugin_dir = pytest_sharding._plugin_env()["PYTHONPATH"].split(os.pathsep)[-1]
+    assert plugin_dir == str(pytest_sharding.PLUGIN_DIR)
+    assert {path.name for path in pytest_sharding.PLUGIN_DIR.glob("*.py")} == {
+        "__init__.py", "pytest_shard_plugin.py", "pytest_context_plugin.py",
+    }
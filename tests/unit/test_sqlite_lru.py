@@ -0,0 +1,55 @@
+"""
+共用 SQLite LRU 存储测试（累计大小、替换、淘汰到低水位、多实例共享文件）
+"""
+
+from utils.sqlite_lru import SqliteLRUStore
+
+
+def make_store(tmp_path, max_size_bytes=100):
+    return SqliteLRUStore(tmp_path / "store.sqlite", "entries", value_column="result",
+                          columns=("kind TEXT",), max_size_bytes=max_size_bytes)
+
+
+def test_size_is_tracked_without_rescanning(tmp_path):
+    store = make_store(tmp_path)
+    assert store.put("a", "x" * 30, kind="static") == []
+    assert store.put("b", "x" * 30, kind="ai") == []
+    # 替换已有条目只计新值的大小
+    store.put("a", "x" * 10, kind="static")
+    assert store.size_bytes == 40
+    assert store.get("a", ("kind",)) == ("x" * 10, "static")
+    assert store.get("missing") is None
+
+    assert store.delete("b") and not store.delete("b")
+    assert store.size_bytes == 10
+    store.close()
+    # 重新打开时从文件得到已有大小
+    assert make_store(tmp_path).size_bytes == 10
+
+
+def test_eviction_removes_least_recently_used_down_to_low_water(tmp_path):
+    store = make_store(tmp_path)
+    for key in "abc":
+        store.put(key, "x" * 30)
+    assert store.get("a") is not None
+
+    # 130 字节超出上限：按最久未访问淘汰 b、c，降到上限的 90% 以下
+    assert store.put("d", "x" * 40) == ["b", "c"]
+    assert store.size_bytes == 70
+    assert store.evictions == 2
+    assert store.get("a") is not None and store.get("d") is not None
+    assert len(store) == 2
+
+
+def test_eviction_resyncs_with_other_writers(tmp_path):
+    first = make_store(tmp_path)
+    second = make_store(tmp_path)
+    first.put("a", "x" * 60)
+    second.put("b", "x" * 30)
+    assert first.size_bytes == 60
+
+    # first 不知道 b 的存在，超出上限淘汰时按文件中的实际大小（135 字节）校准
+    assert first.put("c", "x" * 45) == ["a"]
+    assert first.size_bytes == 75
+    assert len(first) == 2
+    assert first.clear() == 2 and first.size_bytes == 0
@@ -0,0 +1,92 @@
+"""
+存储配额管理器测试（LRU淘汰、最短空闲保护、pin保护）
+"""
+
+import time
+
+from utils.storage_manager import StorageManager, TRASH_DIR_NAME
+
+
+def make_workspace(root, name, size=100):
+    workspace = root / name
+    workspace.mkdir()
+    (workspace / "data.bin").write_bytes(b"x" * size)
+    return workspace
+
+
+def make_manager(tmp_path, budget_bytes=250, min_idle_seconds=0.0):
+    return StorageManager(budget_bytes=budget_bytes, min_idle_seconds=min_idle_seconds, trash_root=tmp_path)
+
+
+def test_over_budget_evicts_least_recently_used(tmp_path):
+    manager = make_manager(tmp_path)
+    first = make_workspace(tmp_path, "project_a")
+    second = make_workspace(tmp_path, "project_b")
+    manager.register(first)
+    manager.register(second)
+    manager.touch(first)
+
+    third = make_workspace(tmp_path, "project_c")
+    manager.register(third)
+    assert manager.wait_for_pending(timeout=10)
+
+    assert first.exists() and third.exists()
+    assert not second.exists()
+    assert not any((tmp_path / TRASH_DIR_NAME).iterdir())
+    metrics = manager.get_metrics()
+    assert metrics["evictions"] == 1
+    assert metrics["reclaimed_bytes"] == 100
+    assert metrics["used_bytes"] == 200
+
+
+def test_recently_used_workspaces_are_not_evicted(tmp_path):
+    manager = make_manager(tmp_path, budget_bytes=150, min_idle_seconds=60)
+    first = make_workspace(tmp_path, "project_a")
+    second = make_workspace(tmp_path, "project_b")
+    manager.register(first)
+    manager.register(second)
+    # 两个工作区都在最短空闲时间内，允许暂时超出预算
+    assert manager.used_bytes == 200
+    assert first.exists() and second.exists()
+
+    manager.find_workspace(first).last_access = time.time() - 120
+    assert manager.enforce_budget() == [str(first.resolve())]
+    assert manager.wait_for_pending(timeout=10)
+    assert not first.exists() and second.exists()
+
+
+def test_pinned_workspace_survives_until_unpinned(tmp_path):
+    manager = make_manager(tmp_path, budget_bytes=150)
+    pinned = make_workspace(tmp_path, "project_pinned")
+    manager.register(pinned, pinned=True)
+    # 工作区内的路径也能找到所属工作区
+    assert manager.find_workspace(pinned / "data.bin").path == pinned.resolve()
+
+    other = make_workspace(tmp_path, "project_other")
+    manager.register(other)
+    assert manager.wait_for_pending(timeout=10)
+    assert pinned.exists() and not other.exists()
+    assert manager.get_metrics()["pinned_workspaces"] == 1
+
+    manager.pin(pinned)
+    manager.unpin(pinned)
+    assert manager.get_metrics()["pinned_workspaces"] == 1
+    manager.unpin(pinned)
+    latest = make_workspace(tmp_path, "project_latest")
+    manager.register(latest)
+    assert manager.wait_for_pending(timeout=10)
+    assert not pinned.exists() and latest.exists()
+
+
+def test_refresh_updates_size_and_enforces_budget(tmp_path):
+    manager = make_manager(tmp_path)
+    first = make_workspace(tmp_path, "project_a")
+    second = make_workspace(tmp_path, "project_b")
+    manager.register(first)
+    manager.register(second)
+
+    (second / "venv.bin").write_bytes(b"x" * 100)
+    manager.refresh(second)
+    assert manager.wait_for_pending(timeout=10)
+    assert not first.exists()
+    assert manager.used_bytes == 200
@@ -0,0 +1,144 @@
+"""
+任务调度测试（优先级老化、Agent容量、截止时间、注销Agent）
+"""
+
+import asyncio
+
+from coordinator.message_types import TaskStatus
+from coordinator.task_manager import TaskManager, TaskPriority
+
+AGENT_ID = "bug_detection_agent"
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def make_manager(max_workers=1, aging_interval=30.0, queue_depth=None):
+    """不启动调度循环，测试中手动调用 _schedule；派发函数只记录派发顺序"""
+    manager = TaskManager({"aging_interval": aging_interval})
+    dispatched = []
+
+    async def dispatcher(task):
+        dispatched.append(task['data']['name'])
+
+    manager.set_dispatcher(dispatcher)
+    manager.register_agent(AGENT_ID, max_workers=max_workers, queue_depth=queue_depth)
+    return manager, dispatched
+
+
+async def submit(manager, name, priority=TaskPriority.NORMAL, deadline=None, group=None, agent_id=AGENT_ID):
+    task_id = await manager.create_task("detect_bugs", {"name": name}, priority, deadline=deadline, group=group)
+    await manager.assign_task(task_id, agent_id)
+    return task_id
+
+
+def test_higher_priority_dispatches_first_until_low_priority_ages():
+    async def main():
+        manager, dispatched = await make_manager(aging_interval=10.0)
+        old_low = await submit(manager, "old_low", TaskPriority.LOW)
+        await submit(manager, "new_low", TaskPriority.LOW)
+        high = await submit(manager, "high", TaskPriority.HIGH)
+        await manager._schedule()
+        assert dispatched == ["high"]
+
+        # 低优先级任务等待了 3 个老化周期：有效优先级 1 + 3 = 4，高于新提交的 HIGH(3)
+        manager.tasks[old_low]['assigned_at'] -= 30
+        await submit(manager, "new_high", TaskPriority.HIGH)
+        await manager.update_task_result(high, {"success": True})
+        await manager._schedule()
+        assert dispatched == ["high", "old_low"]
+
+    run(main())
+
+
+def test_dispatch_respects_agent_capacity_and_queue_depth():
+    async def main():
+        backlog = {"depth": 0}
+        manager, dispatched = await make_manager(max_workers=2, queue_depth=lambda: backlog["depth"])
+        task_ids = [await submit(manager, f"task_{i}") for i in range(5)]
+        await manager._schedule()
+        assert dispatched == ["task_0", "task_1"]
+        assert manager._waiting_by_agent() == {AGENT_ID: 3}
+
+        await manager.update_task_result(task_ids[0], {"success": True})
+        await manager._schedule()
+        assert dispatched == ["task_0", "task_1", "task_2"]
+
+        # Agent自身还积压着不经过任务管理器的任务时，扣除这部分容量
+        backlog["depth"] = 2
+        await manager.update_task_result(task_ids[1], {"success": True})
+        await manager._schedule()
+        assert dispatched == ["task_0", "task_1", "task_2"]
+        backlog["depth"] = 0
+        await manager._schedule()
+        assert dispatched == ["task_0", "task_1", "task_2", "task_3"]
+        assert manager.agent_running[AGENT_ID] == 2
+
+    run(main())
+
+
+def test_groups_share_capacity_fairly():
+    async def main():
+        manager, dispatched = await make_manager(max_workers=2)
+        for i in range(3):
+            await submit(manager, f"a{i}", group="workflow_a")
+        await submit(manager, "b0", group="workflow_b")
+        await manager._schedule()
+        # workflow_a 已有任务在运行，同优先级时先派发运行任务少的 workflow_b
+        assert dispatched == ["a0", "b0"]
+
+    run(main())
+
+
+def test_tasks_past_deadline_expire_without_dispatch():
+    async def main():
+        manager, dispatched = await make_manager(max_workers=1)
+        blocker = await submit(manager, "blocker")
+        expiring = await submit(manager, "expiring", deadline=0.01)
+        await manager._schedule()
+        await asyncio.sleep(0.02)
+        await manager.update_task_result(blocker, {"success": True})
+        await manager._schedule()
+
+        assert dispatched == ["blocker"]
+        assert manager.tasks[expiring]['status'] == TaskStatus.FAILED
+        assert await manager.get_task_result(expiring) == {"error": "Task timeout", "success": False}
+        assert manager.stats["tasks_expired"] == 1
+
+    run(main())
+
+
+def test_unregister_agent_fails_waiting_tasks_immediately():
+    async def main():
+        manager, dispatched = await make_manager(max_workers=1)
+        running = await submit(manager, "running")
+        waiting = [await submit(manager, f"waiting_{i}") for i in range(2)]
+        await manager._schedule()
+
+        assert await manager.unregister_agent(AGENT_ID) == 2
+        for task_id in waiting:
+            result = await asyncio.wait_for(manager.get_task_result(task_id), timeout=1)
+            assert result == {"error": f"Agent {AGENT_ID} 已注销", "success": False}
+        assert manager.tasks[running]['status'] == TaskStatus.RUNNING
+        assert manager._waiting_by_agent() == {}
+        assert manager.agent_loads[AGENT_ID] == 1
+
+        await manager._schedule()
+        assert dispatched == ["running"]
+
+    run(main())
+
+
+def test_assign_without_dispatcher_fails_the_task():
+    async def main():
+        manager = TaskManager({})
+        task_id = await manager.create_task("detect_bugs", {"name": "orphan"})
+
+        assert await manager.assign_task(task_id, AGENT_ID) is False
+        assert manager.tasks[task_id]['status'] == TaskStatus.FAILED
+        result = await asyncio.wait_for(manager.get_task_result(task_id), timeout=1)
+        assert result == {"error": "任务管理器未设置派发函数", "success": False}
+        assert manager._waiting_by_agent() == {}
+
+    run(main())
@@ -0,0 +1,184 @@
+"""
+工作流图执行器测试（依赖顺序、数据流消费、可选/必需节点失败、取消）
+"""
+
+import asyncio
+
+import pytest
+
+from coordinator.coordinator import Coordinator
+from coordinator.workflow_graph import WorkflowCancelled, WorkflowContext, WorkflowGraph, WorkflowNode
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def recorder(events, name, result=None, delay=0.0, error=None):
+    async def node(context):
+        events.append(f"{name}:start")
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        events.append(f"{name}:end")
+        return result if result is not None else name
+    return node
+
+
+def test_nodes_start_after_their_dependencies():
+    events = []
+    graph = WorkflowGraph([
+        WorkflowNode("report", recorder(events, "report"), deps=["static", "dynamic"]),
+        WorkflowNode("static", recorder(events, "static", delay=0.02)),
+        WorkflowNode("dynamic", recorder(events, "dynamic", delay=0.01)),
+    ])
+    context = WorkflowContext("wf_order")
+    results = run(graph.run(context))
+
+    assert results == {"static": "static", "dynamic": "dynamic", "report": "report"}
+    # 相互独立的节点并发启动，下游在所有依赖结束后才启动
+    assert events[:2] == ["static:start", "dynamic:start"]
+    assert events.index("report:start") > max(events.index("static:end"), events.index("dynamic:end"))
+    assert set(context.node_status.values()) == {"completed"}
+
+
+def test_validate_rejects_unknown_dependencies_and_cycles():
+    async def noop(context):
+        return None
+
+    with pytest.raises(ValueError, match="未知节点"):
+        WorkflowGraph([WorkflowNode("a", noop, deps=["missing"])]).validate()
+    with pytest.raises(ValueError, match="环"):
+        WorkflowGraph([WorkflowNode("a", noop, deps=["b"]), WorkflowNode("b", noop, streams=["a"])]).validate()
+    with pytest.raises(ValueError, match="重复"):
+        WorkflowGraph([WorkflowNode("a", noop), WorkflowNode("a", noop)])
+
+
+def test_stream_consumer_processes_items_before_producer_finishes():
+    producer_status = []
+
+    async def produce(context):
+        stream = context.stream("detect")
+        for item in range(5):
+            await stream.emit(item)
+            await asyncio.sleep(0.01)
+        return "detected"
+
+    async def consume(context):
+        consumed = []
+        async for batch in context.stream("detect").batches(2):
+            producer_status.append(context.node_status["detect"])
+            consumed.extend(batch)
+        return consumed
+
+    graph = WorkflowGraph([
+        WorkflowNode("detect", produce),
+        WorkflowNode("decide", consume, streams=["detect"]),
+    ])
+    results = run(graph.run(WorkflowContext("wf_stream")))
+
+    assert results["decide"] == [0, 1, 2, 3, 4]
+    # 消费者在生产者结束前已经逐批读到了数据
+    assert producer_status.count("running") >= 4
+
+
+def test_stream_can_be_read_by_late_consumers():
+    async def produce(context):
+        for item in "abc":
+            await context.stream("source").emit(item)
+
+    async def late(context):
+        return [item async for item in context.stream("source")]
+
+    graph = WorkflowGraph([
+        WorkflowNode("source", produce),
+        WorkflowNode("first", late, deps=["source"], streams=["source"]),
+        WorkflowNode("second", late, deps=["first"], streams=["source"]),
+    ])
+    results = run(graph.run(WorkflowContext("wf_replay")))
+    assert results["first"] == results["second"] == ["a", "b", "c"]
+
+
+def test_optional_node_failure_does_not_stop_downstream():
+    events = []
+    graph = WorkflowGraph([
+        WorkflowNode("static", recorder(events, "static")),
+        WorkflowNode("dynamic", recorder(events, "dynamic", error=RuntimeError("沙箱不可用")), optional=True),
+        WorkflowNode("slow_optional", recorder(events, "slow_optional", delay=1), optional=True, timeout=0.05),
+        WorkflowNode("fix", recorder(events, "fix"), deps=["static", "dynamic", "slow_optional"]),
+    ])
+    context = WorkflowContext("wf_optional")
+    results = run(graph.run(context))
+
+    assert results["fix"] == "fix"
+    assert results["dynamic"] is None and results["slow_optional"] is None
+    assert context.node_status["dynamic"] == "failed"
+    assert context.errors["dynamic"] == "沙箱不可用"
+    assert "超时" in context.errors["slow_optional"]
+
+
+def test_required_node_failure_cancels_running_siblings():
+    events = []
+    graph = WorkflowGraph([
+        WorkflowNode("static", recorder(events, "static", delay=0.01, error=ValueError("检测失败"))),
+        WorkflowNode("dynamic", recorder(events, "dynamic", delay=5)),
+        WorkflowNode("fix", recorder(events, "fix"), deps=["static"]),
+    ])
+    context = WorkflowContext("wf_failure")
+
+    async def main():
+        start = asyncio.get_running_loop().time()
+        with pytest.raises(ValueError, match="检测失败"):
+            await graph.run(context)
+        return asyncio.get_running_loop().time() - start
+
+    elapsed = run(main())
+    assert elapsed < 1
+    assert context.node_status == {"static": "failed", "dynamic": "cancelled", "fix": "cancelled"}
+    assert "fix:start" not in events and "dynamic:end" not in events
+
+
+def test_external_cancel_stops_all_nodes():
+    events = []
+    graph = WorkflowGraph([
+        WorkflowNode("static", recorder(events, "static", delay=5)),
+        WorkflowNode("fix", recorder(events, "fix"), deps=["static"]),
+    ])
+
+    async def cancel_via_context():
+        context = WorkflowContext("wf_cancel")
+        runner = asyncio.create_task(graph.run(context))
+        await asyncio.sleep(0.02)
+        context.cancel()
+        with pytest.raises(WorkflowCancelled):
+            await runner
+        return context
+
+    context = run(cancel_via_context())
+    assert context.node_status == {"static": "cancelled", "fix": "cancelled"}
+
+    async def cancel_task():
+        context = WorkflowContext("wf_cancel_task")
+        runner = asyncio.create_task(graph.run(context))
+        await asyncio.sleep(0.02)
+        runner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await runner
+        # 所有节点的数据流都已关闭，等待中的消费者不会挂起
+        assert all(context.stream(name).closed for name in ("static", "fix"))
+        return context
+
+    context = run(cancel_task())
+    assert context.cancelled
+    assert context.node_status == {"static": "cancelled", "fix": "cancelled"}
+
+
+def test_fix_waits_for_every_reader_of_the_target():
+    coordinator = Coordinator({})
+    graph = coordinator._build_workflow_graph({"id": "wf", "tenant_id": "default"}, "app.py", None)
+    fix = graph.nodes["fix"]
+    assert set(fix.deps) == {"static_detection", "dynamic_detection", "test_generation"}
+    assert fix.streams == ["decision"]
+
+    project_graph = coordinator._build_workflow_graph({"id": "wf", "tenant_id": "default"}, None, "/tmp/project")
+    assert set(project_graph.nodes["fix"].deps) == {"static_detection", "test_generation"}
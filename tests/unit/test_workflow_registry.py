@@ -0,0 +1,154 @@
+"""
+工作流注册表测试（重复ID、租户配额与排队、全局槽位公平分配、取消排队）
+"""
+
+import asyncio
+
+import pytest
+
+from coordinator.workflow_graph import WorkflowCancelled
+from coordinator.workflow_registry import WorkflowQuotaExceeded, WorkflowRegistry
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def start(registry, workflow_id, tenant_id):
+    """登记并开始等待槽位，返回 acquire 任务（让出一次事件循环使其进入队列）"""
+    registry.register(workflow_id, tenant_id)
+    task = asyncio.create_task(registry.acquire(workflow_id))
+    await asyncio.sleep(0)
+    return task
+
+
+def running(registry):
+    return sorted(w['id'] for w in registry.workflows.values() if w['status'] == 'running')
+
+
+def test_duplicate_active_workflow_id_is_rejected():
+    registry = WorkflowRegistry({})
+    workflow, _ = registry.register("wf_1", "tenant_a")
+    with pytest.raises(ValueError, match="wf_1"):
+        registry.register("wf_1", "tenant_b")
+    assert registry.workflows["wf_1"] is workflow
+    assert registry.stats["workflows_registered"] == 1
+
+    # 结束后同一ID可以再次使用
+    registry.finish("wf_1")
+    registry.register("wf_1", "tenant_a")
+
+
+def test_tenant_quota_queues_and_rejects_when_queue_is_full():
+    async def main():
+        registry = WorkflowRegistry({"max_workflows_per_tenant": 1, "max_queued_workflows_per_tenant": 1,
+                                     "tenant_quotas": {"big": 2}})
+        first = await start(registry, "a1", "small")
+        second = await start(registry, "a2", "small")
+        assert first.done() and not second.done()
+        assert registry.stats["workflows_queued"] == 1
+
+        with pytest.raises(WorkflowQuotaExceeded):
+            registry.register("a3", "small")
+        assert registry.stats["workflows_rejected"] == 1
+
+        # 单独配置配额的租户可以同时运行两个
+        big = [await start(registry, f"b{i}", "big") for i in range(2)]
+        assert all(task.done() for task in big)
+        assert registry.get_stats()["tenants"]["small"] == {"running": 1, "queued": 1, "quota": 1}
+
+        registry.finish("a1")
+        await asyncio.wait_for(second, timeout=1)
+        assert running(registry) == ["a2", "b0", "b1"]
+        assert registry.get("a1") == registry.history[-1]
+
+    run(main())
+
+
+def test_queue_cap_applies_when_the_global_limit_blocks():
+    async def main():
+        registry = WorkflowRegistry({"max_active_workflows": 1, "max_workflows_per_tenant": 5,
+                                     "max_queued_workflows_per_tenant": 2})
+        await start(registry, "b1", "tenant_b")
+        # tenant_a 未达到自身配额，但全局槽位已满：排队数同样受上限约束
+        queued = [await start(registry, f"a{i}", "tenant_a") for i in range(2)]
+        assert not any(task.done() for task in queued)
+        with pytest.raises(WorkflowQuotaExceeded):
+            registry.register("a2", "tenant_a")
+        assert registry.stats["workflows_rejected"] == 1
+        for task in queued:
+            task.cancel()
+        await asyncio.gather(*queued, return_exceptions=True)
+
+    run(main())
+
+
+def test_global_slot_goes_to_tenant_with_fewest_running_workflows():
+    async def main():
+        registry = WorkflowRegistry({"max_active_workflows": 2, "max_workflows_per_tenant": 5})
+        await start(registry, "a1", "tenant_a")
+        await start(registry, "a2", "tenant_a")
+        waiting = {
+            "a3": await start(registry, "a3", "tenant_a"),
+            "b1": await start(registry, "b1", "tenant_b"),
+            "c1": await start(registry, "c1", "tenant_c"),
+        }
+        assert running(registry) == ["a1", "a2"]
+
+        # tenant_a 已有运行中的工作流；没有运行工作流的租户中先提交的 b1 优先
+        registry.finish("a1")
+        await asyncio.sleep(0)
+        assert running(registry) == ["a2", "b1"]
+
+        # 运行数相同的租户之间按提交顺序：a3 早于 c1
+        registry.finish("a2")
+        await asyncio.sleep(0)
+        assert running(registry) == ["a3", "b1"]
+
+        registry.finish("b1")
+        await asyncio.wait_for(waiting["c1"], timeout=1)
+        assert running(registry) == ["a3", "c1"]
+        assert all(task.done() for task in waiting.values())
+
+    run(main())
+
+
+def test_cancel_queued_workflow():
+    async def main():
+        registry = WorkflowRegistry({"max_workflows_per_tenant": 1})
+        first = await start(registry, "a1", "tenant_a")
+        queued = await start(registry, "a2", "tenant_a")
+        later = await start(registry, "a3", "tenant_a")
+
+        # 已在运行的工作流不能通过 cancel_queued 取消
+        assert registry.cancel_queued("a1") is False
+        assert registry.cancel_queued("a2") is True
+        with pytest.raises(WorkflowCancelled):
+            await queued
+        assert registry.cancel_queued("a2") is False
+        assert registry.cancel_queued("missing") is False
+        assert registry.get_stats()["queued_workflows"] == 1
+
+        # 被取消的工作流不占用槽位，结束 a1 后放行 a3
+        registry.finish("a2")
+        registry.finish("a1")
+        await asyncio.wait_for(later, timeout=1)
+        assert first.done() and running(registry) == ["a3"]
+
+    run(main())
+
+
+def test_cancelled_acquire_leaves_the_queue():
+    async def main():
+        registry = WorkflowRegistry({"max_workflows_per_tenant": 1})
+        await start(registry, "a1", "tenant_a")
+        waiter = await start(registry, "a2", "tenant_a")
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert registry.get_stats()["queued_workflows"] == 0
+
+        registry.finish("a1")
+        assert registry.get_stats()["running_workflows"] == 0
+
+    run(main())
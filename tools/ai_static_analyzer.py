@@ -11,6 +11,7 @@ from dataclasses import dataclass
 from enum import Enum
 import httpx
 from api.deepseek_config import deepseek_config
+from utils.metrics import observe_llm
 
 class LanguageType(Enum):
     """支持的语言类型"""
@@ -347,33 +348,36 @@ class AIMultiLanguageAnalyzer:
                 return {'issues': []}
             
             # 调用AI API
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.config.base_url}/chat/completions",
-                    headers=self.config.get_headers(),
-                    json={
-                        "model": self.config.model,
-                        "messages": [
-                            {"role": "user", "content": prompt}
-                        ],
-                        "max_tokens": 1000,
-                        "temperature": 0.2
-                    }
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    ai_content = result["choices"][0]["message"]["content"]
+            with observe_llm("ai_static_analyzer", self.config.model) as call:
+                async with httpx.AsyncClient(timeout=30.0) as client:
+                    response = await client.post(
+                        f"{self.config.base_url}/chat/completions",
+                        headers=self.config.get_headers(),
+                        json={
+                            "model": self.config.model,
+                            "messages": [
+                                {"role": "user", "content": prompt}
+                            ],
+                            "max_tokens": 1000,
+                            "temperature": 0.2
+                        }
+                    )
                     
-                    # 调试信息
-                    print(f"🤖 AI响应长度: {len(ai_content)} 字符")
-                    print(f"🤖 AI响应预览: {ai_content[:100]}...")
-                    
-                    # 解析AI响应
-                    return self._parse_ai_response(ai_content, file_path, language)
-                else:
-                    print(f"AI API调用失败: {response.status_code}")
-                    return {'issues': []}
+                    if response.status_code == 200:
+                        result = response.json()
+                        call.record_usage(result)
+                        ai_content = result["choices"][0]["message"]["content"]
+                        
+                        # 调试信息
+                        print(f"🤖 AI响应长度: {len(ai_content)} 字符")
+                        print(f"🤖 AI响应预览: {ai_content[:100]}...")
+                        
+                        # 解析AI响应
+                        return self._parse_ai_response(ai_content, file_path, language)
+                    else:
+                        call.fail()
+                        print(f"AI API调用失败: {response.status_code}")
+                        return {'issues': []}
                     
         except Exception as e:
             print(f"AI分析失败: {e}")
@@ -11,6 +11,7 @@ from typing import Dict, List, Any, Optional
 from pathlib import Path
 import httpx
 from api.deepseek_config import deepseek_config
+from utils.metrics import observe_llm, record_cache
 
 
 class FalsePositiveFilter:
@@ -193,24 +194,26 @@ class FalsePositiveFilter:
         messages.append({"role": "user", "content": prompt})
         
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    f"{self.config_obj.base_url}/chat/completions",
-                    headers=self.config_obj.get_headers(),
-                    json={
-                        "model": self.model,
-                        "messages": messages,
-                        "max_tokens": 2000,
-                        "temperature": 0.1,  # 降低随机性，提高一致性
-                    }
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    return result["choices"][0]["message"]["content"]
-                else:
-                    error_msg = f"LLM API调用失败: {response.status_code} - {response.text}"
-                    raise RuntimeError(error_msg)
+            with observe_llm("llm_filter", self.model) as call:
+                async with httpx.AsyncClient(timeout=60.0) as client:
+                    response = await client.post(
+                        f"{self.config_obj.base_url}/chat/completions",
+                        headers=self.config_obj.get_headers(),
+                        json={
+                            "model": self.model,
+                            "messages": messages,
+                            "max_tokens": 2000,
+                            "temperature": 0.1,  # 降低随机性，提高一致性
+                        }
+                    )
+                    
+                    if response.status_code == 200:
+                        result = response.json()
+                        call.record_usage(result)
+                        return result["choices"][0]["message"]["content"]
+                    else:
+                        error_msg = f"LLM API调用失败: {response.status_code} - {response.text}"
+                        raise RuntimeError(error_msg)
                     
         except Exception as e:
             raise RuntimeError(f"LLM API调用异常: {str(e)}")
@@ -304,6 +307,7 @@ class FalsePositiveFilter:
         # 检查缓存
         if self.cache is not None:
             cache_key = self._get_cache_key(issue, source_code)
+            record_cache("llm_filter", cache_key in self.cache)
             if cache_key in self.cache:
                 cached_result = self.cache[cache_key]
                 if cached_result["is_real_issue"] and cached_result["confidence"] >= self.confidence_threshold:
@@ -387,13 +391,15 @@ class FalsePositiveFilter:
         return filtered
     
     async def filter_issues_batch(self, static_results: List[Dict[str, Any]], 
-                                 source_code_provider: callable) -> List[Dict[str, Any]]:
+                                 source_code_provider: callable,
+                                 on_issue_kept: Optional[callable] = None) -> List[Dict[str, Any]]:
         """
         批量过滤问题列表（优化版本，减少API调用次数）
         
         Args:
             static_results: 静态工具输出的问题列表
             source_code_provider: 函数，接收file_path返回源码
+            on_issue_kept: 可选回调，每个问题被判定保留时立即调用（用于实时上报进度）
         
         Returns:
             过滤后的高置信度问题列表
@@ -403,6 +409,11 @@ class FalsePositiveFilter:
         
         filtered = []
         
+        def keep(issue: Dict[str, Any]):
+            filtered.append(issue)
+            if on_issue_kept is not None:
+                on_issue_kept(issue)
+        
         # 按文件分组
         issues_by_file = {}
         for issue in static_results:
@@ -429,6 +440,7 @@ class FalsePositiveFilter:
                 for issue in batch:
                     if self.cache is not None:
                         cache_key = self._get_cache_key(issue, source_code)
+                        record_cache("llm_filter", cache_key in self.cache)
                         if cache_key in self.cache:
                             cached_results.append((issue, self.cache[cache_key]))
                         else:
@@ -441,7 +453,7 @@ class FalsePositiveFilter:
                     if cached_judgment.get("is_real_issue") and cached_judgment.get("confidence", 0.0) >= self.confidence_threshold:
                         issue["llm_confidence"] = cached_judgment.get("confidence", 0.5)
                         issue["llm_reason"] = cached_judgment.get("reason", "")
-                        filtered.append(issue)
+                        keep(issue)
                 
                 # 批量处理未缓存的问题
                 if uncached_issues:
@@ -471,7 +483,7 @@ class FalsePositiveFilter:
                             if judgment.get("is_real_issue") and judgment.get("confidence", 0.0) >= self.confidence_threshold:
                                 issue["llm_confidence"] = judgment.get("confidence", 0.5)
                                 issue["llm_reason"] = judgment.get("reason", "")
-                                filtered.append(issue)
+                                keep(issue)
                     
                     except Exception as e:
                         # 批量处理失败，回退到单个处理或保留原问题
@@ -479,7 +491,7 @@ class FalsePositiveFilter:
                         for issue in uncached_issues:
                             issue["llm_filter_error"] = str(e)
                             issue["llm_confidence"] = 0.5
-                            filtered.append(issue)  # 失败时保留原问题
+                            keep(issue)  # 失败时保留原问题
         
         return filtered
 
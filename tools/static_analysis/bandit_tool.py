@@ -7,6 +7,8 @@ import subprocess
 import json
 import os
 
+from utils.metrics import run_tool
+
 
 class BanditTool:
     """Bandit安全分析工具"""
@@ -24,7 +26,8 @@ class BanditTool:
                 env['PYTHONUTF8'] = '1'
             
             # Bandit对于单个文件不使用-r参数，使用-f json直接指定文件
-            result = subprocess.run(
+            result = run_tool(
+                'bandit', 'file',
                 ['bandit', '-f', 'json', file_path],
                 capture_output=True,
                 text=True,
@@ -86,7 +89,8 @@ class BanditTool:
             if os.name == 'nt':
                 env['PYTHONUTF8'] = '1'
             
-            result = subprocess.run(
+            result = run_tool(
+                'bandit', 'directory',
                 ['bandit', '-r', directory_path, '-f', 'json'],
                 capture_output=True,
                 text=True,
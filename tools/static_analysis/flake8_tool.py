@@ -7,6 +7,8 @@ import os
 import sys
 from typing import Dict, List, Any, Optional
 
+from utils.metrics import run_tool
+
 
 class Flake8Tool:
     """Flake8代码风格检查工具"""
@@ -38,7 +40,8 @@ class Flake8Tool:
             
             print(f"执行Flake8命令: {' '.join(cmd)}")  # 调试信息
             
-            result = subprocess.run(
+            result = run_tool(
+                'flake8', 'file',
                 cmd,
                 capture_output=True,
                 text=True,
@@ -9,6 +9,8 @@ import json
 import os
 import re
 
+from utils.metrics import run_tool
+
 class MypyTool:
     """MyPy类型检查工具（增强严格模式）"""
     
@@ -67,7 +69,8 @@ class MypyTool:
             env = os.environ.copy()
             env['MYPY_FORCE_COLOR'] = '0'  # 禁用颜色输出
             
-            result = subprocess.run(
+            result = run_tool(
+                'mypy', 'file',
                 cmd,
                 capture_output=True,
                 text=True,
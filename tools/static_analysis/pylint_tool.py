@@ -9,6 +9,8 @@ import os
 import sys
 from typing import Dict, List, Any, Optional
 
+from utils.metrics import run_tool
+
 
 class PylintTool:
     """Pylint静态分析工具"""
@@ -42,7 +44,8 @@ class PylintTool:
             if os.name == 'nt' and '--disable=C0114' not in cmd:
                 cmd.extend(['--disable=C0114'])  # 只禁用missing-module-docstring
             
-            result = subprocess.run(
+            result = run_tool(
+                'pylint', 'file',
                 cmd,
                 capture_output=True,
                 text=True,
@@ -161,7 +164,8 @@ class PylintTool:
                 # 直接分析目录（Pylint支持）
                 cmd.append(directory_path)
             
-            result = subprocess.run(
+            result = run_tool(
+                'pylint', 'directory',
                 cmd,
                 capture_output=True,
                 text=True,
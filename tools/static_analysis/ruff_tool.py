@@ -8,6 +8,8 @@ import json
 import os
 from typing import Dict, List, Any, Optional
 
+from utils.metrics import run_tool
+
 
 class RuffTool:
     """Ruff静态分析工具"""
@@ -61,7 +63,8 @@ class RuffTool:
             if os.name == 'nt':
                 env['PYTHONUTF8'] = '1'
             
-            result = subprocess.run(
+            result = run_tool(
+                'ruff', 'file',
                 cmd,
                 capture_output=True,
                 text=True,
@@ -188,7 +191,8 @@ class RuffTool:
             # 尝试使用环境变量设置JSON输出格式（某些Ruff版本可能需要）
             env['RUFF_OUTPUT_FORMAT'] = 'json'
             
-            result = subprocess.run(
+            result = run_tool(
+                'ruff', 'directory',
                 cmd,
                 capture_output=True,
                 text=True,
@@ -9,6 +9,8 @@ import os
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 
+from utils.metrics import run_tool
+
 
 class SemgrepTool:
     """Semgrep静态分析工具"""
@@ -71,7 +73,8 @@ class SemgrepTool:
                 env['PYTHONIOENCODING'] = 'utf-8'
                 env['PYTHONUTF8'] = '1'
             
-            result = subprocess.run(
+            result = run_tool(
+                'semgrep', 'file',
                 cmd,
                 capture_output=True,
                 text=True,
@@ -194,7 +197,8 @@ class SemgrepTool:
                 env['PYTHONIOENCODING'] = 'utf-8'
                 env['PYTHONUTF8'] = '1'
             
-            result = subprocess.run(
+            result = run_tool(
+                'semgrep', 'directory',
                 cmd,
                 capture_output=True,
                 text=True,
@@ -0,0 +1,289 @@
+"""
+异步报告产物存储
+AI报告、结构化数据和可下载报告都是磁盘上的文件，API处理函数通过本模块读取和生成，不在事件循环中做同步I/O。
+
+- 读写文件在线程中执行（asyncio.to_thread），写入先写临时文件再原子替换
+- 读取时计算一次内容哈希作为 ETag，按 (路径, mtime, 大小) 缓存，文件被替换或删除后自动失效
+- if_none_match_matches 用于处理 If-None-Match 条件请求（命中时返回 304）
+- get_or_generate 对同一路径的并发生成做合并（single-flight）：同时请求同一个缺失报告只执行一次生成，
+  生成在独立任务中执行，不随某个请求的取消而中断
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from utils.metrics import record_cache
+from utils.storage_manager import get_storage_manager
+
+logger = logging.getLogger(__name__)
+
+PathLike = Union[str, Path]
+
+# 生成函数返回文件内容（str/bytes），或返回已写好的文件路径（移动到目标位置）；返回 None 表示无法生成
+Generator = Callable[[], Awaitable[Optional[Union[str, bytes, Path]]]]
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """已加载的产物：内容及其 ETag"""
+    path: Path
+    content: bytes
+    etag: str
+    mtime_ns: int
+    size: int
+
+    def text(self, encoding: str = "utf-8") -> str:
+        return self.content.decode(encoding)
+
+
+def compute_etag(content: bytes) -> str:
+    """内容哈希形式的强 ETag（带引号）"""
+    return '"' + hashlib.sha256(content).hexdigest()[:32] + '"'
+
+
+def if_none_match_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """判断 If-None-Match 请求头是否命中当前 ETag（弱比较，支持列表和 *）"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _stat(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _read_file(path: Path) -> Optional[Tuple[bytes, int, int]]:
+    try:
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            content = f.read()
+    except OSError:
+        return None
+    return content, st.st_mtime_ns, st.st_size
+
+
+def _write_file(path: Path, content: bytes) -> Tuple[int, int]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _move_file(source: Path, path: Path) -> Tuple[bytes, int, int]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(source, path)
+    loaded = _read_file(path)
+    if loaded is None:
+        raise OSError(f"无法读取生成的文件: {path}")
+    return loaded
+
+
+class ArtifactStore:
+    """
+    报告产物的异步读取、生成与 ETag 缓存
+
+    内存中只缓存最近读取的小文件内容（按总字节数LRU淘汰）；
+    缓存条目以 (mtime_ns, size) 校验，每次读取只需在线程中做一次 stat。
+    """
+
+    def __init__(self, max_cached_bytes: int = 32 * 1024 * 1024, max_cached_file_bytes: int = 4 * 1024 * 1024):
+        self.max_cached_bytes = max_cached_bytes
+        self.max_cached_file_bytes = max_cached_file_bytes
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Artifact]" = OrderedDict()
+        self._cached_bytes = 0
+        # 路径 -> 正在进行的生成任务
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._stats = {
+            "memory_hits": 0,
+            "disk_reads": 0,
+            "misses": 0,
+            "writes": 0,
+            "generations": 0,
+            "coalesced_generations": 0,
+            "failed_generations": 0,
+        }
+
+    async def read(self, path: PathLike) -> Optional[Artifact]:
+        """读取产物；文件不存在时返回 None"""
+        path = Path(path)
+        key = str(path.resolve())
+        stat = await asyncio.to_thread(_stat, path)
+        if stat is None:
+            self._forget(key)
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and (cached.mtime_ns, cached.size) == stat:
+                self._cache.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                record_cache("artifact", True)
+                return cached
+
+        loaded = await asyncio.to_thread(_read_file, path)
+        if loaded is None:
+            self._forget(key)
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        content, mtime_ns, size = loaded
+        artifact = Artifact(path=path, content=content, etag=compute_etag(content), mtime_ns=mtime_ns, size=size)
+        self._remember(key, artifact)
+        with self._lock:
+            self._stats["disk_reads"] += 1
+        record_cache("artifact", False)
+        return artifact
+
+    async def write(self, path: PathLike, content: Union[str, bytes], kind: Optional[str] = "report") -> Artifact:
+        """原子写入产物并登记到存储配额管理器"""
+        path = Path(path)
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        mtime_ns, size = await asyncio.to_thread(_write_file, path, content)
+        artifact = Artifact(path=path, content=content, etag=compute_etag(content), mtime_ns=mtime_ns, size=size)
+        self._remember(str(path.resolve()), artifact)
+        with self._lock:
+            self._stats["writes"] += 1
+        if kind:
+            await asyncio.to_thread(get_storage_manager().register, path, kind)
+        return artifact
+
+    async def get_or_generate(
+        self,
+        path: PathLike,
+        generate: Generator,
+        kind: Optional[str] = "report"
+    ) -> Optional[Artifact]:
+        """
+        读取产物，不存在时调用 generate 生成并保存
+
+        同一路径的并发调用共享同一次生成；生成失败时所有等待者收到同一个异常，
+        下一次请求会重新尝试生成。
+        """
+        artifact = await self.read(path)
+        if artifact is not None:
+            return artifact
+
+        key = str(Path(path).resolve())
+        task = self._inflight.get(key)
+        if task is not None:
+            with self._lock:
+                self._stats["coalesced_generations"] += 1
+        else:
+            task = asyncio.create_task(self._generate_once(key, Path(path), generate, kind))
+            # 所有调用方都已取消时仍取走异常，避免 "exception was never retrieved" 警告
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        # 生成在独立任务中执行，每个调用方（包括发起生成的调用方）都通过 shield 等待：
+        # 任何一个调用方被取消都不会取消生成本身，其他调用方照常拿到结果
+        return await asyncio.shield(task)
+
+    async def _generate_once(self, key: str, path: Path, generate: Generator, kind: Optional[str]) -> Optional[Artifact]:
+        try:
+            return await self._generate(path, generate, kind)
+        except Exception:
+            with self._lock:
+                self._stats["failed_generations"] += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _generate(self, path: Path, generate: Generator, kind: Optional[str]) -> Optional[Artifact]:
+        # 等待期间其他进程可能已经生成了文件
+        artifact = await self.read(path)
+        if artifact is not None:
+            return artifact
+
+        with self._lock:
+            self._stats["generations"] += 1
+        result = await generate()
+        if result is None:
+            return None
+        if isinstance(result, (str, bytes)):
+            return await self.write(path, result, kind=kind)
+
+        source = Path(result)
+        content, mtime_ns, size = await asyncio.to_thread(_move_file, source, path)
+        artifact = Artifact(path=path, content=content, etag=compute_etag(content), mtime_ns=mtime_ns, size=size)
+        self._remember(str(path.resolve()), artifact)
+        storage_manager = get_storage_manager()
+        # 原路径已不存在，reclaim 只会移除它的登记
+        await asyncio.to_thread(storage_manager.reclaim, source)
+        if kind:
+            await asyncio.to_thread(storage_manager.register, path, kind)
+        return artifact
+
+    def invalidate(self, path: PathLike) -> None:
+        """丢弃内存中的缓存条目（文件本身不删除）"""
+        self._forget(str(Path(path).resolve()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "cached_entries": len(self._cache),
+                "cached_bytes": self._cached_bytes,
+                "max_cached_bytes": self.max_cached_bytes,
+                "inflight_generations": len(self._inflight),
+            }
+
+    def _remember(self, key: str, artifact: Artifact) -> None:
+        with self._lock:
+            previous = self._cache.pop(key, None)
+            if previous is not None:
+                self._cached_bytes -= previous.size
+            if artifact.size > self.max_cached_file_bytes:
+                return
+            self._cache[key] = artifact
+            self._cached_bytes += artifact.size
+            while self._cached_bytes > self.max_cached_bytes and self._cache:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= evicted.size
+
+    def _forget(self, key: str) -> None:
+        with self._lock:
+            previous = self._cache.pop(key, None)
+            if previous is not None:
+                self._cached_bytes -= previous.size
+
+
+# 全局产物存储实例
+_artifact_store: Optional[ArtifactStore] = None
+
+
+def get_artifact_store() -> ArtifactStore:
+    """获取全局产物存储实例"""
+    global _artifact_store
+    if _artifact_store is None:
+        _artifact_store = ArtifactStore()
+    return _artifact_store
@@ -11,6 +11,7 @@ import json
 import asyncio
 import logging
 import sys
+import uuid
 from pathlib import Path
 from typing import Dict, Any, Optional, List
 from datetime import datetime
@@ -249,8 +250,8 @@ class DockerRunner:
                     "returncode": -1
                 }
             
-            # 生成唯一的容器名
-            container_name = f"{self.container_prefix}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+            # 生成唯一的容器名（同一秒内可能并发启动多个容器，追加随机后缀）
+            container_name = f"{self.container_prefix}-{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
             
             # 准备环境变量
             env_vars = []
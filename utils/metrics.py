@@ -0,0 +1,442 @@
+"""
+进程内指标
+计数器（Counter）、仪表（Gauge）和直方图（Histogram），通过 /metrics 以 Prometheus 文本格式导出。
+
+- 指标按名称注册在全局注册表中，重复注册返回同一个对象；标签值以关键字参数传入
+- 队列深度等状态类仪表可以登记取值函数，导出时才读取，热路径上无需更新；多个实例登记的结果按标签求和
+- 每次更新只是一次加锁的字典操作；CODEAGENT_INSTRUMENTATION=0 时（或 set_instrumentation_enabled(False)）
+  指标和追踪都不再记录，用于衡量埋点本身的开销
+
+本模块不依赖 prometheus_client，导出格式与其文本格式（0.0.4）兼容。
+"""
+
+import asyncio
+import inspect
+import logging
+import math
+import subprocess
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from . import tracing
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 覆盖毫秒级事件处理到数分钟的项目级工具运行
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_enabled = tracing.tracing_enabled()
+
+LabelValues = Tuple[str, ...]
+
+
+def metrics_enabled() -> bool:
+    return _enabled
+
+
+def set_instrumentation_enabled(enabled: bool) -> None:
+    """同时打开或关闭指标记录和调用链追踪"""
+    global _enabled
+    _enabled = enabled
+    tracing.set_tracing_enabled(enabled)
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """指标基类：按标签值保存数据"""
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}，收到 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {_escape_help(self.documentation)}",
+            f"# TYPE {self.name} {self.type_name}"
+        ]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Counter(_Metric):
+    """只增不减的计数器（名称以 _total 结尾）"""
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        if not _enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    """可增可减的仪表；登记取值函数后导出时读取当前值"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._functions: List[Callable[[], Optional[Callable[[], Any]]]] = []
+
+    def set(self, value: float, **labels: Any):
+        if not _enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        if not _enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Optional[Callable[[], Any]]):
+        """
+        绑定唯一的取值函数（替换之前登记的所有函数），传入 None 时解除绑定
+
+        无标签的仪表返回数值；有标签的仪表返回 {标签值（单个标签时可以是字符串）: 数值}
+        """
+        with self._lock:
+            self._functions = [] if function is None else [lambda: function]
+
+    def add_function(self, function: Callable[[], Any]):
+        """
+        登记一个取值函数，导出时对所有已登记函数的结果按标签求和
+
+        用于同一进程内多个实例（如多个任务管理器）共同提供一个指标。绑定方法只保存弱引用，
+        所属对象被回收后自动移除；实例停止时应调用 remove_function。
+        """
+        ref = weakref.WeakMethod(function) if inspect.ismethod(function) else (lambda: function)
+        with self._lock:
+            self._functions.append(ref)
+
+    def remove_function(self, function: Callable[[], Any]):
+        """移除已登记的取值函数（未登记时忽略）"""
+        with self._lock:
+            self._functions = [ref for ref in self._functions if ref() not in (None, function)]
+
+    def value(self, **labels: Any) -> float:
+        return dict(self._collect()).get(self._key(labels), 0.0)
+
+    def _collect(self) -> List[Tuple[LabelValues, float]]:
+        with self._lock:
+            functions = [function for function in (ref() for ref in self._functions) if function is not None]
+            if len(functions) != len(self._functions):
+                self._functions = [ref for ref in self._functions if ref() is not None]
+            if not functions:
+                return list(self._values.items())
+        totals: Dict[LabelValues, float] = {}
+        for function in functions:
+            try:
+                value = function()
+            except Exception as e:
+                logger.debug(f"读取指标 {self.name} 失败: {e}")
+                continue
+            if not self.labelnames:
+                totals[()] = totals.get((), 0.0) + float(value)
+                continue
+            for key, item in (value or {}).items():
+                key = key if isinstance(key, tuple) else (key,)
+                totals[key] = totals.get(key, 0.0) + float(item)
+        return list(totals.items())
+
+    def _render_samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, tuple(str(v) for v in key))} {_format_value(value)}"
+            for key, value in self._collect()
+        ]
+
+
+class Histogram(_Metric):
+    """直方图：按桶累计观测值的分布，以及总和与次数"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets: Tuple[float, ...] = tuple(sorted(float(b) for b in buckets))
+
+    def observe(self, value: float, **labels: Any):
+        if not _enabled:
+            return
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [各桶（不累计）的计数..., +Inf 桶计数, 总和]
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """记录 with 块的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: Any) -> int:
+        state = self._values.get(self._key(labels))
+        return sum(state[:-1]) if state else 0
+
+    def sum(self, **labels: Any) -> float:
+        state = self._values.get(self._key(labels))
+        return state[-1] if state else 0.0
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), state[:-1]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", "+Inf" if math.isinf(bound) else repr(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"指标 {name} 已注册为不同的类型或标签")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """导出全部指标（Prometheus 文本格式）"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """清空所有指标的数据（保留注册和绑定的取值函数，用于测试）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    return REGISTRY
+
+
+# ===== 任务与事件总线 =====
+TASKS_TOTAL = REGISTRY.counter(
+    "codeagent_tasks_total", "结束的任务数（按任务类型和结果）", ("type", "status"))
+TASK_DURATION = REGISTRY.histogram(
+    "codeagent_task_duration_seconds", "任务从派发到结束的耗时", ("type",))
+TASK_QUEUE_DELAY = REGISTRY.histogram(
+    "codeagent_task_queue_delay_seconds", "任务从分配到派发的排队时间", ("type",))
+TASK_QUEUE_DEPTH = REGISTRY.gauge(
+    "codeagent_task_queue_depth", "等待派发的任务数（按Agent）", ("agent",))
+AGENT_RUNNING_TASKS = REGISTRY.gauge(
+    "codeagent_agent_running_tasks", "Agent正在执行的任务数", ("agent",))
+AGENT_TASK_DURATION = REGISTRY.histogram(
+    "codeagent_agent_task_duration_seconds", "Agent内部处理单个任务的耗时", ("agent", "status"))
+EVENT_BUS_QUEUE_DEPTH = REGISTRY.gauge(
+    "codeagent_event_bus_queue_depth", "事件总线待处理的消息数")
+EVENTS_PUBLISHED = REGISTRY.counter(
+    "codeagent_events_published_total", "发布到事件总线的事件数", ("event_type",))
+EVENTS_DROPPED = REGISTRY.counter(
+    "codeagent_events_dropped_total", "事件总线队列已满而丢弃的事件数", ("event_type",))
+WORKFLOW_DURATION = REGISTRY.histogram(
+    "codeagent_workflow_duration_seconds", "工作流从提交到结束的耗时", ("status",))
+
+# ===== 外部工具 =====
+TOOL_DURATION = REGISTRY.histogram(
+    "codeagent_tool_duration_seconds", "外部工具子进程的耗时", ("tool", "mode"))
+TOOL_RUNS = REGISTRY.counter(
+    "codeagent_tool_runs_total", "外部工具子进程的运行次数（status 为 ok / timeout / error）",
+    ("tool", "mode", "status"))
+
+# ===== LLM =====
+LLM_DURATION = REGISTRY.histogram(
+    "codeagent_llm_request_duration_seconds", "LLM 请求耗时", ("component", "model"))
+LLM_REQUESTS = REGISTRY.counter(
+    "codeagent_llm_requests_total", "LLM 请求数", ("component", "model", "status"))
+LLM_TOKENS = REGISTRY.counter(
+    "codeagent_llm_tokens_total", "LLM 消耗的 token 数（kind 为 prompt / completion）",
+    ("component", "model", "kind"))
+
+# ===== 缓存 =====
+CACHE_REQUESTS = REGISTRY.counter(
+    "codeagent_cache_requests_total", "缓存查询次数（result 为 hit / miss）", ("cache", "result"))
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """记录一次缓存查询"""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_llm(component: str, model: Optional[str], duration: float, success: bool = True,
+               usage: Optional[Dict[str, Any]] = None) -> None:
+    """
+    记录一次 LLM 请求
+
+    Args:
+        usage: OpenAI 兼容接口响应中的 usage（prompt_tokens / completion_tokens）
+    """
+    if not _enabled:
+        return
+    model = model or "unknown"
+    LLM_DURATION.observe(duration, component=component, model=model)
+    LLM_REQUESTS.inc(component=component, model=model, status="ok" if success else "error")
+    for kind in ("prompt", "completion"):
+        tokens = (usage or {}).get(f"{kind}_tokens")
+        if tokens:
+            LLM_TOKENS.inc(float(tokens), component=component, model=model, kind=kind)
+
+
+class LLMCall:
+    """observe_llm 中的一次请求：收到响应后调用 record_usage，非异常的失败（如非 200 状态码）调用 fail"""
+
+    def __init__(self):
+        self.success = True
+        self.usage: Optional[Dict[str, Any]] = None
+
+    def record_usage(self, response: Any):
+        """从 OpenAI 兼容接口的响应 JSON 中读取 token 用量"""
+        if isinstance(response, dict) and isinstance(response.get("usage"), dict):
+            self.usage = response["usage"]
+
+    def fail(self):
+        self.success = False
+
+
+@contextmanager
+def observe_llm(component: str, model: Optional[str]) -> Iterator[LLMCall]:
+    """记录一次 LLM 请求的耗时、结果和 token 用量，并生成 span；with 块抛出异常时记为失败"""
+    call = LLMCall()
+    start = time.perf_counter()
+    with tracing.span(f"llm.{component}", model=model) as current:
+        try:
+            yield call
+        except BaseException:
+            call.success = False
+            raise
+        finally:
+            record_llm(component, model, time.perf_counter() - start, call.success, call.usage)
+            if call.usage:
+                current.set_attribute("total_tokens", call.usage.get("total_tokens"))
+
+
+@contextmanager
+def observe_tool(tool: str, mode: str) -> Iterator[Any]:
+    """记录一次外部工具运行的耗时和结果（超时异常记为 timeout，其余异常记为 error），并生成 span"""
+    start = time.perf_counter()
+    status = "ok"
+    with tracing.span(f"tool.{tool}", mode=mode) as current:
+        try:
+            yield current
+        except (subprocess.TimeoutExpired, asyncio.TimeoutError, TimeoutError):
+            status = "timeout"
+            raise
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            TOOL_DURATION.observe(time.perf_counter() - start, tool=tool, mode=mode)
+            TOOL_RUNS.inc(tool=tool, mode=mode, status=status)
+
+
+def run_tool(tool: str, mode: str, *popenargs: Any, **kwargs: Any) -> subprocess.CompletedProcess:
+    """
+    subprocess.run 的包装：记录工具子进程的耗时和结果
+
+    工具以非零退出码表示“发现问题”，因此退出码不影响 status，只记录在 span 的属性中
+    """
+    with observe_tool(tool, mode) as current:
+        result = subprocess.run(*popenargs, **kwargs)
+        current.set_attribute("returncode", result.returncode)
+        return result
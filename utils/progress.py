@@ -0,0 +1,66 @@
+"""
+任务进度上报
+Agent 在执行任务的过程中通过 report_progress 上报阶段切换、单个工具完成和通过过滤的缺陷，
+Coordinator 在把任务交给 Agent 时绑定上报函数，把进度作为事件发布到事件总线（带任务所属的工作流和租户）。
+
+上报函数保存在 contextvars 中：Agent 在 submit_task 里用 asyncio.create_task 启动的处理协程会复制当前上下文，
+因此无需修改 Agent 的接口即可把进度关联到正确的任务；没有绑定上报函数时（直接调用 Agent、单元测试）上报是空操作。
+"""
+
+import contextvars
+import logging
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 进度事件类型（与 coordinator.message_types.EventType 中的值一致）
+STAGE_CHANGED = "task_stage_changed"
+TOOL_COMPLETED = "tool_completed"
+ISSUE_FOUND = "issue_found"
+
+ProgressReporter = Callable[[str, Dict[str, Any]], None]
+
+_reporter: contextvars.ContextVar[Optional[ProgressReporter]] = contextvars.ContextVar(
+    "progress_reporter", default=None
+)
+
+
+def bind_progress_reporter(reporter: Optional[ProgressReporter]) -> contextvars.Token:
+    """在当前上下文中绑定上报函数，返回用于恢复的 token"""
+    return _reporter.set(reporter)
+
+
+def reset_progress_reporter(token: contextvars.Token) -> None:
+    """恢复绑定前的上报函数"""
+    _reporter.reset(token)
+
+
+def progress_enabled() -> bool:
+    """当前上下文是否绑定了上报函数（上报内容需要额外计算时先检查）"""
+    return _reporter.get() is not None
+
+
+def report_progress(event_type: str, data: Dict[str, Any]) -> None:
+    """上报一条进度；上报失败只记录日志，不影响任务本身"""
+    reporter = _reporter.get()
+    if reporter is None:
+        return
+    try:
+        reporter(event_type, data)
+    except Exception as e:
+        logger.debug(f"进度上报失败: {e}")
+
+
+def report_stage(stage: str, **data: Any) -> None:
+    """上报阶段切换"""
+    report_progress(STAGE_CHANGED, {"stage": stage, **data})
+
+
+def report_tool_completed(tool: str, issues: int, duration: float, **data: Any) -> None:
+    """上报单个工具执行完成"""
+    report_progress(TOOL_COMPLETED, {"tool": tool, "issues": issues, "duration": round(duration, 3), **data})
+
+
+def report_issue(issue: Dict[str, Any]) -> None:
+    """上报一个通过过滤的缺陷"""
+    report_progress(ISSUE_FOUND, {"issue": issue})
@@ -0,0 +1,4 @@
+"""
+由 ShardedPytestRunner 通过 -p 加载到被测项目 pytest 进程中的插件
+只有本目录会追加到被测进程的 PYTHONPATH，避免 utils 下的其他模块遮蔽被测项目的同名包
+"""
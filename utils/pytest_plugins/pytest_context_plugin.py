@@ -0,0 +1,24 @@
+"""
+pytest 覆盖率上下文插件（由 ShardedPytestRunner 在 coverage run 下通过 -p 加载）
+每个测试执行期间（含 setup/teardown）把 coverage.py 的动态上下文切换为测试ID，
+使覆盖率数据记录“每一行被哪些测试执行过”；测试之外（如收集阶段的导入）上下文为空。
+"""
+
+import pytest
+
+try:
+    import coverage
+except ImportError:  # 未在 coverage run 下运行时插件不生效
+    coverage = None
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    cov = coverage.Coverage.current() if coverage else None
+    if cov is not None:
+        cov.switch_context(item.nodeid)
+    try:
+        yield
+    finally:
+        if cov is not None:
+            cov.switch_context("")
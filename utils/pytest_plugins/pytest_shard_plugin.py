@@ -0,0 +1,29 @@
+"""
+pytest 分片插件（由 ShardedPytestRunner 通过 -p 加载到被测项目的 pytest 进程中）
+读取 --shard-plan 指定的分片计划，为每个测试添加 xdist_group 标记，
+配合 --dist loadgroup 使同一分片的测试在同一个 xdist 工作进程中执行。
+"""
+
+import json
+
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption("--shard-plan", default=None, help="分片计划文件（测试ID或文件 -> xdist 分组名）")
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_collection_modifyitems(config, items):
+    plan_path = config.getoption("shard_plan")
+    if not plan_path:
+        return
+    try:
+        with open(plan_path, "r", encoding="utf-8") as f:
+            plan = json.load(f)
+    except (OSError, ValueError):
+        return
+    for item in items:
+        group = plan.get(item.nodeid, plan.get(item.nodeid.split("::")[0]))
+        if group is not None:
+            item.add_marker(pytest.mark.xdist_group(group))
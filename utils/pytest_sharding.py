@@ -0,0 +1,429 @@
+"""
+分片并行 pytest 执行器
+先收集一次测试ID，按本地记录的历史耗时把测试分配到 N 个分片并行执行，
+再合并各分片的 JUnit XML 报告，得到逐个测试的结构化结果（不再从终端输出中解析通过/失败数）。
+
+执行方式：
+- xdist：安装了 pytest-xdist 时，在一个 pytest 进程中用 --dist loadgroup 执行，
+  由 pytest_plugins/pytest_shard_plugin 按分片计划为测试添加 xdist_group 标记
+- subprocess：未安装 xdist（或显式指定）时，每个分片启动一个 pytest 子进程
+- single：只有一个分片或收集失败时，整体运行一次
+
+需要逐测试覆盖率时，各分片在 coverage run 下运行，由 pytest_context_plugin 以测试ID作为动态上下文。
+"""
+
+import asyncio
+import hashlib
+import heapq
+import importlib.util
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from utils.sqlite_lru import DEFAULT_CACHE_ROOT
+
+logger = logging.getLogger(__name__)
+
+# 没有历史记录时的测试耗时估计（秒）
+DEFAULT_TEST_DURATION = 1.0
+# 测试ID总长度超过该值时按文件分片，避免超出命令行长度限制（Windows 约 32K 字符）
+MAX_COMMAND_CHARS = 24000
+# 由 -p 加载到被测进程的插件所在目录（只把该目录加入被测进程的 PYTHONPATH）
+PLUGIN_DIR = Path(__file__).resolve().parent / "pytest_plugins"
+# xdist 分组名前缀（JUnit 报告中的测试名会带上 @分组名 后缀）
+SHARD_GROUP_PREFIX = "codeagent_shard_"
+# 结果中失败详情的最大长度
+MAX_DETAILS_CHARS = 4000
+
+_OUTCOME_RANK = {"passed": 0, "skipped": 1, "failed": 2, "error": 3}
+_GROUP_SUFFIX = re.compile(rf"@{SHARD_GROUP_PREFIX}\d+$")
+
+
+def xdist_available() -> bool:
+    return importlib.util.find_spec("xdist") is not None
+
+
+def junit_address(nodeid: str) -> Tuple[str, str]:
+    """按 pytest junitxml 插件的规则把测试ID转换为 (classname, name)"""
+    path, bracket, params = nodeid.partition("[")
+    names = path.split("::")
+    names[0] = re.sub(r"\.py$", "", names[0].replace("/", "."))
+    names[-1] += bracket + params
+    return ".".join(names[:-1]), names[-1]
+
+
+def plan_shards(durations: Dict[str, float], shard_count: int) -> List[Tuple[List[str], float]]:
+    """
+    按耗时分片（最长处理时间优先的贪心分配）
+
+    Args:
+        durations: 分片单元（测试ID或文件）-> 预计耗时，按收集顺序排列
+        shard_count: 分片数
+
+    Returns:
+        [(分片内的单元（保持收集顺序）, 预计耗时)]，不含空分片
+    """
+    order = {unit: i for i, unit in enumerate(durations)}
+    shards: List[List[str]] = [[] for _ in range(max(1, shard_count))]
+    heap = [(0.0, i) for i in range(len(shards))]
+    for unit in sorted(durations, key=lambda u: (-durations[u], order[u])):
+        load, index = heapq.heappop(heap)
+        shards[index].append(unit)
+        heapq.heappush(heap, (load + durations[unit], index))
+    loads = {index: load for load, index in heap}
+    return [(sorted(units, key=order.get), loads[i]) for i, units in enumerate(shards) if units]
+
+
+def parse_junit_report(path: str, known_nodeids: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    """解析 JUnit XML 报告为逐个测试的结果；同一测试出现多次时（如 teardown 出错）保留最差的结果"""
+    addresses = {junit_address(nodeid): nodeid for nodeid in known_nodeids}
+    try:
+        root = ET.parse(path).getroot()
+    except (OSError, ET.ParseError):
+        return []
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for case in root.iter("testcase"):
+        classname = case.get("classname", "")
+        name = _GROUP_SUFFIX.sub("", case.get("name", ""))
+        nodeid = addresses.get((classname, name)) or (f"{classname}::{name}" if classname else name)
+
+        outcome, message, details = "passed", "", ""
+        for child in case:
+            tag = "failed" if child.tag == "failure" else child.tag
+            if tag in ("failed", "error", "skipped") and _OUTCOME_RANK[tag] >= _OUTCOME_RANK[outcome]:
+                outcome = tag
+                message = child.get("message", "") or ""
+                details = (child.text or "")[-MAX_DETAILS_CHARS:]
+
+        try:
+            duration = float(case.get("time") or 0.0)
+        except ValueError:
+            duration = 0.0
+        try:
+            line = int(case.get("line")) + 1 if case.get("line") is not None else None
+        except ValueError:
+            line = None
+        result = {
+            "nodeid": nodeid,
+            "outcome": outcome,
+            "duration": duration,
+            "file": case.get("file") or nodeid.split("::")[0],
+            "line": line,
+            "message": message,
+            "details": details,
+        }
+
+        previous = results.get(nodeid)
+        if previous is None:
+            results[nodeid] = result
+        else:
+            previous["duration"] += duration
+            if _OUTCOME_RANK[outcome] > _OUTCOME_RANK[previous["outcome"]]:
+                previous.update(outcome=outcome, message=message, details=details)
+    return list(results.values())
+
+
+def command_targets(targets: Sequence[str]) -> List[str]:
+    """
+    命令行中使用的 pytest 目标：总长度超过 MAX_COMMAND_CHARS 时退化为目标所在的文件，
+    仍然超长时返回空列表（收集并运行整个项目），避免超出命令行长度限制
+    """
+    if sum(len(target) + 1 for target in targets) <= MAX_COMMAND_CHARS:
+        return list(targets)
+    files = list(dict.fromkeys(target.split("::")[0] for target in targets))
+    if sum(len(path) + 1 for path in files) <= MAX_COMMAND_CHARS:
+        return files
+    return []
+
+
+def _plugin_env() -> Dict[str, str]:
+    """加载插件所需的环境：插件目录追加到 PYTHONPATH 末尾，不遮蔽被测项目自己的模块"""
+    pythonpath = os.pathsep.join(p for p in [os.environ.get("PYTHONPATH", ""), str(PLUGIN_DIR)] if p)
+    return {**os.environ, "PYTHONPATH": pythonpath}
+
+
+def combine_coverage(coverage_file: str) -> Optional[str]:
+    """合并各分片以 --parallel-mode 写出的覆盖率数据；没有数据或未安装 coverage 时返回 None"""
+    try:
+        from coverage import Coverage
+    except ImportError:
+        return None
+    try:
+        cov = Coverage(data_file=coverage_file, config_file=False)
+        cov.combine(keep=False)
+        cov.save()
+    except Exception as e:
+        logger.warning(f"合并覆盖率数据失败: {e}")
+        return None
+    return coverage_file if os.path.exists(coverage_file) else None
+
+
+def _write_json(path: str, data: Any):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+class DurationHistory:
+    """按项目在本地缓存目录中记录每个测试的历史耗时（指数滑动平均）"""
+
+    def __init__(self, project_path: str, cache_dir: Optional[str] = None, smoothing: float = 0.5):
+        cache_dir = Path(cache_dir or os.getenv("TEST_DURATION_CACHE_DIR") or DEFAULT_CACHE_ROOT / "test_durations")
+        key = hashlib.sha1(str(Path(project_path).resolve()).encode("utf-8")).hexdigest()[:16]
+        self.path = cache_dir / f"{key}.json"
+        self.smoothing = smoothing
+        self.durations: Dict[str, float] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.durations = {k: float(v) for k, v in json.load(f).get("durations", {}).items()}
+        except (OSError, ValueError, AttributeError):
+            self.durations = {}
+
+    def estimate(self, nodeids: Sequence[str]) -> Dict[str, float]:
+        """预计耗时；没有记录的测试使用已记录测试的平均耗时"""
+        known = [self.durations[n] for n in nodeids if n in self.durations]
+        default = sum(known) / len(known) if known else DEFAULT_TEST_DURATION
+        return {nodeid: self.durations.get(nodeid, default) for nodeid in nodeids}
+
+    def record(self, tests: Sequence[Dict[str, Any]]):
+        for test in tests:
+            if test["outcome"] == "skipped":
+                continue
+            previous = self.durations.get(test["nodeid"])
+            duration = test["duration"]
+            self.durations[test["nodeid"]] = (
+                duration if previous is None else previous + self.smoothing * (duration - previous)
+            )
+
+    def save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"durations": self.durations}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"保存测试耗时记录失败: {e}")
+
+
+class ShardedPytestRunner:
+    """
+    分片并行 pytest 执行器
+
+    配置项：
+        test_workers: 分片数（默认 CPU 核数，最多 8）
+        test_backend: auto（有 xdist 时使用 xdist）/ xdist / subprocess
+        test_timeout: 每次 pytest 运行的超时时间（秒）
+        test_duration_cache_dir: 历史耗时记录目录
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.workers = max(1, int(config.get("test_workers") or min(os.cpu_count() or 1, 8)))
+        self.backend = config.get("test_backend", "auto")
+        self.timeout = config.get("test_timeout", 600)
+        self.duration_cache_dir = config.get("test_duration_cache_dir")
+        self.python = config.get("test_python") or sys.executable
+
+    async def collect(self, project_path: str, targets: Sequence[str] = ()) -> Tuple[List[str], str]:
+        """收集测试ID（只收集一次，各分片直接使用收集结果）；目标超长时按 command_targets 的规则放宽"""
+        run = await self._run_pytest(project_path, ["--collect-only", *command_targets(targets)])
+        nodeids = [
+            line.strip() for line in run["stdout"].splitlines()
+            if "::" in line and not line.startswith((" ", "\t")) and not line.startswith(("ERROR", "FAILED"))
+        ]
+        return nodeids, run["stdout"] + run["stderr"]
+
+    async def run(
+        self,
+        project_path: str,
+        targets: Optional[Sequence[str]] = None,
+        coverage_file: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        运行测试
+
+        Args:
+            project_path: 项目路径
+            targets: pytest 目标（文件或测试ID），为空时运行整个项目
+            coverage_file: 指定时在 coverage run 下运行，并以测试ID作为动态上下文记录逐测试的行覆盖，
+                各分片的数据合并到该文件（需要被测环境安装 coverage；此时不使用 xdist）
+
+        Returns:
+            passed/returncode/stdout/stderr（与直接运行 pytest 的结果兼容），以及
+            summary（各结果计数）、tests（逐个测试的结果）、shards（分片计划与耗时）、backend
+        """
+        start = time.monotonic()
+        # 目标超长时按文件（或整个项目）收集和运行，与 _plan 按文件分片的处理一致
+        targets = command_targets(targets or [])
+        nodeids, collect_output = await self.collect(project_path, targets)
+        history = await asyncio.to_thread(DurationHistory, project_path, self.duration_cache_dir)
+
+        with tempfile.TemporaryDirectory(prefix="pytest_shards_") as report_dir:
+            plan = self._plan(nodeids, history)
+            backend = self._choose_backend(len(plan), allow_xdist=coverage_file is None)
+            if backend == "xdist":
+                runs = [await self._run_xdist(project_path, targets, plan, report_dir)]
+            elif backend == "subprocess":
+                runs = await asyncio.gather(*(
+                    self._run_pytest(
+                        project_path, units, os.path.join(report_dir, f"shard_{i}.xml"), coverage_file=coverage_file
+                    )
+                    for i, (units, _) in enumerate(plan)
+                ))
+            else:
+                # 单分片或收集失败：整体运行一次，收集错误由 pytest 自己报告
+                runs = [await self._run_pytest(
+                    project_path, targets, os.path.join(report_dir, "shard_0.xml"), coverage_file=coverage_file
+                )]
+
+            tests: List[Dict[str, Any]] = []
+            for run in runs:
+                tests.extend(parse_junit_report(run["report"], nodeids))
+
+        tests.extend(self._missing_results(plan, runs, tests, backend))
+        if coverage_file:
+            coverage_file = await asyncio.to_thread(combine_coverage, coverage_file)
+        history.record(tests)
+        await asyncio.to_thread(history.save)
+
+        summary = {outcome: 0 for outcome in _OUTCOME_RANK}
+        for test in tests:
+            summary[test["outcome"]] += 1
+        summary["total"] = len(tests)
+        returncode = next((run["returncode"] for run in runs if run["returncode"] != 0), 0)
+        if not tests and not nodeids and returncode == 0:
+            returncode = 5
+        shards = [{"units": len(units), "expected_duration": round(expected, 3)} for units, expected in plan]
+        if backend == "subprocess":
+            for shard, run in zip(shards, runs):
+                shard["duration"] = round(run["duration"], 3)
+
+        return {
+            "passed": returncode == 0 and summary["failed"] == 0 and summary["error"] == 0,
+            "returncode": returncode,
+            "stdout": "\n".join(run["stdout"] for run in runs).strip(),
+            "stderr": "\n".join(run["stderr"] for run in runs if run["stderr"]).strip() or (
+                collect_output.strip() if not nodeids else ""
+            ),
+            "summary": summary,
+            "tests": tests,
+            "failures": [test for test in tests if test["outcome"] in ("failed", "error")],
+            "backend": backend,
+            "shards": shards,
+            "coverage_file": coverage_file,
+            "duration": time.monotonic() - start,
+        }
+
+    def _plan(self, nodeids: List[str], history: DurationHistory) -> List[Tuple[List[str], float]]:
+        if not nodeids:
+            return []
+        durations = history.estimate(nodeids)
+        if sum(len(nodeid) + 1 for nodeid in nodeids) > MAX_COMMAND_CHARS:
+            by_file: Dict[str, float] = {}
+            for nodeid in nodeids:
+                file_path = nodeid.split("::")[0]
+                by_file[file_path] = by_file.get(file_path, 0.0) + durations[nodeid]
+            durations = by_file
+        return plan_shards(durations, min(self.workers, len(durations)))
+
+    def _choose_backend(self, shard_count: int, allow_xdist: bool = True) -> str:
+        if shard_count <= 1:
+            return "single"
+        if self.backend in ("auto", "xdist") and allow_xdist:
+            if xdist_available():
+                return "xdist"
+            if self.backend == "xdist":
+                logger.info("未安装 pytest-xdist，改为每个分片启动一个 pytest 子进程")
+        return "subprocess"
+
+    async def _run_xdist(
+        self,
+        project_path: str,
+        targets: List[str],
+        plan: List[Tuple[List[str], float]],
+        report_dir: str
+    ) -> Dict[str, Any]:
+        plan_path = os.path.join(report_dir, "shard_plan.json")
+        groups = {unit: f"{SHARD_GROUP_PREFIX}{index}" for index, (units, _) in enumerate(plan) for unit in units}
+        await asyncio.to_thread(_write_json, plan_path, groups)
+        args = [
+            "-p", "pytest_shard_plugin", f"--shard-plan={plan_path}",
+            "-n", str(len(plan)), "--dist", "loadgroup", *targets,
+        ]
+        return await self._run_pytest(project_path, args, os.path.join(report_dir, "xdist.xml"), env=_plugin_env())
+
+    async def _run_pytest(
+        self,
+        project_path: str,
+        args: Sequence[str],
+        report: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        coverage_file: Optional[str] = None
+    ) -> Dict[str, Any]:
+        cmd = [self.python, "-m", "pytest", "-q", "-p", "no:cacheprovider"]
+        if coverage_file:
+            cmd[1:3] = ["-m", "coverage", "run", "--parallel-mode", f"--data-file={coverage_file}", "-m", "pytest"]
+            cmd += ["-p", "pytest_context_plugin"]
+            env = env or _plugin_env()
+        if report:
+            cmd += [f"--junitxml={report}", "-o", "junit_family=xunit1"]
+        cmd += list(args)
+        start = time.monotonic()
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, cwd=project_path, env=env,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=self.timeout)
+            returncode = proc.returncode
+        except asyncio.TimeoutError:
+            proc.kill()
+            stdout, stderr = await proc.communicate()
+            stderr += f"\npytest 运行超时（{self.timeout}秒）".encode("utf-8")
+            returncode = -1
+        return {
+            "returncode": returncode,
+            "stdout": stdout.decode("utf-8", errors="ignore"),
+            "stderr": stderr.decode("utf-8", errors="ignore"),
+            "report": report,
+            "duration": time.monotonic() - start,
+        }
+
+    @staticmethod
+    def _missing_results(
+        plan: List[Tuple[List[str], float]],
+        runs: List[Dict[str, Any]],
+        tests: List[Dict[str, Any]],
+        backend: str
+    ) -> List[Dict[str, Any]]:
+        """分片超时或崩溃时没有写出报告的测试记为 error，避免被当作通过"""
+        if backend != "subprocess":
+            return []
+        reported = {test["nodeid"] for test in tests}
+        reported_files = {test["nodeid"].split("::")[0] for test in tests}
+        missing = []
+        for (units, _), run in zip(plan, runs):
+            if run["returncode"] in (0, 1):
+                continue
+            for unit in units:
+                if unit in reported or ("::" not in unit and unit in reported_files):
+                    continue
+                missing.append({
+                    "nodeid": unit,
+                    "outcome": "error",
+                    "duration": 0.0,
+                    "file": unit.split("::")[0],
+                    "line": None,
+                    "message": f"分片执行异常退出（返回码 {run['returncode']}）",
+                    "details": run["stderr"][-MAX_DETAILS_CHARS:],
+                })
+        return missing
@@ -0,0 +1,130 @@
+"""
+按大小做LRU淘汰的 SQLite 键值存储（各类持久化结果缓存共用）
+
+每个条目保存序列化后的值、大小、创建时间和最近访问时间，以及调用方定义的附加列。
+总大小在进程内累计维护，写入时不再扫描整表；只有超出上限时才用 SUM(size) 校准
+（其他进程可能写入同一个文件），并按最近访问时间淘汰到上限的 EVICT_LOW_WATER 比例，
+避免到达上限后每次写入都触发淘汰。
+
+所有方法都是同步阻塞的（线程安全），在异步代码中应通过 asyncio.to_thread 调用。
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+# 默认缓存目录：项目根目录下的 cache/，与启动时的工作目录无关
+DEFAULT_CACHE_ROOT = Path(__file__).resolve().parent.parent / "cache"
+# 超出上限时淘汰到上限的该比例
+EVICT_LOW_WATER = 0.9
+
+
+class SqliteLRUStore:
+    """
+    SQLite 键值存储，超出容量上限时按最近最少使用淘汰
+
+    Args:
+        path: SQLite 文件路径
+        table: 表名
+        value_column: 保存序列化值的列名
+        columns: 附加列定义（如 "kind TEXT"），写入时按列名传入
+        max_size_bytes: 值的总大小上限（字节）
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        table: str,
+        value_column: str = "value",
+        columns: Sequence[str] = (),
+        max_size_bytes: int = 128 * 1024 * 1024
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.table = table
+        self.value_column = value_column
+        self.columns = [column.split()[0] for column in columns]
+        self.max_size_bytes = max_size_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        definitions = ", ".join(["key TEXT PRIMARY KEY", f"{value_column} TEXT", *columns,
+                                 "size INTEGER", "created REAL", "last_access REAL"])
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({definitions})")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_access ON {table}(last_access)")
+        self._size_bytes = self._total_size()
+
+    def get(self, key: str, columns: Sequence[str] = ()) -> Optional[Tuple[Any, ...]]:
+        """查找条目并刷新最近访问时间，返回 (值, *附加列)，不存在时返回 None"""
+        selected = ", ".join([self.value_column, *columns])
+        with self._lock:
+            row = self._conn.execute(f"SELECT {selected} FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (time.time(), key))
+        return row
+
+    def put(self, key: str, value: str, **columns: Any) -> List[str]:
+        """写入条目（已存在时替换），返回因超出容量被淘汰的键"""
+        names = ["key", self.value_column, *columns, "size", "created", "last_access"]
+        size = len(value.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute(f"SELECT size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                (key, value, *columns.values(), size, now, now)
+            )
+            self._size_bytes += size - (previous[0] if previous else 0)
+            if self._size_bytes <= self.max_size_bytes:
+                return []
+            return self._evict()
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(f"SELECT size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._size_bytes -= row[0]
+        return True
+
+    def clear(self) -> int:
+        """删除全部条目，返回删除的条目数"""
+        with self._lock:
+            removed = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._size_bytes = 0
+        return removed
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size_bytes
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _total_size(self) -> int:
+        return self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+
+    def _evict(self) -> List[str]:
+        # 校准累计值：其他进程可能也写入或淘汰了条目
+        total = self._total_size()
+        target = int(self.max_size_bytes * EVICT_LOW_WATER) if total > self.max_size_bytes else total
+        evicted = []
+        for key, size in self._conn.execute(f"SELECT key, size FROM {self.table} ORDER BY last_access ASC"):
+            if total <= target:
+                break
+            evicted.append(key)
+            total -= size
+        self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", [(key,) for key in evicted])
+        self._size_bytes = total
+        self.evictions += len(evicted)
+        return evicted
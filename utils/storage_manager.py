@@ -0,0 +1,366 @@
+"""
+存储配额管理器
+跟踪 temp_extract 工作区、虚拟环境和报告文件的磁盘占用，按LRU策略在超出预算时回收空间。
+
+回收采用“先重命名、后删除”：同步阶段只把目录重命名到同一文件系统下的回收站（O(1)），
+真正的 rmtree 交给后台线程执行，请求处理路径不会被大目录删除阻塞。
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+PathLike = Union[str, Path]
+
+TRASH_DIR_NAME = ".trash"
+
+
+def get_path_size(path: PathLike) -> int:
+    """计算文件或目录占用的字节数（基于 os.scandir 的迭代遍历，不跟随符号链接）"""
+    path = Path(path)
+    try:
+        if path.is_symlink():
+            return 0
+        if path.is_file():
+            return path.stat().st_size
+    except OSError:
+        return 0
+
+    total = 0
+    stack = [str(path)]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
+
+@dataclass
+class Workspace:
+    """被跟踪的工作区（目录或文件）"""
+    path: Path
+    kind: str
+    size_bytes: int
+    created_at: float = field(default_factory=time.time)
+    last_access: float = field(default_factory=time.time)
+    pins: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "kind": self.kind,
+            "size_bytes": self.size_bytes,
+            "created_at": self.created_at,
+            "last_access": self.last_access,
+            "pinned": self.pins > 0,
+        }
+
+
+class StorageManager:
+    """
+    进程内存储配额管理器
+
+    - register: 创建工作区时登记，并一次性计算其大小
+    - touch / pin / unpin: 更新LRU顺序；被pin的工作区（正在使用中）不会被淘汰，
+      最近 min_idle_seconds 内访问过的工作区同样不会被淘汰（覆盖解压、安装依赖等进行中的阶段）
+    - refresh: 工作区内容变化后（如安装依赖）重新计算大小
+    - reclaim: 重命名到回收站后在后台线程删除
+    - enforce_budget: 总占用超出预算时按最近最少使用顺序回收
+    """
+
+    def __init__(
+        self,
+        budget_bytes: Optional[int] = None,
+        min_idle_seconds: Optional[float] = None,
+        trash_root: PathLike = "temp_extract"
+    ):
+        if budget_bytes is None:
+            budget_bytes = int(float(os.getenv("STORAGE_BUDGET_MB", "10240")) * 1024 * 1024)
+        if min_idle_seconds is None:
+            min_idle_seconds = float(os.getenv("STORAGE_MIN_IDLE_SECONDS", "300"))
+        self.budget_bytes = budget_bytes
+        self.min_idle_seconds = min_idle_seconds
+        self.trash_root = Path(trash_root)
+        self._workspaces: "OrderedDict[str, Workspace]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage-reclaim")
+        self._pending: Dict[str, Future] = {}
+        self._stats = {
+            "evictions": 0,
+            "reclaimed": 0,
+            "reclaimed_bytes": 0,
+            "reclaim_failures": 0,
+        }
+
+    @staticmethod
+    def _key(path: PathLike) -> str:
+        return str(Path(path).resolve())
+
+    def register(self, path: PathLike, kind: str = "temp_extract", pinned: bool = False) -> Optional[Workspace]:
+        """登记工作区并计算大小；登记后立即检查预算"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        workspace = Workspace(path=path.resolve(), kind=kind, size_bytes=get_path_size(path))
+        if pinned:
+            workspace.pins = 1
+        with self._lock:
+            key = str(workspace.path)
+            existing = self._workspaces.pop(key, None)
+            if existing is not None:
+                workspace.created_at = existing.created_at
+                workspace.pins += existing.pins
+            self._workspaces[key] = workspace
+        logger.debug(f"登记工作区: {path} ({kind}, {workspace.size_bytes} 字节)")
+        self.enforce_budget()
+        return workspace
+
+    def refresh(self, path: PathLike) -> Optional[Workspace]:
+        """重新计算已登记工作区的大小（例如虚拟环境安装完成后）"""
+        key = self._key(path)
+        with self._lock:
+            workspace = self._workspaces.get(key)
+        if workspace is None:
+            return None
+        size = get_path_size(workspace.path)
+        with self._lock:
+            workspace.size_bytes = size
+            workspace.last_access = time.time()
+            if key in self._workspaces:
+                self._workspaces.move_to_end(key)
+        self.enforce_budget()
+        return workspace
+
+    def touch(self, path: PathLike) -> None:
+        """标记工作区被访问（移动到LRU队尾）"""
+        key = self._key(path)
+        with self._lock:
+            workspace = self._workspaces.get(key)
+            if workspace is not None:
+                workspace.last_access = time.time()
+                self._workspaces.move_to_end(key)
+
+    def pin(self, path: PathLike) -> None:
+        """标记工作区正在使用，使用期间不会被淘汰"""
+        key = self._key(path)
+        with self._lock:
+            workspace = self._workspaces.get(key)
+            if workspace is not None:
+                workspace.pins += 1
+                workspace.last_access = time.time()
+                self._workspaces.move_to_end(key)
+
+    def unpin(self, path: PathLike) -> None:
+        """解除使用标记，并在必要时回收空间"""
+        key = self._key(path)
+        with self._lock:
+            workspace = self._workspaces.get(key)
+            if workspace is not None and workspace.pins > 0:
+                workspace.pins -= 1
+        self.enforce_budget()
+
+    def find_workspace(self, path: PathLike) -> Optional[Workspace]:
+        """查找包含给定路径的已登记工作区"""
+        resolved = Path(path).resolve()
+        with self._lock:
+            for candidate in [resolved, *resolved.parents]:
+                workspace = self._workspaces.get(str(candidate))
+                if workspace is not None:
+                    return workspace
+        return None
+
+    @property
+    def used_bytes(self) -> int:
+        with self._lock:
+            return sum(workspace.size_bytes for workspace in self._workspaces.values())
+
+    def enforce_budget(self) -> List[str]:
+        """超出预算时按LRU顺序回收未被使用的工作区，返回被回收的路径"""
+        victims: List[Workspace] = []
+        now = time.time()
+        with self._lock:
+            used = sum(workspace.size_bytes for workspace in self._workspaces.values())
+            if used <= self.budget_bytes:
+                return []
+            for workspace in self._workspaces.values():
+                if used <= self.budget_bytes:
+                    break
+                if workspace.pins > 0 or now - workspace.last_access < self.min_idle_seconds:
+                    continue
+                victims.append(workspace)
+                used -= workspace.size_bytes
+
+        evicted = []
+        for workspace in victims:
+            if self.reclaim(workspace.path):
+                evicted.append(str(workspace.path))
+                with self._lock:
+                    self._stats["evictions"] += 1
+        if evicted:
+            logger.info(f"存储超出预算，已淘汰 {len(evicted)} 个工作区")
+        return evicted
+
+    def reclaim(self, path: PathLike) -> bool:
+        """
+        回收工作区：同步重命名到回收站，后台线程删除
+
+        路径不存在或重命名失败时返回 False（未登记的路径同样可以回收）。
+        """
+        path = Path(path)
+        key = self._key(path)
+        with self._lock:
+            workspace = self._workspaces.pop(key, None)
+        size = workspace.size_bytes if workspace is not None else None
+
+        if not path.exists():
+            return False
+
+        trash_dir = self.trash_root / TRASH_DIR_NAME
+        target = trash_dir / f"{path.name}_{uuid.uuid4().hex[:8]}"
+        try:
+            trash_dir.mkdir(parents=True, exist_ok=True)
+            path.rename(target)
+        except OSError as e:
+            # 跨文件系统或文件被占用时无法重命名，退回到后台直接删除原路径
+            logger.debug(f"重命名到回收站失败，直接删除: {path}, 错误: {e}")
+            target = path
+
+        future = self._executor.submit(self._delete, target, size)
+        with self._lock:
+            self._pending[str(target)] = future
+        future.add_done_callback(lambda _: self._forget_pending(str(target)))
+        return True
+
+    def _forget_pending(self, key: str) -> None:
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def _delete(self, target: Path, size: Optional[int]) -> None:
+        if size is None:
+            size = get_path_size(target)
+        try:
+            if target.is_dir() and not target.is_symlink():
+                shutil.rmtree(target, ignore_errors=True)
+            else:
+                target.unlink()
+        except OSError as e:
+            logger.warning(f"删除失败: {target}, 错误: {e}")
+        with self._lock:
+            if target.exists():
+                self._stats["reclaim_failures"] += 1
+            else:
+                self._stats["reclaimed"] += 1
+                self._stats["reclaimed_bytes"] += size
+
+    def adopt_existing(self, root: PathLike = "temp_extract", pattern: str = "project_*") -> int:
+        """
+        登记启动前遗留的工作区，并清空上次未删除完的回收站
+
+        遗留工作区按修改时间排序加入LRU队列，返回登记数量。
+        """
+        root = Path(root)
+        if not root.exists():
+            return 0
+        trash_dir = root / TRASH_DIR_NAME
+        if trash_dir.exists():
+            for leftover in trash_dir.iterdir():
+                future = self._executor.submit(self._delete, leftover, None)
+                with self._lock:
+                    self._pending[str(leftover)] = future
+                future.add_done_callback(lambda _, key=str(leftover): self._forget_pending(key))
+
+        candidates = []
+        for item in root.glob(pattern):
+            try:
+                candidates.append((item.stat().st_mtime, item))
+            except OSError:
+                continue
+
+        adopted = 0
+        for mtime, item in sorted(candidates):
+            key = self._key(item)
+            with self._lock:
+                if key in self._workspaces:
+                    continue
+            workspace = Workspace(
+                path=item.resolve(), kind="temp_extract", size_bytes=get_path_size(item),
+                created_at=mtime, last_access=mtime
+            )
+            with self._lock:
+                self._workspaces[key] = workspace
+            adopted += 1
+        self.enforce_budget()
+        return adopted
+
+    def wait_for_pending(self, timeout: Optional[float] = None) -> bool:
+        """等待所有后台删除完成（主要用于测试和关闭流程）"""
+        with self._lock:
+            futures = list(self._pending.values())
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for future in futures:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                future.result(timeout=remaining)
+            except Exception:
+                return False
+        return True
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """返回存储使用指标"""
+        with self._lock:
+            by_kind: Dict[str, Dict[str, int]] = {}
+            for workspace in self._workspaces.values():
+                entry = by_kind.setdefault(workspace.kind, {"count": 0, "size_bytes": 0})
+                entry["count"] += 1
+                entry["size_bytes"] += workspace.size_bytes
+            used = sum(entry["size_bytes"] for entry in by_kind.values())
+            return {
+                "budget_bytes": self.budget_bytes,
+                "used_bytes": used,
+                "usage_ratio": used / self.budget_bytes if self.budget_bytes else 0.0,
+                "workspaces": len(self._workspaces),
+                "pinned_workspaces": sum(1 for w in self._workspaces.values() if w.pins > 0),
+                "by_kind": by_kind,
+                "pending_deletions": len(self._pending),
+                **self._stats,
+            }
+
+    def list_workspaces(self) -> List[Dict[str, Any]]:
+        """按LRU顺序（最久未使用在前）列出工作区"""
+        with self._lock:
+            return [workspace.to_dict() for workspace in self._workspaces.values()]
+
+
+# 全局存储管理器实例
+_storage_manager: Optional[StorageManager] = None
+_storage_manager_lock = threading.Lock()
+
+
+def get_storage_manager() -> StorageManager:
+    """获取全局存储管理器实例（线程安全：register/refresh 会在工作线程中调用）"""
+    global _storage_manager
+    if _storage_manager is None:
+        with _storage_manager_lock:
+            if _storage_manager is None:
+                _storage_manager = StorageManager()
+    return _storage_manager
@@ -0,0 +1,179 @@
+"""
+轻量级调用链追踪
+span 记录一次操作（工作流节点、Agent任务、工具子进程、LLM请求等）的名称、耗时、属性和父子关系，
+同一工作流的所有 span 共享一个 trace_id（由工作流ID派生），可通过 get_trace 查看工作流的完整调用链。
+
+- 当前 span 保存在 contextvars 中：asyncio.create_task 启动的协程复制当前上下文，
+  线程池中的同步代码（Agent 的工具调用）由 run_in_executor 调用方负责复制上下文
+- trace_id 随事件总线消息传递（消息的 trace_id 字段），Agent 收到任务消息后在该 trace 下执行
+- 结束的 span 保存在有界的环形缓冲区中，不做采样和外部导出；CODEAGENT_INSTRUMENTATION=0 时关闭
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+# (trace_id, span_id)：span_id 为 None 表示只绑定了 trace、尚未开始 span（如刚收到任务消息）
+_current: contextvars.ContextVar[Optional[Tuple[str, Optional[str]]]] = contextvars.ContextVar(
+    "trace_context", default=None
+)
+
+_enabled = os.getenv("CODEAGENT_INSTRUMENTATION", "1").lower() not in ("0", "false", "no", "off")
+
+
+@dataclass
+class Span:
+    """一次操作的追踪记录"""
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    start_time: float
+    duration: Optional[float] = None
+    status: str = "ok"
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "status": self.status,
+            "error": self.error,
+            "attributes": dict(self.attributes)
+        }
+
+
+class _NoopSpan:
+    """追踪关闭时返回的空 span"""
+    trace_id = None
+    span_id = None
+    attributes: Dict[str, Any] = {}
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """span 的创建与保存"""
+
+    def __init__(self, max_spans: int = 5000):
+        self._spans: Deque[Span] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, trace_id: Optional[str] = None, **attributes: Any) -> Iterator[Span]:
+        """
+        在当前上下文中开始一个 span，退出时记录耗时；异常时记录错误并继续抛出
+
+        Args:
+            trace_id: 指定 trace（如工作流的 trace），默认沿用当前 trace，没有时新建
+        """
+        if not _enabled:
+            yield _NOOP_SPAN
+            return
+        parent = _current.get()
+        if trace_id is None:
+            trace_id = parent[0] if parent else new_trace_id()
+        parent_id = parent[1] if parent and parent[0] == trace_id else None
+        span = Span(trace_id, uuid.uuid4().hex[:16], parent_id, name, time.time(), attributes=attributes)
+        token = _current.set((trace_id, span.span_id))
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "cancelled" if isinstance(e, asyncio.CancelledError) else "error"
+            span.error = str(e) or type(e).__name__
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            _current.reset(token)
+            with self._lock:
+                self._spans.append(span)
+
+    def get_trace(self, trace_id: str) -> List[Dict[str, Any]]:
+        """某个 trace 中仍在缓冲区内的 span，按开始时间排序"""
+        with self._lock:
+            spans = [s for s in self._spans if s.trace_id == trace_id]
+        return [s.to_dict() for s in sorted(spans, key=lambda s: s.start_time)]
+
+    def recent(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """最近结束的 span"""
+        with self._lock:
+            spans = list(self._spans)[-limit:]
+        return [s.to_dict() for s in spans]
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def span(name: str, trace_id: Optional[str] = None, **attributes: Any):
+    """在全局 tracer 上开始一个 span（用法：with span("tool.pylint", mode="file"): ...）"""
+    return _tracer.span(name, trace_id=trace_id, **attributes)
+
+
+def get_trace(trace_id: str) -> List[Dict[str, Any]]:
+    return _tracer.get_trace(trace_id)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def trace_id_for(workflow_id: str) -> str:
+    """工作流的 trace_id：由工作流ID确定性派生，工作流的所有任务和事件都归入同一个 trace"""
+    return uuid.uuid5(uuid.NAMESPACE_URL, f"codeagent:workflow:{workflow_id}").hex
+
+
+def current_trace_id() -> Optional[str]:
+    context = _current.get()
+    return context[0] if context else None
+
+
+def bind_trace(trace_id: Optional[str]) -> Optional[contextvars.Token]:
+    """在当前上下文中绑定 trace（不开始 span），返回用于恢复的 token；trace_id 为空时不做任何事"""
+    if not trace_id or not _enabled:
+        return None
+    context = _current.get()
+    if context and context[0] == trace_id:
+        return None
+    return _current.set((trace_id, None))
+
+
+def reset_trace(token: Optional[contextvars.Token]) -> None:
+    if token is not None:
+        _current.reset(token)
+
+
+def tracing_enabled() -> bool:
+    return _enabled
+
+
+def set_tracing_enabled(enabled: bool) -> None:
+    global _enabled
+    _enabled = enabled